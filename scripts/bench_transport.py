@@ -0,0 +1,194 @@
+"""
+传输后端基准测试
+启动本地模拟导出服务（支持HTTP/1.1与h2c），用 AsyncFeishuExporter 的真实导出流程
+（创建任务 → 轮询 → 下载）对比各传输后端的吞吐量和建立的连接数
+
+依赖（仅本脚本需要）：
+    pip install hypercorn httpx[http2]
+
+用法：
+    python scripts/bench_transport.py --docs 200 --concurrency 20 --latency 0.05
+"""
+import os
+import sys
+import time
+import json
+import uuid
+import asyncio
+import argparse
+import tempfile
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from async_exporter import AsyncFeishuExporter  # noqa: E402
+from export_stats import ExportStats  # noqa: E402
+import transport as transport_module  # noqa: E402
+
+try:
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+except ImportError:
+    serve = None
+
+
+class MockExportServer:
+    """模拟飞书导出接口的ASGI应用，统计客户端连接数"""
+
+    def __init__(self, latency: float, polls: int, file_size: int):
+        self.latency = latency
+        self.polls = polls
+        self.payload = os.urandom(file_size)
+        self.tickets = {}
+        self.clients = set()
+        self.requests = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.clients.add(tuple(scope.get("client") or ()))
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+
+        path = scope["path"]
+        if scope["method"] == "POST" and path.endswith("/export_tasks"):
+            ticket = uuid.uuid4().hex
+            self.tickets[ticket] = 0
+            await self._json(send, {"code": 0, "data": {"ticket": ticket}})
+        elif "/export_tasks/file/" in path:
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"application/octet-stream"),
+                (b"content-length", str(len(self.payload)).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": self.payload})
+        elif "/export_tasks/" in path:
+            ticket = path.rsplit("/", 1)[-1]
+            self.tickets[ticket] = self.tickets.get(ticket, 0) + 1
+            if self.tickets[ticket] >= self.polls:
+                result = {"job_status": 0, "file_token": ticket}
+            else:
+                result = {"job_status": 1}
+            await self._json(send, {"code": 0, "data": {"result": result}})
+        else:
+            await self._json(send, {"code": 404, "msg": "not found"}, status=404)
+
+    @staticmethod
+    async def _json(send, body: dict, status: int = 200):
+        data = json.dumps(body).encode()
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(data)).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": data})
+
+    def reset(self):
+        self.clients.clear()
+        self.requests = 0
+
+
+def start_server(app, port: int):
+    """在后台线程中运行hypercorn，返回停止函数"""
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.loglevel = "WARNING"
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve(app, config, shutdown_trigger=stop.wait))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    time.sleep(1.0)
+
+    def shutdown():
+        loop.call_soon_threadsafe(stop.set)
+        thread.join(timeout=5)
+
+    return shutdown
+
+
+def create_transport(backend: str):
+    """创建异步传输（HTTP/2后端对明文本地服务使用h2c）"""
+    headers = {"Authorization": "Bearer bench", "Content-Type": "application/json; charset=utf-8"}
+    if backend == "http2":
+        return transport_module.AsyncHttp2Transport(headers, prior_knowledge=True)
+    if backend == "requests":
+        return transport_module.AsyncThreadedTransport(transport_module.RequestsTransport(), headers)
+    return transport_module.AiohttpTransport(headers)
+
+
+async def run_backend(backend: str, base_url: str, docs: int, concurrency: int, workdir: str) -> float:
+    """用指定后端导出docs篇文档，返回耗时"""
+    api = SimpleNamespace(access_token="bench", transport_name=backend, transport=None)
+    limits = {name: 10 ** 9 for name in ("export_create", "export_query", "export_download")}
+    exporter = AsyncFeishuExporter(
+        api, stats=ExportStats(path=os.path.join(workdir, "stats.json")),
+        rate_limits=limits, hedging={"enabled": False}
+    )
+    exporter.base_url = base_url
+    exporter.session = create_transport(backend)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def export_one(i: int):
+        nonlocal failures
+        async with semaphore:
+            result = await exporter.export_document_batch(f"doc{i}", "docx", ["pdf"], workdir, f"{backend}_{i}")
+            if not result["pdf"][0]:
+                failures += 1
+
+    start = time.time()
+    try:
+        await asyncio.gather(*(export_one(i) for i in range(docs)))
+    finally:
+        await exporter.session.close()
+    elapsed = time.time() - start
+    if failures:
+        print(f"  ⚠️ {backend}: {failures} 篇导出失败")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比传输后端的导出吞吐量")
+    parser.add_argument("--docs", type=int, default=200, help="模拟文档数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发导出数")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务端每个请求的延迟（秒）")
+    parser.add_argument("--polls", type=int, default=3, help="任务完成前需要的查询次数")
+    parser.add_argument("--size", type=int, default=256, help="导出文件大小（KB）")
+    parser.add_argument("--port", type=int, default=18443, help="模拟服务端口")
+    parser.add_argument("--backends", default="aiohttp,requests,http2", help="逗号分隔的后端列表")
+    args = parser.parse_args()
+
+    if serve is None:
+        print("❌ 需要安装 hypercorn: pip install hypercorn")
+        return 1
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "http2" in backends and transport_module.httpx is None:
+        print("⚠️ 未安装 httpx[http2]，跳过 http2 后端")
+        backends.remove("http2")
+
+    app = MockExportServer(args.latency, args.polls, args.size * 1024)
+    shutdown = start_server(app, args.port)
+    base_url = f"http://127.0.0.1:{args.port}/open-apis"
+
+    print(f"📊 {args.docs} 篇文档, 并发 {args.concurrency}, 延迟 {args.latency * 1000:.0f}ms, "
+          f"每篇 {args.polls} 次查询, 文件 {args.size}KB")
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for backend in backends:
+                app.reset()
+                elapsed = asyncio.run(run_backend(backend, base_url, args.docs, args.concurrency, workdir))
+                print(f"  {backend:<10} {elapsed:7.2f}秒  {args.docs / elapsed:7.1f} 篇/秒  "
+                      f"{app.requests / elapsed:7.1f} 请求/秒  连接数 {len(app.clients)}")
+    finally:
+        shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+应用数据目录模块
+统一管理跨运行持久化的数据（统计、缓存、索引等）的存放位置
+"""
+import os
+
+
+def get_data_dir(*parts: str) -> str:
+    """
+    获取应用数据目录（不存在时自动创建）
+
+    默认位于用户主目录下的 .docharvest，可通过环境变量 DOCHARVEST_HOME 覆盖
+
+    Args:
+        parts: 子目录名
+
+    Returns:
+        目录绝对路径
+    """
+    root = os.environ.get("DOCHARVEST_HOME") or os.path.join(os.path.expanduser("~"), ".docharvest")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
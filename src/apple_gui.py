@@ -12,6 +12,7 @@ from PyQt5.QtGui import *
 
 from feishu_api import FeishuAPI
 from workers import WikiWorkerThread
+from node_filter import NodeFilter
 
 
 
@@ -259,11 +260,13 @@ class AppleMainWindow(QMainWindow):
     def _save_config(self):
         root_dir = os.path.dirname(os.path.dirname(__file__))
         config_path = os.path.join(root_dir, 'config_local.json')
-        config = {
+        # 保留界面上没有的配置项（如 filters）
+        config = dict(self.config)
+        config.update({
             "app_id": self.app_id_input.text().strip(),
             "app_secret": self.app_secret_input.text().strip(),
             "default_save_path": self.save_path_input.text().strip()
-        }
+        })
         try:
             with open(config_path, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=2, ensure_ascii=False)
@@ -564,10 +567,22 @@ class AppleMainWindow(QMainWindow):
     
     def _create_export_button(self, parent_layout):
         """创建导出按钮"""
+        row = QHBoxLayout()
+        row.setSpacing(12)
+        
+        self.plan_btn = AppleButton("预估", 'secondary')
+        self.plan_btn.setFixedHeight(50)
+        self.plan_btn.setFixedWidth(120)
+        self.plan_btn.setToolTip("只遍历目录，统计文档并预估API调用次数和耗时")
+        self.plan_btn.clicked.connect(lambda: self._start_export(plan_only=True))
+        row.addWidget(self.plan_btn)
+        
         self.export_btn = AppleButton("开始导出", 'primary')
         self.export_btn.setFixedHeight(50)
-        self.export_btn.clicked.connect(self._start_export)
-        parent_layout.addWidget(self.export_btn)
+        self.export_btn.clicked.connect(lambda: self._start_export())
+        row.addWidget(self.export_btn)
+        
+        parent_layout.addLayout(row)
     
     def _create_console_section(self, parent_layout):
         """创建控制台日志区域"""
@@ -666,7 +681,7 @@ class AppleMainWindow(QMainWindow):
         self.log_text.append(html)
         self.log_text.verticalScrollBar().setValue(self.log_text.verticalScrollBar().maximum())
     
-    def _start_export(self):
+    def _start_export(self, plan_only=False):
         app_id = self.app_id_input.text().strip()
         app_secret = self.app_secret_input.text().strip()
         wiki_link = self.link_input.toPlainText().strip()
@@ -689,17 +704,35 @@ class AppleMainWindow(QMainWindow):
             QMessageBox.warning(self, "提示", "请至少选择一种导出格式")
             return
         
+        try:
+            node_filter = NodeFilter.from_config(self.config.get("filters"))
+        except ValueError as e:
+            QMessageBox.warning(self, "提示", f"过滤配置无效: {e}")
+            return
+        
         self._save_config()
         
         self.export_btn.setEnabled(False)
-        self.export_btn.setText("导出中...")
+        self.plan_btn.setEnabled(False)
+        self.export_btn.setText("预估中..." if plan_only else "导出中...")
         self.log_text.clear()
         
         max_workers = self.workers_spinbox.value()
         
         self.worker_thread = WikiWorkerThread(
             app_id, app_secret, wiki_link, save_path,
-            export_formats, True, max_workers, True
+            export_formats, True, max_workers, True,
+            node_filter=node_filter, plan_only=plan_only,
+            rate_limits=self.config.get("rate_limits"),
+            hedging=self.config.get("hedging"),
+            transport=self.config.get("transport"),
+            md_source=self.config.get("md_source"),
+            media=self.config.get("media"),
+            render_modes=self.config.get("render_modes"),
+            render_processes=self.config.get("render_processes"),
+            output=self.config.get("output"),
+            export_cache=self.config.get("export_cache"),
+            content_store=self.config.get("content_store")
         )
         
         self.worker_thread.log_signal.connect(self._append_log)
@@ -708,6 +741,7 @@ class AppleMainWindow(QMainWindow):
     
     def _on_finished(self, success, message):
         self.export_btn.setEnabled(True)
+        self.plan_btn.setEnabled(True)
         self.export_btn.setText("开始导出")
         
         if success:
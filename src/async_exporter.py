@@ -1,68 +1,81 @@
 """
 异步飞书导出器 - 极速版本
-使用aiohttp实现异步并发,大幅提升速度
+使用异步I/O实现并发（默认aiohttp，可切换为HTTP/2多路复用）,大幅提升速度
 目标: 100-200篇文档在60秒内完成
 """
 import os
 import time
 import logging
 import asyncio
-import aiohttp
 from typing import Optional, Dict, Any, Tuple, List
+from node_filter import NodeFilter
+from export_stats import ExportStats, get_default_stats
+from content_store import ContentStore, content_store_from_config
+from export_cache import ExportCache, export_cache_from_config
+from export_scheduler import ExportScheduler
+from rate_limiter import AsyncRateLimiter
+from hedging import RequestHedger
+from ranged_download import AsyncRangedDownloader
+from transport import create_async_transport
+import json_codec
+from block_converter import MD_SOURCE_BLOCKS, MD_SOURCES, MD_RATE_LIMIT_KEYS, export_document_markdown
+from media_fetcher import MediaFetcher
+from local_renderer import LocalRenderer, normalize_render_modes, split_formats
+from render_service import RenderService
+from path_planner import PathPlanner
+from output_sink import (META_SOURCE_VERSION, OutputSink, create_output_sink, document_metadata,
+                         export_name, normalize_output_config, output_export_formats)
 
 
 class AsyncFeishuExporter:
-    """异步飞书导出器 - 使用aiohttp实现高并发"""
+    """异步飞书导出器 - 高并发（传输后端可配置）"""
     
-    def __init__(self, api):
+    def __init__(self, api, stats: ExportStats = None, rate_limits: Dict[str, float] = None,
+                 hedging: Dict[str, Any] = None, cache: ExportCache = None):
         """
         初始化异步导出器
         
         Args:
             api: FeishuAPI实例
+            stats: 导出耗时统计（默认使用进程内共享实例）
+            rate_limits: 各接口频控（次/分钟），覆盖默认值
+            hedging: 请求对冲配置（config.json中的 "hedging"）
+            cache: 跨运行的导出缓存（可选）
         """
         self.api = api
         self.logger = logging.getLogger(__name__)
         self.base_url = "https://open.feishu.cn/open-apis"
+        self.stats = stats or get_default_stats()
+        self.cache = cache
         
-        # 配置连接池
-        self.connector = None
+        # 频控与对冲（对冲请求同样占用频控额度）
+        self.rate_limiter = AsyncRateLimiter(rate_limits)
+        self.hedger = RequestHedger.from_config(self.rate_limiter, hedging)
+        
+        # 传输会话（进入上下文时创建）
         self.session = None
     
     async def __aenter__(self):
         """异步上下文管理器 - 进入"""
-        # 创建连接池 - 允许更多并发连接
-        self.connector = aiohttp.TCPConnector(
-            limit=50,  # 最大连接数
-            limit_per_host=20,  # 每个主机最大连接数
-            ttl_dns_cache=300,  # DNS缓存时间
-            force_close=False,  # 保持连接
-            enable_cleanup_closed=True
-        )
-        
-        # 创建会话 - 配置超时
-        timeout = aiohttp.ClientTimeout(
-            total=120,  # 总超时
-            connect=10,  # 连接超时
-            sock_read=30  # 读取超时
-        )
-        
-        self.session = aiohttp.ClientSession(
-            connector=self.connector,
-            timeout=timeout,
+        # 按配置创建传输（aiohttp连接池 / HTTP/2多路复用 / 线程池中的requests会话）
+        self.session = create_async_transport(
+            self.api.transport_name,
             headers={
                 "Authorization": f"Bearer {self.api.access_token}",
                 "Content-Type": "application/json; charset=utf-8"
-            }
+            },
+            sync_transport=self.api.transport
         )
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器 - 退出"""
+        if self.hedger and self.hedger.hedges_issued:
+            self.logger.info(
+                f"⏱️ 对冲请求: 发起 {self.hedger.hedges_issued} 次，胜出 {self.hedger.hedges_won} 次"
+            )
         if self.session:
             await self.session.close()
-        if self.connector:
-            await self.connector.close()
     
     async def export_document_batch(
         self, 
@@ -70,7 +83,8 @@ class AsyncFeishuExporter:
         doc_type: str, 
         export_formats: List[str], 
         base_path: str, 
-        filename: str
+        filename: str,
+        revision: str = None
     ) -> Dict[str, Tuple[bool, str]]:
         """
         异步批量导出文档（真正并发）
@@ -81,6 +95,7 @@ class AsyncFeishuExporter:
             export_formats: 导出格式列表
             base_path: 保存目录
             filename: 文件名
+            revision: 文档版本（如 obj_edit_time，可选）；提供时先查找导出缓存
             
         Returns:
             {格式: (成功, 错误信息)}
@@ -90,7 +105,7 @@ class AsyncFeishuExporter:
         
         # 并发创建所有导出任务
         tasks = [
-            self._export_single_format(doc_token, doc_type, fmt, base_path, filename)
+            self._export_single_format(doc_token, doc_type, fmt, base_path, filename, revision)
             for fmt in export_formats
         ]
         
@@ -112,15 +127,30 @@ class AsyncFeishuExporter:
         doc_type: str,
         export_format: str,
         base_path: str,
-        filename: str
+        filename: str,
+        revision: str = None
     ) -> Tuple[bool, str]:
         """
-        异步导出单个格式
+        异步导出单个格式（导出缓存中有该版本时直接使用）
         
         Returns:
             (成功, 错误信息)
         """
+        start_time = time.time()
+        save_path = os.path.join(base_path, f"{filename}.{export_format}")
+        loop = asyncio.get_running_loop()
         try:
+            # 步骤0: 查找导出缓存（链接或复制文件在线程池中执行）
+            if self.cache is not None:
+                cached = self.cache.lookup(doc_token, revision, export_format)
+                if cached:
+                    try:
+                        await loop.run_in_executor(None, self.cache.materialize, cached, save_path)
+                        self.logger.info(f"♻️ 使用缓存的{export_format.upper()}: {doc_token}")
+                        return (True, "")
+                    except Exception as e:
+                        self.logger.warning(f"使用导出缓存失败，重新导出: {str(e)}")
+            
             # 步骤1: 创建导出任务
             ticket = await self._create_export_task(doc_token, doc_type, export_format)
             if not ticket:
@@ -132,10 +162,12 @@ class AsyncFeishuExporter:
                 return (False, "查询任务失败或超时")
             
             # 步骤3: 下载文件
-            save_path = os.path.join(base_path, f"{filename}.{export_format}")
             success = await self._download_exported_file(file_token, save_path)
             
             if success:
+                self.stats.record(export_format, time.time() - start_time, doc_token)
+                if self.cache is not None:
+                    await loop.run_in_executor(None, self.cache.add, doc_token, revision, export_format, save_path)
                 return (True, "")
             else:
                 return (False, "下载失败")
@@ -171,8 +203,9 @@ class AsyncFeishuExporter:
         }
         
         try:
+            await self.rate_limiter.acquire("export_create")
             async with self.session.post(url, json=payload) as response:
-                result = await response.json()
+                result = await json_codec.decode_async_response(response)
                 
                 if result.get("code") == 0:
                     ticket = result.get("data", {}).get("ticket")
@@ -207,48 +240,49 @@ class AsyncFeishuExporter:
         
         while time.time() - start_time < max_wait:
             try:
-                async with self.session.get(url, params=params) as response:
-                    result = await response.json()
+                result = await self._hedged(
+                    "poll", "export_query",
+                    lambda attempt: self._poll_once(url, params, attempt)
+                )
+                if result.get("code") == 0:
+                    data = result.get("data", {})
+                    result_data = data.get("result", data)
                     
-                    if result.get("code") == 0:
-                        data = result.get("data", {})
-                        result_data = data.get("result", data)
-                        
-                        job_status = result_data.get("job_status")
-                        
-                        # 成功
-                        if job_status in [0, "success"]:
-                            file_token = (
-                                result_data.get("file_token") or 
-                                result_data.get("token") or
-                                result_data.get("ticket")
-                            )
-                            
-                            if file_token and file_token.strip():
-                                return file_token.strip()
-                            
-                            # 任务成功但token为空,继续等待
-                            await asyncio.sleep(0.3)
+                    job_status = result_data.get("job_status")
+                    
+                    # 成功
+                    if job_status in [0, "success"]:
+                        file_token = (
+                            result_data.get("file_token") or 
+                            result_data.get("token") or
+                            result_data.get("ticket")
+                        )
                         
-                        # 失败
-                        elif job_status in [3, "failed"]:
-                            error_msg = data.get("job_error_msg", "Unknown error")
-                            self.logger.error(f"导出失败: {error_msg}")
-                            return None
+                        if file_token and file_token.strip():
+                            return file_token.strip()
                         
-                        # 进行中 - 激进轮询策略
-                        else:
-                            check_count += 1
-                            if check_count <= 5:
-                                await asyncio.sleep(0.2)  # 前5次快速检查
-                            elif check_count <= 10:
-                                await asyncio.sleep(0.5)  # 6-10次中速
-                            else:
-                                await asyncio.sleep(1)    # 之后正常间隔
-                    else:
-                        self.logger.error(f"查询失败: {result.get('msg')}")
+                        # 任务成功但token为空,继续等待
+                        await asyncio.sleep(0.3)
+                    
+                    # 失败
+                    elif job_status in [3, "failed"]:
+                        error_msg = data.get("job_error_msg", "Unknown error")
+                        self.logger.error(f"导出失败: {error_msg}")
                         return None
-            
+                    
+                    # 进行中 - 激进轮询策略
+                    else:
+                        check_count += 1
+                        if check_count <= 5:
+                            await asyncio.sleep(0.2)  # 前5次快速检查
+                        elif check_count <= 10:
+                            await asyncio.sleep(0.5)  # 6-10次中速
+                        else:
+                            await asyncio.sleep(1)    # 之后正常间隔
+                else:
+                    self.logger.error(f"查询失败: {result.get('msg')}")
+                    return None
+        
             except asyncio.TimeoutError:
                 self.logger.warning("查询超时,重试...")
                 await asyncio.sleep(1)
@@ -259,39 +293,92 @@ class AsyncFeishuExporter:
         self.logger.error("导出超时")
         return None
     
+    async def _hedged(self, kind: str, endpoint: str, request):
+        """
+        执行可对冲的请求（未启用对冲时直接执行原始请求）
+        
+        Args:
+            kind: 请求类型，如 'poll'、'download'
+            endpoint: 频控接口名
+            request: 请求工厂 request(attempt)
+        """
+        if self.hedger:
+            return await self.hedger.run(kind, endpoint, request)
+        return await request(0)
+    
+    async def _poll_once(self, url: str, params: dict, attempt: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        查询一次导出任务状态
+        
+        Args:
+            attempt: 0为原始请求，对冲请求的频控额度由对冲器占用
+        """
+        if attempt == 0:
+            await self.rate_limiter.acquire("export_query")
+        async with self.session.get(url, params=params) as response:
+            return await json_codec.decode_async_response(response)
+    
     async def _download_exported_file(
         self, 
         file_token: str, 
         save_path: str
     ) -> bool:
         """
-        异步下载文件
+        异步下载文件（慢下载会触发对冲请求，先完成者胜出）
         
         Returns:
             是否成功
         """
         url = f"{self.base_url}/drive/v1/export_tasks/file/{file_token}/download"
         
+        # 确保目录存在
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        
         try:
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    self.logger.error(f"下载失败: HTTP {response.status}")
-                    return False
-                
-                # 确保目录存在
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                
-                # 异步写入文件
-                with open(save_path, 'wb') as f:
-                    async for chunk in response.content.iter_chunked(8192):
-                        f.write(chunk)
-                
-                self.logger.info(f"✓ 已下载: {os.path.basename(save_path)}")
-                return True
+            part_path = await self._hedged(
+                "download", "export_download",
+                lambda attempt: self._download_attempt(url, save_path, attempt)
+            )
+            if not part_path:
+                return False
+            
+            os.replace(part_path, save_path)
+            self.logger.info(f"✓ 已下载: {os.path.basename(save_path)}")
+            return True
         
         except Exception as e:
             self.logger.error(f"下载异常: {str(e)}")
             return False
+        finally:
+            # 清理落败请求留下的临时文件
+            for attempt in (0, 1):
+                part_path = f"{save_path}.part{attempt}"
+                if os.path.exists(part_path):
+                    try:
+                        os.remove(part_path)
+                    except OSError:
+                        pass
+    
+    async def _download_attempt(self, url: str, save_path: str, attempt: int = 0) -> Optional[str]:
+        """
+        执行一次下载，写入该次请求独占的临时文件（支持断点续传和分段并行下载）
+        
+        Returns:
+            临时文件路径，失败返回None
+        """
+        if attempt == 0:
+            await self.rate_limiter.acquire("export_download")
+        
+        part_path = f"{save_path}.part{attempt}"
+        
+        # 中断后按Range续传，大文件分段并行下载（后续请求同样占用频控额度）
+        downloader = AsyncRangedDownloader(
+            self.session,
+            acquire=lambda: self.rate_limiter.acquire("export_download")
+        )
+        if await downloader.download(url, part_path):
+            return part_path
+        return None
 
 
 class AsyncParallelWikiCrawler:
@@ -300,29 +387,85 @@ class AsyncParallelWikiCrawler:
     使用异步I/O + 高并发实现极致性能
     """
     
-    def __init__(self, api, export_formats: List[str] = None, max_workers: int = 10):
+    def __init__(self, api, export_formats: List[str] = None, max_workers: int = 10,
+                 node_filter: NodeFilter = None, aging_rate: float = 0.5,
+                 rate_limits: Dict[str, float] = None, hedging: Dict[str, Any] = None,
+                 md_source: str = MD_SOURCE_BLOCKS, media: Dict[str, Any] = None,
+                 render_modes: Dict[str, str] = None, render_processes: int = None,
+                 output: Dict[str, Any] = None, export_cache: Dict[str, Any] = None,
+                 content_store: Dict[str, Any] = None):
         """
         Args:
             api: FeishuAPI实例
             export_formats: 导出格式列表
             max_workers: 最大并发数（建议10-20）
+            node_filter: 节点过滤器（可选）
+            aging_rate: 调度老化系数（每等待1秒相当于预测耗时增加的秒数）
+            rate_limits: 各接口频控（次/分钟），覆盖默认值
+            hedging: 请求对冲配置
+            md_source: Markdown内容来源（'blocks' 文档块 / 'raw' 纯文本）
+            media: 图片/附件下载配置（可选）
+            render_modes: PDF/Word的渲染方式（可选），如 {"pdf": "local"}
+            render_processes: 本地渲染的进程数（None为按CPU核数，0为在线程中渲染）
+            output: 输出目标配置（可选），如 {"format": "zip"}
+            export_cache: 原生导出缓存配置（可选），如 {"enabled": true, "max_cache_mb": 4096}
+            content_store: 文档内容存储配置（可选），如 {"enabled": true, "max_cache_mb": 1024}
         """
+        if md_source not in MD_SOURCES:
+            raise ValueError(f"未知的Markdown内容来源: {md_source}")
         self.api = api
-        self.export_formats = export_formats or ['pdf']
+        self.output = normalize_output_config(output)
+        self.export_cache: Optional[ExportCache] = export_cache_from_config(export_cache)
+        self.content_store: Optional[ContentStore] = content_store_from_config(content_store)
+        self.sink: Optional[OutputSink] = None
+        self.path_planner = PathPlanner()
+        self.export_formats = output_export_formats(self.output, export_formats or ['pdf'])
+        self.render_modes = normalize_render_modes(render_modes)
+        self.local_formats, self.native_formats = split_formats(self.export_formats, self.render_modes)
+        self.render_processes = render_processes
+        self.render_service: Optional[RenderService] = None
         self.max_workers = max_workers
+        self.node_filter = node_filter
+        self.aging_rate = aging_rate
+        self.rate_limits = rate_limits
+        self.hedging = hedging
+        self.md_source = md_source
+        self.media = media
+        self.media_fetcher: Optional[MediaFetcher] = None
         self.logger = logging.getLogger(__name__)
         self.crawled_nodes = set()
-        self.semaphore = None  # 并发控制信号量
+        self.traversal_errors = 0  # 因出错没有遍历到的子树数（列出子节点失败等；不为0时同步目录保留未出现的页面）
     
-    def _sanitize_filename(self, filename: str) -> str:
-        """清理文件名"""
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            filename = filename.replace(char, '_')
-        filename = filename.strip()
-        if len(filename) > 100:
-            filename = filename[:100]
-        return filename or "未命名"
+    def _export_markdown(self, document_id: str, title: str, file_path: str, revision: str = None) -> bool:
+        """获取文档内容并保存为Markdown（同步，在线程池中调用）"""
+        return export_document_markdown(self.api, document_id, file_path, title, self.md_source,
+                                        media=self.media_fetcher, content_store=self.content_store,
+                                        revision=revision)
+    
+    def _render_local(self, document_id: str, title: str, base_path: str, filename: str,
+                      metadata: Dict[str, str] = None) -> Dict[str, Tuple[bool, str]]:
+        """获取一次文档内容并本地渲染（同步，在线程池中调用）"""
+        formats = (['md'] if 'md' in self.export_formats else []) + self.local_formats
+        renderer = LocalRenderer(self.api, self.md_source, self.media_fetcher,
+                                 render_service=self.render_service, sink=self.sink,
+                                 content_store=self.content_store)
+        return renderer.render(document_id, title, base_path, filename, formats, metadata)
+
+    async def _commit_outputs(self, base_path: str, filename: str, formats: List[str],
+                              metadata: Dict[str, str] = None):
+        """文档的文件已生成，提交给输出目标（写入归档、上传是阻塞操作，在线程池中执行）"""
+        if self.sink is None or not formats:
+            return
+        paths = [os.path.join(base_path, f"{filename}.{fmt}") for fmt in formats]
+        await asyncio.get_running_loop().run_in_executor(None, self.sink.commit, paths, metadata)
+
+    async def _is_unchanged(self, node: Dict[str, Any], base_path: str, filename: str) -> bool:
+        """输出目标中该文档的所有格式是否已是当前版本（查询对象元数据，在线程池中执行）"""
+        version = document_metadata(node).get(META_SOURCE_VERSION)
+        if self.sink is None or not version:
+            return False
+        paths = [os.path.join(base_path, f"{filename}.{fmt}") for fmt in self.export_formats]
+        return await asyncio.get_running_loop().run_in_executor(None, self.sink.is_current, paths, version)
     
     async def _process_document_node(
         self, 
@@ -343,25 +486,46 @@ class AsyncParallelWikiCrawler:
         obj_type = node.get("obj_type", "")
         node_type = node.get("node_type")
         
-        safe_title = self._sanitize_filename(title)
+        safe_title = self.path_planner.name(node)
+        if await self._is_unchanged(node, base_path, safe_title):
+            self.logger.info(f"{'  ' * level}⏭️ 未修改，跳过: {title}")
+            return 1
+        
+        metadata = document_metadata(node)
         exported_any = False
         
+        # 本地渲染：一次获取内容，同时生成Markdown和本地渲染的PDF/Word
+        if self.local_formats:
+            try:
+                await exporter.rate_limiter.acquire(MD_RATE_LIMIT_KEYS[self.md_source])
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(
+                    None, self._render_local, obj_token or node_token, title, base_path, safe_title, metadata
+                )
+                for fmt, (success, error) in results.items():
+                    if success:
+                        self.logger.info(f"{'  ' * level}✅ {fmt.upper()} (本地): {safe_title}.{fmt}")
+                        exported_any = True
+                    else:
+                        self.logger.warning(f"{'  ' * level}❌ {fmt.upper()}本地生成失败: {error}")
+            except Exception as e:
+                self.logger.error(f"{'  ' * level}❌ 本地渲染失败: {title} - {str(e)}")
+        
         # 处理Markdown格式（同步获取内容）
-        if 'md' in self.export_formats:
+        elif 'md' in self.export_formats:
             try:
-                content = self.api.get_document_content(node_token)
-                if content:
-                    from document_converter import DocumentConverter
-                    converter = DocumentConverter()
-                    metadata = {"title": title}
-                    markdown_text = converter.to_markdown(content, metadata)
-                    file_path = os.path.join(base_path, f"{safe_title}.md")
-                    
-                    # 确保目录存在
-                    os.makedirs(base_path, exist_ok=True)
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(markdown_text)
-                    
+                md_start = time.time()
+                await exporter.rate_limiter.acquire(MD_RATE_LIMIT_KEYS[self.md_source])
+                loop = asyncio.get_running_loop()
+                file_path = os.path.join(base_path, f"{safe_title}.md")
+                # 流式获取内容并边解析边写入（在线程池中执行，不阻塞事件循环）
+                saved = await loop.run_in_executor(
+                    None, self._export_markdown, obj_token or node_token, title, file_path,
+                    node.get("obj_edit_time")
+                )
+                if saved:
+                    get_default_stats().record('md', time.time() - md_start, obj_token or node_token)
+                    await self._commit_outputs(base_path, safe_title, ['md'], metadata)
                     self.logger.info(f"{'  ' * level}✅ MD: {safe_title}.md")
                     exported_any = True
                 else:
@@ -370,23 +534,25 @@ class AsyncParallelWikiCrawler:
                 self.logger.error(f"{'  ' * level}❌ MD导出失败: {title} - {str(e)}")
         
         # 处理PDF和Word（使用异步导出器）
-        native_formats = [fmt for fmt in self.export_formats if fmt in ['docx', 'pdf']]
+        native_formats = self.native_formats
         
         if native_formats:
             export_token = obj_token if obj_token else node_token
             export_type = obj_type if obj_type else (node_type or "docx")
             
             # 使用异步导出器
-            os.makedirs(base_path, exist_ok=True)
             results = await exporter.export_document_batch(
                 export_token,
                 export_type,
                 native_formats,
                 base_path,
-                safe_title
+                safe_title,
+                node.get("obj_edit_time")
             )
             
             # 检查结果
+            await self._commit_outputs(base_path, safe_title,
+                                       [fmt for fmt, (success, _) in results.items() if success], metadata)
             for fmt, (success, error) in results.items():
                 if success:
                     self.logger.info(f"{'  ' * level}✅ {fmt.upper()}: {safe_title}.{fmt}")
@@ -405,14 +571,15 @@ class AsyncParallelWikiCrawler:
         node: Dict[str, Any],
         base_path: str,
         space_id: str,
-        exporter: AsyncFeishuExporter,
-        level: int = 0
+        scheduler: ExportScheduler,
+        level: int = 0,
+        parent_path: str = ""
     ) -> int:
         """
-        异步递归爬取节点
+        异步递归遍历节点，将文档加入导出调度队列
         
         Returns:
-            成功文档数
+            加入队列的文档数
         """
         node_token = node.get("node_token")
         title = node.get("title", "未命名")
@@ -423,55 +590,109 @@ class AsyncParallelWikiCrawler:
             return 0
         self.crawled_nodes.add(node_token)
         
-        count = 0
+        queued = 0
+        node_path = NodeFilter.join_path(parent_path, title)
         
-        # 处理当前文档
+        from wiki_crawler import WikiCrawler
+        temp_crawler = WikiCrawler(self.api, self.export_formats, self.node_filter)
+        
+        # 当前文档加入调度队列（按预测耗时排序，而不是按树的顺序）
         node_type = node.get("node_type")
         obj_type = node.get("obj_type", "")
         
-        if node_type in ["doc", "docx"] or obj_type in ["doc", "docx"]:
-            # 使用信号量控制并发
-            async with self.semaphore:
-                count += await self._process_document_node(node, base_path, exporter, level)
+        is_document = node_type in ["doc", "docx"] or obj_type in ["doc", "docx"]
+        if is_document and temp_crawler._should_export_node(node, node_path, level):
+            await scheduler.put((node, base_path, level), node)
+            queued += 1
         
         # 处理子节点
-        if has_child:
-            safe_title = self._sanitize_filename(title)
-            sub_dir = os.path.join(base_path, safe_title)
-            os.makedirs(sub_dir, exist_ok=True)
+        if has_child and temp_crawler._should_descend_node(node, node_path, level):
+            # 子节点列表接口是同步的，放到线程池中执行，避免阻塞导出任务
+            loop = asyncio.get_running_loop()
+            child_nodes = await loop.run_in_executor(
+                None, temp_crawler.get_child_nodes, space_id, node_token, node_path, level + 1
+            )
+            self.traversal_errors += temp_crawler.traversal_errors
             
-            # 同步获取子节点（这部分API不支持异步）
-            from wiki_crawler import WikiCrawler
-            temp_crawler = WikiCrawler(self.api, self.export_formats)
-            child_nodes = temp_crawler.get_child_nodes(space_id, node_token)
+            # 为子节点分配文件名并创建子目录
+            sub_dir = os.path.join(base_path, self.path_planner.name(node))
+            self.path_planner.plan(sub_dir, child_nodes, complete=node_token not in temp_crawler.partial_listings)
             
             if child_nodes:
-                # 异步并发处理所有子节点
+                # 异步并发遍历所有子节点
                 tasks = [
-                    self._crawl_node_async(child, sub_dir, space_id, exporter, level + 1)
+                    self._crawl_node_async(child, sub_dir, space_id, scheduler, level + 1, node_path)
                     for child in child_nodes
                 ]
                 child_counts = await asyncio.gather(*tasks, return_exceptions=True)
                 
                 for result in child_counts:
                     if isinstance(result, int):
-                        count += result
+                        queued += result
                     else:
                         self.logger.error(f"子节点处理失败: {result}")
+                        self.traversal_errors += 1
+        elif has_child:
+            self.path_planner.skip(os.path.join(base_path, self.path_planner.name(node)))
         
-        return count
+        return queued
+    
+    async def _export_worker(self, scheduler: ExportScheduler, exporter: AsyncFeishuExporter) -> int:
+        """
+        导出工作协程：不断从调度队列取出优先级最高的文档进行导出
+        
+        Returns:
+            成功导出的文档数
+        """
+        count = 0
+        while True:
+            job = await scheduler.get()
+            if job is None:
+                return count
+            
+            node, base_path, level = job
+            try:
+                count += await self._process_document_node(node, base_path, exporter, level)
+            except Exception as e:
+                self.logger.error(f"文档处理失败 {node.get('title')}: {str(e)}")
+    
+    async def _discover(self, root_nodes: List[Dict[str, Any]], output_dir: str, space_id: str,
+                        scheduler: ExportScheduler) -> int:
+        """遍历所有根节点，完成后关闭调度队列"""
+        try:
+            tasks = [
+                self._crawl_node_async(node, output_dir, space_id, scheduler, 0)
+                for node in root_nodes
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            
+            queued = 0
+            for result in results:
+                if isinstance(result, int):
+                    queued += result
+                else:
+                    self.logger.error(f"根节点处理失败: {result}")
+                    self.traversal_errors += 1
+            
+            self.logger.info(f"📋 目录遍历完成，共 {queued} 篇文档待导出")
+            return queued
+        finally:
+            await scheduler.close()
     
     async def crawl_wiki_async(self, wiki_link: str, save_path: str) -> Tuple[int, str]:
         """
         异步爬取Wiki
         
+        目录遍历与导出同时进行：遍历到的文档进入优先级队列，
+        由 max_workers 个工作协程按预测耗时从长到短导出
+        
         Returns:
             (成功数量, 错误信息)
         """
         try:
             # 提取space_id
             from wiki_crawler import WikiCrawler
-            temp_crawler = WikiCrawler(self.api, self.export_formats)
+            temp_crawler = WikiCrawler(self.api, self.export_formats, self.node_filter)
             space_id = temp_crawler.extract_space_id_from_link(wiki_link)
             
             if not space_id:
@@ -485,33 +706,51 @@ class AsyncParallelWikiCrawler:
             root_nodes = temp_crawler.get_child_nodes(space_id, None)
             if not root_nodes:
                 return (0, "无法获取根节点")
+            self.traversal_errors = temp_crawler.traversal_errors
             
-            # 创建输出目录
-            output_dir = os.path.join(save_path, f"Wiki导出_{int(time.time())}")
-            os.makedirs(output_dir, exist_ok=True)
+            # 创建输出目标（目录、归档或对象存储）
+            self.sink = create_output_sink(save_path, export_name(self.output, space_id), self.output)
+            output_dir, location = self.sink.root, self.sink.location
+            self.path_planner = PathPlanner(self.sink.sync_index)
+            self.path_planner.plan(output_dir, root_nodes, complete=None not in temp_crawler.partial_listings)
+            if (('md' in self.export_formats or self.local_formats) and self.md_source == MD_SOURCE_BLOCKS
+                    and not self.sink.text_only):
+                self.media_fetcher = MediaFetcher.from_config(self.api, output_dir, self.media, self.rate_limits)
+            if self.local_formats and self.render_processes != 0:
+                # 渲染进程在遍历目录的同时完成预热
+                self.render_service = RenderService(self.render_processes)
+                warmup = asyncio.get_running_loop().run_in_executor(None, self.render_service.warmup)
+                warmup.add_done_callback(self._warmup_done)
             
-            # 创建信号量控制并发
-            self.semaphore = asyncio.Semaphore(self.max_workers)
+            # 创建导出调度队列（长任务优先，带老化）
+            scheduler = ExportScheduler(self.export_formats, aging_rate=self.aging_rate,
+                                        render_modes=self.render_modes)
             
             # 使用异步导出器
-            async with AsyncFeishuExporter(self.api) as exporter:
-                # 并发处理所有根节点
-                tasks = [
-                    self._crawl_node_async(node, output_dir, space_id, exporter, 0)
-                    for node in root_nodes
+            async with AsyncFeishuExporter(self.api, rate_limits=self.rate_limits,
+                                           hedging=self.hedging, cache=self.export_cache) as exporter:
+                workers = [
+                    asyncio.create_task(self._export_worker(scheduler, exporter))
+                    for _ in range(self.max_workers)
                 ]
                 
-                results = await asyncio.gather(*tasks, return_exceptions=True)
+                await self._discover(root_nodes, output_dir, space_id, scheduler)
+                results = await asyncio.gather(*workers, return_exceptions=True)
                 
                 total_count = 0
                 for result in results:
                     if isinstance(result, int):
                         total_count += result
                     else:
-                        self.logger.error(f"根节点处理失败: {result}")
+                        self.logger.error(f"导出协程异常: {result}")
+            
+            finished = self._close_resources()
+            get_default_stats().save()
+            if not finished:
+                return (total_count, f"完成输出失败: {location}")
             
             self.logger.info(f"🎉 完成! 共 {total_count} 篇文档")
-            self.logger.info(f"📂 位置: {output_dir}")
+            self.logger.info(f"📂 位置: {location}")
             
             return (total_count, "")
         
@@ -520,8 +759,44 @@ class AsyncParallelWikiCrawler:
             self.logger.error(error_msg)
             import traceback
             traceback.print_exc()
+            self._close_resources(complete=False)
             return (0, error_msg)
     
+    def _warmup_done(self, future: asyncio.Future):
+        """记录后台预热渲染进程时的异常（不等待预热完成）"""
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.warning(f"渲染进程预热失败: {future.exception()}")
+
+    def _close_resources(self, complete: bool = True) -> bool:
+        """
+        等待素材下载完成、保存素材、导出缓存和内容存储的索引，关闭渲染进程池并完成输出（归档模式下写入索引）
+
+        Args:
+            complete: 导出是否正常结束；为False时放弃输出（保留未完成的归档，不上传导出清单）
+
+        Returns:
+            输出是否已完成
+        """
+        if self.export_cache is not None:
+            self.export_cache.save()
+        if self.content_store is not None:
+            self.content_store.save()
+        if self.media_fetcher is not None:
+            self.media_fetcher.close()
+            self.media_fetcher = None
+        if self.render_service is not None:
+            self.render_service.shutdown()
+            self.render_service = None
+        finished = complete
+        if self.sink is not None:
+            if complete:
+                self.sink.partial = self.traversal_errors > 0
+                finished = self.sink.close()
+            else:
+                self.sink.abort()
+            self.sink = None
+        return finished
+    
     def crawl_wiki(self, wiki_link: str, save_path: str) -> Tuple[int, str]:
         """
         同步包装器 - 运行异步爬取
@@ -0,0 +1,446 @@
+"""
+文档块转换模块
+将 docx blocks API 返回的结构化块转换为Markdown，保留标题、列表、代码块、引用、表格等结构。
+块按页到达时增量渲染：某个顶层块及其所有子孙块都已到达后立即输出并释放
+"""
+import os
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import unquote
+
+from content_store import CONTENT_BLOCKS, fetch_content
+
+
+# Markdown内容来源
+MD_SOURCE_RAW = "raw"        # raw_content 纯文本（启发式识别标题）
+MD_SOURCE_BLOCKS = "blocks"  # docx blocks API（结构化）
+MD_SOURCES = (MD_SOURCE_RAW, MD_SOURCE_BLOCKS)
+
+# 各内容来源对应的频控接口名（见 rate_limiter.DEFAULT_RATE_LIMITS）
+MD_RATE_LIMIT_KEYS = {
+    MD_SOURCE_RAW: "raw_content",
+    MD_SOURCE_BLOCKS: "doc_blocks",
+}
+
+# 块类型（block_type）
+BLOCK_PAGE = 1
+BLOCK_TEXT = 2
+BLOCK_HEADING1 = 3
+BLOCK_HEADING9 = 11
+BLOCK_BULLET = 12
+BLOCK_ORDERED = 13
+BLOCK_CODE = 14
+BLOCK_QUOTE = 15
+BLOCK_TODO = 17
+BLOCK_CALLOUT = 19
+BLOCK_DIVIDER = 22
+BLOCK_FILE = 23
+BLOCK_IMAGE = 27
+BLOCK_TABLE = 31
+BLOCK_TABLE_CELL = 32
+BLOCK_QUOTE_CONTAINER = 34
+
+# 列表类块（相邻的同类列表项之间不空行）
+_LIST_TYPES = (BLOCK_BULLET, BLOCK_ORDERED, BLOCK_TODO)
+
+# 块类型对应的内容字段名
+_TEXT_FIELDS = {
+    BLOCK_PAGE: "page",
+    BLOCK_TEXT: "text",
+    BLOCK_BULLET: "bullet",
+    BLOCK_ORDERED: "ordered",
+    BLOCK_CODE: "code",
+    BLOCK_QUOTE: "quote",
+    BLOCK_TODO: "todo",
+}
+for _level in range(1, 10):
+    _TEXT_FIELDS[BLOCK_HEADING1 + _level - 1] = f"heading{_level}"
+
+# 代码块语言（style.language）
+_CODE_LANGUAGES = {
+    1: "", 7: "bash", 8: "csharp", 9: "cpp", 10: "c", 12: "css", 15: "dart", 18: "dockerfile",
+    22: "go", 24: "html", 26: "http", 28: "json", 29: "java", 30: "javascript", 32: "kotlin",
+    33: "latex", 36: "lua", 38: "makefile", 39: "markdown", 40: "nginx", 41: "objectivec",
+    43: "php", 44: "perl", 46: "powershell", 48: "protobuf", 49: "python", 50: "r", 52: "ruby",
+    53: "rust", 55: "scss", 56: "sql", 57: "scala", 60: "shell", 61: "swift", 63: "typescript",
+    66: "xml", 67: "yaml",
+}
+
+# 图片/附件链接：callback(token, kind) -> 链接地址，kind 为 'image' 或 'file'
+MediaResolver = Callable[[str, str], str]
+
+
+# 素材预取：callback(tokens)，在块到达后、渲染前提交下载
+MediaPrefetch = Callable[[List[str]], object]
+
+
+def _default_media_resolver(token: str, kind: str) -> str:
+    """默认使用素材token作为链接"""
+    return token
+
+
+def collect_media_tokens(blocks: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    收集块中的图片和附件token
+
+    Args:
+        blocks: 文档块
+
+    Returns:
+        素材token列表（按出现顺序）
+    """
+    tokens = []
+    for block in blocks:
+        block_type = block.get("block_type")
+        if block_type == BLOCK_IMAGE:
+            token = (block.get("image") or {}).get("token")
+        elif block_type == BLOCK_FILE:
+            token = (block.get("file") or {}).get("token")
+        else:
+            continue
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+class BlockConverter:
+    """文档块到Markdown转换器（增量）"""
+
+    def __init__(self, media_resolver: MediaResolver = None, media_prefetch: MediaPrefetch = None):
+        """
+        Args:
+            media_resolver: 图片/附件链接生成函数（可选）
+            media_prefetch: 素材预取函数（可选），每页块到达后以该页的素材token调用，
+                使下载与后续分页请求、渲染并行
+        """
+        self.media_resolver = media_resolver or _default_media_resolver
+        self.media_prefetch = media_prefetch
+        self.logger = logging.getLogger(__name__)
+
+    def iter_markdown(self, block_pages: Iterable[List[Dict[str, Any]]], title: Optional[str] = None) -> Iterator[str]:
+        """
+        增量转换为Markdown
+
+        Args:
+            block_pages: 按页到达的块列表（如 FeishuAPI.iter_document_blocks）
+            title: 文档标题（可选）
+
+        Returns:
+            Markdown文本片段迭代器，每个片段为一个或多个完整的顶层块
+        """
+        if title:
+            yield f"# {title}\n\n"
+
+        blocks: Dict[str, Dict[str, Any]] = {}
+        top_level: List[str] = []
+        cursor = 0
+        root_id = None
+        state = _RenderState()
+        emitted = False
+
+        for page in block_pages:
+            for block in page:
+                blocks[block.get("block_id")] = block
+                if root_id is None and block.get("block_type") == BLOCK_PAGE:
+                    root_id = block.get("block_id")
+                    top_level = list(block.get("children") or [])
+
+            if self.media_prefetch is not None:
+                tokens = collect_media_tokens(page)
+                if tokens:
+                    self.media_prefetch(tokens)
+
+            # 输出已完整到达的顶层块
+            parts = []
+            while cursor < len(top_level) and self._is_complete(top_level[cursor], blocks):
+                parts.append(self._render_top(top_level[cursor], blocks, state))
+                self._release(top_level[cursor], blocks)
+                cursor += 1
+            text = "".join(parts)
+            if text:
+                emitted = True
+                yield text
+
+        # 剩余的块（子块缺失时按已有内容输出）
+        parts = [self._render_top(block_id, blocks, state) for block_id in top_level[cursor:]]
+        if root_id is None:
+            # 没有页面块时按到达顺序输出所有无父块的块
+            parts = [self._render_top(block_id, blocks, state) for block_id, block in list(blocks.items())
+                     if not block.get("parent_id") or block.get("parent_id") not in blocks]
+        text = "".join(parts)
+        if text:
+            emitted = True
+            yield text
+
+        if not emitted:
+            self.logger.warning("文档内容为空")
+            yield "*文档内容为空*"
+
+    def save_markdown(self, block_pages: Iterable[List[Dict[str, Any]]], save_path: str,
+                      title: Optional[str] = None) -> bool:
+        """
+        增量转换并保存Markdown（先写入临时文件，完成后重命名）
+
+        Returns:
+            是否成功
+        """
+        part_path = save_path + ".part"
+        try:
+            os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+            with open(part_path, 'w', encoding='utf-8') as f:
+                for piece in self.iter_markdown(block_pages, title):
+                    f.write(piece)
+            os.replace(part_path, save_path)
+            return True
+        except Exception as e:
+            self.logger.error(f"导出Markdown失败: {str(e)}")
+            if os.path.exists(part_path):
+                try:
+                    os.remove(part_path)
+                except OSError:
+                    pass
+            return False
+
+    # ------------------------------------------------------------------
+    # 增量控制
+    # ------------------------------------------------------------------
+
+    def _is_complete(self, block_id: str, blocks: Dict[str, Dict[str, Any]]) -> bool:
+        """块及其所有子孙块是否都已到达"""
+        stack = [block_id]
+        while stack:
+            block = blocks.get(stack.pop())
+            if block is None:
+                return False
+            stack.extend(block.get("children") or [])
+        return True
+
+    def _release(self, block_id: str, blocks: Dict[str, Dict[str, Any]]):
+        """释放已输出的块"""
+        stack = [block_id]
+        while stack:
+            block = blocks.pop(stack.pop(), None)
+            if block:
+                stack.extend(block.get("children") or [])
+
+    # ------------------------------------------------------------------
+    # 渲染
+    # ------------------------------------------------------------------
+
+    def _render_top(self, block_id: str, blocks: Dict[str, Dict[str, Any]], state: "_RenderState") -> str:
+        """渲染一个顶层块（块之间以空行分隔，连续列表项之间不空行）"""
+        block = blocks.get(block_id)
+        if block is None:
+            return ""
+        block_type = block.get("block_type")
+        lines = self._render_block(block, blocks, 0, state)
+        if not lines:
+            return ""
+
+        list_type = block_type if block_type in _LIST_TYPES else 0
+        separator = "\n" if list_type and list_type == state.prev_list else ("\n\n" if state.started else "")
+        state.started = True
+        state.prev_list = list_type
+        if block_type != BLOCK_ORDERED:
+            state.ordered_index = 0
+        return separator + "\n".join(lines)
+
+    def _render_children(self, block: Dict[str, Any], blocks: Dict[str, Dict[str, Any]], depth: int) -> List[str]:
+        """渲染子块（列表子项缩进，其余以空行分隔）"""
+        lines: List[str] = []
+        state = _RenderState()
+        for child_id in block.get("children") or []:
+            child = blocks.get(child_id)
+            if child is None:
+                continue
+            child_lines = self._render_block(child, blocks, depth, state)
+            if not child_lines:
+                continue
+            child_type = child.get("block_type")
+            list_type = child_type if child_type in _LIST_TYPES else 0
+            if lines and not (list_type and list_type == state.prev_list):
+                lines.append("")
+            lines.extend(child_lines)
+            state.prev_list = list_type
+            if child.get("block_type") != BLOCK_ORDERED:
+                state.ordered_index = 0
+        return lines
+
+    def _render_block(self, block: Dict[str, Any], blocks: Dict[str, Dict[str, Any]], depth: int,
+                      state: "_RenderState") -> List[str]:
+        """渲染单个块为若干行"""
+        block_type = block.get("block_type")
+
+        if BLOCK_HEADING1 <= block_type <= BLOCK_HEADING9:
+            # 文档标题占用一级标题，正文标题整体下移一级
+            level = min(block_type - BLOCK_HEADING1 + 2, 6)
+            return [f"{'#' * level} {self._inline(block, block_type)}"]
+
+        if block_type == BLOCK_TEXT:
+            text = self._inline(block, block_type)
+            return [text] if text else []
+
+        if block_type in _LIST_TYPES:
+            if block_type == BLOCK_BULLET:
+                marker = "-"
+            elif block_type == BLOCK_ORDERED:
+                state.ordered_index += 1
+                marker = f"{state.ordered_index}."
+            else:
+                done = (block.get("todo") or {}).get("style", {}).get("done")
+                marker = "- [x]" if done else "- [ ]"
+            lines = [f"{marker} {self._inline(block, block_type)}"]
+            indent = " " * (len(marker) + 1) if block_type == BLOCK_ORDERED else "  "
+            lines.extend(indent + line if line else line
+                         for line in self._render_children(block, blocks, depth + 1))
+            return lines
+
+        if block_type == BLOCK_CODE:
+            code = block.get("code") or {}
+            language = _CODE_LANGUAGES.get((code.get("style") or {}).get("language"), "")
+            body = self._plain_text(code)
+            return [f"```{language}", *body.split("\n"), "```"]
+
+        if block_type == BLOCK_QUOTE:
+            return ["> " + line for line in self._inline(block, block_type).split("\n")]
+
+        if block_type in (BLOCK_QUOTE_CONTAINER, BLOCK_CALLOUT):
+            return [f"> {line}" if line else ">" for line in self._render_children(block, blocks, depth)]
+
+        if block_type == BLOCK_DIVIDER:
+            return ["---"]
+
+        if block_type == BLOCK_IMAGE:
+            token = (block.get("image") or {}).get("token", "")
+            return [f"![]({self.media_resolver(token, 'image')})"] if token else []
+
+        if block_type == BLOCK_FILE:
+            file_info = block.get("file") or {}
+            token = file_info.get("token", "")
+            name = file_info.get("name") or token
+            return [f"[{name}]({self.media_resolver(token, 'file')})"] if token else []
+
+        if block_type == BLOCK_TABLE:
+            return self._render_table(block, blocks)
+
+        # 其他容器块（分栏、页面等）：按顺序渲染子块
+        return self._render_children(block, blocks, depth)
+
+    def _render_table(self, block: Dict[str, Any], blocks: Dict[str, Dict[str, Any]]) -> List[str]:
+        """渲染表格（首行作为表头）"""
+        table = block.get("table") or {}
+        cells = table.get("cells") or block.get("children") or []
+        columns = (table.get("property") or {}).get("column_size") or 1
+        if not cells:
+            return []
+
+        rows = []
+        for start in range(0, len(cells), columns):
+            row = []
+            for cell_id in cells[start:start + columns]:
+                cell = blocks.get(cell_id)
+                text = "<br>".join(line for line in self._render_children(cell, blocks, 0) if line) if cell else ""
+                row.append(text.replace("|", "\\|"))
+            row.extend([""] * (columns - len(row)))
+            rows.append(f"| {' | '.join(row)} |")
+
+        rows.insert(1, "|" + " --- |" * columns)
+        return rows
+
+    def _inline(self, block: Dict[str, Any], block_type: int) -> str:
+        """渲染块的行内元素（带样式）"""
+        content = block.get(_TEXT_FIELDS.get(block_type, "")) or {}
+        return "".join(self._render_element(element) for element in content.get("elements") or [])
+
+    def _plain_text(self, content: Dict[str, Any]) -> str:
+        """行内元素的纯文本（用于代码块）"""
+        parts = []
+        for element in content.get("elements") or []:
+            run = element.get("text_run") or element.get("equation")
+            if run:
+                parts.append(run.get("content", ""))
+        return "".join(parts)
+
+    def _render_element(self, element: Dict[str, Any]) -> str:
+        """渲染单个行内元素"""
+        if "text_run" in element:
+            run = element["text_run"]
+            text = run.get("content", "")
+            style = run.get("text_element_style") or {}
+            if not text.strip():
+                return text
+            if style.get("inline_code"):
+                text = f"`{text}`"
+            else:
+                if style.get("bold"):
+                    text = f"**{text}**"
+                if style.get("italic"):
+                    text = f"*{text}*"
+                if style.get("strikethrough"):
+                    text = f"~~{text}~~"
+            link = (style.get("link") or {}).get("url")
+            if link:
+                text = f"[{text}]({unquote(link)})"
+            return text
+
+        if "mention_doc" in element:
+            doc = element["mention_doc"]
+            return f"[{doc.get('title', '')}]({unquote(doc.get('url', ''))})"
+
+        if "mention_user" in element:
+            return "@" + (element["mention_user"].get("user_id") or "")
+
+        if "equation" in element:
+            return f"${element['equation'].get('content', '').strip()}$"
+
+        return ""
+
+
+class _RenderState:
+    """同一层级内相邻块之间的渲染状态"""
+    __slots__ = ("started", "prev_list", "ordered_index")
+
+    def __init__(self):
+        self.started = False
+        self.prev_list = 0  # 上一个块的列表类型（0表示非列表）
+        self.ordered_index = 0
+
+
+def export_document_markdown(api, document_id: str, save_path: str, title: Optional[str] = None,
+                             md_source: str = MD_SOURCE_BLOCKS, media=None, content_store=None,
+                             revision: Optional[str] = None) -> bool:
+    """
+    获取文档内容并保存为Markdown
+
+    blocks 模式在文档块接口不可用时（如旧版文档）自动回退到 raw_content
+
+    Args:
+        api: FeishuAPI实例
+        document_id: 文档ID
+        save_path: 保存路径
+        title: 文档标题
+        md_source: 内容来源（'blocks' 或 'raw'）
+        media: 素材下载器（MediaFetcher，可选）；提供时图片和附件下载到本地并以相对路径引用
+        content_store: 内容存储（ContentStore，可选）；有该版本的内容时不再请求接口
+        revision: 文档版本（如 obj_edit_time，可选）
+
+    Returns:
+        是否成功
+    """
+    fetched = fetch_content(api, document_id, md_source, title, content_store, revision)
+    if fetched is None:
+        return False
+    kind, chunks = fetched
+    if kind == CONTENT_BLOCKS:
+        if media is None:
+            converter = BlockConverter()
+        else:
+            doc_dir = os.path.dirname(os.path.abspath(save_path))
+            converter = BlockConverter(
+                media_resolver=lambda token, kind: media.resolve(token, doc_dir),
+                media_prefetch=media.prefetch,
+            )
+        return converter.save_markdown(chunks, save_path, title)
+
+    from document_converter import DocumentConverter
+    return DocumentConverter().save_markdown(chunks, save_path, {"title": title})
@@ -0,0 +1,191 @@
+"""
+命令行入口
+不启动图形界面，对已有的导出结果执行维护操作
+
+用法：
+    python src/cli.py verify <导出目录> [--repair] [--workers N] [--config config.json]
+    python src/cli.py rerender <导出目录> [--formats md,docx,pdf] [--processes N]
+    python src/cli.py search <导出目录> <查询词...> [--limit N]
+    python src/cli.py relink <导出目录>
+"""
+import sys
+import os
+import multiprocessing
+import json
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+# 与 main.py 相同：确保能找到同目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from feishu_api import FeishuAPI  # noqa: E402
+
+
+def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取配置（未指定时与图形界面相同：优先 config_local.json，其次 config.json）
+
+    Args:
+        config_path: 配置文件路径
+
+    Returns:
+        配置字典；文件不存在时返回空字典
+    """
+    if not config_path:
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        config_path = os.path.join(root_dir, 'config_local.json')
+        if not os.path.exists(config_path):
+            config_path = os.path.join(root_dir, 'config.json')
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def create_api(config: Dict[str, Any]) -> Optional[FeishuAPI]:
+    """按配置创建API客户端并获取access_token，失败时返回None"""
+    if not config.get("app_id") or not config.get("app_secret"):
+        logging.error("❌ 配置中缺少 app_id / app_secret")
+        return None
+    api = FeishuAPI(config["app_id"], config["app_secret"], transport=config.get("transport"))
+    if not api.get_tenant_access_token():
+        logging.error("❌ 获取access_token失败，请检查App ID和App Secret")
+        return None
+    return api
+
+
+def cmd_verify(args) -> int:
+    """校验导出目录（可选重新导出损坏的文件）"""
+    from export_cache import export_cache_from_config
+    from export_manifest import MANIFEST_NAME
+    from output_verifier import OutputRepairer, verify_output
+
+    output_dir = os.path.abspath(args.output_dir)
+    if not os.path.exists(os.path.join(output_dir, MANIFEST_NAME)):
+        logging.error(f"❌ {output_dir} 中没有导出清单 {MANIFEST_NAME}")
+        return 1
+
+    checked, failed = verify_output(output_dir, args.workers)
+    for entry, problem in failed:
+        logging.warning(f"⚠️ {entry['path']}: {problem}")
+    logging.info(f"🔍 已校验 {checked} 个文件，{len(failed)} 个有问题")
+    if not failed:
+        return 0
+    if not args.repair:
+        return 1
+
+    config = load_config(args.config)
+    api = create_api(config)
+    if api is None:
+        return 1
+    repairer = OutputRepairer(api, output_dir, config.get("md_source", "blocks"), config.get("media"),
+                              config.get("rate_limits"), export_cache_from_config(config.get("export_cache")))
+    entries: List[Dict[str, Any]] = [entry for entry, _ in failed]
+    repaired = repairer.repair(entries)
+    logging.info(f"🔧 已重新导出 {repaired}/{len(entries)} 个文件")
+    return 0 if repaired == len(entries) else 1
+
+
+def cmd_rerender(args) -> int:
+    """从内容存储离线重新渲染导出目录（不请求飞书接口）"""
+    from export_manifest import MANIFEST_NAME
+    from offline_renderer import RERENDER_FORMATS, OfflineRenderer
+
+    output_dir = os.path.abspath(args.output_dir)
+    if not os.path.exists(os.path.join(output_dir, MANIFEST_NAME)):
+        logging.error(f"❌ {output_dir} 中没有导出清单 {MANIFEST_NAME}")
+        return 1
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()] if args.formats else None
+    unknown = [fmt for fmt in formats or [] if fmt not in RERENDER_FORMATS]
+    if unknown:
+        logging.error(f"❌ 不支持重新渲染的格式: {', '.join(unknown)}")
+        return 1
+
+    done, missing, failed = OfflineRenderer(output_dir, processes=args.processes).rerender(formats)
+    logging.info(f"🎨 重新渲染 {done} 篇文档，{missing} 篇内容存储中没有对应版本，{failed} 篇失败")
+    return 0 if not missing and not failed else 1
+
+
+def cmd_search(args) -> int:
+    """在导出目录的全文索引中检索"""
+    from search_index import SEARCH_INDEX_NAME, SearchIndex
+
+    output_dir = os.path.abspath(args.output_dir)
+    if not os.path.exists(os.path.join(output_dir, SEARCH_INDEX_NAME)):
+        logging.error(f"❌ {output_dir} 中没有全文索引 {SEARCH_INDEX_NAME}（导出时在 output 中开启 search_index）")
+        return 1
+
+    index = SearchIndex(output_dir)
+    try:
+        results = index.search(" ".join(args.query), args.limit)
+    finally:
+        index.close()
+    for result in results:
+        print(f"{result['path']}  {result['title']}")
+        print(f"    {result['snippet']}")
+    logging.info(f"🔎 找到 {len(results)} 篇文档")
+    return 0 if results else 1
+
+
+def cmd_relink(args) -> int:
+    """把导出目录中Markdown的Wiki内部链接改写为本地相对路径"""
+    from export_manifest import MANIFEST_NAME
+    from link_rewriter import LinkRewriter
+
+    output_dir = os.path.abspath(args.output_dir)
+    if not os.path.exists(os.path.join(output_dir, MANIFEST_NAME)):
+        logging.error(f"❌ {output_dir} 中没有导出清单 {MANIFEST_NAME}")
+        return 1
+    rewriter = LinkRewriter(output_dir)
+    files, links = rewriter.rewrite()
+    if rewriter.failures:
+        logging.error(f"❌ {rewriter.failures} 篇文档改写链接失败")
+        return 1
+    if not files:
+        logging.info("🔗 没有需要改写的链接")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="docharvest", description="DocHarvest 命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    verify = subparsers.add_parser("verify", help="按导出清单校验导出目录")
+    verify.add_argument("output_dir", help="导出目录（包含 _manifest.jsonl）")
+    verify.add_argument("--repair", action="store_true", help="重新导出损坏或缺失的文件")
+    verify.add_argument("--workers", type=int, default=None, help="并行校验的线程数")
+    verify.add_argument("--config", default=None, help="配置文件路径（默认 config_local.json / config.json）")
+    verify.set_defaults(func=cmd_verify)
+
+    rerender = subparsers.add_parser("rerender", help="从内容存储离线重新渲染导出目录")
+    rerender.add_argument("output_dir", help="导出目录（包含 _manifest.jsonl）")
+    rerender.add_argument("--formats", default=None, help="需要生成的格式，如 md,docx,pdf（默认为已导出的格式）")
+    rerender.add_argument("--processes", type=int, default=None, help="渲染进程数（默认为CPU核数）")
+    rerender.set_defaults(func=cmd_rerender)
+
+    search = subparsers.add_parser("search", help="在导出目录的全文索引中检索")
+    search.add_argument("output_dir", help="导出目录（包含 _search_index.sqlite）")
+    search.add_argument("query", nargs="+", help="查询词（多个词需同时出现）")
+    search.add_argument("--limit", type=int, default=20, help="最多显示的结果数")
+    search.set_defaults(func=cmd_search)
+
+    relink = subparsers.add_parser("relink", help="把Wiki内部链接改写为本地相对路径")
+    relink.add_argument("output_dir", help="导出目录（包含 _manifest.jsonl）")
+    relink.set_defaults(func=cmd_relink)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    """主函数"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    # 打包后渲染进程池需要
+    multiprocessing.freeze_support()
+    sys.exit(main())
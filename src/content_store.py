@@ -0,0 +1,301 @@
+"""
+内容存储模块
+跨运行保存获取到的文档内容（文档块JSON或raw_content纯文本），按（文档token、文档版本）查找，压缩存放：
+文档未修改时再次导出不再请求内容接口；调整转换规则或增加输出格式后可离线重新渲染（见 offline_renderer）。
+总大小超过上限时按最近最少使用淘汰
+"""
+import os
+import gzip
+import json
+import uuid
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from lru_store import LruStore
+
+# zstd压缩依赖（可选，未安装时使用gzip）
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 默认上限 1GB
+
+# 内容类型（与 md_source 的取值一致）
+CONTENT_BLOCKS = "blocks"  # 文档块分页列表
+CONTENT_RAW = "raw"        # raw_content 纯文本
+
+_ZSTD_EXT = ".json.zst"
+_GZIP_EXT = ".json.gz"
+_ZSTD_LEVEL = 6
+
+
+def load_content(path: str) -> Dict[str, Any]:
+    """
+    读取存储的内容（模块级函数，可在渲染进程中调用）
+
+    Args:
+        path: 对象文件路径
+
+    Returns:
+        {"kind": "blocks"/"raw", "obj_token": ..., "revision": ..., "title": ..., "data": 分页列表或文本}
+    """
+    if path.endswith(_ZSTD_EXT) and zstandard is None:
+        raise RuntimeError("读取 .zst 内容需要安装 zstandard 库")
+    with open(path, "rb") as f:
+        # 流式写入的zstd帧头中没有内容大小，按流读取
+        if path.endswith(_ZSTD_EXT):
+            reader = zstandard.ZstdDecompressor().stream_reader(f)
+        else:
+            reader = gzip.GzipFile(fileobj=f, mode="rb")
+        with reader:
+            return json.load(reader)
+
+
+def content_chunks(content: Dict[str, Any]) -> Iterable:
+    """存储的内容转换为与接口相同形式的迭代对象（文档块分页或纯文本片段）"""
+    if content["kind"] == CONTENT_BLOCKS:
+        return iter(content["data"])
+    return iter([content["data"]])
+
+
+class _ContentWriter:
+    """边获取边压缩写入的内容文件（与 load_content 读取的JSON格式相同，不在内存中保留整篇文档）"""
+
+    def __init__(self, path: str, obj_token: str, revision: str, kind: str, title: Optional[str]):
+        self.kind = kind
+        self._file = open(path, "wb")
+        try:
+            if zstandard is not None:
+                self._stream = zstandard.ZstdCompressor(level=_ZSTD_LEVEL).stream_writer(self._file)
+            else:
+                self._stream = gzip.GzipFile(fileobj=self._file, mode="wb")
+        except Exception:
+            self._file.close()
+            raise
+        self._first = True
+        header = json.dumps({"kind": kind, "obj_token": obj_token, "revision": revision, "title": title},
+                            ensure_ascii=False)
+        self._write(header[:-1] + ', "data": ' + ('[' if kind == CONTENT_BLOCKS else '"'))
+
+    def write(self, chunk: Any):
+        """写入一页文档块或一段纯文本（纯文本各段拼接为一个JSON字符串）"""
+        if self.kind == CONTENT_BLOCKS:
+            self._write(("" if self._first else ", ") + json.dumps(chunk, ensure_ascii=False))
+        else:
+            self._write(json.dumps(chunk, ensure_ascii=False)[1:-1])
+        self._first = False
+
+    def finish(self):
+        """写入结尾并关闭"""
+        self._write(']}' if self.kind == CONTENT_BLOCKS else '"}')
+        self.close()
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._file.close()
+
+    def abort(self):
+        """放弃写入（忽略关闭时的错误）"""
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _write(self, text: str):
+        self._stream.write(text.encode("utf-8"))
+
+
+class ContentStore(LruStore):
+    """文档内容存储（线程安全）：每个文档只保留最新版本"""
+
+    default_subdir = "content"
+    default_max_bytes = DEFAULT_MAX_BYTES
+    index_label = "内容存储索引"
+
+    def lookup(self, obj_token: str, revision: str) -> Optional[str]:
+        """
+        查找文档该版本的内容
+
+        Args:
+            obj_token: 文档token
+            revision: 文档版本（如 obj_edit_time）
+
+        Returns:
+            对象文件路径，未命中时返回None
+        """
+        if not revision:
+            return None
+        with self._lock:
+            name = self._find(obj_token)
+            path = self._lookup(name, revision) if name is not None else None
+            if path is not None:
+                self.hits += 1
+            return path
+
+    def put(self, obj_token: str, revision: str, kind: str, title: Optional[str], data: Any):
+        """
+        保存文档内容（替换该文档的旧版本）
+
+        Args:
+            obj_token: 文档token
+            revision: 文档版本
+            kind: 内容类型（CONTENT_BLOCKS / CONTENT_RAW）
+            title: 文档标题
+            data: 文档块分页列表或纯文本
+        """
+        for _ in self.capture(obj_token, revision, kind, title, data if kind == CONTENT_BLOCKS else [data]):
+            pass
+
+    def capture(self, obj_token: str, revision: str, kind: str, title: Optional[str],
+                chunks: Iterable) -> Iterator:
+        """
+        包装接口返回的迭代对象：原样产出，同时逐段压缩写入临时文件，完整读取后保存
+        （中途出错或未读完时不保存；写入失败只记录日志，不影响产出）
+
+        Args:
+            obj_token: 文档token
+            revision: 文档版本
+            kind: 内容类型
+            title: 文档标题
+            chunks: 文档块分页或纯文本片段
+
+        Returns:
+            产出相同内容的迭代器
+        """
+        if not revision:
+            yield from chunks
+            return
+
+        name = self._object_stem(obj_token) + (_ZSTD_EXT if zstandard is not None else _GZIP_EXT)
+        path = self._object_path(name)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+        writer = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = _ContentWriter(tmp_path, obj_token, str(revision), kind, title)
+        except Exception as e:
+            self.logger.warning(f"保存文档内容失败 {obj_token}: {str(e)}")
+
+        completed = False
+        try:
+            for chunk in chunks:
+                if writer is not None:
+                    try:
+                        writer.write(chunk)
+                    except Exception as e:
+                        self.logger.warning(f"保存文档内容失败 {obj_token}: {str(e)}")
+                        writer.abort()
+                        writer = None
+                yield chunk
+            completed = True
+        finally:
+            if writer is not None:
+                if completed:
+                    self._commit(writer, tmp_path, obj_token, str(revision), name)
+                else:
+                    writer.abort()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _commit(self, writer: _ContentWriter, tmp_path: str, obj_token: str, revision: str, name: str):
+        """写完的临时文件替换为对象文件并记录"""
+        path = self._object_path(name)
+        try:
+            writer.finish()
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.warning(f"保存文档内容失败 {obj_token}: {str(e)}")
+            return
+
+        size = os.path.getsize(path)
+        with self._lock:
+            old_name = self._find(obj_token)
+            if old_name is not None and old_name != name:
+                # 压缩方式变化（安装或卸载了zstandard），删除旧文件
+                self._remove(old_name)
+            self._put(name, revision, size)
+
+    @staticmethod
+    def _object_stem(obj_token: str) -> str:
+        return hashlib.sha256(obj_token.encode("utf-8")).hexdigest()[:40]
+
+    def _find(self, obj_token: str) -> Optional[str]:
+        """文档对应的对象名（调用方持有锁）"""
+        stem = self._object_stem(obj_token)
+        for ext in (_ZSTD_EXT, _GZIP_EXT):
+            if stem + ext in self._entries:
+                return stem + ext
+        return None
+
+
+def fetch_content(api, document_id: str, md_source: str = CONTENT_BLOCKS, title: Optional[str] = None,
+                  store: Optional[ContentStore] = None, revision: str = None) -> Optional[Tuple[str, Iterable]]:
+    """
+    获取文档内容：内容存储中有该版本时直接读取，否则请求接口（blocks 模式在文档块接口不可用时回退到 raw_content），
+    读取完成后存入内容存储
+
+    Args:
+        api: FeishuAPI实例
+        document_id: 文档ID
+        md_source: 内容来源（'blocks' 或 'raw'）
+        title: 文档标题
+        store: 内容存储（可选）
+        revision: 文档版本（如 obj_edit_time，可选）
+
+    Returns:
+        (内容类型, 文档块分页或纯文本片段的迭代对象)，获取失败时返回None
+    """
+    if store is not None:
+        path = store.lookup(document_id, revision)
+        if path:
+            try:
+                content = load_content(path)
+                if md_source == CONTENT_BLOCKS or content["kind"] == CONTENT_RAW:
+                    return content["kind"], content_chunks(content)
+            except Exception as e:
+                store.logger.warning(f"读取存储的文档内容失败，重新获取 {document_id}: {str(e)}")
+
+    kind, chunks = None, None
+    if md_source == CONTENT_BLOCKS:
+        kind, chunks = CONTENT_BLOCKS, api.iter_document_blocks(document_id)
+        if chunks is None:
+            logging.getLogger(__name__).info(f"文档块获取失败，回退到纯文本内容: {document_id}")
+    if chunks is None:
+        kind, chunks = CONTENT_RAW, api.stream_document_content(document_id)
+        if chunks is None:
+            return None
+    if store is not None and revision:
+        chunks = store.capture(document_id, revision, kind, title, chunks)
+    return kind, chunks
+
+
+def get_default_content_store(max_bytes: int = None) -> ContentStore:
+    """
+    获取进程内共享的内容存储
+
+    Args:
+        max_bytes: 总大小上限（首次创建或修改上限时生效）
+    """
+    return ContentStore.get_default(max_bytes)
+
+
+def content_store_from_config(config: Optional[Dict[str, Any]]) -> Optional[ContentStore]:
+    """
+    按配置获取内容存储（需要在配置中开启）
+
+    Args:
+        config: config.json中的 "content_store" 配置，如 {"enabled": true, "max_cache_mb": 1024}
+
+    Returns:
+        内容存储；未开启时返回None
+    """
+    config = config or {}
+    if not config.get("enabled", False):
+        return None
+    max_cache_mb = config.get("max_cache_mb")
+    return get_default_content_store(int(max_cache_mb * 1024 * 1024) if max_cache_mb else None)
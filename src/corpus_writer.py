@@ -0,0 +1,261 @@
+"""
+语料输出模块
+把Markdown文档转为纯文本记录（整篇一条，或按标题切分、不超过指定token数的片段），
+流式追加写入分片压缩的JSONL文件（安装 zstandard 时为 .jsonl.zst，否则为 .jsonl.gz），供下游检索系统导入。
+每条记录带有Wiki路径、节点信息和编辑时间；只在内存中保留当前文档，不生成单篇文件
+"""
+import os
+import re
+import gzip
+import json
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from document_ir import HEADING, TextEmitter, parse_markdown
+from line_formatter import TextSource
+
+# zstd压缩依赖（可选，未安装时使用gzip）
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_CHUNK_TOKENS = 512
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024  # 每个分片的未压缩大小上限
+
+SHARD_PREFIX = "corpus-"
+
+# 粗略估算token数：中日韩文字每字一个，其他文字每个词一个，标点每个一个
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN = re.compile(rf"[{_CJK}]|[^\W{_CJK}]+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的token数（不依赖具体模型的分词器）"""
+    return sum(1 for _ in _TOKEN.finditer(text))
+
+
+def _split_text(text: str, max_tokens: int) -> List[str]:
+    """超长文本按token数切分（后半段有换行时在换行处断开）"""
+    pieces = []
+    start = count = 0
+    for match in _TOKEN.finditer(text):
+        if count >= max_tokens:
+            cut = text.rfind("\n", start, match.start()) + 1
+            if cut - start <= (match.start() - start) // 2:
+                cut = match.start()
+            pieces.append(text[start:cut])
+            start = cut
+            count = estimate_tokens(text[start:match.start()])
+        count += 1
+    pieces.append(text[start:])
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+def _node_text(node) -> str:
+    """单个节点的纯文本"""
+    emitter = TextEmitter()
+    emitter.add(node)
+    return emitter.getvalue()
+
+
+def chunk_markdown(source: TextSource, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> Iterator[Dict[str, Any]]:
+    """
+    Markdown切分为纯文本片段：每个标题开始一个新片段，片段超过 max_tokens 时在块之间断开，
+    单个块超长时再按token数切分
+
+    Args:
+        source: Markdown（字符串、字符串片段序列、或文件流）
+        max_tokens: 每个片段的token上限，为0时整篇文档一个片段（不按标题切分）
+
+    Returns:
+        片段迭代器，每项为 {"title": 文档标题, "headings": 所在的各级标题, "text": 纯文本}
+        （文档开头的一级标题为文档标题，不计入正文）
+    """
+    title = None
+    headings: List[tuple] = []  # [(级别, 标题)]
+    emitter, tokens = TextEmitter(), 0
+
+    def flush():
+        nonlocal emitter, tokens
+        text = emitter.getvalue().strip()
+        emitter, tokens = TextEmitter(), 0
+        if text:
+            return {"title": title, "headings": [name for _, name in headings], "text": text}
+        return None
+
+    for node in parse_markdown(source):
+        if node.kind == HEADING and node.level == 1 and title is None:
+            title = node.text
+            continue
+        if node.kind == HEADING and max_tokens:
+            chunk = flush()
+            if chunk:
+                yield chunk
+            while headings and headings[-1][0] >= node.level:
+                headings.pop()
+            headings.append((node.level, _node_text(node)))
+            continue
+
+        size = estimate_tokens(_node_text(node)) if max_tokens else 0
+        if max_tokens and tokens and tokens + size > max_tokens:
+            chunk = flush()
+            if chunk:
+                yield chunk
+        if max_tokens and size > max_tokens:
+            for piece in _split_text(_node_text(node), max_tokens):
+                yield {"title": title, "headings": [name for _, name in headings], "text": piece}
+            continue
+        emitter.add(node)
+        tokens += size
+
+    chunk = flush()
+    if chunk:
+        yield chunk
+
+
+def document_records(source: TextSource, document: Dict[str, Any],
+                     max_tokens: int = DEFAULT_CHUNK_TOKENS) -> Iterator[Dict[str, Any]]:
+    """
+    一篇文档的语料记录
+
+    Args:
+        source: Markdown（字符串、字符串片段序列、或文件流）
+        document: 文档信息，如 {"node_token", "obj_token", "obj_type", "path": Wiki路径, "edit_time"}
+        max_tokens: 每个片段的token上限，为0时整篇文档一条记录
+
+    Returns:
+        记录迭代器：文档信息 + {"id": "<node_token>#<序号>", "chunk": 序号, "title", "headings", "text"}
+    """
+    default_title = document.get("path", "").rsplit("/", 1)[-1]
+    for index, chunk in enumerate(chunk_markdown(source, max_tokens)):
+        record = {"id": f"{document.get('node_token', '')}#{index}"}
+        record.update(document)
+        record["chunk"] = index
+        record["title"] = chunk["title"] or default_title
+        record["headings"] = chunk["headings"]
+        record["text"] = chunk["text"]
+        yield record
+
+
+class _HashingWriter:
+    """写入时计算sha256和大小的包装"""
+
+    def __init__(self, file):
+        self._file = file
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+class CorpusWriter:
+    """分片压缩的JSONL写入器（线程安全，同一文档的记录连续写入）"""
+
+    def __init__(self, directory: str, shard_bytes: int = DEFAULT_SHARD_BYTES, zstd_level: int = 3):
+        """
+        Args:
+            directory: 分片所在目录
+            shard_bytes: 每个分片的未压缩大小上限（超过后在文档之间换到下一个分片）
+            zstd_level: zstd压缩级别
+        """
+        self.directory = directory
+        self.shard_bytes = shard_bytes
+        self.zstd_level = zstd_level
+        self.extension = ".jsonl.zst" if zstandard is not None else ".jsonl.gz"
+        self.logger = logging.getLogger(__name__)
+        self.shards: List[Dict[str, Any]] = []  # 已完成的分片
+        self.documents = 0
+        self.records = 0
+        self._lock = threading.Lock()
+        self._raw: Optional[_HashingWriter] = None
+        self._stream = None
+        self._shard: Optional[Dict[str, Any]] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        写入一篇文档的记录
+
+        Args:
+            records: 记录（先在锁外生成完毕，再连续写入）
+
+        Returns:
+            写入的记录数
+        """
+        lines = [json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records]
+        if not lines:
+            return 0
+        with self._lock:
+            if self._shard is not None and self._shard["bytes"] >= self.shard_bytes:
+                self._close_shard()
+            if self._shard is None:
+                self._open_shard()
+            for line in lines:
+                self._stream.write(line)
+                self._shard["bytes"] += len(line)
+            self._shard["records"] += len(lines)
+            self.documents += 1
+            self.records += len(lines)
+        return len(lines)
+
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        完成当前分片
+
+        Returns:
+            [{"path": 分片文件名, "records", "bytes": 未压缩大小, "size", "sha256"}]
+        """
+        with self._lock:
+            if self._shard is not None:
+                self._close_shard()
+        return self.shards
+
+    def abort(self):
+        """放弃当前分片（保留为 .part 文件，不计入已完成的分片）"""
+        with self._lock:
+            if self._shard is not None:
+                self._stream.close()
+                if zstandard is None:
+                    self._raw.close()
+                self._raw = self._stream = self._shard = None
+
+    def _open_shard(self):
+        """打开下一个分片（调用方持有锁）"""
+        name = f"{SHARD_PREFIX}{len(self.shards):05d}{self.extension}"
+        # 写入过程中使用 .part 后缀，完成后改名
+        self._raw = _HashingWriter(open(os.path.join(self.directory, name + ".part"), "wb"))
+        if zstandard is not None:
+            self._stream = zstandard.ZstdCompressor(level=self.zstd_level).stream_writer(self._raw)
+        else:
+            self._stream = gzip.GzipFile(filename="", mode="wb", fileobj=self._raw)
+        self._shard = {"path": name, "records": 0, "bytes": 0}
+
+    def _close_shard(self):
+        """完成当前分片（调用方持有锁）"""
+        self._stream.close()
+        if zstandard is None:
+            # GzipFile 不关闭传入的文件对象
+            self._raw.close()
+        path = os.path.join(self.directory, self._shard["path"])
+        os.replace(path + ".part", path)
+        self._shard["size"] = self._raw.size
+        self._shard["sha256"] = self._raw.hexdigest()
+        self.shards.append(self._shard)
+        self.logger.info(f"📚 语料分片完成: {self._shard['path']}（{self._shard['records']} 条记录）")
+        self._raw = self._stream = self._shard = None
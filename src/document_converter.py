@@ -3,26 +3,35 @@
 支持将飞书文档内容转换为Markdown、Word (docx) 和 PDF格式
 """
 import os
-import re
 import logging
-import platform
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, Optional, Iterable, Iterator
+
+from line_formatter import LineFormatter
+from document_ir import (HEADING, DocxEmitter, Emitter, Node, PdfEmitter, emit, parse_markdown,
+                         parse_plain_text)
+
+# 超过该字符数的内容使用流式写入器生成Word
+STREAMING_DOCX_THRESHOLD = 200_000
 
 # Word导出依赖
 try:
     from docx import Document
-    from docx.shared import Pt
-    from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 except ImportError:
     Document = None
 
-# PDF导出依赖
-try:
-    import markdown
-    from xhtml2pdf import pisa
-except ImportError:
-    markdown = None
-    pisa = None
+# PDF导出依赖（见 pdf_renderer）
+from pdf_renderer import pisa, find_cjk_font
+
+
+def _word_heading_levels(nodes: Iterable[Node]) -> Iterator[Node]:
+    """
+    raw_content转Word时沿用原有的标题级别：识别出的2、3级标题对应Word的Heading 2、3，文档标题为Title
+    （DocxEmitter 按Markdown级别减一映射，如 ## 对应Heading 1）
+    """
+    for node in nodes:
+        if node.kind == HEADING and node.level > 1:
+            node = Node(HEADING, text=node.text, level=node.level + 1)
+        yield node
 
 
 class DocumentConverter:
@@ -39,208 +48,118 @@ class DocumentConverter:
             self.logger.error("文档内容为空")
             return ""
         
-        markdown_lines = []
-        
-        # 添加文档标题
-        if doc_metadata and doc_metadata.get("title"):
-            title = doc_metadata.get("title", "未命名文档")
-            markdown_lines.append(f"# {title}\n")
-        
-        # 获取纯文本内容
-        content = doc_content.get("content", "")
+        title = doc_metadata.get("title", "未命名文档") if doc_metadata else None
+        return "".join(LineFormatter().iter_markdown(doc_content.get("content", ""), title))
+    
+    def iter_markdown(self, content_chunks: Iterable[str], doc_metadata: Dict[str, Any] = None) -> Iterator[str]:
+        """
+        流式转换为Markdown格式（输出与 to_markdown 一致）
         
-        if content:
-            markdown_lines.append(self._format_content(content))
-        else:
-            self.logger.warning("文档内容为空")
-            markdown_lines.append("*文档内容为空*")
+        Args:
+            content_chunks: 文档纯文本内容的片段（如 FeishuAPI.stream_document_content）
+            doc_metadata: 文档元数据
+            
+        Returns:
+            Markdown文本片段迭代器
+        """
+        title = doc_metadata.get("title", "未命名文档") if doc_metadata else None
+        return LineFormatter().iter_markdown(content_chunks, title)
+    
+    def save_markdown(self, content_chunks: Iterable[str], save_path: str, doc_metadata: Dict[str, Any] = None) -> bool:
+        """
+        流式转换并保存Markdown（先写入临时文件，完成后重命名）
         
-        return "\n".join(markdown_lines)
+        Args:
+            content_chunks: 文档纯文本内容的片段
+            save_path: 保存路径
+            doc_metadata: 文档元数据
+            
+        Returns:
+            是否成功
+        """
+        part_path = save_path + ".part"
+        try:
+            os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+            title = doc_metadata.get("title", "未命名文档") if doc_metadata else None
+            with open(part_path, 'w', encoding='utf-8') as f:
+                LineFormatter().write(content_chunks, f, title)
+            os.replace(part_path, save_path)
+            return True
+        except Exception as e:
+            self.logger.error(f"导出Markdown失败: {str(e)}")
+            if os.path.exists(part_path):
+                try:
+                    os.remove(part_path)
+                except OSError:
+                    pass
+            return False
     
     def to_docx(self, doc_content: Dict[str, Any], doc_metadata: Dict[str, Any] = None, save_path: str = None) -> bool:
         """
         转换为Word格式
+        
+        内容超过 STREAMING_DOCX_THRESHOLD 个字符（或未安装python-docx）时使用流式写入器，
+        逐段写出OOXML，避免构建完整的文档对象树
         """
-        if Document is None:
-            self.logger.error("未安装python-docx库，无法导出Word")
-            return False
-            
-        if not doc_content:
-            return False
-            
-        try:
-            doc = Document()
-            
-            # 添加标题
-            if doc_metadata and doc_metadata.get("title"):
-                title = doc_metadata.get("title", "未命名文档")
-                doc.add_heading(title, 0)
-            
-            # 获取内容
-            content = doc_content.get("content", "")
-            if content:
-                # 处理内容
-                lines = content.split('\n')
-                prev_empty = False
-                
-                for line in lines:
-                    stripped = line.strip()
-                    
-                    if not stripped:
-                        if not prev_empty:
-                            doc.add_paragraph("")
-                            prev_empty = True
-                        continue
-                    
-                    prev_empty = False
-                    
-                    # 简单的标题检测
-                    if self._is_likely_heading(stripped, line):
-                        level = self._detect_heading_level(stripped)
-                        # Word标题级别从1开始，且不能超过9
-                        level = min(max(level, 1), 9)
-                        doc.add_heading(stripped, level=level)
-                    else:
-                        doc.add_paragraph(stripped)
-            
-            if save_path:
-                doc.save(save_path)
-                return True
-            return False
-            
-        except Exception as e:
-            self.logger.error(f"导出Word失败: {str(e)}")
+        if not doc_content or not save_path:
             return False
+        
+        content = doc_content.get("content", "")
+        title = doc_metadata.get("title", "未命名文档") if doc_metadata and doc_metadata.get("title") else None
+        streaming = len(content) >= STREAMING_DOCX_THRESHOLD
+        nodes = _word_heading_levels(parse_plain_text(content, title, blank_lines=True))
+        return self._emit(nodes, lambda: DocxEmitter(save_path, streaming), "Word")
 
     def to_pdf(self, doc_content: Dict[str, Any], doc_metadata: Dict[str, Any] = None, save_path: str = None) -> bool:
         """
-        转换为PDF格式
+        转换为PDF格式（与 to_markdown 的标题识别一致，直接由纯文本生成，不经过Markdown文本）
         """
-        if markdown is None or pisa is None:
-            self.logger.error("未安装markdown或xhtml2pdf库，无法导出PDF")
+        if pisa is None:
+            self.logger.error("未安装xhtml2pdf库，无法导出PDF")
             return False
+        if not doc_content or not save_path:
+            return False
+        
+        title = doc_metadata.get("title", "未命名文档") if doc_metadata else None
+        return self._emit(parse_plain_text(doc_content.get("content", ""), title), lambda: PdfEmitter(save_path), "PDF")
+
+    def markdown_to_pdf(self, md_content: str, save_path: str) -> bool:
+        """
+        将Markdown文本渲染为PDF（使用已注册的中文字体，图片等相对路径以保存目录为基准）
+        
+        Args:
+            md_content: Markdown文本
+            save_path: 保存路径
             
-        try:
-            # 先转换为Markdown
-            md_content = self.to_markdown(doc_content, doc_metadata)
-            
-            # Markdown转HTML
-            html_content = markdown.markdown(md_content)
-            
-            # 添加基本的HTML结构和CSS
-            # 注意：xhtml2pdf对中文字体支持有限，这里使用基本样式
-            # 中文可能显示为方块，这是xhtml2pdf的已知限制
-            full_html = f"""
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <style>
-                    body {{
-                        font-family: sans-serif;
-                        font-size: 12pt;
-                        line-height: 1.6;
-                    }}
-                    h1, h2, h3, h4, h5, h6 {{ 
-                        margin-top: 20px; 
-                        margin-bottom: 10px; 
-                        font-weight: bold;
-                    }}
-                    h1 {{ font-size: 24pt; }}
-                    h2 {{ font-size: 20pt; }}
-                    h3 {{ font-size: 16pt; }}
-                    p {{ margin-bottom: 10px; line-height: 1.5; }}
-                    pre {{ background-color: #f5f5f5; padding: 10px; border-radius: 5px; }}
-                    code {{ background-color: #f5f5f5; padding: 2px 4px; border-radius: 3px; }}
-                </style>
-            </head>
-            <body>
-                {html_content}
-            </body>
-            </html>
-            """
-            
-            if save_path:
-                with open(save_path, "wb") as f:
-                    pisa_status = pisa.CreatePDF(full_html, dest=f, encoding='utf-8')
+        Returns:
+            是否成功
+        """
+        return self._emit(parse_markdown(md_content), lambda: PdfEmitter(save_path), "PDF")
 
-                
-                return not pisa_status.err
-            return False
+    def markdown_to_docx(self, md_content: str, save_path: str) -> bool:
+        """
+        将Markdown文本渲染为Word（支持标题、列表、引用、代码块、表格和本地图片；
+        未安装python-docx时使用流式写入器）
+        
+        Args:
+            md_content: Markdown文本
+            save_path: 保存路径
             
-        except Exception as e:
+        Returns:
+            是否成功
+        """
+        return self._emit(parse_markdown(md_content), lambda: DocxEmitter(save_path), "Word")
 
-            self.logger.error(f"导出PDF失败: {str(e)}")
+    def _emit(self, nodes: Iterable[Node], make_emitter: Callable[[], Emitter], label: str) -> bool:
+        """创建并驱动单个输出器"""
+        try:
+            emitter = make_emitter()
+            success, _ = emit(nodes, [emitter])[emitter.format]
+            return success
+        except Exception as e:
+            self.logger.error(f"导出{label}失败: {str(e)}")
             return False
 
     def _get_chinese_font_path(self) -> Optional[str]:
         """获取中文字体路径"""
-        system = platform.system()
-        if system == "Windows":
-            # 尝试常见的Windows中文字体
-            fonts = [
-                "C:\\Windows\\Fonts\\msyh.ttc", # 微软雅黑
-                "C:\\Windows\\Fonts\\simhei.ttf", # 黑体
-                "C:\\Windows\\Fonts\\simsun.ttc", # 宋体
-            ]
-            for font in fonts:
-                if os.path.exists(font):
-                    return font.replace("\\", "/") # xhtml2pdf需要正斜杠或转义
-        elif system == "Darwin": # macOS
-            fonts = [
-                "/System/Library/Fonts/PingFang.ttc",
-                "/Library/Fonts/Arial Unicode.ttf"
-            ]
-            for font in fonts:
-                if os.path.exists(font):
-                    return font
-        # Linux等其他系统暂不处理，或者需要用户指定
-        return None
-
-    def _format_content(self, content: str) -> str:
-        """格式化内容 (复用原逻辑)"""
-        lines = content.split('\n')
-        formatted_lines = []
-        
-        prev_empty = False
-        for line in lines:
-            stripped = line.strip()
-            
-            if not stripped:
-                if not prev_empty:
-                    formatted_lines.append("")
-                    prev_empty = True
-                continue
-            
-            prev_empty = False
-            
-            if self._is_likely_heading(stripped, line):
-                level = self._detect_heading_level(stripped)
-                formatted_lines.append(f"{'#' * level} {stripped}")
-            else:
-                formatted_lines.append(line)
-        
-        return "\n".join(formatted_lines)
-    
-    def _is_likely_heading(self, stripped: str, original: str) -> bool:
-        """判断是否为标题 (复用原逻辑)"""
-        if len(stripped) > 80:
-            return False
-        
-        if re.match(r'^[\d一二三四五六七八九十]+[、\.\s]', stripped):
-            return True
-        
-        if len(stripped) < 30 and not stripped.endswith(('。', '，', ',', '.', '；', ';')):
-            return True
-        
-        return False
-    
-    def _detect_heading_level(self, text: str) -> int:
-        """检测标题级别 (复用原逻辑)"""
-        if re.match(r'^一[、\.]', text) or re.match(r'^1[、\.]', text):
-            return 2
-        elif re.match(r'^[\d一二三四五六七八九十]+[、\.]', text):
-            return 3
-        elif len(text) < 20:
-            return 2
-        else:
-            return 3
+        return find_cjk_font()
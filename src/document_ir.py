@@ -0,0 +1,636 @@
+"""
+文档中间表示模块
+每篇文档只解析一次，得到由标题、段落、列表项、代码块、引用、表格、图片组成的节点流；
+Markdown、HTML、Word、PDF、纯文本等输出格式各自实现一个输出器，在同一次遍历中消费节点，
+增加输出格式只增加序列化开销，不再重复解析
+"""
+import os
+import re
+import time
+import logging
+from html import escape
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+
+from line_formatter import TextSource, TextSink, heading_level, iter_lines
+from docx_writer import StreamingDocxWriter
+
+# Word输出依赖
+try:
+    from docx import Document
+    from docx.shared import Pt, Inches
+except ImportError:
+    Document = None
+
+
+# 节点类型
+HEADING = "heading"
+PARAGRAPH = "paragraph"
+LIST_ITEM = "list_item"
+CODE = "code"
+QUOTE = "quote"
+TABLE = "table"
+IMAGE = "image"
+RULE = "rule"
+
+# Markdown行级语法
+_HEADING = re.compile(r'(#{1,6})\s+(.*)')
+_LIST_ITEM = re.compile(r'([-*+](?:\s+\[[ xX]\])?|\d+\.)\s+(.*)')
+_IMAGE = re.compile(r'!\[([^\]]*)\]\(([^)\s]+)\)')
+_TABLE_RULE = re.compile(r'\|(\s*:?-{3,}:?\s*\|)+')
+_TABLE_CELL = re.compile(r'(?<!\\)\|')
+
+# 行内语法
+_INLINE_LINK = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+_INLINE_EMPHASIS = re.compile(r'(\*\*|~~|`)')
+_INLINE_CODE = re.compile(r'(`[^`]+`)')
+_HTML_IMAGE = re.compile(r'!\[([^\]]*)\]\(([^)\s]+)\)')
+_HTML_LINK = re.compile(r'\[([^\]]*)\]\(([^)\s]*)\)')
+_HTML_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_HTML_STRIKE = re.compile(r'~~(.+?)~~')
+_HTML_ITALIC = re.compile(r'(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])')
+
+logger = logging.getLogger(__name__)
+
+
+class Node:
+    """
+    文档节点
+
+    各类型使用的字段：
+        HEADING: text, level（1-6，1为文档标题）
+        PARAGRAPH: text
+        LIST_ITEM: text, level（嵌套深度，从0开始）, marker（'-'、'1.'、'- [ ]'、'- [x]'）
+        CODE: text（语言）, lines
+        QUOTE: lines（每行为一段，空字符串表示段落间隔）
+        TABLE: rows（首行为表头，单元格内换行为 '\\n'）
+        IMAGE: text（图片路径）
+        RULE: 无
+
+    文本字段保留Markdown行内语法（加粗、链接等），由各输出器自行转换
+    """
+    __slots__ = ("kind", "text", "level", "marker", "lines", "rows")
+
+    def __init__(self, kind: str, text: str = "", level: int = 0, marker: str = "",
+                 lines: List[str] = None, rows: List[List[str]] = None):
+        self.kind = kind
+        self.text = text
+        self.level = level
+        self.marker = marker
+        self.lines = lines
+        self.rows = rows
+
+    def __repr__(self):
+        return f"Node({self.kind!r}, {self.text!r}, level={self.level})"
+
+
+def strip_inline(text: str) -> str:
+    """去除行内Markdown标记（链接保留文字）"""
+    return _INLINE_EMPHASIS.sub("", _INLINE_LINK.sub(r"\1", text))
+
+
+def _attr(value: str) -> str:
+    return value.replace('"', "&quot;")
+
+
+def inline_html(text: str) -> str:
+    """将行内Markdown标记转为HTML（行内代码中的内容原样保留）"""
+    parts = []
+    for i, part in enumerate(_INLINE_CODE.split(text)):
+        if i % 2:
+            parts.append(f"<code>{escape(part[1:-1])}</code>")
+            continue
+        # 先整体转义，属性值中只需再处理引号
+        part = escape(part, quote=False)
+        part = _HTML_IMAGE.sub(lambda m: f'<img src="{_attr(unquote(m.group(2)))}" alt="{_attr(m.group(1))}"/>', part)
+        part = _HTML_LINK.sub(lambda m: f'<a href="{_attr(m.group(2))}">{m.group(1)}</a>', part)
+        part = _HTML_BOLD.sub(r"<b>\1</b>", part)
+        part = _HTML_STRIKE.sub(r"<strike>\1</strike>", part)
+        part = _HTML_ITALIC.sub(r"<i>\1</i>", part)
+        parts.append(part)
+    return "".join(parts)
+
+
+# ----------------------------------------------------------------------
+# 解析
+# ----------------------------------------------------------------------
+
+def parse_markdown(source: TextSource) -> Iterator[Node]:
+    """
+    将Markdown（BlockConverter / LineFormatter 的输出）解析为节点流
+
+    每个非空正文行为一个段落（飞书文档的换行即分段）
+
+    Args:
+        source: 字符串、字符串片段序列、或文件流
+
+    Returns:
+        节点迭代器
+    """
+    code: Optional[Node] = None
+    code_indent = 0
+    table: List[List[str]] = []
+    quote: List[str] = []
+    list_indents: List[int] = []
+
+    for line in iter_lines(source):
+        stripped = line.strip()
+
+        # 代码块原样保留（去除与围栏相同的缩进）
+        if code is not None:
+            if stripped.startswith("```"):
+                yield code
+                code = None
+            else:
+                indent = min(code_indent, len(line) - len(line.lstrip(" ")))
+                code.lines.append(line[indent:])
+            continue
+
+        # 表格行、引用行先收集，遇到其他行时一起输出
+        if stripped.startswith("|") and stripped.endswith("|") and len(stripped) > 1:
+            if not _TABLE_RULE.fullmatch(stripped):
+                table.append([cell.strip().replace("\\|", "|").replace("<br>", "\n")
+                              for cell in _TABLE_CELL.split(stripped[1:-1])])
+            continue
+        if table:
+            yield Node(TABLE, rows=table)
+            table = []
+
+        if stripped.startswith(">"):
+            quote.append(stripped[1:].strip())
+            continue
+        if quote:
+            yield Node(QUOTE, lines=quote)
+            quote = []
+
+        if not stripped:
+            continue
+
+        if stripped.startswith("```"):
+            code = Node(CODE, text=stripped[3:].strip(), lines=[])
+            code_indent = len(line) - len(line.lstrip(" "))
+            list_indents = []
+            continue
+
+        item = _LIST_ITEM.match(stripped)
+        if item:
+            indent = len(line) - len(line.lstrip(" "))
+            while list_indents and indent < list_indents[-1]:
+                list_indents.pop()
+            if not list_indents or indent > list_indents[-1]:
+                list_indents.append(indent)
+            marker = item.group(1)
+            if marker[0] in "*+":
+                marker = "-" + marker[1:]
+            yield Node(LIST_ITEM, text=item.group(2), level=len(list_indents) - 1, marker=" ".join(marker.split()))
+            continue
+        if line[:1] != " ":
+            list_indents = []
+
+        heading = _HEADING.match(stripped)
+        if heading:
+            yield Node(HEADING, text=heading.group(2), level=len(heading.group(1)))
+        elif stripped == "---":
+            yield Node(RULE)
+        elif _IMAGE.fullmatch(stripped):
+            yield Node(IMAGE, text=unquote(_IMAGE.fullmatch(stripped).group(2)))
+        else:
+            yield Node(PARAGRAPH, text=stripped)
+
+    if code is not None:
+        yield code
+    if table:
+        yield Node(TABLE, rows=table)
+    if quote:
+        yield Node(QUOTE, lines=quote)
+
+
+def parse_plain_text(source: TextSource, title: Optional[str] = None,
+                     blank_lines: bool = False) -> Iterator[Node]:
+    """
+    将raw_content纯文本解析为节点流（标题识别规则与 LineFormatter 相同）
+
+    Args:
+        source: 纯文本来源
+        title: 文档标题（可选）
+        blank_lines: 是否把空行（连续空行合并为一个）保留为空段落（Word输出沿用原有的段落间隔）
+
+    Returns:
+        节点迭代器
+    """
+    if title:
+        yield Node(HEADING, text=title, level=1)
+    prev_empty = False
+    for line in iter_lines(source):
+        stripped = line.strip()
+        if not stripped:
+            if blank_lines and not prev_empty:
+                yield Node(PARAGRAPH)
+            prev_empty = True
+            continue
+        prev_empty = False
+        level = heading_level(stripped)
+        yield Node(HEADING, text=stripped, level=level) if level else Node(PARAGRAPH, text=stripped)
+
+
+# ----------------------------------------------------------------------
+# 输出器
+# ----------------------------------------------------------------------
+
+def _list_type(node: Node) -> str:
+    """列表项的类型（无序、有序、待办）"""
+    if node.marker[0].isdigit():
+        return "ordered"
+    return "todo" if node.marker.startswith("- [") else "bullet"
+
+
+class Emitter:
+    """输出器基类：add 逐个接收节点，close 完成输出"""
+
+    format = ""
+
+    def add(self, node: Node):
+        raise NotImplementedError
+
+    def close(self) -> bool:
+        """
+        完成输出
+
+        Returns:
+            是否成功
+        """
+        return True
+
+    def abort(self):
+        """放弃输出（add 出错时调用）"""
+
+
+class _TextSinkEmitter(Emitter):
+    """写入文本的输出器（sink 为提供 write 的对象或回调；未提供时收集为字符串，见 getvalue）"""
+
+    def __init__(self, sink: TextSink = None):
+        self._parts: List[str] = []
+        self._write = getattr(sink, "write", sink) if sink is not None else self._parts.append
+        self._prev: Optional[Node] = None
+
+    def getvalue(self) -> str:
+        """收集到的文本（仅在未提供 sink 时可用）"""
+        return "".join(self._parts)
+
+    def _separator(self, node: Node) -> str:
+        """块之间以空行分隔，同一列表内的列表项之间不空行"""
+        prev = self._prev
+        self._prev = node
+        if prev is None:
+            return ""
+        if prev.kind == LIST_ITEM and node.kind == LIST_ITEM:
+            if node.level or prev.level or _list_type(node) == _list_type(prev):
+                return "\n"
+        return "\n\n"
+
+
+class MarkdownEmitter(_TextSinkEmitter):
+    """Markdown输出器"""
+
+    format = "md"
+
+    def add(self, node: Node):
+        kind = node.kind
+        if kind == HEADING:
+            text = f"{'#' * node.level} {node.text}"
+        elif kind == LIST_ITEM:
+            text = "  " * node.level + f"{node.marker} {node.text}"
+        elif kind == CODE:
+            text = "\n".join([f"```{node.text}", *node.lines, "```"])
+        elif kind == QUOTE:
+            text = "\n".join(f"> {line}" if line else ">" for line in node.lines)
+        elif kind == TABLE:
+            columns = max(len(row) for row in node.rows)
+            rows = [
+                "| " + " | ".join(cell.replace("|", "\\|").replace("\n", "<br>")
+                                  for cell in row + [""] * (columns - len(row))) + " |"
+                for row in node.rows
+            ]
+            rows.insert(1, "|" + " --- |" * columns)
+            text = "\n".join(rows)
+        elif kind == IMAGE:
+            text = f"![]({node.text})"
+        elif kind == RULE:
+            text = "---"
+        else:
+            text = node.text
+        self._write(self._separator(node) + text)
+
+
+class TextEmitter(_TextSinkEmitter):
+    """纯文本输出器（去除行内标记，用于全文检索、语料等）"""
+
+    format = "txt"
+
+    def add(self, node: Node):
+        kind = node.kind
+        if kind == LIST_ITEM:
+            marker = "•" if node.marker == "-" else node.marker.lstrip("- ")
+            text = "  " * node.level + f"{marker} {strip_inline(node.text)}"
+        elif kind == CODE:
+            text = "\n".join(node.lines)
+        elif kind == QUOTE:
+            text = "\n".join(strip_inline(line) for line in node.lines)
+        elif kind == TABLE:
+            text = "\n".join("\t".join(strip_inline(cell).replace("\n", " ") for cell in row)
+                             for row in node.rows)
+        elif kind in (IMAGE, RULE):
+            return
+        else:
+            text = strip_inline(node.text)
+        self._write(self._separator(node) + text)
+
+
+class HtmlEmitter(Emitter):
+    """HTML输出器（产出 <body> 内的内容，见 body；提供 save_path 时保存为完整的HTML文件）"""
+
+    format = "html"
+
+    def __init__(self, save_path: str = None):
+        self.save_path = save_path
+        self._parts: List[str] = []
+        self._lists: List[str] = []  # 当前打开的列表标签（ul/ol）
+
+    def add(self, node: Node):
+        kind = node.kind
+        if kind == LIST_ITEM:
+            self._add_list_item(node)
+            return
+        self._close_lists(0)
+
+        if kind == HEADING:
+            self._parts.append(f"<h{node.level}>{inline_html(node.text)}</h{node.level}>\n")
+        elif kind == PARAGRAPH:
+            self._parts.append(f"<p>{inline_html(node.text)}</p>\n")
+        elif kind == CODE:
+            self._parts.append(f"<pre><code>{escape(chr(10).join(node.lines))}</code></pre>\n")
+        elif kind == QUOTE:
+            paragraphs = "".join(f"<p>{inline_html(line)}</p>" for line in node.lines if line)
+            self._parts.append(f"<blockquote>{paragraphs}</blockquote>\n")
+        elif kind == TABLE:
+            rows = []
+            for index, row in enumerate(node.rows):
+                tag = "th" if index == 0 else "td"
+                cells = "".join(f"<{tag}>{inline_html(cell).replace(chr(10), '<br/>')}</{tag}>" for cell in row)
+                rows.append(f"<tr>{cells}</tr>")
+            self._parts.append(f"<table>{''.join(rows)}</table>\n")
+        elif kind == IMAGE:
+            self._parts.append(f'<p><img src="{escape(node.text)}"/></p>\n')
+        elif kind == RULE:
+            self._parts.append("<hr/>\n")
+
+    def body(self) -> str:
+        """已输出的HTML正文"""
+        self._close_lists(0)
+        return "".join(self._parts)
+
+    def close(self) -> bool:
+        if not self.save_path:
+            return True
+        part_path = self.save_path + ".part"
+        try:
+            with open(part_path, "w", encoding="utf-8") as f:
+                f.write(f'<html><head><meta charset="utf-8"></head><body>\n{self.body()}</body></html>\n')
+            os.replace(part_path, self.save_path)
+            return True
+        except Exception as e:
+            logger.error(f"导出HTML失败: {str(e)}")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return False
+
+    def _add_list_item(self, node: Node):
+        """按嵌套深度打开或关闭列表"""
+        tag = "ol" if node.marker[0].isdigit() else "ul"
+        depth = node.level + 1
+        self._close_lists(depth)
+        if len(self._lists) == depth and self._lists[-1] != tag:
+            self._close_lists(depth - 1)
+        while len(self._lists) < depth:
+            start = f' start="{node.marker[:-1]}"' if tag == "ol" and node.marker != "1." else ""
+            self._parts.append(f"<{tag}{start}>")
+            self._lists.append(tag)
+
+        text = inline_html(node.text)
+        if node.marker.startswith("- ["):
+            text = node.marker[2:] + " " + text
+        self._parts.append(f"<li>{text}</li>\n")
+
+    def _close_lists(self, depth: int):
+        while len(self._lists) > depth:
+            self._parts.append(f"</{self._lists.pop()}>\n")
+
+
+class PdfEmitter(Emitter):
+    """PDF输出器（生成HTML后由 xhtml2pdf 渲染，见 pdf_renderer）"""
+
+    format = "pdf"
+
+    def __init__(self, save_path: str, outline_shift: int = 0):
+        """
+        Args:
+            save_path: 保存路径
+            outline_shift: 书签层级上移的级数（分段渲染时使用）
+        """
+        self.save_path = save_path
+        self.outline_shift = outline_shift
+        self._html = HtmlEmitter()
+
+    def add(self, node: Node):
+        self._html.add(node)
+
+    def close(self) -> bool:
+        from pdf_renderer import render_html_pdf
+        return render_html_pdf(self._html.body(), self.save_path, self.outline_shift)
+
+
+class DocxEmitter(Emitter):
+    """
+    Word输出器
+
+    默认使用 python-docx（支持列表样式、表格和图片）；streaming 为True或未安装python-docx时
+    使用 StreamingDocxWriter 逐段写出，列表、表格等以普通段落表示
+    """
+
+    format = "docx"
+
+    def __init__(self, save_path: str, streaming: bool = False):
+        """
+        Args:
+            save_path: 保存路径（图片相对路径以其所在目录为基准）
+            streaming: 是否使用流式写入器（超大文档）
+        """
+        self.save_path = save_path
+        self.base_dir = os.path.dirname(os.path.abspath(save_path))
+        self.streaming = streaming or Document is None
+        if self.streaming:
+            self._writer = StreamingDocxWriter(save_path)
+            self._doc = None
+        else:
+            self._writer = None
+            self._doc = Document()
+
+    def add(self, node: Node):
+        if self.streaming:
+            self._add_streaming(node)
+            return
+
+        doc = self._doc
+        kind = node.kind
+        if kind == HEADING:
+            # 一级标题（文档标题）对应Word的Title样式
+            doc.add_heading(strip_inline(node.text), min(node.level - 1, 9))
+        elif kind == PARAGRAPH:
+            doc.add_paragraph(strip_inline(node.text))
+        elif kind == LIST_ITEM:
+            base = "List Number" if node.marker[0].isdigit() else "List Bullet"
+            style = base if node.level == 0 else f"{base} {min(node.level + 1, 3)}"
+            doc.add_paragraph(strip_inline(node.text), style=style)
+        elif kind == CODE:
+            for line in node.lines:
+                run = doc.add_paragraph().add_run(line)
+                run.font.name = "Consolas"
+                run.font.size = Pt(9)
+        elif kind == QUOTE:
+            for line in node.lines:
+                if line:
+                    doc.add_paragraph(strip_inline(line), style="Quote")
+        elif kind == TABLE:
+            self._add_table(node.rows)
+        elif kind == IMAGE:
+            image_path = os.path.join(self.base_dir, node.text)
+            if os.path.isfile(image_path):
+                try:
+                    doc.add_picture(image_path, width=Inches(6))
+                except Exception:
+                    # 不支持的图片格式（如svg），保留路径
+                    doc.add_paragraph(node.text)
+
+    def close(self) -> bool:
+        try:
+            if self.streaming:
+                self._writer.close()
+            else:
+                self._doc.save(self.save_path)
+            return True
+        except Exception as e:
+            logger.error(f"导出Word失败: {str(e)}")
+            self.abort()
+            return False
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.abort()
+
+    def _add_streaming(self, node: Node):
+        writer = self._writer
+        kind = node.kind
+        if kind == HEADING:
+            writer.add_heading(strip_inline(node.text), min(node.level - 1, 9))
+        elif kind == PARAGRAPH:
+            writer.add_paragraph(strip_inline(node.text))
+        elif kind == LIST_ITEM:
+            marker = "•" if node.marker == "-" else node.marker.lstrip("- ")
+            writer.add_paragraph("    " * node.level + f"{marker} {strip_inline(node.text)}")
+        elif kind == CODE:
+            for line in node.lines:
+                writer.add_paragraph(line)
+        elif kind == QUOTE:
+            for line in node.lines:
+                if line:
+                    writer.add_paragraph(strip_inline(line))
+        elif kind == TABLE:
+            for row in node.rows:
+                writer.add_paragraph("\t".join(strip_inline(cell).replace("\n", " ") for cell in row))
+        elif kind == IMAGE:
+            writer.add_paragraph(node.text)
+
+    def _add_table(self, rows: List[List[str]]):
+        """添加表格（首行为表头）"""
+        columns = max(len(row) for row in rows)
+        table = self._doc.add_table(rows=len(rows), cols=columns)
+        table.style = "Table Grid"
+        for r, row in enumerate(rows):
+            for c, text in enumerate(row):
+                table.cell(r, c).text = strip_inline(text)
+
+
+def emit(nodes: Iterable[Node], emitters: List[Emitter]) -> Dict[str, Tuple[bool, float]]:
+    """
+    遍历一次节点流，同时驱动多个输出器
+
+    某个输出器出错时放弃该输出器，其余输出器继续
+
+    Args:
+        nodes: 节点流（parse_markdown / parse_plain_text 的结果）
+        emitters: 输出器列表（格式互不相同）
+
+    Returns:
+        {格式: (是否成功, 该输出器的耗时秒数)}
+    """
+    seconds = [0.0] * len(emitters)
+    failed = [False] * len(emitters)
+    clock = time.perf_counter
+
+    for node in nodes:
+        for i, emitter in enumerate(emitters):
+            if failed[i]:
+                continue
+            start = clock()
+            try:
+                emitter.add(node)
+            except Exception as e:
+                logger.error(f"生成{emitter.format.upper()}失败: {str(e)}")
+                failed[i] = True
+                emitter.abort()
+            seconds[i] += clock() - start
+
+    results = {}
+    for i, emitter in enumerate(emitters):
+        if failed[i]:
+            results[emitter.format] = (False, seconds[i])
+            continue
+        start = clock()
+        try:
+            success = emitter.close()
+        except Exception as e:
+            logger.error(f"生成{emitter.format.upper()}失败: {str(e)}")
+            emitter.abort()
+            success = False
+        results[emitter.format] = (success, seconds[i] + clock() - start)
+    return results
+
+
+def render_markdown(md_content: str, targets: Dict[str, str]) -> Dict[str, Tuple[bool, str, float]]:
+    """
+    将Markdown渲染为多种格式：只解析一次，各格式在同一次遍历中生成（RenderService 的渲染任务）
+
+    Args:
+        md_content: Markdown文本
+        targets: {格式: 保存路径}，格式为 'docx' 或 'pdf'
+
+    Returns:
+        {格式: (是否成功, 错误信息, 耗时秒数)}
+    """
+    emitter_types = {'docx': DocxEmitter, 'pdf': PdfEmitter}
+    results = {}
+    emitters = []
+    for fmt, save_path in targets.items():
+        emitter_type = emitter_types.get(fmt)
+        if emitter_type is None:
+            results[fmt] = (False, f"不支持本地渲染的格式: {fmt}", 0.0)
+            continue
+        try:
+            emitters.append(emitter_type(save_path))
+        except Exception as e:
+            results[fmt] = (False, f"本地渲染{fmt.upper()}失败: {str(e)}", 0.0)
+
+    if emitters:
+        for fmt, (success, seconds) in emit(parse_markdown(md_content), emitters).items():
+            results[fmt] = (success, "" if success else f"本地渲染{fmt.upper()}失败", seconds)
+    return results
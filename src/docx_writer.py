@@ -0,0 +1,199 @@
+"""
+流式Word写入模块
+直接生成OOXML：段落逐个写入zip中的 word/document.xml，样式表预先生成，
+内存占用与文档大小无关，用于替代 python-docx 处理超大文档（也不依赖 python-docx）
+"""
+import os
+import re
+import zipfile
+import logging
+from xml.sax.saxutils import escape
+from typing import List, Optional
+
+
+FLUSH_PARAGRAPHS = 500  # 每累积多少个段落写入一次
+
+# XML 1.0 不允许的字符（python-docx 遇到时会报错，这里直接去除）
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+_DOCUMENT_HEADER = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+    f'<w:document xmlns:w="{_W_NS}" xmlns:r="{_R_NS}"><w:body>'
+)
+# 页面设置与 python-docx 默认模板一致（Letter，上下1英寸、左右1.25英寸）
+_DOCUMENT_FOOTER = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" '
+    'w:header="720" w:footer="720" w:gutter="0"/>'
+    '<w:cols w:space="720"/></w:sectPr></w:body></w:document>'
+)
+
+_CONTENT_TYPES = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+_PACKAGE_RELS = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+_DOCUMENT_RELS = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+
+def _heading_style(level: int) -> str:
+    """标题样式（字号、颜色参照 python-docx 默认模板）"""
+    size = {1: 28, 2: 26}.get(level)
+    color = "365F91" if level == 1 else "4F81BD"
+    before = 480 if level == 1 else 200
+    size_xml = f'<w:sz w:val="{size}"/><w:szCs w:val="{size}"/>' if size else ""
+    italic = "<w:i/><w:iCs/>" if level == 4 else ""
+    return (
+        f'<w:style w:type="paragraph" w:styleId="Heading{level}">'
+        f'<w:name w:val="heading {level}"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>'
+        f'<w:uiPriority w:val="9"/><w:qFormat/>'
+        f'<w:pPr><w:keepNext/><w:keepLines/><w:spacing w:before="{before}" w:after="0"/>'
+        f'<w:outlineLvl w:val="{level - 1}"/></w:pPr>'
+        f'<w:rPr><w:rFonts w:ascii="Cambria" w:eastAsia="SimHei" w:hAnsi="Cambria"/>'
+        f'<w:b/><w:bCs/>{italic}<w:color w:val="{color}"/>{size_xml}</w:rPr>'
+        f'</w:style>'
+    )
+
+
+_STYLES = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+    f'<w:styles xmlns:w="{_W_NS}">'
+    '<w:docDefaults>'
+    '<w:rPrDefault><w:rPr><w:rFonts w:ascii="Calibri" w:eastAsia="SimSun" w:hAnsi="Calibri" w:cs="Times New Roman"/>'
+    '<w:sz w:val="22"/><w:szCs w:val="22"/><w:lang w:val="en-US" w:eastAsia="zh-CN" w:bidi="ar-SA"/></w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>'
+    '<w:next w:val="Normal"/><w:uiPriority w:val="10"/><w:qFormat/>'
+    '<w:pPr><w:pBdr><w:bottom w:val="single" w:sz="8" w:space="4" w:color="4F81BD"/></w:pBdr>'
+    '<w:spacing w:after="300" w:line="240" w:lineRule="auto"/><w:contextualSpacing/></w:pPr>'
+    '<w:rPr><w:rFonts w:ascii="Cambria" w:eastAsia="SimHei" w:hAnsi="Cambria"/><w:color w:val="17365D"/>'
+    '<w:spacing w:val="5"/><w:kern w:val="28"/><w:sz w:val="52"/><w:szCs w:val="52"/></w:rPr></w:style>'
+    + "".join(_heading_style(level) for level in range(1, 10))
+    + '</w:styles>'
+)
+
+
+def _text_xml(text: str) -> str:
+    """段落文本转为run（制表符转为 w:tab，与 python-docx 一致）"""
+    text = escape(_INVALID_XML_CHARS.sub("", text))
+    parts = text.split("\t")
+    runs = []
+    for i, part in enumerate(parts):
+        if i:
+            runs.append("<w:tab/>")
+        if part:
+            runs.append(f'<w:t xml:space="preserve">{part}</w:t>')
+    return f'<w:r>{"".join(runs)}</w:r>' if runs else ""
+
+
+class StreamingDocxWriter:
+    """流式Word写入器（先写入临时文件，close 成功后重命名）"""
+
+    def __init__(self, save_path: str, flush_paragraphs: int = FLUSH_PARAGRAPHS):
+        """
+        Args:
+            save_path: 保存路径
+            flush_paragraphs: 每累积多少个段落写入一次
+        """
+        self.save_path = save_path
+        self.part_path = save_path + ".part"
+        self.flush_paragraphs = flush_paragraphs
+        self.paragraphs = 0
+        self.logger = logging.getLogger(__name__)
+
+        self._zip = zipfile.ZipFile(self.part_path, 'w', zipfile.ZIP_DEFLATED)
+        self._stream = self._zip.open("word/document.xml", 'w', force_zip64=True)
+        self._buffer: List[str] = [_DOCUMENT_HEADER]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def add_heading(self, text: str, level: int = 1):
+        """
+        添加标题
+
+        Args:
+            text: 标题文本
+            level: 级别（0为文档标题，1-9为各级标题）
+        """
+        style = "Title" if level == 0 else f"Heading{min(max(level, 1), 9)}"
+        self.add_paragraph(text, style)
+
+    def add_paragraph(self, text: str = "", style: Optional[str] = None):
+        """
+        添加段落
+
+        Args:
+            text: 段落文本
+            style: 样式ID（如 'Heading1'），默认为正文
+        """
+        props = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+        self._buffer.append(f"<w:p>{props}{_text_xml(text) if text else ''}</w:p>")
+        self.paragraphs += 1
+        if len(self._buffer) >= self.flush_paragraphs:
+            self._flush()
+
+    def close(self):
+        """写入结尾和其余部件，完成文件"""
+        self._buffer.append(_DOCUMENT_FOOTER)
+        self._flush()
+        self._stream.close()
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", _PACKAGE_RELS)
+        self._zip.writestr("word/_rels/document.xml.rels", _DOCUMENT_RELS)
+        self._zip.writestr("word/styles.xml", _STYLES)
+        self._zip.close()
+        os.replace(self.part_path, self.save_path)
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        try:
+            self._stream.close()
+            self._zip.close()
+        except Exception:
+            pass
+        if os.path.exists(self.part_path):
+            try:
+                os.remove(self.part_path)
+            except OSError:
+                pass
+
+    def _flush(self):
+        """写出缓存的段落"""
+        self._stream.write("".join(self._buffer).encode("utf-8"))
+        self._buffer = []
@@ -0,0 +1,178 @@
+"""
+导出缓存模块
+跨运行缓存飞书原生导出的PDF/Word，按（文档token、版本、格式、转换器版本）查找；
+命中时以硬链接（或写时复制、复制）放入输出目录，省去创建导出任务、轮询和下载。总大小超过上限时按最近最少使用淘汰
+"""
+import os
+import sys
+import uuid
+import shutil
+import hashlib
+from typing import Any, Dict, Optional
+
+from lru_store import LruStore
+
+# 写时复制依赖（Linux的 FICLONE，其他平台不可用时回退到复制）
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024  # 默认上限 4GB
+
+# 飞书服务端导出的转换器版本：服务端导出结果的格式变化时修改，使旧缓存失效
+NATIVE_CONVERTER_VERSION = "feishu-export-1"
+
+_FICLONE = 0x40049409  # linux/fs.h
+
+
+def _reflink(src: str, dest: str) -> bool:
+    """写时复制（仅支持的文件系统上可用，如 Btrfs、XFS）"""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dest):
+            os.remove(dest)
+        return False
+
+
+def link_or_copy(src: str, dest: str):
+    """
+    将文件放到目标路径（依次尝试硬链接、写时复制、复制；目标已存在时替换）
+
+    Args:
+        src: 源文件
+        dest: 目标路径
+    """
+    tmp_path = f"{dest}.{uuid.uuid4().hex[:8]}.part"
+    try:
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            if not _reflink(src, tmp_path):
+                shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ExportCache(LruStore):
+    """内容缓存（线程安全）：每个文档的每种格式只保留最新版本"""
+
+    default_subdir = "exports"
+    default_max_bytes = DEFAULT_MAX_BYTES
+    index_label = "导出缓存索引"
+
+    def lookup(self, obj_token: str, revision: str, fmt: str,
+               converter: str = NATIVE_CONVERTER_VERSION) -> Optional[str]:
+        """
+        查找缓存的导出结果
+
+        Args:
+            obj_token: 文档token
+            revision: 文档版本（如 obj_edit_time）
+            fmt: 格式
+            converter: 转换器版本
+
+        Returns:
+            缓存文件路径，未命中时返回None
+        """
+        if not revision:
+            return None
+        with self._lock:
+            path = self._lookup(self._object_name(obj_token, fmt, converter), revision)
+            if path is not None:
+                self.hits += 1
+            return path
+
+    def add(self, obj_token: str, revision: str, fmt: str, source_path: str,
+            converter: str = NATIVE_CONVERTER_VERSION):
+        """
+        缓存导出结果（替换该文档该格式的旧版本；源文件保留）
+
+        Args:
+            obj_token: 文档token
+            revision: 文档版本
+            fmt: 格式
+            source_path: 导出的文件
+            converter: 转换器版本
+        """
+        if not revision:
+            return
+        name = self._object_name(obj_token, fmt, converter)
+        path = self._object_path(name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            link_or_copy(source_path, path)
+        except Exception as e:
+            self.logger.warning(f"写入导出缓存失败 {source_path}: {str(e)}")
+            return
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._put(name, str(revision), size)
+
+    def discard(self, obj_token: str, fmt: str, converter: str = NATIVE_CONVERTER_VERSION):
+        """
+        删除该文档该格式的缓存（如输出文件已损坏：缓存文件可能与之是同一个硬链接）
+
+        Args:
+            obj_token: 文档token
+            fmt: 格式
+            converter: 转换器版本
+        """
+        name = self._object_name(obj_token, fmt, converter)
+        with self._lock:
+            if name in self._entries:
+                self._remove(name)
+
+    def materialize(self, object_path: str, dest_path: str):
+        """
+        将缓存文件放入输出目录（硬链接，跨文件系统时写时复制或复制）
+
+        Args:
+            object_path: 缓存文件路径
+            dest_path: 输出文件路径
+        """
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        link_or_copy(object_path, dest_path)
+
+    @staticmethod
+    def _object_name(obj_token: str, fmt: str, converter: str) -> str:
+        """对象名（同一文档、格式、转换器的各版本共用，新版本替换旧版本）"""
+        digest = hashlib.sha256(f"{obj_token}\0{fmt}\0{converter}".encode("utf-8")).hexdigest()[:40]
+        return f"{digest}.{fmt}"
+
+
+def get_default_export_cache(max_bytes: int = None) -> ExportCache:
+    """
+    获取进程内共享的导出缓存
+
+    Args:
+        max_bytes: 总大小上限（首次创建或修改上限时生效）
+    """
+    return ExportCache.get_default(max_bytes)
+
+
+def export_cache_from_config(config: Optional[Dict[str, Any]]) -> Optional[ExportCache]:
+    """
+    按配置获取导出缓存
+
+    Args:
+        config: config.json中的 "export_cache" 配置，如 {"enabled": true, "max_cache_mb": 4096}
+
+    Returns:
+        导出缓存；配置中关闭时返回None
+    """
+    config = config or {}
+    if not config.get("enabled", True):
+        return None
+    max_cache_mb = config.get("max_cache_mb")
+    return get_default_export_cache(int(max_cache_mb * 1024 * 1024) if max_cache_mb else None)
@@ -0,0 +1,175 @@
+"""
+导出清单模块
+每次导出在输出根目录写入 _manifest.jsonl：每个文档文件一行，记录节点、路径、格式、大小、sha256、
+文档版本和各阶段耗时，供 verify 命令校验输出并只重新导出损坏或缺失的文件
+"""
+import os
+import json
+import mmap
+import time
+import zipfile
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, Iterator, Optional
+
+from export_stats import ExportStats, get_default_stats
+
+
+MANIFEST_NAME = "_manifest.jsonl"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 4 * 1024 * 1024  # 超过该大小的文件以内存映射方式读取计算哈希
+
+# 基于zip的格式（可检查中央目录）
+_ZIP_FORMATS = {"docx", "xlsx", "pptx", "zip"}
+_PDF_TAIL_BYTES = 1024
+
+
+def file_sha256(path: str) -> str:
+    """
+    计算文件的sha256（大文件使用内存映射，避免逐块复制到用户空间缓冲区）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, HASH_CHUNK_SIZE):
+                        digest.update(view[offset:offset + HASH_CHUNK_SIZE])
+                finally:
+                    view.release()
+        else:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_structure(path: str, export_format: str) -> Optional[str]:
+    """
+    快速检查文件结构（PDF的文件头和结尾标记、DOCX等zip格式的中央目录），不读取全部内容
+
+    Args:
+        path: 文件路径
+        export_format: 格式
+
+    Returns:
+        问题描述，正常时返回None
+    """
+    try:
+        if export_format == "pdf":
+            with open(path, "rb") as f:
+                if f.read(5) != b"%PDF-":
+                    return "PDF文件头缺失"
+                f.seek(max(0, os.fstat(f.fileno()).st_size - _PDF_TAIL_BYTES))
+                if b"%%EOF" not in f.read():
+                    return "PDF结尾标记缺失（文件可能被截断）"
+        elif export_format in _ZIP_FORMATS:
+            with zipfile.ZipFile(path) as archive:
+                names = set(archive.namelist())
+            if export_format != "zip" and "[Content_Types].xml" not in names:
+                return "缺少 [Content_Types].xml"
+    except zipfile.BadZipFile:
+        return "zip中央目录损坏（文件可能被截断）"
+    except OSError as e:
+        return f"读取失败: {str(e)}"
+    return None
+
+
+def iter_manifest(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    按写入顺序逐条读取清单（跳过不完整的行）
+
+    Args:
+        path: 清单文件路径
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 导出中断时最后一行可能不完整
+                continue
+            if entry.get("path"):
+                yield entry
+
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    读取清单（同一路径有多条记录时以最后一条为准）
+
+    Args:
+        path: 清单文件路径
+
+    Returns:
+        {相对路径: 记录}
+    """
+    return {entry["path"]: entry for entry in iter_manifest(path)}
+
+
+class ExportManifest:
+    """导出清单写入器（线程安全，逐行追加，导出中断时已写入的记录仍然有效）"""
+
+    def __init__(self, path: str, stats: ExportStats = None):
+        """
+        Args:
+            path: 清单文件路径
+            stats: 导出耗时统计（各阶段耗时从中读取，默认使用进程内共享实例）
+        """
+        self.path = path
+        self.stats = stats or get_default_stats()
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self.entries = 0
+
+    def add(self, name: str, size: int, digest: str, metadata: Optional[Dict[str, str]]):
+        """
+        记录一个文档文件（不属于某个文档的文件，如共用素材，不记录）
+
+        Args:
+            name: 输出中的相对路径（/ 分隔）
+            size: 大小（字节）
+            digest: sha256
+            metadata: 文档元数据（output_sink.document_metadata）
+        """
+        if not metadata or not metadata.get("node-token"):
+            return
+        obj_token = metadata.get("obj-token", "")
+        entry = {
+            "node_token": metadata["node-token"],
+            "obj_token": obj_token,
+            "obj_type": metadata.get("obj-type", ""),
+            "path": name,
+            "format": os.path.splitext(name)[1].lstrip(".").lower(),
+            "size": size,
+            "sha256": digest,
+            "revision": metadata.get("source-version", ""),
+            "timings": self.stats.document_timings(obj_token),
+            "written_at": int(time.time()),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+            self.entries += 1
+
+    def close(self):
+        """关闭清单文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,371 @@
+"""
+导出预估模块（Dry-run）
+只执行Wiki遍历阶段，统计文档数量并预估API调用次数和耗时，不创建任何导出任务
+"""
+import os
+import math
+import time
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+from feishu_api import FeishuAPI
+from node_filter import NodeFilter
+from wiki_crawler import WikiCrawler
+from export_stats import ExportStats, get_default_stats
+from rate_limiter import DEFAULT_RATE_LIMITS
+from block_converter import MD_SOURCE_BLOCKS, MD_RATE_LIMIT_KEYS
+from local_renderer import local_stats_key
+from path_planner import assign_names
+from sync_index import SYNC_INDEX_NAME, SyncIndex
+from output_sink import META_SOURCE_VERSION, OUTPUT_S3, S3Sink, document_metadata, export_name
+
+
+# 异步导出器的轮询间隔（与 AsyncFeishuExporter._query_export_result 保持一致）
+_POLL_SCHEDULE = [0.2] * 5 + [0.5] * 5
+
+# 跳过规则：callback(node, path) -> 跳过原因或None
+SkipRule = Callable[[Dict[str, Any], str], Optional[str]]
+
+SKIP_UNCHANGED = "增量跳过: 未修改"
+
+
+class ExportPlanner(WikiCrawler):
+    """导出预估器 - 只遍历不导出"""
+
+    def __init__(self, api: FeishuAPI, export_formats: List[str] = None, node_filter: NodeFilter = None,
+                 max_workers: int = 15, rate_limits: Dict[str, float] = None,
+                 stats: ExportStats = None, skip_rules: List[SkipRule] = None,
+                 md_source: str = MD_SOURCE_BLOCKS, render_modes: Dict[str, str] = None,
+                 output: Dict[str, Any] = None, save_path: str = None):
+        """
+        初始化预估器
+
+        Args:
+            api: FeishuAPI实例
+            export_formats: 导出格式列表
+            node_filter: 节点过滤器（可选）
+            max_workers: 计划使用的并发数
+            rate_limits: 各接口频控（次/分钟），覆盖 DEFAULT_RATE_LIMITS 中的对应项
+            stats: 历史导出耗时统计（默认使用进程内共享实例）
+            skip_rules: 额外的跳过规则
+            md_source: Markdown内容来源（'blocks' 或 'raw'）
+            render_modes: PDF/Word的渲染方式（可选）
+            output: 输出目标配置（可选）；同步目录、固定前缀的对象存储按上次导出的结果跳过未修改的文档
+            save_path: 保存路径（同步目录所在目录）
+        """
+        super().__init__(api, export_formats, node_filter, md_source, render_modes=render_modes, output=output)
+        self.save_path = save_path
+        self.max_workers = max(1, max_workers)
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        self.rate_limits.update(rate_limits or {})
+        self.stats = stats or get_default_stats()
+        self.skip_rules = skip_rules or []
+        self.logger = logging.getLogger(__name__)
+
+        self.documents: List[Dict[str, Any]] = []
+        self.skipped: List[Dict[str, str]] = []
+        self._stems: Dict[str, str] = {}  # 节点token -> 输出路径（相对路径，不含扩展名，与导出时的分配规则相同）
+        self._target = None  # 上次导出的结果（SyncIndex 或 S3Sink，增量导出时）
+
+    def plan_wiki(self, wiki_link: str, progress_callback=None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        预估整个Wiki的导出开销
+
+        Args:
+            wiki_link: Wiki链接
+            progress_callback: 进度回调函数 callback(message)
+
+        Returns:
+            (预估结果, 错误信息)
+        """
+        def log_progress(msg):
+            self.logger.info(msg)
+            if progress_callback:
+                progress_callback(msg)
+
+        try:
+            space_id, error = self.resolve_space_id(wiki_link, log_progress)
+            if not space_id:
+                return (None, error)
+
+            self.crawled_nodes.clear()
+            self.documents = []
+            self.skipped = []
+            self.listing_calls = 0
+            self._stems = {}
+            self._target = self._open_target(space_id)
+            if self._target is not None:
+                log_progress("🔄 增量导出：按上次导出的结果跳过未修改的文档")
+
+            log_progress("🔍 正在遍历Wiki目录（预估模式，不会导出）...")
+            start_time = time.time()
+
+            root_nodes = self.get_child_nodes(space_id, None)
+            self._plan_names("", root_nodes)
+            for node in root_nodes:
+                self._walk_node(node, space_id, 0, "")
+
+            discovery_seconds = time.time() - start_time
+            plan = self._build_plan(space_id, discovery_seconds)
+            return (plan, "")
+
+        except Exception as e:
+            import traceback
+            error_msg = f"预估过程出错: {str(e)}"
+            self.logger.error(traceback.format_exc())
+            log_progress(f"❌ {error_msg}")
+            return (None, error_msg)
+        finally:
+            if isinstance(self._target, S3Sink):
+                self._target.discard()
+            self._target = None
+
+    def _open_target(self, space_id: str):
+        """
+        打开上次导出的结果（与导出时的 _is_unchanged 判断一致）
+
+        Returns:
+            同步目录的 SyncIndex 或固定前缀的 S3Sink；非增量输出或尚未导出过时返回None
+        """
+        if self.output["sync"]:
+            root = os.path.join(self.save_path or "", export_name(self.output, space_id))
+            return SyncIndex(root) if os.path.isfile(os.path.join(root, SYNC_INDEX_NAME)) else None
+        if self.output["format"] == OUTPUT_S3 and self.output["prefix"]:
+            output = self.output
+            return S3Sink(output["bucket"], output["prefix"], endpoint_url=output["endpoint_url"],
+                          region=output["region"])
+        return None
+
+    def _plan_names(self, parent_stem: str, nodes: List[Dict[str, Any]]):
+        """按导出时的规则为兄弟节点分配输出路径"""
+        for node, name in zip(nodes, assign_names(nodes)):
+            token = node.get("node_token")
+            if token:
+                self._stems.setdefault(token, f"{parent_stem}/{name}" if parent_stem else name)
+
+    def _skip_unchanged(self, node: Dict[str, Any], path: str) -> Optional[str]:
+        """增量导出的跳过规则：上次导出的结果中该文档的所有格式都已是当前版本"""
+        version = document_metadata(node).get(META_SOURCE_VERSION)
+        stem = self._stems.get(node.get("node_token"))
+        if self._target is None or not version or stem is None:
+            return None
+        base = os.path.join(self._target.root, *stem.split("/"))
+        if isinstance(self._target, SyncIndex):
+            # 改名或移动的页面导出时直接移动原有文件，按索引中记录的位置判断
+            base = self._target.node_path(node.get("node_token")) or base
+        if self._target.is_current([f"{base}.{fmt}" for fmt in self.export_formats], version):
+            return SKIP_UNCHANGED
+        return None
+
+    def _walk_node(self, node: Dict[str, Any], space_id: str, level: int, parent_path: str):
+        """递归遍历节点（只记录，不导出）"""
+        node_token = node.get("node_token")
+        if node_token in self.crawled_nodes:
+            return
+        self.crawled_nodes.add(node_token)
+
+        node_path = NodeFilter.join_path(parent_path, node.get("title"))
+        node_type = node.get("node_type")
+        obj_type = node.get("obj_type", "")
+
+        if node_type in ["doc", "docx"] or obj_type in ["doc", "docx"]:
+            if self._should_export_node(node, node_path, level) and not self._apply_skip_rules(node, node_path):
+                self.documents.append({
+                    "node_token": node_token,
+                    "obj_token": node.get("obj_token") or node_token,
+                    "obj_type": obj_type or node_type or "docx",
+                    "path": node_path,
+                })
+
+        if node.get("has_child", False) and self._should_descend_node(node, node_path, level):
+            child_nodes = self.get_child_nodes(space_id, node_token, node_path, level + 1)
+            self._plan_names(self._stems.get(node_token, ""), child_nodes)
+            for child in child_nodes:
+                self._walk_node(child, space_id, level + 1, node_path)
+
+    def _apply_skip_rules(self, node: Dict[str, Any], path: str) -> bool:
+        """执行额外跳过规则和增量导出规则，命中时记录并返回True"""
+        for rule in self.skip_rules + [self._skip_unchanged]:
+            reason = rule(node, path)
+            if reason:
+                self._record_skip(node, path, reason)
+                return True
+        return False
+
+    def _record_skip(self, node: Dict[str, Any], path: str, reason: str):
+        """记录被跳过的节点"""
+        self.skipped.append({
+            "node_token": node.get("node_token", ""),
+            "path": path,
+            "reason": reason,
+        })
+
+    def _prune_nodes(self, nodes: List[Dict[str, Any]], parent_path: str, depth: int) -> List[Dict[str, Any]]:
+        """剔除被剪除的节点，并记录原因"""
+        if not self.node_filter:
+            return nodes
+
+        kept = []
+        for node in nodes:
+            path = NodeFilter.join_path(parent_path, node.get("title"))
+            reason = self.node_filter.prune_reason(node, path, depth)
+            if reason:
+                self._record_skip(node, path, f"子树跳过: {reason}")
+                continue
+            kept.append(node)
+        return kept
+
+    def _should_export_node(self, node: Dict[str, Any], path: str, level: int) -> bool:
+        """文档节点是否需要导出，并记录跳过原因"""
+        if not self.node_filter:
+            return True
+        reason = self.node_filter.export_skip_reason(node, path, level)
+        if reason:
+            self._record_skip(node, path, reason)
+            return False
+        return True
+
+    def _should_descend_node(self, node: Dict[str, Any], path: str, level: int) -> bool:
+        """是否需要遍历子节点，并记录跳过原因"""
+        if not self.node_filter:
+            return True
+        reason = self.node_filter.descend_skip_reason(node, path, level)
+        if reason:
+            self._record_skip(node, path, f"不展开: {reason}")
+            return False
+        return True
+
+    def _build_plan(self, space_id: str, discovery_seconds: float) -> Dict[str, Any]:
+        """汇总预估结果"""
+        native_formats = self.native_formats
+        by_obj_type = Counter(doc["obj_type"] for doc in self.documents)
+        by_format = {fmt: len(self.documents) for fmt in self.export_formats}
+
+        api_calls = Counter({"wiki_nodes": self.listing_calls})
+        work_seconds = 0.0
+
+        for doc in self.documents:
+            doc_seconds = 0.0
+            if 'md' in self.export_formats or self.local_formats:
+                # 文档块按页获取，大多数文档只需一页；本地渲染与Markdown共用这一次获取
+                api_calls[MD_RATE_LIMIT_KEYS[self.md_source]] += 1
+                doc_seconds += self.stats.estimate('md', doc["obj_token"])
+
+            # 本地渲染的格式并行生成，不占用导出接口
+            local_seconds = [self.stats.estimate(local_stats_key(fmt), doc["obj_token"]) for fmt in self.local_formats]
+            if local_seconds:
+                doc_seconds += max(local_seconds)
+
+            # 同一文档的多个原生格式并发导出，耗时取最大值
+            native_seconds = 0.0
+            for fmt in native_formats:
+                seconds = self.stats.estimate(fmt, doc["obj_token"])
+                api_calls["export_create"] += 1
+                api_calls["export_query"] += self._estimate_polls(seconds)
+                api_calls["export_download"] += 1
+                native_seconds = max(native_seconds, seconds)
+
+            work_seconds += doc_seconds + native_seconds
+
+        # 并发受限耗时 与 频控受限耗时 取较大者
+        worker_bound = work_seconds / self.max_workers
+        rate_bound = 0.0
+        for endpoint, calls in api_calls.items():
+            limit = self.rate_limits.get(endpoint)
+            if limit:
+                rate_bound = max(rate_bound, calls / limit * 60)
+
+        suggested_workers = self.max_workers
+        if rate_bound > 0:
+            suggested_workers = max(1, math.ceil(work_seconds / rate_bound))
+
+        return {
+            "space_id": space_id,
+            "documents": len(self.documents),
+            "by_obj_type": dict(by_obj_type),
+            "by_format": by_format,
+            "skipped": list(self.skipped),
+            "api_calls": dict(api_calls),
+            "total_api_calls": sum(api_calls.values()),
+            "discovery_seconds": round(discovery_seconds, 1),
+            "worker_bound_seconds": round(worker_bound, 1),
+            "rate_bound_seconds": round(rate_bound, 1),
+            "estimated_seconds": round(discovery_seconds + max(worker_bound, rate_bound), 1),
+            "max_workers": self.max_workers,
+            "suggested_max_workers": suggested_workers,
+            "history_formats": [fmt for fmt in self.export_formats if self.stats.has_history(fmt)],
+        }
+
+    @staticmethod
+    def _estimate_polls(seconds: float) -> int:
+        """按异步导出器的轮询间隔，估算等待指定时长所需的查询次数"""
+        polls = 1
+        elapsed = 0.0
+        for interval in _POLL_SCHEDULE:
+            if elapsed >= seconds:
+                return polls
+            elapsed += interval
+            polls += 1
+        return polls + max(0, math.ceil(seconds - elapsed))
+
+
+def format_plan_report(plan: Dict[str, Any], max_skipped: int = 50) -> List[str]:
+    """
+    将预估结果格式化为日志行
+
+    Args:
+        plan: ExportPlanner.plan_wiki 返回的预估结果
+        max_skipped: 最多列出的跳过节点数
+
+    Returns:
+        文本行列表
+    """
+    lines = [
+        "📊 导出预估（未创建任何导出任务）",
+        f"📄 待导出文档: {plan['documents']} 篇",
+    ]
+
+    if plan["by_obj_type"]:
+        types = ", ".join(f"{k}: {v}" for k, v in sorted(plan["by_obj_type"].items()))
+        lines.append(f"📂 按类型: {types}")
+    if plan["by_format"]:
+        formats = ", ".join(f"{k.upper()}: {v}" for k, v in plan["by_format"].items())
+        lines.append(f"📦 按格式: {formats}")
+
+    calls = ", ".join(f"{k}: {v}" for k, v in plan["api_calls"].items())
+    lines.append(f"🔌 预计API调用: {plan['total_api_calls']} 次 ({calls})")
+
+    lines.append(
+        f"⏱️ 预计耗时: {_format_seconds(plan['estimated_seconds'])} "
+        f"(遍历 {_format_seconds(plan['discovery_seconds'])}, "
+        f"并发上限 {_format_seconds(plan['worker_bound_seconds'])}, "
+        f"频控上限 {_format_seconds(plan['rate_bound_seconds'])})"
+    )
+    lines.append(
+        f"⚡ 当前并发数 {plan['max_workers']}，超过 {plan['suggested_max_workers']} 后耗时主要受频控限制"
+    )
+    if not plan["history_formats"]:
+        lines.append("⚠️ 暂无历史导出耗时，使用默认值估算")
+
+    skipped = plan["skipped"]
+    if skipped:
+        lines.append(f"⏭️ 跳过节点: {len(skipped)} 个")
+        for item in skipped[:max_skipped]:
+            lines.append(f"   - {item['path']}: {item['reason']}")
+        if len(skipped) > max_skipped:
+            lines.append(f"   ... 另有 {len(skipped) - max_skipped} 个")
+
+    return lines
+
+
+def _format_seconds(seconds: float) -> str:
+    """格式化秒数"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}秒"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}分{seconds}秒"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}小时{minutes}分"
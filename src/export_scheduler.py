@@ -0,0 +1,111 @@
+"""
+导出任务调度模块
+按预测耗时从长到短调度导出任务（带老化机制，避免小任务饿死），缩短整体完成时间
+"""
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Any, Dict, List, Optional
+
+from export_stats import ExportStats, get_default_stats
+from local_renderer import local_stats_key, normalize_render_modes, split_formats
+
+
+class ExportScheduler:
+    """导出任务优先级队列（异步）"""
+
+    def __init__(self, export_formats: List[str], stats: ExportStats = None, aging_rate: float = 0.5,
+                 render_modes: Dict[str, str] = None):
+        """
+        初始化调度器
+
+        Args:
+            export_formats: 导出格式列表（用于预测耗时）
+            stats: 历史导出耗时统计（默认使用进程内共享实例）
+            aging_rate: 老化系数，任务每等待1秒，优先级相当于预测耗时增加 aging_rate 秒
+            render_modes: PDF/Word的渲染方式（本地渲染的格式使用本地耗时预测）
+        """
+        self.export_formats = export_formats
+        self.local_formats, self.native_formats = split_formats(export_formats, normalize_render_modes(render_modes))
+        self.stats = stats or get_default_stats()
+        self.aging_rate = aging_rate
+        self.logger = logging.getLogger(__name__)
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._closed = False
+        self._condition = asyncio.Condition()
+
+    def predict(self, node: Dict[str, Any]) -> float:
+        """
+        预测文档导出耗时
+
+        Wiki节点列表不返回文档大小，因此优先使用该文档的历史耗时，其次使用格式平均耗时
+
+        Args:
+            node: 节点信息
+
+        Returns:
+            预测耗时（秒）
+        """
+        doc_token = node.get("obj_token") or node.get("node_token")
+        seconds = 0.0
+        if 'md' in self.export_formats or self.local_formats:
+            seconds += self.stats.estimate('md', doc_token)
+
+        # 本地渲染的格式并行生成，取最大值
+        local = [self.stats.estimate(local_stats_key(fmt), doc_token) for fmt in self.local_formats]
+        if local:
+            seconds += max(local)
+
+        # 同一文档的原生格式并发导出，取最大值
+        native = [self.stats.estimate(fmt, doc_token) for fmt in self.native_formats]
+        if native:
+            seconds += max(native)
+        return seconds
+
+    async def put(self, job: Any, node: Dict[str, Any]):
+        """
+        加入导出任务
+
+        Args:
+            job: 任务数据（由消费者解释）
+            node: 节点信息（用于预测耗时）
+        """
+        predicted = self.predict(node)
+        # 老化：有效优先级 = 预测耗时 + aging_rate * 等待时长
+        # 所有任务以相同速率老化，因此可用入队时刻换算成固定排序键
+        key = self.aging_rate * time.monotonic() - predicted
+
+        async with self._condition:
+            heapq.heappush(self._heap, (key, next(self._counter), predicted, job))
+            self._condition.notify()
+
+    async def get(self) -> Optional[Any]:
+        """
+        取出当前优先级最高的任务
+
+        Returns:
+            任务数据；队列已关闭且为空时返回None
+        """
+        async with self._condition:
+            while not self._heap and not self._closed:
+                await self._condition.wait()
+
+            if not self._heap:
+                return None
+
+            _, _, predicted, job = heapq.heappop(self._heap)
+            self.logger.debug(f"调度导出任务: 预测耗时 {predicted:.1f}秒, 剩余 {len(self._heap)} 个")
+            return job
+
+    async def close(self):
+        """关闭队列（不再接收新任务），等待中的消费者在队列清空后退出"""
+        async with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._heap)
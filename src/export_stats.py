@@ -0,0 +1,150 @@
+"""
+导出耗时统计模块
+记录各格式及各文档的历史导出耗时，用于预估和调度
+"""
+import os
+import json
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+from app_paths import get_data_dir
+
+
+class ExportStats:
+    """导出耗时统计（跨运行持久化）"""
+
+    # 没有历史数据时使用的默认耗时（秒）
+    DEFAULT_DURATIONS = {
+        'md': 1.0,
+        'pdf': 8.0,
+        'docx': 6.0,
+        'pdf_local': 2.0,
+        'docx_local': 1.0,
+    }
+
+    def __init__(self, path: str = None, alpha: float = 0.2, max_documents: int = 50000):
+        """
+        初始化统计
+
+        Args:
+            path: 统计文件路径，默认位于应用数据目录
+            alpha: 指数滑动平均系数
+            max_documents: 最多保留的单文档记录数
+        """
+        self.path = path or os.path.join(get_data_dir(), "export_stats.json")
+        self.alpha = alpha
+        self.max_documents = max_documents
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._formats: Dict[str, Dict[str, float]] = {}
+        self._documents: Dict[str, Dict[str, float]] = {}
+        self._dirty = False
+        self._load()
+
+    def record(self, export_format: str, seconds: float, doc_token: str = None):
+        """
+        记录一次导出耗时
+
+        Args:
+            export_format: 导出格式
+            seconds: 耗时（秒）
+            doc_token: 文档token（可选，用于单文档预估）
+        """
+        with self._lock:
+            entry = self._formats.setdefault(export_format, {"avg": seconds, "count": 0})
+            if entry["count"]:
+                entry["avg"] += self.alpha * (seconds - entry["avg"])
+            entry["count"] += 1
+
+            if doc_token:
+                doc_entry = self._documents.pop(doc_token, {})
+                doc_entry[export_format] = round(seconds, 3)
+                # 重新插入以保持最近使用顺序
+                self._documents[doc_token] = doc_entry
+                while len(self._documents) > self.max_documents:
+                    self._documents.pop(next(iter(self._documents)))
+
+            self._dirty = True
+
+    def estimate(self, export_format: str, doc_token: str = None) -> float:
+        """
+        预估导出耗时
+
+        Args:
+            export_format: 导出格式
+            doc_token: 文档token（有单文档历史时优先使用）
+
+        Returns:
+            预估耗时（秒）
+        """
+        with self._lock:
+            if doc_token:
+                seconds = self._documents.get(doc_token, {}).get(export_format)
+                if seconds is not None:
+                    return seconds
+
+            entry = self._formats.get(export_format)
+            if entry:
+                return entry["avg"]
+
+        return self.DEFAULT_DURATIONS.get(export_format, 5.0)
+
+    def document_timings(self, doc_token: str) -> Dict[str, float]:
+        """
+        文档最近一次各格式（及本地渲染）的耗时
+
+        Args:
+            doc_token: 文档token
+
+        Returns:
+            {统计键: 耗时秒数}，如 {"md": 0.8, "pdf_local": 2.1}
+        """
+        with self._lock:
+            return dict(self._documents.get(doc_token, {}))
+
+    def has_history(self, export_format: str) -> bool:
+        """是否有该格式的历史数据"""
+        with self._lock:
+            return export_format in self._formats
+
+    def save(self):
+        """保存统计到文件"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"formats": self._formats, "documents": self._documents}
+            self._dirty = False
+
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.warning(f"保存导出统计失败: {str(e)}")
+
+    def _load(self):
+        """从文件加载统计"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data: Dict[str, Any] = json.load(f)
+            self._formats = data.get("formats", {})
+            self._documents = data.get("documents", {})
+        except Exception as e:
+            self.logger.warning(f"读取导出统计失败，将重新统计: {str(e)}")
+
+
+_default_stats: Optional[ExportStats] = None
+_default_lock = threading.Lock()
+
+
+def get_default_stats() -> ExportStats:
+    """获取进程内共享的统计实例"""
+    global _default_stats
+    with _default_lock:
+        if _default_stats is None:
+            _default_stats = ExportStats()
+        return _default_stats
@@ -5,26 +5,34 @@
 import requests
 import json
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List
 import logging
+from concurrent.futures import ThreadPoolExecutor
+import json_codec
+from transport import create_sync_transport
 
 
 class FeishuAPI:
     """飞书API客户端"""
     
-    def __init__(self, app_id: str, app_secret: str):
+    def __init__(self, app_id: str, app_secret: str, transport: str = None):
         """
         初始化飞书API客户端
         
         Args:
             app_id: 飞书应用ID
             app_secret: 飞书应用密钥
+            transport: HTTP传输后端（default/requests/aiohttp/http2），异步导出器使用同一配置
         """
         self.app_id = app_id
         self.app_secret = app_secret
         self.access_token = None
         self.base_url = "https://open.feishu.cn/open-apis"
         
+        # 同步请求共用一个传输（复用连接）
+        self.transport_name = transport
+        self.transport = create_sync_transport(transport)
+        
         # 配置日志
         self.logger = logging.getLogger(__name__)
     
@@ -45,7 +53,7 @@ class FeishuAPI:
             响应JSON或None
         """
         try:
-            response = requests.request(
+            response = self.transport.request(
                 method=method,
                 url=url,
                 headers=headers,
@@ -54,7 +62,7 @@ class FeishuAPI:
                 timeout=timeout
             )
             response.raise_for_status()
-            return response.json()
+            return json_codec.decode_response(response)
         except requests.RequestException as e:
             self.logger.error(f"HTTP请求失败: {str(e)}")
             return None
@@ -82,10 +90,10 @@ class FeishuAPI:
         
         try:
             self.logger.info("正在获取access_token...")
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            response = self.transport.post(url, headers=headers, json=payload, timeout=10)
             response.raise_for_status()
             
-            result = response.json()
+            result = json_codec.decode_response(response)
             
             if result.get("code") == 0:
                 self.access_token = result.get("tenant_access_token")
@@ -160,10 +168,10 @@ class FeishuAPI:
         
         try:
             self.logger.info(f"正在获取文档内容: {document_id}")
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.transport.get(url, headers=headers, timeout=30)
             response.raise_for_status()
             
-            result = response.json()
+            result = json_codec.decode_response(response)
             
             if result.get("code") == 0:
                 self.logger.info("成功获取文档内容")
@@ -179,6 +187,115 @@ class FeishuAPI:
             self.logger.error(f"未知错误: {str(e)}")
             return None
     
+    def stream_document_content(self, document_id: str) -> Optional[Iterator[str]]:
+        """
+        流式获取文档原始内容
+        
+        响应体边下载边解析，按片段产出 data.content，不在内存中保留完整的响应和内容字符串
+        
+        Args:
+            document_id: 文档ID
+            
+        Returns:
+            内容片段迭代器，请求失败返回None；接口返回错误码时迭代过程中抛出ValueError
+        """
+        if not self.access_token:
+            self.logger.error("请先获取access_token")
+            return None
+        
+        url = f"{self.base_url}/docx/v1/documents/{document_id}/raw_content"
+        
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json; charset=utf-8"
+        }
+        
+        try:
+            self.logger.info(f"正在获取文档内容: {document_id}")
+            response = self.transport.get(url, headers=headers, timeout=30, stream=True)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.logger.error(f"网络请求失败: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"未知错误: {str(e)}")
+            return None
+        
+        return self._iter_document_content(response)
+    
+    def _iter_document_content(self, response) -> Iterator[str]:
+        """产出raw_content片段，解析结束后检查错误码"""
+        fields = {}
+        yield from json_codec.iter_response_string_field(response, ("data", "content"), fields)
+        
+        if fields.get("code") != 0:
+            raise ValueError(f"获取文档内容失败: {fields.get('msg')}")
+    
+    def iter_document_blocks(self, document_id: str, page_size: int = 500) -> Optional[Iterator[List[Dict[str, Any]]]]:
+        """
+        分页获取文档的所有块（docx blocks API）
+        
+        第一页同步获取（失败时返回None，便于调用方回退）；之后每产出一页，
+        下一页已在后台线程中请求，网络等待与调用方的渲染重叠
+        
+        Args:
+            document_id: 文档ID
+            page_size: 每页块数（接口上限500）
+            
+        Returns:
+            每页块列表的迭代器，失败返回None；后续页请求失败时迭代过程中抛出ValueError
+        """
+        if not self.access_token:
+            self.logger.error("请先获取access_token")
+            return None
+        
+        self.logger.info(f"正在获取文档块: {document_id}")
+        first = self._get_blocks_page(document_id, None, page_size)
+        if first is None:
+            return None
+        return self._iter_block_pages(document_id, first, page_size)
+    
+    def _get_blocks_page(self, document_id: str, page_token: Optional[str], page_size: int) -> Optional[Dict[str, Any]]:
+        """获取一页文档块"""
+        url = f"{self.base_url}/docx/v1/documents/{document_id}/blocks"
+        
+        headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json; charset=utf-8"
+        }
+        
+        params = {"page_size": page_size, "document_revision_id": -1}
+        if page_token:
+            params["page_token"] = page_token
+        
+        result = self._make_request("GET", url, headers=headers, params=params)
+        if not result:
+            return None
+        if result.get("code") != 0:
+            self.logger.error(f"获取文档块失败: {result.get('msg')}")
+            return None
+        return result.get("data", {})
+    
+    def _iter_block_pages(self, document_id: str, first: Dict[str, Any], page_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """产出各页块列表，产出当前页前先提交下一页的请求"""
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            data = first
+            while True:
+                future = None
+                if data.get("has_more") and data.get("page_token"):
+                    future = executor.submit(self._get_blocks_page, document_id, data["page_token"], page_size)
+                
+                yield data.get("items") or []
+                
+                if future is None:
+                    return
+                data = future.result()
+                if data is None:
+                    raise ValueError(f"获取文档块失败: {document_id}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
     def get_document_metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
         """
         获取文档元数据（标题等信息）
@@ -202,10 +319,10 @@ class FeishuAPI:
         
         try:
             self.logger.info(f"正在获取文档元数据: {document_id}")
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.transport.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             
-            result = response.json()
+            result = json_codec.decode_response(response)
             
             if result.get("code") == 0:
                 self.logger.info("成功获取文档元数据")
@@ -6,24 +6,33 @@ import os
 import time
 import logging
 import requests
+import json_codec
 from typing import Optional, Dict, Any, Tuple
+from export_stats import ExportStats, get_default_stats
+from export_cache import ExportCache
+from ranged_download import RangedDownloader
 
 
 class FeishuNativeExporter:
     """飞书原生导出器 - 使用官方API导出PDF/Word"""
     
-    def __init__(self, api):
+    def __init__(self, api, stats: ExportStats = None, cache: ExportCache = None):
         """
         初始化导出器
         
         Args:
             api: FeishuAPI实例
+            stats: 导出耗时统计（默认使用进程内共享实例）
+            cache: 跨运行的导出缓存（可选）
         """
         self.api = api
         self.logger = logging.getLogger(__name__)
         self.base_url = "https://open.feishu.cn/open-apis"
+        self.stats = stats or get_default_stats()
+        self.cache = cache
     
-    def export_document_batch(self, doc_token: str, doc_type: str, export_formats: list, base_path: str, filename: str) -> Dict[str, Tuple[bool, str]]:
+    def export_document_batch(self, doc_token: str, doc_type: str, export_formats: list, base_path: str, filename: str,
+                              revision: str = None) -> Dict[str, Tuple[bool, str]]:
         """
         批量导出文档为多种格式（并行处理）
         
@@ -33,6 +42,7 @@ class FeishuNativeExporter:
             export_formats: 导出格式列表，如 ['pdf', 'docx']
             base_path: 保存目录
             filename: 文件名（不含扩展名）
+            revision: 文档版本（如 obj_edit_time，可选）；提供时先查找导出缓存
             
         Returns:
             字典 {格式: (是否成功, 错误信息)}
@@ -42,10 +52,15 @@ class FeishuNativeExporter:
         
         results = {}
         tickets = {}
+        start_times = {}
         
-        # 步骤1: 并行创建所有导出任务
+        # 步骤1: 并行创建所有导出任务（缓存命中的格式直接使用缓存）
         for fmt in export_formats:
+            if self._restore_cached(doc_token, revision, fmt, os.path.join(base_path, f"{filename}.{fmt}")):
+                results[fmt] = (True, "")
+                continue
             self.logger.info(f"创建{fmt.upper()}导出任务: {doc_token}")
+            start_times[fmt] = time.time()
             ticket = self._create_export_task(doc_token, doc_type, fmt)
             if ticket:
                 tickets[fmt] = ticket
@@ -68,6 +83,9 @@ class FeishuNativeExporter:
                 success = self._download_exported_file(file_token, save_path)
                 
                 if success:
+                    self.stats.record(fmt, time.time() - start_times[fmt], doc_token)
+                    if self.cache is not None:
+                        self.cache.add(doc_token, revision, fmt, save_path)
                     results[fmt] = (True, "")
                 else:
                     results[fmt] = (False, "下载失败")
@@ -123,6 +141,26 @@ class FeishuNativeExporter:
             self.logger.error(f"导出异常: {str(e)}")
             return False, str(e)
     
+    def _restore_cached(self, doc_token: str, revision: Optional[str], export_format: str, save_path: str) -> bool:
+        """
+        从导出缓存中取出该版本的导出结果
+        
+        Returns:
+            是否命中
+        """
+        if self.cache is None:
+            return False
+        cached = self.cache.lookup(doc_token, revision, export_format)
+        if not cached:
+            return False
+        try:
+            self.cache.materialize(cached, save_path)
+        except Exception as e:
+            self.logger.warning(f"使用导出缓存失败，重新导出: {str(e)}")
+            return False
+        self.logger.info(f"♻️ 使用缓存的{export_format.upper()}: {doc_token}")
+        return True
+    
     def _create_export_task(self, doc_token: str, doc_type: str, export_format: str, retry_count: int = 2) -> Optional[str]:
         """
         创建导出任务（带重试）
@@ -159,9 +197,9 @@ class FeishuNativeExporter:
         
         for attempt in range(retry_count + 1):
             try:
-                response = requests.post(url, headers=headers, json=payload, timeout=30)
+                response = self.api.transport.post(url, headers=headers, json=payload, timeout=30)
                 response.raise_for_status()
-                result = response.json()
+                result = json_codec.decode_response(response)
                 
                 if result.get("code") == 0:
                     ticket = result.get("data", {}).get("ticket")
@@ -232,9 +270,9 @@ class FeishuNativeExporter:
         
         while time.time() - start_time < max_wait:
             try:
-                response = requests.get(url, headers=headers, params=params, timeout=20)
+                response = self.api.transport.get(url, headers=headers, params=params, timeout=20)
                 response.raise_for_status()
-                result = response.json()
+                result = json_codec.decode_response(response)
                 
                 if result.get("code") == 0:
                     data = result.get("data", {})
@@ -308,7 +346,7 @@ class FeishuNativeExporter:
     
     def _download_exported_file(self, file_token: str, save_path: str) -> bool:
         """
-        下载导出的文件
+        下载导出的文件（支持断点续传和大文件分段并行下载）
         
         Args:
             file_token: 文件token
@@ -323,22 +361,12 @@ class FeishuNativeExporter:
             "Authorization": f"Bearer {self.api.access_token}"
         }
         
-        try:
-            response = requests.get(url, headers=headers, stream=True, timeout=60)
-            response.raise_for_status()
-            
-            # 确保目录存在
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            
-            # 写入文件
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
+        # 确保目录存在
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        
+        # 中断后按Range续传，大文件分段并行下载
+        downloader = RangedDownloader(self.api.transport, headers=headers, timeout=60)
+        if downloader.download(url, save_path):
             self.logger.info(f"文件已下载: {save_path}")
             return True
-            
-        except Exception as e:
-            self.logger.error(f"下载文件异常: {str(e)}")
-            return False
+        return False
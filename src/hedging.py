@@ -0,0 +1,173 @@
+"""
+请求对冲模块
+当轮询或下载耗时超过历史延迟的指定分位数时，在另一个连接上发起重复请求，
+先成功者胜出，落后者被取消。对冲请求同样占用频控额度，且每次运行有上限
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from rate_limiter import AsyncRateLimiter
+
+
+class LatencyTracker:
+    """按请求类型记录最近的延迟样本"""
+
+    def __init__(self, window: int = 200):
+        """
+        Args:
+            window: 每种请求保留的样本数
+        """
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, kind: str, seconds: float):
+        """记录一次延迟"""
+        samples = self._samples.get(kind)
+        if samples is None:
+            samples = self._samples[kind] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, kind: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """
+        计算延迟分位数
+
+        Args:
+            kind: 请求类型
+            q: 分位数（0-1）
+            min_samples: 样本数不足时返回None
+
+        Returns:
+            分位数延迟（秒）或None
+        """
+        samples = self._samples.get(kind)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+class RequestHedger:
+    """请求对冲器"""
+
+    def __init__(self, rate_limiter: AsyncRateLimiter, percentile: float = 0.95,
+                 max_hedges: int = 50, min_samples: int = 20, min_delay: float = 0.5):
+        """
+        初始化对冲器
+
+        Args:
+            rate_limiter: 频控器（对冲请求同样占用额度）
+            percentile: 触发对冲的延迟分位数
+            max_hedges: 单次运行最多发起的对冲请求数
+            min_samples: 样本数达到该值后才启用对冲
+            min_delay: 触发对冲的最小等待时间（秒）
+        """
+        self.rate_limiter = rate_limiter
+        self.percentile = percentile
+        self.max_hedges = max_hedges
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.tracker = LatencyTracker()
+        self.logger = logging.getLogger(__name__)
+
+        self.hedges_issued = 0
+        self.hedges_won = 0
+
+    @classmethod
+    def from_config(cls, rate_limiter: AsyncRateLimiter, config: Optional[Dict[str, Any]]) -> Optional["RequestHedger"]:
+        """
+        从配置创建对冲器
+
+        Args:
+            rate_limiter: 频控器
+            config: config.json中的 "hedging" 配置，enabled为False时返回None
+        """
+        config = config or {}
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            rate_limiter,
+            percentile=config.get("percentile", 0.95),
+            max_hedges=config.get("max_hedges", 50),
+            min_samples=config.get("min_samples", 20),
+            min_delay=config.get("min_delay", 0.5),
+        )
+
+    def hedge_delay(self, kind: str) -> Optional[float]:
+        """当前触发对冲的等待时间，不满足对冲条件时返回None"""
+        if self.hedges_issued >= self.max_hedges:
+            return None
+        threshold = self.tracker.percentile(kind, self.percentile, self.min_samples)
+        if threshold is None:
+            return None
+        return max(threshold, self.min_delay)
+
+    async def run(self, kind: str, endpoint: str, request: Callable[[int], Awaitable[Any]]) -> Any:
+        """
+        执行可对冲的请求
+
+        Args:
+            kind: 请求类型（用于统计延迟），如 'poll'、'download'
+            endpoint: 频控接口名（对冲请求占用该接口额度）
+            request: 请求工厂 request(attempt)，attempt为0表示原始请求，1表示对冲请求；
+                     返回None或False视为失败
+
+        Returns:
+            先成功的请求结果；都失败时返回原始请求的结果（或抛出其异常）
+        """
+        start_times = {}
+        tasks = {}
+
+        def launch(attempt: int):
+            start_times[attempt] = time.monotonic()
+            task = asyncio.ensure_future(request(attempt))
+            tasks[task] = attempt
+            return task
+
+        primary = launch(0)
+        delay = self.hedge_delay(kind)
+
+        if delay is not None:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done and self.hedges_issued < self.max_hedges:
+                self.hedges_issued += 1
+                await self.rate_limiter.acquire(endpoint)
+                if not primary.done():
+                    self.logger.info(f"⏱️ {kind}请求超过 {delay:.1f}秒，发起对冲请求 ({self.hedges_issued}/{self.max_hedges})")
+                    launch(1)
+
+        pending = set(tasks)
+        first_result = None
+        first_error = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    attempt = tasks[task]
+                    if task.exception() is not None:
+                        if attempt == 0:
+                            first_error = task.exception()
+                        continue
+
+                    result = task.result()
+                    if result is not None and result is not False:
+                        self.tracker.record(kind, time.monotonic() - start_times[attempt])
+                        if attempt > 0:
+                            self.hedges_won += 1
+                        return result
+                    if attempt == 0:
+                        first_result = result
+        finally:
+            # 取消落后的请求
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if first_error is not None:
+            raise first_error
+        return first_result
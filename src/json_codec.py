@@ -0,0 +1,261 @@
+"""
+JSON编解码模块
+优先使用orjson（可选依赖）解码接口响应，并提供按字段增量解析的流式解码，
+用于在不把整个响应读入内存的情况下取出raw_content中的大字符串
+"""
+import re
+import json
+import codecs
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+# 快速JSON解码（可选）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# 增量解析时每次从响应读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    解码JSON
+
+    Args:
+        data: JSON字节串或字符串
+
+    Returns:
+        解码后的对象
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """编码为JSON字符串（保留中文）"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def decode_response(response) -> Any:
+    """
+    解码同步传输（requests风格）的响应体
+
+    Args:
+        response: 提供 content 属性的响应对象
+
+    Returns:
+        解码后的对象
+    """
+    return loads(response.content)
+
+
+async def decode_async_response(response) -> Any:
+    """
+    解码异步传输（aiohttp风格）的响应体，不校验Content-Type
+
+    Args:
+        response: 提供 read() 协程的响应对象
+
+    Returns:
+        解码后的对象
+    """
+    return loads(await response.read())
+
+
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\]*)*')
+_HIGH_SURROGATE_ESCAPE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}$')
+_SCALAR_END = re.compile(r'[,}\]\s]')
+
+
+def _ends_with_high_surrogate(buf: str, start: int, end: int) -> bool:
+    """字符串片段是否以高位代理转义（如 \\ud83d）结尾"""
+    if end - start < 6 or not _HIGH_SURROGATE_ESCAPE.search(buf, end - 6, end):
+        return False
+    # 反斜杠本身可能被转义，统计连续反斜杠的个数
+    backslashes = 0
+    pos = end - 6
+    while pos >= start and buf[pos] == '\\':
+        backslashes += 1
+        pos -= 1
+    return backslashes % 2 == 1
+
+
+class _Container:
+    """解析栈中的对象或数组"""
+    __slots__ = ("is_object", "key", "expect_key")
+
+    def __init__(self, is_object: bool):
+        self.is_object = is_object
+        self.key = None
+        self.expect_key = is_object
+
+
+def iter_string_field(chunks: Iterable[Union[bytes, str]], path: Sequence[str],
+                      fields: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    增量解析JSON，按片段产出指定路径上的字符串值
+
+    字符串内容以原始切片批量产出，不会先拼成完整字符串；顶层的标量字段
+    （如 code、msg）收集到 fields 中，供调用方在解析结束后检查
+
+    Args:
+        chunks: 响应体分块（字节或字符串）
+        path: 目标字段的键路径，如 ("data", "content")
+        fields: 用于收集顶层标量字段的字典（可选）
+
+    Returns:
+        目标字符串的片段迭代器（已完成转义解码）
+
+    Raises:
+        ValueError: JSON格式错误
+    """
+    target_path = list(path)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    stack = []
+    buf = ""
+
+    # 当前字符串的状态
+    in_string = False
+    string_is_key = False
+    string_is_target = False
+    string_parts = []
+
+    # 当前标量（数字/true/false/null）的状态
+    scalar_parts = []
+
+    def current_path():
+        return [c.key for c in stack] if all(c.is_object for c in stack) else None
+
+    def finish_value(value):
+        """一个值（字符串/标量/容器）结束"""
+        if len(stack) == 1 and stack[0].is_object and fields is not None and stack[0].key is not None:
+            fields[stack[0].key] = value
+
+    def finish_string():
+        if string_is_key:
+            stack[-1].key = "".join(string_parts)
+            stack[-1].expect_key = False
+        elif not string_is_target:
+            finish_value("".join(string_parts))
+
+    def emit(text):
+        """输出字符串片段（目标字段产出，其余缓存）"""
+        if not text:
+            return None
+        if string_is_target:
+            return text
+        string_parts.append(text)
+        return None
+
+    def feed(chunk_text: str, final: bool):
+        nonlocal buf, in_string, string_is_key, string_is_target, string_parts, scalar_parts
+        buf = buf + chunk_text if buf else chunk_text
+        i = 0
+        n = len(buf)
+        while i < n:
+            if in_string:
+                # 一次匹配一段完整的字符串内容（含合法转义），交给C实现的解码器批量解码
+                end = _STRING_BODY.match(buf, i).end()
+                wait = not final and end + 6 > n and _ends_with_high_surrogate(buf, i, end)
+                if wait:
+                    # 代理对可能被分块截断，留到下一块一起解码
+                    end -= 6
+                if end > i:
+                    segment = buf[i:end]
+                    piece = emit(json.loads(f'"{segment}"') if '\\' in segment else segment)
+                    if piece:
+                        yield piece
+                    i = end
+                if wait or i >= n:
+                    break
+
+                if buf[i] == '"':
+                    finish_string()
+                    in_string = False
+                    i += 1
+                    continue
+
+                # 转义序列不完整，等待下一块
+                if n - i < 6 and not final:
+                    break
+                raise ValueError(f"无效的转义序列: {buf[i:i + 6]}")
+
+            if scalar_parts:
+                m = _SCALAR_END.search(buf, i)
+                if m is None:
+                    scalar_parts.append(buf[i:])
+                    i = n
+                    break
+                scalar_parts.append(buf[i:m.start()])
+                finish_value(json.loads("".join(scalar_parts)))
+                scalar_parts = []
+                i = m.start()
+                continue
+
+            ch = buf[i]
+            if ch in ' \t\r\n':
+                i += 1
+            elif ch == '"':
+                in_string = True
+                string_parts = []
+                string_is_key = bool(stack) and stack[-1].expect_key
+                string_is_target = not string_is_key and current_path() == target_path
+                i += 1
+            elif ch == '{' or ch == '[':
+                stack.append(_Container(ch == '{'))
+                i += 1
+            elif ch == '}' or ch == ']':
+                if not stack:
+                    raise ValueError("JSON格式错误: 多余的右括号")
+                stack.pop()
+                i += 1
+            elif ch == ':':
+                i += 1
+            elif ch == ',':
+                if stack and stack[-1].is_object:
+                    stack[-1].key = None
+                    stack[-1].expect_key = True
+                i += 1
+            else:
+                scalar_parts = [""]
+        buf = buf[i:]
+
+    for chunk in chunks:
+        text = decoder.decode(chunk) if isinstance(chunk, (bytes, bytearray)) else chunk
+        if text:
+            yield from feed(text, False)
+
+    tail = decoder.decode(b"", final=True)
+    yield from feed(tail, True)
+
+    if scalar_parts:
+        finish_value(json.loads("".join(scalar_parts)))
+    if in_string or stack or buf.strip():
+        raise ValueError("JSON格式错误: 响应不完整")
+
+
+def iter_response_string_field(response, path: Sequence[str], fields: Optional[Dict[str, Any]] = None,
+                               chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    从同步传输的流式响应中增量取出字符串字段（读取完毕后关闭响应）
+
+    Args:
+        response: 以 stream=True 发起的requests风格响应
+        path: 目标字段的键路径
+        fields: 用于收集顶层标量字段的字典（可选）
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        字符串片段迭代器
+    """
+    try:
+        yield from iter_string_field(response.iter_content(chunk_size=chunk_size), path, fields)
+    finally:
+        response.close()
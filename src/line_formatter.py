@@ -0,0 +1,226 @@
+"""
+纯文本逐行格式化模块
+DocumentConverter 与 MarkdownConverter 共用的流式格式化引擎：
+合并连续空行、识别标题，按批写入输出，内存占用与文档大小无关
+"""
+import re
+import codecs
+import logging
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+
+READ_CHUNK_SIZE = 64 * 1024  # 从文件流读取的块大小
+BATCH_LINES = 1000           # 每批输出的行数
+
+EMPTY_PLACEHOLDER = "*文档内容为空*"
+
+# 标题识别规则（预编译）
+_NUMBERED = re.compile(r'[\d一二三四五六七八九十]+[、\.\s]')
+_NUMBERED_PUNCT = re.compile(r'[\d一二三四五六七八九十]+[、\.]')
+_FIRST_LEVEL = re.compile(r'[一1][、\.]')
+_SENTENCE_END = ('。', '，', ',', '.', '；', ';')
+
+# 文本来源：字符串、字符串片段序列、或提供 read(size) 的文件流
+TextSource = Union[str, Iterable[str], object]
+# 输出：提供 write(text) 的对象或回调函数
+TextSink = Union[Callable[[str], object], object]
+
+
+def heading_level(stripped: str) -> int:
+    """
+    判断一行（已去除首尾空白）是否为标题，并给出级别
+
+    规则：
+    1. 超过80个字符不是标题
+    2. 以数字编号开头的是标题
+    3. 少于30个字符且不以标点结尾的是标题
+
+    Args:
+        stripped: 去除空格后的文本
+
+    Returns:
+        标题级别（2或3），不是标题时返回0
+    """
+    length = len(stripped)
+    if length > 80:
+        return 0
+    if not _NUMBERED.match(stripped):
+        if length >= 30 or stripped.endswith(_SENTENCE_END):
+            return 0
+
+    # 根据编号前缀判断级别
+    if _FIRST_LEVEL.match(stripped):
+        return 2
+    if _NUMBERED_PUNCT.match(stripped):
+        return 3
+    return 2 if length < 20 else 3
+
+
+def iter_lines(source: TextSource, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """
+    将文本来源重组为行（与 str.split('\\n') 的结果一致，空来源不产出任何行）
+
+    Args:
+        source: 字符串、字符串片段序列、或文件流（read返回str或bytes）
+        chunk_size: 从文件流读取的块大小
+
+    Returns:
+        行迭代器（不含换行符）
+    """
+    pending = []
+    received = False
+    for chunk in _iter_chunks(source, chunk_size):
+        if not chunk:
+            continue
+        received = True
+        if '\n' not in chunk:
+            pending.append(chunk)
+            continue
+        parts = chunk.split('\n')
+        pending.append(parts[0])
+        yield "".join(pending)
+        yield from parts[1:-1]
+        pending = [parts[-1]]
+    if received:
+        yield "".join(pending)
+
+
+def _iter_chunks(source: TextSource, chunk_size: int) -> Iterator[str]:
+    """统一不同类型的文本来源"""
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+
+    read = getattr(source, "read", None)
+    if read is None:
+        yield from source
+        return
+
+    decoder = None
+    while True:
+        data = read(chunk_size)
+        if not data:
+            break
+        if isinstance(data, (bytes, bytearray)):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+            data = decoder.decode(data)
+        yield data
+    if decoder is not None:
+        yield decoder.decode(b"", final=True)
+
+
+def format_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    逐行格式化：合并连续空行，将识别出的标题转为Markdown标题
+
+    Args:
+        lines: 原始行
+
+    Returns:
+        格式化后的行
+    """
+    prev_empty = False
+    numbered = _NUMBERED.match
+    for line in lines:
+        stripped = line.strip()
+
+        # 跳过连续的空行
+        if not stripped:
+            if not prev_empty:
+                yield ""
+                prev_empty = True
+            continue
+
+        prev_empty = False
+
+        # 快速排除大多数正文行，避免对每行都执行完整判断
+        length = len(stripped)
+        if length > 80 or (length >= 30 and not numbered(stripped)):
+            yield line
+            continue
+
+        level = heading_level(stripped)
+        if level:
+            yield f"{'#' * level} {stripped}"
+        else:
+            yield line
+
+
+class LineFormatter:
+    """流式Markdown格式化器"""
+
+    def __init__(self, batch_lines: int = BATCH_LINES, chunk_size: int = READ_CHUNK_SIZE):
+        """
+        Args:
+            batch_lines: 每批输出的行数
+            chunk_size: 从文件流读取的块大小
+        """
+        self.batch_lines = batch_lines
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+
+    def iter_formatted(self, source: TextSource) -> Iterator[str]:
+        """
+        按批产出格式化后的正文（批之间以换行连接，拼接结果等于 "\\n".join(格式化后的行)）
+
+        Args:
+            source: 文本来源
+
+        Returns:
+            文本片段迭代器；来源为空时不产出任何内容
+        """
+        batch = []
+        first = True
+        for line in format_lines(iter_lines(source, self.chunk_size)):
+            batch.append(line)
+            if len(batch) >= self.batch_lines:
+                yield ("" if first else "\n") + "\n".join(batch)
+                batch = []
+                first = False
+        if batch:
+            yield ("" if first else "\n") + "\n".join(batch)
+
+    def iter_markdown(self, source: TextSource, title: Optional[str] = None) -> Iterator[str]:
+        """
+        产出完整的Markdown文档（标题 + 正文，正文为空时输出占位文本）
+
+        Args:
+            source: 文本来源
+            title: 文档标题（可选）
+
+        Returns:
+            Markdown文本片段迭代器
+        """
+        if title:
+            yield f"# {title}\n\n"
+
+        empty = True
+        for piece in self.iter_formatted(source):
+            empty = False
+            yield piece
+
+        if empty:
+            self.logger.warning("文档内容为空")
+            yield EMPTY_PLACEHOLDER
+
+    def write(self, source: TextSource, sink: TextSink, title: Optional[str] = None) -> int:
+        """
+        将Markdown文档逐批写入输出
+
+        Args:
+            source: 文本来源
+            sink: 提供 write(text) 的对象（如文件）或回调函数
+            title: 文档标题（可选）
+
+        Returns:
+            写入的字符数
+        """
+        write = getattr(sink, "write", sink)
+        written = 0
+        for piece in self.iter_markdown(source, title):
+            write(piece)
+            written += len(piece)
+        return written
+
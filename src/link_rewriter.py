@@ -0,0 +1,176 @@
+"""
+链接改写模块
+导出结束后按导出清单（节点token、文档token → 输出路径）把Markdown中指向Wiki内其他文档的飞书链接
+（/wiki/<节点token>、/docx/<文档token> 等）改写为本地文件的相对路径，原链接保留在链接标题中：
+[文本](../其他文档.md "https://xxx.feishu.cn/wiki/<token>")
+再次改写时（如同步目录中页面移动后）按标题中的原链接重新计算路径；原链接中的片段（#...）保留在本地路径后。
+每篇文档的所有链接由同一个正则一次扫描找出，再按token查表，耗时只与文本总量有关，与导出的文档数（token数）无关。
+只改写Markdown链接语法中的链接：代码块和行内代码中的链接不改写，正文中的裸链接（如 raw_content 的内容）也不改写
+"""
+import os
+import re
+import posixpath
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+from export_manifest import MANIFEST_NAME, ExportManifest, file_sha256, load_manifest
+
+# Markdown链接目标中的飞书文档链接；已改写的链接为 (本地路径 "原链接")
+_LINK = re.compile(
+    r'\]\((?:[^()\s"]+ ")?'
+    r'(https?://[\w.-]*(?:feishu|larksuite)\.[a-z.]+/(wiki|docx|docs|doc)/([A-Za-z0-9]+)[^\s()"]*)"?\)'
+)
+
+# 代码块（``` 或 ~~~ 围栏，未闭合时到文末）和行内代码（同一行内成对的等长反引号）
+_CODE = re.compile(
+    r'^ {0,3}(`{3,}|~{3,}).*?(?:\n {0,3}\1[`~]*[ \t]*(?=\n|\Z)|\Z)'
+    r'|(?<!`)(`+)(?!`)[^\n]*?(?<!`)\2(?!`)',
+    re.M | re.S
+)
+
+# 同一文档有多种格式时链接到的文件（优先Markdown）
+_FORMAT_PRIORITY = ('md', 'pdf', 'docx')
+
+
+def _local_href(path: str) -> str:
+    """相对路径中会破坏Markdown链接语法的字符转义"""
+    return path.replace(" ", "%20").replace("(", "%28").replace(")", "%29")
+
+
+class LinkRewriter:
+    """按导出清单改写导出目录中Markdown的Wiki内部链接"""
+
+    def __init__(self, output_dir: str):
+        """
+        Args:
+            output_dir: 导出目录（包含 _manifest.jsonl）
+        """
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self.logger = logging.getLogger(__name__)
+        self.documents: Dict[str, Dict[str, str]] = {}  # Markdown相对路径 -> 文档元数据
+        self.targets: Dict[str, str] = {}  # 节点token / 文档token -> 链接到的文件相对路径
+        self.failures = 0  # 上次 rewrite 中改写失败的文档数
+        self._load()
+
+    def rewrite_text(self, content: str, doc_path: str) -> Tuple[str, int]:
+        """
+        改写一篇Markdown中的链接（跳过代码块和行内代码）
+
+        Args:
+            content: Markdown文本
+            doc_path: 文档的相对路径（/ 分隔，用于计算相对路径）
+
+        Returns:
+            (改写后的文本, 改写的链接数)
+        """
+        doc_dir = posixpath.dirname(doc_path)
+        count = 0
+
+        def replace(match: re.Match) -> str:
+            nonlocal count
+            url, token = match.group(1), match.group(3)
+            target = self.targets.get(token)
+            if target is None:
+                # 目标已不在导出结果中，恢复为原链接
+                new = f"]({url})"
+            else:
+                fragment = url[url.find("#"):] if "#" in url else ""
+                new = f']({_local_href(posixpath.relpath(target, doc_dir or "."))}{fragment} "{url}")'
+            if new != match.group(0):
+                count += 1
+            return new
+
+        parts = []
+        last = 0
+        for code in _CODE.finditer(content):
+            parts.append(_LINK.sub(replace, content[last:code.start()]))
+            parts.append(code.group(0))
+            last = code.end()
+        parts.append(_LINK.sub(replace, content[last:]))
+        return "".join(parts), count
+
+    def rewrite(self, paths: Optional[Iterable[str]] = None) -> Tuple[int, int]:
+        """
+        改写Markdown文件，并在清单中追加改写后文件的记录（改写失败的文档数记入 failures）
+
+        Args:
+            paths: 需要改写的Markdown相对路径，默认为清单中的全部Markdown
+
+        Returns:
+            (改写的文件数, 改写的链接数)
+        """
+        files = links = 0
+        self.failures = 0
+        manifest = None
+        try:
+            for doc_path in (self.documents if paths is None else paths):
+                file_path = os.path.join(self.output_dir, *doc_path.split("/"))
+                try:
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        content = f.read()
+                    # 大部分文档没有内部链接，先做子串判断
+                    if "feishu" not in content and "larksuite" not in content:
+                        continue
+                    updated, count = self.rewrite_text(content, doc_path)
+                    if updated == content:
+                        continue
+                    tmp_path = file_path + ".tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.write(updated)
+                    os.replace(tmp_path, file_path)
+                except Exception as e:
+                    self.logger.warning(f"改写链接失败 {doc_path}: {str(e)}")
+                    self.failures += 1
+                    continue
+
+                metadata = self.documents.get(doc_path)
+                if metadata:
+                    if manifest is None:
+                        manifest = ExportManifest(self.manifest_path)
+                    manifest.add(doc_path, os.path.getsize(file_path), file_sha256(file_path), metadata)
+                files += 1
+                links += count
+        finally:
+            if manifest is not None:
+                manifest.close()
+        if files:
+            self.logger.info(f"🔗 已将 {links} 个Wiki内部链接改写为本地路径（{files} 篇文档）")
+        if self.failures:
+            self.logger.warning(f"⚠️ {self.failures} 篇文档改写链接失败")
+        return files, links
+
+    def _load(self):
+        """从导出清单建立token到输出文件的索引（文件已不存在的记录不作为链接目标）"""
+        if not os.path.exists(self.manifest_path):
+            return
+        best: Dict[str, Tuple[int, str]] = {}
+        for entry in load_manifest(self.manifest_path).values():
+            path, fmt = entry["path"], entry.get("format")
+            if fmt not in _FORMAT_PRIORITY or not os.path.isfile(os.path.join(self.output_dir, *path.split("/"))):
+                continue
+            if fmt == 'md':
+                self.documents[path] = {
+                    "node-token": entry.get("node_token", ""),
+                    "obj-token": entry.get("obj_token", ""),
+                    "obj-type": entry.get("obj_type", ""),
+                    "source-version": entry.get("revision", ""),
+                }
+            priority = _FORMAT_PRIORITY.index(fmt)
+            for token in (entry.get("node_token"), entry.get("obj_token")):
+                if token and (token not in best or priority < best[token][0]):
+                    best[token] = (priority, path)
+        self.targets = {token: path for token, (_, path) in best.items()}
+
+
+def rewrite_links(output_dir: str) -> Tuple[int, int]:
+    """
+    改写导出目录中全部Markdown的Wiki内部链接
+
+    Args:
+        output_dir: 导出目录（包含 _manifest.jsonl）
+
+    Returns:
+        (改写的文件数, 改写的链接数)
+    """
+    return LinkRewriter(output_dir).rewrite()
@@ -0,0 +1,250 @@
+"""
+本地渲染模块
+PDF/Word 可选择由飞书服务端导出（export_tasks）或在本地渲染：
+本地模式下每篇文档只获取一次内容，生成的Markdown同时用于写入.md文件和渲染Word、PDF
+（Markdown只解析一次为中间表示，见 document_ir）
+"""
+import os
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from block_converter import MD_SOURCE_BLOCKS, BlockConverter
+from content_store import CONTENT_BLOCKS, ContentStore, fetch_content
+from document_ir import render_markdown
+from export_stats import ExportStats, get_default_stats
+from line_formatter import LineFormatter
+from output_sink import META_SOURCE_VERSION
+from pdf_renderer import PdfRenderer
+
+
+# 渲染方式
+RENDER_SERVER = "server"  # 飞书服务端导出
+RENDER_LOCAL = "local"    # 本地渲染
+RENDER_MODES = (RENDER_SERVER, RENDER_LOCAL)
+
+# 可选择渲染方式的格式
+RENDERABLE_FORMATS = ('docx', 'pdf')
+
+
+def normalize_render_modes(render_modes: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """
+    校验并补全各格式的渲染方式（未指定的格式使用服务端导出）
+
+    Args:
+        render_modes: config.json中的 "render_modes"，如 {"pdf": "local"}
+
+    Returns:
+        各格式的渲染方式
+
+    Raises:
+        ValueError: 未知的格式或渲染方式
+    """
+    modes = {fmt: RENDER_SERVER for fmt in RENDERABLE_FORMATS}
+    for fmt, mode in (render_modes or {}).items():
+        if fmt not in RENDERABLE_FORMATS:
+            raise ValueError(f"不支持选择渲染方式的格式: {fmt}")
+        if mode not in RENDER_MODES:
+            raise ValueError(f"未知的渲染方式: {mode}")
+        modes[fmt] = mode
+    return modes
+
+
+def split_formats(export_formats: List[str], render_modes: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """
+    按渲染方式拆分PDF/Word格式
+
+    Args:
+        export_formats: 导出格式列表
+        render_modes: 各格式的渲染方式（normalize_render_modes 的结果）
+
+    Returns:
+        (本地渲染的格式, 服务端导出的格式)
+    """
+    local = [fmt for fmt in export_formats if fmt in RENDERABLE_FORMATS and render_modes.get(fmt) == RENDER_LOCAL]
+    server = [fmt for fmt in export_formats if fmt in RENDERABLE_FORMATS and render_modes.get(fmt) != RENDER_LOCAL]
+    return local, server
+
+
+def local_stats_key(export_format: str) -> str:
+    """本地渲染在导出统计中的格式名（与服务端导出的耗时分开统计）"""
+    return f"{export_format}_local"
+
+
+class LocalRenderer:
+    """单次获取内容、多格式本地渲染"""
+
+    def __init__(self, api, md_source: str = MD_SOURCE_BLOCKS, media=None, stats: ExportStats = None,
+                 render_service=None, sink=None, content_store: ContentStore = None):
+        """
+        初始化渲染器
+
+        Args:
+            api: FeishuAPI实例
+            md_source: 内容来源（'blocks' 或 'raw'）
+            media: 素材下载器（MediaFetcher，可选），图片下载后可嵌入Word/PDF
+            stats: 导出耗时统计（默认使用进程内共享实例）
+            render_service: 进程池渲染服务（RenderService，可选）；未提供时在当前线程中渲染
+            sink: 输出目标（OutputSink，可选）；提供时Markdown直接写入，渲染完成的文件随即提交
+            content_store: 内容存储（可选）；有该版本的内容时不再请求接口
+        """
+        self.api = api
+        self.md_source = md_source
+        self.media = media
+        self.render_service = render_service
+        self.sink = sink
+        self.content_store = content_store
+        self.stats = stats or get_default_stats()
+        self.logger = logging.getLogger(__name__)
+
+    def render(self, document_id: str, title: str, base_path: str, filename: str,
+               formats: List[str], metadata: Dict[str, str] = None) -> Dict[str, Tuple[bool, str]]:
+        """
+        获取一次文档内容并渲染为多种格式
+
+        Args:
+            document_id: 文档ID
+            title: 文档标题
+            base_path: 保存目录
+            filename: 文件名（不含扩展名）
+            formats: 需要生成的格式（'md'、'docx'、'pdf' 的子集）
+            metadata: 提交给输出目标的文档元数据（可选）
+
+        Returns:
+            {格式: (是否成功, 错误信息)}
+        """
+        start = time.time()
+        md_content = self.fetch_markdown(document_id, title, base_path,
+                                         (metadata or {}).get(META_SOURCE_VERSION))
+        if md_content is None:
+            return {fmt: (False, "获取文档内容失败") for fmt in formats}
+
+        os.makedirs(base_path, exist_ok=True)
+        results = {}
+        if 'md' in formats:
+            # 先记录获取耗时，写入输出目标时导出清单即可带上
+            self.stats.record('md', time.time() - start, document_id)
+            md_path = os.path.join(base_path, f"{filename}.md")
+            results['md'] = self._save_markdown(md_content, md_path, metadata)
+
+        targets = [fmt for fmt in formats if fmt in RENDERABLE_FORMATS]
+        if self.render_service is not None:
+            # 每个格式单独提交，同一文档的多个格式在不同进程中并行渲染；
+            # PDF由当前线程切分为多段提交，全部完成后合并
+            futures = {}
+            for fmt in targets:
+                if fmt == 'pdf':
+                    continue
+                save_path = os.path.join(base_path, f"{filename}.{fmt}")
+                try:
+                    futures[fmt] = self.render_service.submit(md_content, {fmt: save_path})
+                except RuntimeError as e:
+                    # 进程池不可用（如重启失败）时在当前进程渲染
+                    self.logger.warning(f"渲染进程不可用，改为在当前进程渲染: {str(e)}")
+                    results[fmt] = self._record_local(fmt, render_markdown(md_content, {fmt: save_path}),
+                                                      document_id)
+            if 'pdf' in targets:
+                results['pdf'] = self._render_pdf_chunked(md_content, base_path, filename, document_id)
+            for fmt, future in futures.items():
+                results[fmt] = self._collect(fmt, future, document_id)
+        elif targets:
+            # 在当前线程中解析一次，各格式在同一次遍历中生成
+            rendered = render_markdown(md_content, {fmt: os.path.join(base_path, f"{filename}.{fmt}")
+                                                    for fmt in targets})
+            for fmt in rendered:
+                results[fmt] = self._record_local(fmt, rendered, document_id)
+
+        if self.sink is not None:
+            self.sink.commit([os.path.join(base_path, f"{filename}.{fmt}")
+                              for fmt in targets if results[fmt][0]], metadata)
+        return results
+
+    def fetch_markdown(self, document_id: str, title: str, base_path: str,
+                       revision: Optional[str] = None) -> Optional[str]:
+        """
+        获取文档内容并转换为Markdown文本
+
+        Args:
+            document_id: 文档ID
+            title: 文档标题
+            base_path: 保存目录（素材链接相对于该目录）
+            revision: 文档版本（可选，用于内容存储）
+
+        Returns:
+            Markdown文本，获取失败时返回None
+        """
+        try:
+            fetched = fetch_content(self.api, document_id, self.md_source, title, self.content_store, revision)
+            if fetched is None:
+                return None
+            kind, chunks = fetched
+            if kind == CONTENT_BLOCKS:
+                if self.media is None:
+                    converter = BlockConverter()
+                else:
+                    doc_dir = os.path.abspath(base_path)
+                    converter = BlockConverter(
+                        media_resolver=lambda token, kind: self.media.resolve(token, doc_dir),
+                        media_prefetch=self.media.prefetch,
+                    )
+                return "".join(converter.iter_markdown(chunks, title))
+            return "".join(LineFormatter().iter_markdown(chunks, title))
+        except Exception as e:
+            self.logger.error(f"获取文档内容失败 {document_id}: {str(e)}")
+            return None
+
+    def _save_markdown(self, md_content: str, save_path: str,
+                       metadata: Dict[str, str] = None) -> Tuple[bool, str]:
+        """保存Markdown（先写入临时文件，完成后重命名；有输出目标时直接写入）"""
+        if self.sink is not None:
+            try:
+                self.sink.write_bytes(save_path, md_content.encode('utf-8'), metadata)
+                return True, ""
+            except Exception as e:
+                return False, str(e)
+
+        part_path = save_path + ".part"
+        try:
+            with open(part_path, 'w', encoding='utf-8') as f:
+                f.write(md_content)
+            os.replace(part_path, save_path)
+            return True, ""
+        except Exception as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return False, str(e)
+
+    def _render_pdf_chunked(self, md_content: str, base_path: str, filename: str,
+                            document_id: str) -> Tuple[bool, str]:
+        """在渲染进程中分段渲染PDF并合并"""
+        start = time.time()
+        save_path = os.path.join(base_path, f"{filename}.pdf")
+        renderer = PdfRenderer(submit=self.render_service.submit_call)
+        try:
+            success = renderer.render(md_content, save_path)
+        except RuntimeError as e:
+            self.logger.warning(f"渲染进程不可用，改为在当前进程渲染: {str(e)}")
+            return self._record_local('pdf', render_markdown(md_content, {'pdf': save_path}), document_id)
+        if not success:
+            return False, "本地渲染PDF失败"
+        self.stats.record(local_stats_key('pdf'), time.time() - start, document_id)
+        return True, ""
+
+    def _record_local(self, fmt: str, rendered: Dict[str, Tuple[bool, str, float]],
+                      document_id: str) -> Tuple[bool, str]:
+        """记录在当前进程渲染的结果"""
+        success, error, seconds = rendered[fmt]
+        if success:
+            self.stats.record(local_stats_key(fmt), seconds, document_id)
+        return success, error
+
+    def _collect(self, fmt: str, future, document_id: str) -> Tuple[bool, str]:
+        """获取渲染进程的结果"""
+        try:
+            success, error, seconds = future.result()[fmt]
+        except Exception as e:
+            # 进程池异常（如工作进程崩溃）
+            return False, f"渲染进程异常: {str(e)}"
+        if success:
+            self.stats.record(local_stats_key(fmt), seconds, document_id)
+        return success, error
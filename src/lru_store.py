@@ -0,0 +1,174 @@
+"""
+LRU对象存储基类
+素材存储、导出缓存和内容存储共用：对象文件按名称存放在 objects 目录（按名称前两位分目录），
+索引（index.json）记录每个对象的版本和大小，按最近使用排序；总大小超过上限时淘汰最久未使用的对象
+"""
+import os
+import json
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app_paths import get_data_dir
+
+
+class LruStore:
+    """
+    持久化的LRU对象存储（线程安全）
+
+    子类设置 default_subdir、default_max_bytes 和 index_label，并通过 _lookup/_put/_remove 管理对象；
+    索引中需要额外保存的数据通过 _index_data/_load_index/_forgotten 扩展
+    """
+
+    default_subdir = ""       # 默认存储目录（应用数据目录下的子目录名）
+    default_max_bytes = 0     # 默认总大小上限
+    index_label = "索引"      # 日志中的索引名称
+
+    _default_lock = threading.Lock()
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        """
+        Args:
+            root: 存储目录，默认位于应用数据目录下的 default_subdir
+            max_bytes: 总大小上限（字节），超过时淘汰最久未使用的对象
+        """
+        self.root = root or get_data_dir(self.default_subdir)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.index_path = os.path.join(self.root, "index.json")
+        self.max_bytes = max_bytes or self.default_max_bytes
+        self.logger = logging.getLogger(type(self).__module__)
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # 对象名 -> (版本, 大小)（按最近使用排序）
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._total = 0
+        self._dirty = False
+        self.hits = 0
+        self._load()
+
+    @classmethod
+    def get_default(cls, max_bytes: int = None) -> "LruStore":
+        """
+        获取进程内共享的实例（每个子类一个）
+
+        Args:
+            max_bytes: 总大小上限（首次创建或修改上限时生效）
+        """
+        with LruStore._default_lock:
+            instance = cls.__dict__.get("_default_instance")
+            if instance is None:
+                instance = cls(max_bytes=max_bytes)
+                cls._default_instance = instance
+            elif max_bytes:
+                instance.max_bytes = max_bytes
+            return instance
+
+    def save(self):
+        """保存索引"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = self._index_data()
+            self._dirty = False
+
+        try:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            self.logger.warning(f"保存{self.index_label}失败: {str(e)}")
+
+    @property
+    def total_bytes(self) -> int:
+        """当前存储的总大小"""
+        return self._total
+
+    def _lookup(self, name: str, revision: Optional[str] = None) -> Optional[str]:
+        """
+        查找对象并标记为最近使用（调用方持有锁）
+
+        Args:
+            name: 对象名
+            revision: 需要的版本（为None时不比较）
+
+        Returns:
+            对象文件路径；未记录、版本不同或文件已被外部删除时返回None
+        """
+        entry = self._entries.get(name)
+        if entry is None or (revision is not None and entry[0] != str(revision)):
+            return None
+
+        path = self._object_path(name)
+        if not os.path.exists(path):
+            # 文件被外部删除，丢弃记录
+            self._forget(name)
+            return None
+
+        self._entries.move_to_end(name)
+        self._dirty = True
+        return path
+
+    def _put(self, name: str, revision: str, size: int):
+        """记录已写入的对象（替换同名的旧记录），然后按上限淘汰（调用方持有锁）"""
+        old = self._entries.pop(name, None)
+        self._total += size - (old[1] if old else 0)
+        self._entries[name] = (revision, size)
+        self._dirty = True
+        self._evict(keep=name)
+
+    def _object_path(self, name: str) -> str:
+        """对象文件路径（按名称前两位分目录）"""
+        return os.path.join(self.objects_dir, name[:2], name)
+
+    def _evict(self, keep: str = None):
+        """淘汰最久未使用的对象，直到总大小不超过上限（调用方持有锁）"""
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name = next(iter(self._entries))
+            if name == keep:
+                self._entries.move_to_end(name)
+                continue
+            self._remove(name)
+
+    def _remove(self, name: str):
+        """删除对象文件及其记录（调用方持有锁）"""
+        try:
+            os.remove(self._object_path(name))
+        except OSError:
+            pass
+        self._forget(name)
+
+    def _forget(self, name: str):
+        """删除对象记录（调用方持有锁）"""
+        entry = self._entries.pop(name, None)
+        if entry:
+            self._total -= entry[1]
+        self._forgotten(name)
+        self._dirty = True
+
+    def _forgotten(self, name: str):
+        """对象记录删除后的处理（如删除指向它的其他记录，调用方持有锁）"""
+
+    def _index_data(self) -> Dict[str, Any]:
+        """索引文件的内容（调用方持有锁）"""
+        return {"entries": [[name, revision, size] for name, (revision, size) in self._entries.items()]}
+
+    def _load_index(self, data: Dict[str, Any]):
+        """从索引文件的内容恢复记录"""
+        self._entries = OrderedDict(
+            (name, (revision, size)) for name, revision, size in data.get("entries", [])
+        )
+
+    def _load(self):
+        """加载索引"""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._load_index(json.load(f))
+            self._total = sum(size for _, size in self._entries.values())
+        except Exception as e:
+            self.logger.warning(f"读取{self.index_label}失败，将重新建立: {str(e)}")
@@ -7,6 +7,7 @@ Description: 从飞书分享链接中获取文档内容并导出为Markdown文
 
 import sys
 import os
+import multiprocessing
 
 # 确保能找到模块（特别是打包后）
 if getattr(sys, 'frozen', False):
@@ -34,5 +35,7 @@ def main():
 
 
 if __name__ == '__main__':
+    # 打包后本地渲染的进程池需要
+    multiprocessing.freeze_support()
     main()
 
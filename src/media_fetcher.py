@@ -0,0 +1,183 @@
+"""
+素材下载模块
+收集文档中的图片和附件token，在共享频控下并发下载到素材存储，
+并放入导出目录的 _media 子目录，Markdown中以相对路径引用
+"""
+import os
+import re
+import hashlib
+import logging
+import mimetypes
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import unquote
+
+from media_store import MediaStore, get_default_media_store
+from rate_limiter import RateLimiter
+
+
+MEDIA_DIR_NAME = "_media"
+CHUNK_SIZE = 64 * 1024
+
+_FILENAME_STAR = re.compile(r"filename\*\s*=\s*(?:UTF-8'')?([^;]+)", re.IGNORECASE)
+_FILENAME = re.compile(r'filename\s*=\s*"?([^";]+)"?', re.IGNORECASE)
+
+
+def _guess_extension(headers) -> str:
+    """从响应头推断扩展名"""
+    disposition = headers.get("Content-Disposition", "")
+    match = _FILENAME_STAR.search(disposition) or _FILENAME.search(disposition)
+    if match:
+        ext = os.path.splitext(unquote(match.group(1).strip()))[1]
+        if ext and len(ext) <= 10:
+            return ext.lower()
+
+    content_type = headers.get("Content-Type", "").split(";")[0].strip()
+    ext = mimetypes.guess_extension(content_type) if content_type else None
+    if ext == ".jpe":
+        ext = ".jpg"
+    return ext or ""
+
+
+class MediaFetcher:
+    """文档素材下载器（一次导出共享一个实例）"""
+
+    def __init__(self, api, output_dir: str, store: MediaStore = None, max_workers: int = 4,
+                 rate_limiter: RateLimiter = None):
+        """
+        初始化下载器
+
+        Args:
+            api: FeishuAPI实例（使用其传输和access_token）
+            output_dir: 导出根目录，素材放入其下的 _media
+            store: 素材存储（默认使用进程内共享实例）
+            max_workers: 并发下载数
+            rate_limiter: 同步频控器（默认新建）
+        """
+        self.api = api
+        self.media_dir = os.path.join(output_dir, MEDIA_DIR_NAME)
+        self.store = store or get_default_media_store()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.logger = logging.getLogger(__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="media")
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.downloaded = 0
+        self.reused = 0
+        self.failed = 0
+
+    @classmethod
+    def from_config(cls, api, output_dir: str, config: Optional[Dict[str, Any]],
+                    rate_limits: Dict[str, float] = None) -> Optional["MediaFetcher"]:
+        """
+        按配置创建下载器
+
+        Args:
+            api: FeishuAPI实例
+            output_dir: 导出根目录
+            config: config.json中的 "media" 配置，如 {"enabled": true, "max_cache_mb": 2048, "max_workers": 4}
+            rate_limits: 各接口频控（次/分钟）
+
+        Returns:
+            下载器；配置中关闭时返回None
+        """
+        config = config or {}
+        if not config.get("enabled", True):
+            return None
+
+        max_cache_mb = config.get("max_cache_mb")
+        store = get_default_media_store(int(max_cache_mb * 1024 * 1024) if max_cache_mb else None)
+        return cls(api, output_dir, store=store, max_workers=config.get("max_workers", 4),
+                   rate_limiter=RateLimiter(rate_limits))
+
+    def prefetch(self, tokens: Iterable[str]):
+        """
+        提交素材下载（不等待）；同一token在本次导出中只下载一次
+
+        Args:
+            tokens: 素材token
+        """
+        with self._lock:
+            for token in tokens:
+                if token and token not in self._futures:
+                    self._futures[token] = self._executor.submit(self._fetch, token)
+
+    def resolve(self, token: str, from_dir: str) -> str:
+        """
+        获取素材相对于指定目录的链接（等待下载完成）
+
+        Args:
+            token: 素材token
+            from_dir: 引用素材的Markdown文件所在目录
+
+        Returns:
+            相对路径（使用/分隔）；下载失败时返回token本身
+        """
+        self.prefetch([token])
+        path = self._futures[token].result()
+        if not path:
+            return token
+        return os.path.relpath(path, from_dir).replace(os.sep, "/")
+
+    def close(self):
+        """等待未完成的下载并保存素材索引"""
+        self._executor.shutdown(wait=True)
+        self.store.save()
+        if self._futures:
+            self.logger.info(
+                f"🖼️ 素材: 下载 {self.downloaded} 个，复用 {self.reused} 个，失败 {self.failed} 个"
+            )
+
+    def _fetch(self, token: str) -> Optional[str]:
+        """下载（或复用）一个素材，返回其在导出目录中的路径"""
+        try:
+            object_path = self.store.lookup(token)
+            if object_path:
+                self._count("reused")
+            else:
+                object_path = self._download(token)
+                if not object_path:
+                    self._count("failed")
+                    return None
+                self._count("downloaded")
+            return self.store.materialize(object_path, self.media_dir)
+        except Exception as e:
+            self._count("failed")
+            self.logger.warning(f"素材处理失败 {token}: {str(e)}")
+            return None
+
+    def _count(self, name: str):
+        """更新统计计数"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _download(self, token: str) -> Optional[str]:
+        """下载素材到存储，边下载边计算内容哈希"""
+        url = f"{self.api.base_url}/drive/v1/medias/{token}/download"
+        headers = {"Authorization": f"Bearer {self.api.access_token}"}
+        temp_path = self.store.new_temp_path()
+
+        self.rate_limiter.acquire("media_download")
+        response = self.api.transport.get(url, headers=headers, stream=True, timeout=60)
+        try:
+            if response.status_code != 200:
+                self.logger.warning(f"素材下载失败 {token}: HTTP {response.status_code}")
+                return None
+
+            digest = hashlib.sha256()
+            with open(temp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+
+            return self.store.add(token, temp_path, digest.hexdigest(), _guess_extension(response.headers))
+        finally:
+            response.close()
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
@@ -0,0 +1,131 @@
+"""
+素材存储模块
+按内容哈希存放文档中的图片和附件，跨文档、跨运行共享；总大小超过上限时按最近最少使用淘汰
+"""
+import os
+import uuid
+import shutil
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from lru_store import LruStore
+
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 默认上限 2GB
+
+
+class MediaStore(LruStore):
+    """内容寻址的素材存储（线程安全）"""
+
+    default_subdir = "media"
+    default_max_bytes = DEFAULT_MAX_BYTES
+    index_label = "素材索引"
+
+    def __init__(self, root: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        初始化素材存储
+
+        Args:
+            root: 存储目录，默认位于应用数据目录下的 media
+            max_bytes: 总大小上限（字节），超过时淘汰最久未使用的文件
+        """
+        self._tokens: Dict[str, str] = {}  # 素材token -> 对象名
+        super().__init__(root, max_bytes)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def lookup(self, token: str) -> Optional[str]:
+        """
+        查找已存储的素材
+
+        Args:
+            token: 素材token
+
+        Returns:
+            对象文件路径，未存储时返回None
+        """
+        with self._lock:
+            name = self._tokens.get(token)
+            if name is None:
+                return None
+            return self._lookup(name)
+
+    def new_temp_path(self) -> str:
+        """获取下载用的临时文件路径（与存储目录位于同一文件系统，便于原子移动）"""
+        return os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+
+    def add(self, token: str, temp_path: str, digest: str, ext: str = "") -> str:
+        """
+        存入下载完成的素材（相同内容只保留一份）
+
+        Args:
+            token: 素材token
+            temp_path: 临时文件路径（存入后被移动或删除）
+            digest: 内容哈希（十六进制）
+            ext: 扩展名（含点）
+
+        Returns:
+            对象文件路径
+        """
+        name = f"{digest}{ext}"
+        path = self._object_path(name)
+
+        with self._lock:
+            if name in self._entries and os.path.exists(path):
+                os.remove(temp_path)
+                self._entries.move_to_end(name)
+                self._dirty = True
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+                self._put(name, "", os.path.getsize(path))
+
+            self._tokens[token] = name
+            return path
+
+    def materialize(self, object_path: str, dest_dir: str) -> str:
+        """
+        将素材放入输出目录（优先硬链接，跨文件系统时复制）
+
+        Args:
+            object_path: 对象文件路径
+            dest_dir: 输出目录
+
+        Returns:
+            输出文件路径
+        """
+        dest = os.path.join(dest_dir, os.path.basename(object_path))
+        if os.path.exists(dest):
+            return dest
+
+        os.makedirs(dest_dir, exist_ok=True)
+        try:
+            os.link(object_path, dest)
+        except FileExistsError:
+            pass
+        except OSError:
+            shutil.copy2(object_path, dest)
+        return dest
+
+    def _forgotten(self, name: str):
+        """删除指向该对象的token"""
+        for token in [t for t, n in self._tokens.items() if n == name]:
+            del self._tokens[token]
+
+    def _index_data(self) -> Dict[str, Any]:
+        return {"tokens": dict(self._tokens), "objects": [[name, size] for name, (_, size) in self._entries.items()]}
+
+    def _load_index(self, data: Dict[str, Any]):
+        entries = OrderedDict((name, ("", size)) for name, size in data.get("objects", []))
+        self._tokens = {t: n for t, n in data.get("tokens", {}).items() if n in entries}
+        self._entries = entries
+
+
+def get_default_media_store(max_bytes: int = None) -> MediaStore:
+    """
+    获取进程内共享的素材存储
+
+    Args:
+        max_bytes: 总大小上限（首次创建或修改上限时生效）
+    """
+    return MediaStore.get_default(max_bytes)
@@ -0,0 +1,188 @@
+"""
+Wiki节点过滤模块
+在遍历Wiki树时按标题路径、对象类型、层级和编辑时间过滤节点，
+被排除的子树不会再请求子节点列表，被排除的文档不会创建导出任务
+"""
+import time
+import logging
+from datetime import datetime
+from fnmatch import fnmatchcase
+from typing import Dict, Any, List, Optional
+
+
+# glob中的通配字符，用于计算模式的字面前缀
+_GLOB_CHARS = "*?["
+
+
+class NodeFilter:
+    """Wiki节点过滤器"""
+
+    def __init__(self, include_paths: List[str] = None, exclude_paths: List[str] = None,
+                 obj_types: List[str] = None, max_depth: int = None, edited_since=None):
+        """
+        初始化节点过滤器
+
+        Args:
+            include_paths: 标题路径glob白名单，如 ["产品文档/**"]，为空时不限制
+            exclude_paths: 标题路径glob黑名单，命中的节点连同子树一起跳过
+            obj_types: 允许导出的对象类型，如 ['docx', 'doc']，为空时不限制
+            max_depth: 最大层级（根节点为0），超过的节点不再列出
+            edited_since: 只导出该时间之后编辑过的文档，支持时间戳、datetime或 "YYYY-MM-DD" 字符串
+        """
+        self.include_paths = [p.strip("/") for p in (include_paths or []) if p]
+        self.exclude_paths = [p.strip("/") for p in (exclude_paths or []) if p]
+        self.obj_types = set(obj_types or [])
+        self.max_depth = max_depth
+        self.edited_since = self._parse_time(edited_since)
+        self.logger = logging.getLogger(__name__)
+
+        # include模式的字面前缀，用于判断子树是否可能命中
+        self._include_prefixes = [self._literal_prefix(p) for p in self.include_paths]
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["NodeFilter"]:
+        """
+        从配置字典创建过滤器
+
+        Args:
+            config: config.json中的 "filters" 配置
+
+        Returns:
+            NodeFilter实例，未配置任何规则时返回None
+        """
+        if not config:
+            return None
+
+        node_filter = cls(
+            include_paths=config.get("include_paths"),
+            exclude_paths=config.get("exclude_paths"),
+            obj_types=config.get("obj_types"),
+            max_depth=config.get("max_depth"),
+            edited_since=config.get("edited_since"),
+        )
+        return node_filter if node_filter.is_active() else None
+
+    def is_active(self) -> bool:
+        """是否配置了任何过滤规则"""
+        return bool(self.include_paths or self.exclude_paths or self.obj_types
+                    or self.max_depth is not None or self.edited_since is not None)
+
+    @staticmethod
+    def join_path(parent_path: str, title: str) -> str:
+        """拼接标题路径"""
+        title = (title or "未命名").replace("/", "_")
+        return f"{parent_path}/{title}" if parent_path else title
+
+    def prune_reason(self, node: Dict[str, Any], path: str, depth: int) -> Optional[str]:
+        """
+        判断节点是否整体被剪除（既不导出也不遍历子节点）
+
+        Args:
+            node: 节点信息
+            path: 节点标题路径
+            depth: 节点层级
+
+        Returns:
+            剪除原因，不剪除时返回None
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            return f"超过最大层级 {self.max_depth}"
+
+        for pattern in self.exclude_paths:
+            if fnmatchcase(path, pattern):
+                return f"命中排除规则 {pattern}"
+
+        return None
+
+    def descend_skip_reason(self, node: Dict[str, Any], path: str, depth: int) -> Optional[str]:
+        """
+        判断是否跳过节点的子节点列表请求
+
+        Returns:
+            跳过原因，需要遍历时返回None
+        """
+        if self.max_depth is not None and depth >= self.max_depth:
+            return f"达到最大层级 {self.max_depth}"
+
+        if self.include_paths and not self._may_contain_include(path):
+            return "子树不可能命中包含规则"
+
+        return None
+
+    def export_skip_reason(self, node: Dict[str, Any], path: str, depth: int) -> Optional[str]:
+        """
+        判断是否跳过文档导出
+
+        Returns:
+            跳过原因，需要导出时返回None
+        """
+        obj_type = node.get("obj_type") or node.get("node_type") or ""
+        if self.obj_types and obj_type not in self.obj_types:
+            return f"对象类型 {obj_type} 不在导出范围"
+
+        if self.include_paths and not any(fnmatchcase(path, p) for p in self.include_paths):
+            return "未命中包含规则"
+
+        if self.edited_since is not None:
+            edit_time = self._node_edit_time(node)
+            if edit_time is not None and edit_time < self.edited_since:
+                return "编辑时间早于过滤时间"
+
+        return None
+
+    def should_descend(self, node: Dict[str, Any], path: str, depth: int) -> bool:
+        """是否需要请求子节点列表"""
+        return self.descend_skip_reason(node, path, depth) is None
+
+    def should_export(self, node: Dict[str, Any], path: str, depth: int) -> bool:
+        """是否需要导出该文档"""
+        return self.export_skip_reason(node, path, depth) is None
+
+    def _may_contain_include(self, path: str) -> bool:
+        """子树中是否可能存在命中include规则的路径"""
+        for pattern, prefix in zip(self.include_paths, self._include_prefixes):
+            if fnmatchcase(path, pattern):
+                return True
+            # 字面前缀与当前路径互为前缀时，子树仍可能命中
+            if prefix.startswith(path + "/") or (path + "/").startswith(prefix) or not prefix:
+                return True
+        return False
+
+    @staticmethod
+    def _literal_prefix(pattern: str) -> str:
+        """取glob模式中第一个通配符之前的部分"""
+        for i, char in enumerate(pattern):
+            if char in _GLOB_CHARS:
+                return pattern[:i]
+        return pattern
+
+    @staticmethod
+    def _node_edit_time(node: Dict[str, Any]) -> Optional[float]:
+        """读取节点的编辑时间（秒级时间戳）"""
+        value = node.get("obj_edit_time") or node.get("node_create_time")
+        try:
+            return float(value) if value else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _parse_time(value) -> Optional[float]:
+        """解析过滤时间"""
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, (int, float)):
+            return float(value)
+
+        text = str(value).strip()
+        if text.isdigit():
+            return float(text)
+
+        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+            try:
+                return time.mktime(datetime.strptime(text, fmt).timetuple())
+            except ValueError:
+                continue
+
+        raise ValueError(f"无法解析的时间: {value}")
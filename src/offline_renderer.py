@@ -0,0 +1,217 @@
+"""
+离线重新渲染模块
+按导出清单从内容存储读取每篇文档当时获取的内容（文档块JSON或raw_content），在渲染进程池中
+重新生成Markdown、Word、PDF，不请求飞书接口：调整转换规则（如标题识别）或增加输出格式后无需重新获取内容
+"""
+import os
+import logging
+from concurrent.futures import as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from block_converter import BlockConverter
+from content_store import CONTENT_BLOCKS, ContentStore, content_chunks, get_default_content_store, load_content
+from document_ir import render_markdown
+from export_manifest import MANIFEST_NAME, ExportManifest, file_sha256, load_manifest
+from line_formatter import LineFormatter
+from local_renderer import RENDERABLE_FORMATS
+from media_fetcher import MEDIA_DIR_NAME
+from media_store import get_default_media_store
+from output_sink import META_SOURCE_VERSION
+from render_service import RenderService
+from search_index import SEARCH_INDEX_NAME, SearchIndex
+from sync_index import SYNC_INDEX_NAME, SyncIndex
+
+# 可重新渲染的格式（PDF/Word 在本地渲染）
+RERENDER_FORMATS = ('md',) + RENDERABLE_FORMATS
+
+
+def _media_resolver(output_dir: str, doc_dir: str):
+    """从素材存储取出图片和附件放入 _media（不下载；存储中没有的素材保留token）"""
+    store = get_default_media_store()
+    media_dir = os.path.join(output_dir, MEDIA_DIR_NAME)
+
+    def resolve(token: str, kind: str) -> str:
+        object_path = store.lookup(token)
+        if not object_path:
+            return token
+        return os.path.relpath(store.materialize(object_path, media_dir), doc_dir).replace(os.sep, "/")
+    return resolve
+
+
+def _file_result(path: str) -> Tuple[bool, str, int, str]:
+    """成功生成的文件的大小和sha256（在渲染进程中计算）"""
+    return True, "", os.path.getsize(path), file_sha256(path)
+
+
+def render_stored_document(content_path: str, output_dir: str, stem: str,
+                           formats: List[str]) -> Dict[str, Tuple[bool, str, int, str]]:
+    """
+    从存储的内容重新生成一篇文档（在渲染进程中执行）
+
+    Args:
+        content_path: 内容存储中的对象文件
+        output_dir: 导出目录
+        stem: 文档在导出目录中的相对路径（不含扩展名，/ 分隔）
+        formats: 需要生成的格式
+
+    Returns:
+        {格式: (是否成功, 错误信息, 大小, sha256)}
+    """
+    try:
+        content = load_content(content_path)
+        base = os.path.join(output_dir, *stem.split("/"))
+        doc_dir = os.path.dirname(base)
+        os.makedirs(doc_dir, exist_ok=True)
+        if content["kind"] == CONTENT_BLOCKS:
+            converter = BlockConverter(media_resolver=_media_resolver(output_dir, doc_dir))
+        else:
+            converter = LineFormatter()
+        md_content = "".join(converter.iter_markdown(content_chunks(content), content.get("title")))
+    except Exception as e:
+        return {fmt: (False, f"读取内容失败: {str(e)}", 0, "") for fmt in formats}
+
+    results = {}
+    if 'md' in formats:
+        md_path = f"{base}.md"
+        part_path = md_path + ".part"
+        try:
+            with open(part_path, 'w', encoding='utf-8') as f:
+                f.write(md_content)
+            os.replace(part_path, md_path)
+            results['md'] = _file_result(md_path)
+        except Exception as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            results['md'] = (False, str(e), 0, "")
+
+    targets = {fmt: f"{base}.{fmt}" for fmt in formats if fmt in RENDERABLE_FORMATS}
+    if targets:
+        for fmt, (success, error, _) in render_markdown(md_content, targets).items():
+            results[fmt] = _file_result(targets[fmt]) if success else (False, error, 0, "")
+    return results
+
+
+class OfflineRenderer:
+    """按导出清单离线重新渲染导出目录"""
+
+    def __init__(self, output_dir: str, store: ContentStore = None, processes: int = None):
+        """
+        Args:
+            output_dir: 导出目录（包含 _manifest.jsonl）
+            store: 内容存储（默认使用进程内共享实例）
+            processes: 渲染进程数，默认为CPU核数
+        """
+        self.output_dir = output_dir
+        self.store = store or get_default_content_store()
+        self.processes = processes or os.cpu_count() or 1
+        self.logger = logging.getLogger(__name__)
+
+    def plan(self, formats: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        按清单列出需要重新渲染的文档
+
+        Args:
+            formats: 需要生成的格式，默认为清单中各文档已有的格式
+
+        Returns:
+            [{"node_token", "obj_token", "obj_type", "revision", "stem", "formats"}]
+        """
+        documents: Dict[str, Dict[str, Any]] = {}
+        for entry in load_manifest(os.path.join(self.output_dir, MANIFEST_NAME)).values():
+            document = documents.setdefault(entry["node_token"], {
+                "node_token": entry["node_token"],
+                "obj_token": entry.get("obj_token", ""),
+                "obj_type": entry.get("obj_type", ""),
+                "revision": entry.get("revision", ""),
+                "stem": os.path.splitext(entry["path"])[0],
+                "formats": [],
+            })
+            if entry.get("format") in RERENDER_FORMATS and entry["format"] not in document["formats"]:
+                document["formats"].append(entry["format"])
+        if formats:
+            for document in documents.values():
+                document["formats"] = list(formats)
+        return [document for document in documents.values() if document["formats"]]
+
+    def rerender(self, formats: Optional[List[str]] = None) -> Tuple[int, int, int]:
+        """
+        重新渲染，并在清单中追加新的记录（同步目录同时更新节点路径索引，有全文索引时一并更新）
+
+        Args:
+            formats: 需要生成的格式，默认为清单中各文档已有的格式
+
+        Returns:
+            (成功的文档数, 内容存储中没有该版本的文档数, 失败的文档数)
+        """
+        documents = self.plan(formats)
+        manifest = ExportManifest(os.path.join(self.output_dir, MANIFEST_NAME))
+        sync_index = SyncIndex(self.output_dir) if os.path.exists(
+            os.path.join(self.output_dir, SYNC_INDEX_NAME)) else None
+        search_index = SearchIndex(self.output_dir) if os.path.exists(
+            os.path.join(self.output_dir, SEARCH_INDEX_NAME)) else None
+        service = RenderService(self.processes)
+        done = missing = failed = 0
+        try:
+            futures = {}
+            for document in documents:
+                content_path = self.store.lookup(document["obj_token"], document["revision"])
+                if not content_path:
+                    self.logger.warning(f"⚠️ 内容存储中没有该版本，跳过: {document['stem']}")
+                    missing += 1
+                    continue
+                try:
+                    future = service.submit_call(render_stored_document, content_path, self.output_dir,
+                                                 document["stem"], document["formats"])
+                except Exception as e:
+                    # 进程池不可用（如重启后的工作进程再次崩溃），该文档记为失败，继续提交其余文档
+                    self.logger.warning(f"⚠️ 重新渲染失败 {document['stem']}: 渲染进程异常: {str(e)}")
+                    failed += 1
+                    continue
+                futures[future] = document
+
+            for future in as_completed(futures):
+                document = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = {fmt: (False, f"渲染进程异常: {str(e)}", 0, "") for fmt in document["formats"]}
+                if self._record(document, results, manifest, sync_index, search_index):
+                    done += 1
+                else:
+                    failed += 1
+        finally:
+            service.shutdown()
+            manifest.close()
+            self.store.save()
+            if sync_index is not None:
+                sync_index.close(manifest.path, complete=False)
+            if search_index is not None:
+                search_index.close()
+        return done, missing, failed
+
+    def _record(self, document: Dict[str, Any], results: Dict[str, Tuple[bool, str, int, str]],
+                manifest: ExportManifest, sync_index: Optional[SyncIndex],
+                search_index: Optional[SearchIndex] = None) -> bool:
+        """记录一篇文档的渲染结果，全部格式成功时返回True"""
+        metadata = {
+            "node-token": document["node_token"],
+            "obj-token": document["obj_token"],
+            "obj-type": document["obj_type"],
+            META_SOURCE_VERSION: document["revision"],
+        }
+        succeeded = []
+        for fmt, (success, error, size, digest) in results.items():
+            name = f"{document['stem']}.{fmt}"
+            if success:
+                manifest.add(name, size, digest, metadata)
+                succeeded.append(os.path.join(self.output_dir, *name.split("/")))
+                if fmt == 'md' and search_index is not None:
+                    search_index.add_file(document["node_token"], succeeded[-1], document["revision"])
+            else:
+                self.logger.warning(f"⚠️ 重新渲染失败 {name}: {error}")
+        if sync_index is not None and succeeded:
+            sync_index.record(succeeded, document["revision"])
+        if len(succeeded) == len(results):
+            self.logger.info(f"✅ 已重新渲染: {document['stem']}（{', '.join(results)}）")
+            return True
+        return False
@@ -0,0 +1,820 @@
+"""
+输出目标模块
+导出结果默认写入目录；也可以直接写入 zip 或 zstd 压缩的 tar 归档：每篇文档导出完成后立即把文件写入归档
+（保持Wiki目录结构）并删除本地文件，末尾附加一个小索引，省去“先落盘再打包”的第二遍读写；
+或者直接上传到S3兼容的对象存储（分片并发上传），对象元数据记录文档版本，增量导出时跳过未修改的文档。
+目录输出可开启同步模式：每次导出到同一目录，按节点索引移动改名或移动过的页面，只重新导出有修改的文档；
+也可以在写入Markdown的同时建立全文索引（search_index），导出结束后把Wiki内部链接改写为本地相对路径（rewrite_links）。
+语料输出（jsonl）把Markdown转为纯文本记录，追加写入分片压缩的JSONL，不生成单篇文件
+"""
+import io
+import os
+import re
+import json
+import time
+import shutil
+import tarfile
+import zipfile
+import hashlib
+import mimetypes
+import tempfile
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from corpus_writer import DEFAULT_CHUNK_TOKENS, DEFAULT_SHARD_BYTES, CorpusWriter, document_records
+from export_manifest import MANIFEST_NAME, ExportManifest, file_sha256
+from link_rewriter import LinkRewriter
+from search_index import SearchIndex, fts5_available
+from sync_index import SyncIndex
+
+# zstd压缩依赖（可选，仅 tar.zst 格式需要）
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 对象存储依赖（可选，仅 s3 格式需要）
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+
+# 输出格式
+OUTPUT_DIRECTORY = "directory"
+OUTPUT_ZIP = "zip"
+OUTPUT_TAR_ZST = "tar.zst"
+OUTPUT_S3 = "s3"
+OUTPUT_JSONL = "jsonl"
+OUTPUT_FORMATS = (OUTPUT_DIRECTORY, OUTPUT_ZIP, OUTPUT_TAR_ZST, OUTPUT_S3, OUTPUT_JSONL)
+
+INDEX_NAME = "_index.json"  # 归档末尾的索引文件
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# 对象元数据中记录的文档版本（飞书的 obj_edit_time）
+META_SOURCE_VERSION = "source-version"
+
+# 未完成的临时文件（下载、渲染过程中的 .part、.part0、分段PDF等）
+_PARTIAL_FILE = re.compile(r'\.part(\d*|\.pdf)$')
+
+# 本身已压缩的文件在zip中直接存储，不再压缩
+_STORED_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".pptx", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp4"}
+
+
+def normalize_output_config(output: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    校验并补全输出配置
+
+    Args:
+        output: config.json中的 "output"，如 {"format": "zip"}、{"format": "directory", "sync": true}、
+            {"format": "directory", "search_index": true}、{"format": "s3", "bucket": "docs"}
+            或 {"format": "jsonl", "chunk_tokens": 512}
+
+    Returns:
+        补全后的配置
+
+    Raises:
+        ValueError: 未知的输出格式，缺少所需的依赖、参数，或参数无效
+    """
+    config = {
+        "format": OUTPUT_DIRECTORY,
+        "sync": False,
+        "search_index": False,
+        "rewrite_links": False,
+        "zstd_level": 3,
+        "bucket": "",
+        "prefix": "",
+        "endpoint_url": None,
+        "region": None,
+        "part_size_mb": 8,
+        "max_concurrency": 8,
+        "chunk_tokens": DEFAULT_CHUNK_TOKENS,
+        "shard_mb": 256,
+    }
+    config.update(output or {})
+    if config["format"] not in OUTPUT_FORMATS:
+        raise ValueError(f"未知的输出格式: {config['format']}")
+    if config["sync"] and config["format"] != OUTPUT_DIRECTORY:
+        raise ValueError("同步模式仅支持输出到目录（对象存储固定 prefix 即为增量导出）")
+    if config["search_index"]:
+        if config["format"] != OUTPUT_DIRECTORY:
+            raise ValueError("全文索引仅支持输出到目录")
+        if not fts5_available():
+            raise ValueError("全文索引需要支持 FTS5 的 SQLite")
+    if config["rewrite_links"] and config["format"] != OUTPUT_DIRECTORY:
+        raise ValueError("链接改写仅支持输出到目录")
+    if config["format"] == OUTPUT_TAR_ZST and zstandard is None:
+        raise ValueError("输出 tar.zst 归档需要安装 zstandard 库")
+    if config["format"] == OUTPUT_S3:
+        if boto3 is None:
+            raise ValueError("输出到对象存储需要安装 boto3 库")
+        if not config["bucket"]:
+            raise ValueError("输出到对象存储需要配置 bucket")
+    if config["format"] == OUTPUT_JSONL:
+        chunk_tokens, shard_mb = config["chunk_tokens"], config["shard_mb"]
+        if isinstance(chunk_tokens, bool) or not isinstance(chunk_tokens, int) or chunk_tokens < 0:
+            raise ValueError(f"chunk_tokens 需为不小于0的整数: {chunk_tokens}")
+        if isinstance(shard_mb, bool) or not isinstance(shard_mb, (int, float)) or shard_mb <= 0:
+            raise ValueError(f"shard_mb 需为正数: {shard_mb}")
+    return config
+
+
+def output_export_formats(output: Dict[str, Any], export_formats: List[str]) -> List[str]:
+    """
+    输出目标实际需要生成的格式：语料输出只使用Markdown，其他格式不再导出或渲染
+
+    Args:
+        output: 补全后的输出配置
+        export_formats: 配置的导出格式
+
+    Returns:
+        需要生成的格式
+
+    Raises:
+        ValueError: 语料输出但导出格式中没有Markdown
+    """
+    if output["format"] != OUTPUT_JSONL:
+        return export_formats
+    if 'md' not in export_formats:
+        raise ValueError("语料输出需要导出Markdown（导出格式中包含 md）")
+    dropped = [fmt for fmt in export_formats if fmt != 'md']
+    if dropped:
+        logging.getLogger(__name__).warning(f"⚠️ 语料输出只包含Markdown，不导出 {', '.join(dropped)}")
+    return ['md']
+
+
+def export_name(output: Dict[str, Any], space_id: str) -> str:
+    """
+    本次导出的名称（目录名、归档文件名或默认的对象存储前缀）
+
+    Args:
+        output: 补全后的输出配置
+        space_id: Wiki空间ID
+
+    Returns:
+        同步模式下每个空间固定为 'Wiki同步_<space_id>'，否则为 'Wiki导出_<时间戳>'
+    """
+    if output.get("sync"):
+        return f"Wiki同步_{space_id}"
+    return f"Wiki导出_{int(time.time())}"
+
+
+def create_output_sink(save_path: str, name: str, output: Optional[Dict[str, Any]] = None) -> "OutputSink":
+    """
+    按配置创建输出目标
+
+    Args:
+        save_path: 保存路径
+        name: 导出名称（目录名或归档文件名，不含扩展名），如 'Wiki导出_1700000000'；
+            对象存储未配置 prefix 时用作键前缀
+        output: config.json中的 "output"（可选）
+
+    Returns:
+        输出目标（已附带导出清单）
+    """
+    config = normalize_output_config(output)
+    output_format = config["format"]
+    if output_format == OUTPUT_JSONL:
+        # 语料记录自带文档信息，不生成导出清单
+        return CorpusSink(os.path.join(save_path, name), chunk_tokens=config["chunk_tokens"],
+                          shard_bytes=int(config["shard_mb"] * 1024 * 1024), zstd_level=config["zstd_level"])
+    if output_format == OUTPUT_S3:
+        sink = S3Sink(
+            config["bucket"], config["prefix"] or name,
+            endpoint_url=config["endpoint_url"], region=config["region"],
+            part_size=int(config["part_size_mb"] * 1024 * 1024), max_concurrency=config["max_concurrency"],
+        )
+    elif output_format == OUTPUT_ZIP:
+        sink = ZipSink(os.path.join(save_path, f"{name}.zip"))
+    elif output_format == OUTPUT_TAR_ZST:
+        sink = TarZstSink(os.path.join(save_path, f"{name}.tar.zst"), level=config["zstd_level"])
+    else:
+        sink = DirectorySink(os.path.join(save_path, name), sync=config["sync"],
+                             rewrite_links=config["rewrite_links"])
+    sink.manifest = ExportManifest(os.path.join(sink.root, MANIFEST_NAME))
+    if config["search_index"]:
+        sink.search_index = SearchIndex(sink.root)
+    return sink
+
+
+class OutputSink:
+    """
+    输出目标基类
+
+    导出过程在 root 目录下生成文件（下载、渲染都需要真实文件），每篇文档完成后调用 commit；
+    内存中已有的内容（如本地渲染时的Markdown）可通过 write_bytes 直接写入。
+    metadata 为文档的元数据（output_sink.document_metadata），记入导出清单，支持的输出目标还会随文件保存
+    """
+
+    def __init__(self, root: str, location: str):
+        """
+        Args:
+            root: 导出时生成文件的本地目录
+            location: 最终结果的位置（目录、归档文件或对象存储地址）
+        """
+        self.root = root
+        self.location = location
+        self.manifest: Optional[ExportManifest] = None
+        self.sync_index: Optional[SyncIndex] = None  # 同步模式下的节点路径索引
+        self.search_index: Optional[SearchIndex] = None  # 全文索引（可选）
+        self.text_only = False  # 只输出文本（不需要下载图片和附件）
+        self.partial = False  # 本次没有遍历到全部节点（如列出子节点失败）；同步目录保留本次未出现的页面
+        self.files = 0
+        self.bytes = 0
+        self.logger = logging.getLogger(__name__)
+
+    def commit(self, paths: Iterable[str], metadata: Optional[Dict[str, str]] = None):
+        """
+        提交已完成的文件
+
+        Args:
+            paths: root 下的文件路径
+            metadata: 文档元数据（可选）
+        """
+        # 目录输出：文件已在最终位置，只需记入清单
+        if self.manifest is None or not metadata:
+            return
+        for path in paths:
+            if os.path.isfile(path):
+                self._add_to_manifest(self.relative_path(path), os.path.getsize(path), file_sha256(path), metadata)
+
+    def write_bytes(self, path: str, data: bytes, metadata: Optional[Dict[str, str]] = None):
+        """
+        直接写入内容
+
+        Args:
+            path: root 下的文件路径
+            data: 文件内容
+            metadata: 文档元数据（可选）
+        """
+        part_path = path + ".part"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(part_path, "wb") as f:
+                f.write(data)
+            os.replace(part_path, path)
+        except Exception:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        self._add_to_manifest(self.relative_path(path), len(data), hashlib.sha256(data).hexdigest(), metadata)
+
+    def is_current(self, paths: Iterable[str], version: str) -> bool:
+        """
+        上次导出的文件是否都已是该版本（用于增量导出跳过未修改的文档）
+
+        Args:
+            paths: root 下的文件路径
+            version: 文档版本（如 obj_edit_time），为空时视为未知
+
+        Returns:
+            是否都已是最新
+        """
+        return False
+
+    def close(self) -> bool:
+        """
+        完成输出
+
+        Returns:
+            是否成功
+        """
+        if self.manifest is not None:
+            self.manifest.close()
+        return True
+
+    def abort(self):
+        """
+        放弃输出（导出失败时调用）：已写入的内容保留，但不生成表示导出完成的结果（归档索引、对象存储中的清单等）
+        """
+        if self.manifest is not None:
+            self.manifest.close()
+
+    def _add_to_manifest(self, name: str, size: int, digest: str, metadata: Optional[Dict[str, str]]):
+        """记入导出清单（只记录属于文档的文件）"""
+        if self.manifest is not None:
+            self.manifest.add(name, size, digest, metadata)
+
+    def relative_path(self, path: str) -> str:
+        """root 下的文件在结果中的相对路径（使用 / 分隔）"""
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+
+class DirectorySink(OutputSink):
+    """直接输出到目录（文件生成后即为最终结果）"""
+
+    def __init__(self, output_dir: str, sync: bool = False, rewrite_links: bool = False):
+        """
+        Args:
+            output_dir: 输出目录
+            sync: 同步模式（目录中保存节点路径索引，跳过未修改的文档，移动改名或移动过的页面）
+            rewrite_links: 导出结束后把Markdown中的Wiki内部链接改写为本地相对路径
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        super().__init__(output_dir, output_dir)
+        self.rewrite_links = rewrite_links
+        if sync:
+            self.sync_index = SyncIndex(output_dir)
+
+    def commit(self, paths: Iterable[str], metadata: Optional[Dict[str, str]] = None):
+        paths = list(paths)
+        super().commit(paths, metadata)
+        version = (metadata or {}).get(META_SOURCE_VERSION)
+        if self.sync_index is not None:
+            self.sync_index.record(paths, version)
+        if self.search_index is not None and metadata:
+            for path in paths:
+                if path.endswith(".md") and os.path.isfile(path):
+                    self.search_index.add_file(metadata.get("node-token"), path, version)
+
+    def write_bytes(self, path: str, data: bytes, metadata: Optional[Dict[str, str]] = None):
+        super().write_bytes(path, data, metadata)
+        version = (metadata or {}).get(META_SOURCE_VERSION)
+        if self.sync_index is not None:
+            self.sync_index.record([path], version)
+        if self.search_index is not None and metadata and path.endswith(".md"):
+            self.search_index.add_markdown(metadata.get("node-token"), self.relative_path(path),
+                                           data.decode("utf-8", errors="replace"), version)
+
+    def is_current(self, paths: Iterable[str], version: str) -> bool:
+        if self.sync_index is None or not version:
+            return False
+        return self.sync_index.is_current(paths, version)
+
+    def close(self) -> bool:
+        super().close()
+        if self.sync_index is not None:
+            self.sync_index.close(self.manifest.path if self.manifest is not None else None,
+                                  complete=not self.partial)
+        if self.rewrite_links and self.manifest is not None:
+            # 清单已完整（同步目录已按当前路径整理），据此改写全部Markdown
+            LinkRewriter(self.root).rewrite()
+        if self.sync_index is not None:
+            if self.search_index is not None:
+                self.search_index.reconcile(self.sync_index.documents("md"))
+        if self.search_index is not None:
+            self.search_index.close()
+        return True
+
+    def abort(self):
+        # 目录中已导出的文件保留；保存同步索引，下次同步时跳过这些文档（未遍历到的页面保留）
+        super().abort()
+        if self.sync_index is not None:
+            self.sync_index.close(self.manifest.path if self.manifest is not None else None, complete=False)
+        if self.search_index is not None:
+            self.search_index.close()
+
+
+class _StagingSink(OutputSink):
+    """需要暂存目录的输出目标基类：文件在暂存目录中生成，提交后写入最终位置并删除"""
+
+    def __init__(self, location: str, staging_parent: str = None):
+        """
+        Args:
+            location: 最终结果的位置
+            staging_parent: 暂存目录的上级目录（默认为系统临时目录）
+        """
+        root = tempfile.mkdtemp(prefix=".staging_", dir=staging_parent)
+        super().__init__(root, location)
+        self._closed = False
+        self._failed: Dict[str, Optional[Dict[str, str]]] = {}  # 写入失败的文件 -> 文档元数据（close 时重试）
+        self._failed_lock = threading.Lock()
+
+    def commit(self, paths: Iterable[str], metadata: Optional[Dict[str, str]] = None):
+        for path in paths:
+            if os.path.isfile(path) and not self._closed:
+                self._commit_file(path, metadata)
+
+    def close(self) -> bool:
+        """
+        写入暂存目录中剩余的文件（如多篇文档共用的 _media、之前写入失败的文件）和导出清单，完成输出；
+        仍有文件写入失败时放弃输出并保留暂存目录
+        """
+        if self._closed:
+            return True
+        keep_staging = True
+        try:
+            manifest_path = self.manifest.path if self.manifest is not None else None
+            remaining = []
+            for dirpath, _, filenames in os.walk(self.root):
+                remaining.extend(os.path.join(dirpath, filename) for filename in sorted(filenames)
+                                 if not _PARTIAL_FILE.search(filename))
+            failed = 0
+            for path in remaining:
+                if path == manifest_path:
+                    continue
+                with self._failed_lock:
+                    metadata = self._failed.get(path)
+                if not self._commit_file(path, metadata, final=True):
+                    failed += 1
+            if self.manifest is not None:
+                self.manifest.close()
+            if failed:
+                self.logger.error(f"❌ {failed} 个文件写入失败，放弃输出，暂存目录保留在 {self.root}")
+                self._abort()
+                return False
+            if manifest_path and not self._commit_file(manifest_path, None, final=True):
+                self.logger.error(f"❌ 导出清单写入失败，放弃输出，暂存目录保留在 {self.root}")
+                self._abort()
+                return False
+            self._finish()
+            keep_staging = False
+            return True
+        except Exception as e:
+            self.logger.error(f"完成输出失败 {self.location}，暂存目录保留在 {self.root}: {str(e)}")
+            return False
+        finally:
+            self._closed = True
+            if not keep_staging:
+                shutil.rmtree(self.root, ignore_errors=True)
+
+    def _commit_file(self, path: str, metadata: Optional[Dict[str, str]], final: bool = False) -> bool:
+        """
+        写入一个文件，成功后从暂存目录删除；失败时文件和元数据保留，close 时再写入一次
+
+        Returns:
+            是否成功
+        """
+        try:
+            self._store_file(path, self.relative_path(path), metadata)
+        except Exception as e:
+            with self._failed_lock:
+                self._failed[path] = metadata
+            if final:
+                self.logger.error(f"写入失败 {path}: {str(e)}")
+            else:
+                self.logger.warning(f"写入失败，稍后重试 {path}: {str(e)}")
+            return False
+        with self._failed_lock:
+            self._failed.pop(path, None)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return True
+
+    def abort(self):
+        """放弃输出：不再写入暂存目录中剩余的文件和导出清单，删除暂存目录"""
+        if self._closed:
+            return
+        try:
+            if self.manifest is not None:
+                self.manifest.close()
+            self._abort()
+        except Exception as e:
+            self.logger.warning(f"放弃输出时出错 {self.location}: {str(e)}")
+        finally:
+            self._closed = True
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def discard(self):
+        """不再使用（只查询过最终位置，如预估模式）：删除暂存目录，最终位置不做任何改动"""
+        self._closed = True
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _store_file(self, path: str, name: str, metadata: Optional[Dict[str, str]]):
+        """写入一个文件（name 为结果中的相对路径）"""
+        raise NotImplementedError
+
+    def _finish(self):
+        """完成输出（所有文件均已写入）"""
+
+    def _abort(self):
+        """放弃输出（不生成最终结果）"""
+
+
+class _ArchiveSink(_StagingSink):
+    """归档输出基类：文件先在归档旁的暂存目录中生成，提交后写入归档并删除（线程安全）"""
+
+    def __init__(self, archive_path: str):
+        directory = os.path.dirname(os.path.abspath(archive_path))
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(archive_path, directory)
+        self.part_path = archive_path + ".part"
+        self._lock = threading.Lock()
+        self._index: List[Dict[str, Any]] = []
+        self._names = set()
+
+    def _store_file(self, path: str, name: str, metadata: Optional[Dict[str, str]]):
+        size = os.path.getsize(path)
+        with self._lock:
+            if self._closed or name in self._names:
+                return
+            with open(path, "rb") as f:
+                digest = self._add_stream(name, f, size)
+            self._record(name, size, digest)
+        self._add_to_manifest(name, size, digest, metadata)
+
+    def write_bytes(self, path: str, data: bytes, metadata: Optional[Dict[str, str]] = None):
+        name = self.relative_path(path)
+        with self._lock:
+            if self._closed or name in self._names:
+                return
+            digest = self._add_stream(name, io.BytesIO(data), len(data))
+            self._record(name, len(data), digest)
+        self._add_to_manifest(name, len(data), digest, metadata)
+
+    def _finish(self):
+        """写入索引，完成归档"""
+        with self._lock:
+            self._closed = True
+            index = json.dumps({
+                "created_at": int(time.time()),
+                "files": self._index,
+            }, ensure_ascii=False, indent=1).encode("utf-8")
+            self._add_stream(INDEX_NAME, io.BytesIO(index), len(index))
+            self._finish_archive()
+        os.replace(self.part_path, self.location)
+        self.logger.info(f"📦 归档完成: {self.location}（{self.files} 个文件，{self.bytes / 1024 / 1024:.1f}MB）")
+
+    def _abort(self):
+        """关闭归档但不写入索引，也不改为最终文件名"""
+        with self._lock:
+            self._closed = True
+            self._finish_archive()
+        self.logger.warning(f"⚠️ 导出未完成，未完成的归档保留为 {self.part_path}")
+
+    def _record(self, name: str, size: int, digest: str):
+        self._names.add(name)
+        self._index.append({"path": name, "size": size, "sha256": digest})
+        self.files += 1
+        self.bytes += size
+
+    def _add_stream(self, name: str, stream, size: int) -> str:
+        """
+        将流写入归档（调用方持有锁）
+
+        Returns:
+            内容的sha256
+        """
+        raise NotImplementedError
+
+    def _finish_archive(self):
+        """写入归档结尾并关闭文件（调用方持有锁）"""
+        raise NotImplementedError
+
+
+class ZipSink(_ArchiveSink):
+    """输出到zip归档"""
+
+    def __init__(self, archive_path: str):
+        super().__init__(archive_path)
+        self._zip = zipfile.ZipFile(self.part_path, "w", zipfile.ZIP_DEFLATED)
+
+    def _add_stream(self, name: str, stream, size: int) -> str:
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        stored = os.path.splitext(name)[1].lower() in _STORED_EXTENSIONS
+        info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+        info.file_size = size  # 用于判断是否需要zip64
+        digest = hashlib.sha256()
+        with self._zip.open(info, "w") as dest:
+            for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                dest.write(chunk)
+        return digest.hexdigest()
+
+    def _finish_archive(self):
+        self._zip.close()
+
+
+class TarZstSink(_ArchiveSink):
+    """输出到zstd压缩的tar归档（需要 zstandard 库）"""
+
+    def __init__(self, archive_path: str, level: int = 3):
+        if zstandard is None:
+            raise ValueError("输出 tar.zst 归档需要安装 zstandard 库")
+        super().__init__(archive_path)
+        self._file = open(self.part_path, "wb")
+        self._compressor = zstandard.ZstdCompressor(level=level).stream_writer(self._file)
+        self._tar = tarfile.open(fileobj=self._compressor, mode="w|", format=tarfile.PAX_FORMAT)
+
+    def _add_stream(self, name: str, stream, size: int) -> str:
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        reader = _HashingReader(stream)
+        self._tar.addfile(info, reader)
+        return reader.hexdigest()
+
+    def _finish_archive(self):
+        self._tar.close()
+        self._compressor.close()
+        self._file.close()
+
+
+class S3Sink(_StagingSink):
+    """
+    输出到S3兼容的对象存储（需要 boto3 库，凭证按 boto3 的默认方式读取，如环境变量 AWS_ACCESS_KEY_ID）
+
+    Markdown直接从内存上传；下载、渲染生成的文件在文档完成后立即上传并删除，大文件分片并发上传。
+    每个对象的元数据记录文档版本和sha256，作为增量导出的清单
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None, region: str = None,
+                 part_size: int = 8 * 1024 * 1024, max_concurrency: int = 8):
+        """
+        Args:
+            bucket: 存储桶
+            prefix: 键前缀（如 'wiki/产品文档'），增量导出时需固定
+            endpoint_url: 服务地址（MinIO等S3兼容服务，可选）
+            region: 区域（可选）
+            part_size: 分片大小（字节），超过时分片上传
+            max_concurrency: 单个文件的并发上传分片数
+        """
+        if boto3 is None:
+            raise ValueError("输出到对象存储需要安装 boto3 库")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        super().__init__(f"s3://{bucket}/{self.prefix}")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.transfer_config = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size,
+                                              max_concurrency=max_concurrency)
+        self._lock = threading.Lock()
+        # 本输出目标发起的分片上传（键, UploadId），中止时只清理这些，不影响同一前缀下其他导出的上传
+        self._uploads: List[Tuple[str, str]] = []
+        self.client.meta.events.register("after-call.s3.CreateMultipartUpload", self._track_upload)
+
+    def object_key(self, name: str) -> str:
+        """结果中的相对路径对应的对象键"""
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def write_bytes(self, path: str, data: bytes, metadata: Optional[Dict[str, str]] = None):
+        if self._closed:
+            return
+        self._upload(io.BytesIO(data), self.relative_path(path), len(data),
+                     hashlib.sha256(data).hexdigest(), metadata)
+
+    def is_current(self, paths: Iterable[str], version: str) -> bool:
+        if not version:
+            return False
+        for path in paths:
+            try:
+                head = self.client.head_object(Bucket=self.bucket, Key=self.object_key(self.relative_path(path)))
+            except ClientError:
+                return False
+            if head.get("Metadata", {}).get(META_SOURCE_VERSION) != version:
+                return False
+        return True
+
+    def _store_file(self, path: str, name: str, metadata: Optional[Dict[str, str]]):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+                digest.update(chunk)
+            size = f.tell()
+            f.seek(0)
+            self._upload(f, name, size, digest.hexdigest(), metadata)
+
+    def _upload(self, stream, name: str, size: int, digest: str, metadata: Optional[Dict[str, str]]):
+        """上传（超过分片大小时由 boto3 分片并发上传）"""
+        extra_args = {"Metadata": dict(metadata or {}, sha256=digest)}
+        content_type = mimetypes.guess_type(name)[0]
+        if content_type:
+            extra_args["ContentType"] = content_type
+        self.client.upload_fileobj(stream, self.bucket, self.object_key(name),
+                                   ExtraArgs=extra_args, Config=self.transfer_config)
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+        self._add_to_manifest(name, size, digest, metadata)
+
+    def _track_upload(self, parsed: Dict[str, Any], **kwargs):
+        """记录本输出目标发起的分片上传（boto3 事件回调）"""
+        if parsed.get("UploadId"):
+            with self._lock:
+                self._uploads.append((parsed["Key"], parsed["UploadId"]))
+
+    def _finish(self):
+        self.logger.info(f"☁️ 上传完成: {self.location}（{self.files} 个文件，{self.bytes / 1024 / 1024:.1f}MB）")
+
+    def _abort(self):
+        """中止本输出目标发起的未完成的分片上传（已上传的对象保留，但不上传导出清单）"""
+        with self._lock:
+            uploads, self._uploads = self._uploads, []
+        for key, upload_id in uploads:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            except ClientError as e:
+                # 已完成或已由传输管理器中止的上传
+                if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                    self.logger.warning(f"中止分片上传失败 {key}: {str(e)}")
+        self.logger.warning(f"⚠️ 导出未完成，未上传导出清单: {self.location}")
+
+
+class CorpusSink(_StagingSink):
+    """
+    输出为语料：每篇Markdown转为纯文本记录（整篇一条或按标题切分的片段），追加写入分片压缩的JSONL（线程安全）
+
+    Markdown提交后立即读取（刚写入，仍在系统缓存中）并删除，本地渲染的Markdown直接从内存写入；
+    其他格式的文件和共用素材不输出
+    """
+
+    def __init__(self, output_dir: str, chunk_tokens: int = DEFAULT_CHUNK_TOKENS, shard_bytes: int = None,
+                 zstd_level: int = 3):
+        """
+        Args:
+            output_dir: 分片所在目录
+            chunk_tokens: 每个片段的token上限，为0时整篇文档一条记录
+            shard_bytes: 每个分片的未压缩大小上限
+            zstd_level: zstd压缩级别
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        super().__init__(output_dir, output_dir)
+        self.text_only = True
+        self.chunk_tokens = chunk_tokens
+        self._writer = CorpusWriter(output_dir, shard_bytes or DEFAULT_SHARD_BYTES, zstd_level)
+        self._ignored = set()
+
+    def _store_file(self, path: str, name: str, metadata: Optional[Dict[str, str]]):
+        if not metadata:
+            return
+        if not name.endswith(".md"):
+            self._ignore(name)
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            self._write_document(name, f, metadata)
+
+    def write_bytes(self, path: str, data: bytes, metadata: Optional[Dict[str, str]] = None):
+        name = self.relative_path(path)
+        if not metadata or self._closed:
+            return
+        if not name.endswith(".md"):
+            self._ignore(name)
+            return
+        self._write_document(name, data.decode("utf-8", errors="replace"), metadata)
+
+    def _write_document(self, name: str, source, metadata: Dict[str, str]):
+        """一篇文档转为语料记录并写入"""
+        version = metadata.get(META_SOURCE_VERSION, "")
+        document = {
+            "node_token": metadata.get("node-token", ""),
+            "obj_token": metadata.get("obj-token", ""),
+            "obj_type": metadata.get("obj-type", ""),
+            "path": name[:-len(".md")],
+            "edit_time": int(version) if version.isdigit() else version,
+        }
+        self._writer.write(document_records(source, document, self.chunk_tokens))
+
+    def _ignore(self, name: str):
+        """每种格式只提示一次"""
+        ext = os.path.splitext(name)[1]
+        if ext not in self._ignored:
+            self._ignored.add(ext)
+            self.logger.warning(f"⚠️ 语料输出只包含Markdown，忽略 {ext} 文件")
+
+    def _finish(self):
+        shards = self._writer.close()
+        index = {"created_at": int(time.time()), "chunk_tokens": self.chunk_tokens, "shards": shards}
+        tmp_path = os.path.join(self.location, INDEX_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, os.path.join(self.location, INDEX_NAME))
+        self.logger.info(f"📚 语料输出完成: {self.location}（{self._writer.documents} 篇文档，{self._writer.records} 条记录，"
+                         f"{len(shards)} 个分片）")
+
+    def _abort(self):
+        """当前分片保留为 .part 文件，不写入分片索引"""
+        self._writer.abort()
+        self.logger.warning(f"⚠️ 导出未完成，未写入分片索引: {self.location}")
+
+
+def document_metadata(node: Dict[str, Any]) -> Dict[str, str]:
+    """
+    文档的输出元数据（对象存储中随文件保存）
+
+    Args:
+        node: Wiki节点信息
+
+    Returns:
+        {"node-token": ..., "obj-token": ..., "obj-type": ..., "source-version": obj_edit_time}
+        （无编辑时间时不含版本）
+    """
+    metadata = {
+        "node-token": node.get("node_token") or "",
+        "obj-token": node.get("obj_token") or node.get("node_token") or "",
+        "obj-type": node.get("obj_type") or node.get("node_type") or "",
+    }
+    version = node.get("obj_edit_time")
+    if version:
+        metadata[META_SOURCE_VERSION] = str(version)
+    return metadata
+
+
+class _HashingReader:
+    """读取时计算sha256的包装"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self._digest.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
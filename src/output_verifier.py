@@ -0,0 +1,198 @@
+"""
+输出校验模块
+按导出清单并行校验输出目录：先检查文件是否存在、大小和结构（PDF结尾标记、DOCX中央目录），
+结构正常再计算sha256；只重新导出损坏或缺失的文件，其余文件不做改动
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from block_converter import MD_SOURCE_BLOCKS, export_document_markdown
+from export_cache import ExportCache
+from export_manifest import MANIFEST_NAME, ExportManifest, check_structure, file_sha256, load_manifest
+from media_fetcher import MediaFetcher
+from search_index import SEARCH_INDEX_NAME, SearchIndex
+
+# 可重新导出的格式（PDF/Word 统一使用飞书服务端导出）
+REPAIRABLE_FORMATS = ('md', 'pdf', 'docx')
+
+
+def entry_path(output_dir: str, entry: Dict[str, Any]) -> str:
+    """清单记录对应的本地文件路径"""
+    return os.path.join(output_dir, *entry["path"].split("/"))
+
+
+def verify_file(output_dir: str, entry: Dict[str, Any]) -> Optional[str]:
+    """
+    校验单个文件
+
+    Args:
+        output_dir: 导出目录
+        entry: 清单记录
+
+    Returns:
+        问题描述，正常时返回None
+    """
+    path = entry_path(output_dir, entry)
+    if not os.path.isfile(path):
+        return "文件缺失"
+    size = os.path.getsize(path)
+    if size != entry.get("size"):
+        return f"大小不符（{size} ≠ {entry.get('size')}）"
+    problem = check_structure(path, entry.get("format", ""))
+    if problem:
+        return problem
+    if file_sha256(path) != entry.get("sha256"):
+        return "sha256不符"
+    return None
+
+
+def verify_output(output_dir: str, max_workers: int = None) -> Tuple[int, List[Tuple[Dict[str, Any], str]]]:
+    """
+    按清单并行校验导出目录（哈希计算在线程中执行，hashlib 计算期间释放GIL）
+
+    Args:
+        output_dir: 导出目录（包含 _manifest.jsonl）
+        max_workers: 并行数，默认为CPU核数的2倍（最多16）
+
+    Returns:
+        (校验的文件数, [(清单记录, 问题描述)])
+
+    Raises:
+        FileNotFoundError: 目录中没有导出清单
+    """
+    entries = list(load_manifest(os.path.join(output_dir, MANIFEST_NAME)).values())
+    max_workers = max_workers or min(16, (os.cpu_count() or 1) * 2)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="verify") as executor:
+        problems = executor.map(lambda entry: verify_file(output_dir, entry), entries)
+        failed = [(entry, problem) for entry, problem in zip(entries, problems) if problem]
+    failed.sort(key=lambda item: item[0]["path"])
+    return len(entries), failed
+
+
+class OutputRepairer:
+    """重新导出损坏或缺失的文件，并在清单中追加新的记录"""
+
+    def __init__(self, api, output_dir: str, md_source: str = MD_SOURCE_BLOCKS, media: Dict[str, Any] = None,
+                 rate_limits: Dict[str, float] = None, export_cache: ExportCache = None):
+        """
+        Args:
+            api: FeishuAPI实例（已获取access_token）
+            output_dir: 导出目录
+            md_source: Markdown内容来源
+            media: 图片/附件下载配置（config.json中的 "media"）
+            rate_limits: 各接口频控（次/分钟）
+            export_cache: 导出缓存（可选）；重新导出前删除对应的缓存，避免下次导出时恢复同样损坏的文件
+        """
+        self.api = api
+        self.output_dir = output_dir
+        self.md_source = md_source
+        self.media = media
+        self.rate_limits = rate_limits
+        self.export_cache = export_cache
+        self.logger = logging.getLogger(__name__)
+
+    def repair(self, entries: List[Dict[str, Any]]) -> int:
+        """
+        重新导出
+
+        Args:
+            entries: 需要重新导出的清单记录
+
+        Returns:
+            成功数量
+        """
+        media_fetcher = None
+        if self.md_source == MD_SOURCE_BLOCKS and any(entry.get("format") == 'md' for entry in entries):
+            media_fetcher = MediaFetcher.from_config(self.api, self.output_dir, self.media, self.rate_limits)
+        manifest = ExportManifest(os.path.join(self.output_dir, MANIFEST_NAME))
+        search_index = SearchIndex(self.output_dir) if os.path.exists(
+            os.path.join(self.output_dir, SEARCH_INDEX_NAME)) else None
+        repaired = 0
+        try:
+            for entry in entries:
+                if self._repair_one(entry, media_fetcher):
+                    path = entry_path(self.output_dir, entry)
+                    # 重新导出的是文档当前内容，版本未知
+                    manifest.add(entry["path"], os.path.getsize(path), file_sha256(path), {
+                        "node-token": entry.get("node_token", ""),
+                        "obj-token": entry.get("obj_token", ""),
+                        "obj-type": entry.get("obj_type", ""),
+                    })
+                    if entry.get("format") == 'md' and search_index is not None:
+                        search_index.add_file(entry.get("node_token", ""), path)
+                    self.logger.info(f"✅ 已重新导出: {entry['path']}")
+                    repaired += 1
+        finally:
+            if media_fetcher is not None:
+                media_fetcher.close()
+            if self.export_cache is not None:
+                self.export_cache.save()
+            manifest.close()
+            if search_index is not None:
+                search_index.close()
+        return repaired
+
+    def _repair_one(self, entry: Dict[str, Any], media_fetcher: Optional[MediaFetcher]) -> bool:
+        """重新导出单个文件"""
+        export_format = entry.get("format")
+        obj_token = entry.get("obj_token")
+        if export_format not in REPAIRABLE_FORMATS or not obj_token:
+            self.logger.warning(f"⚠️ 无法重新导出 {entry['path']}（格式 {export_format}）")
+            return False
+
+        path = entry_path(self.output_dir, entry)
+        base_path = os.path.dirname(path)
+        filename = os.path.splitext(os.path.basename(path))[0]
+        try:
+            if export_format == 'md':
+                title = self._document_title(entry, path, filename)
+                return export_document_markdown(self.api, obj_token, path, title, self.md_source,
+                                                media=media_fetcher)
+
+            # 不使用导出缓存，并删除其中的记录：缓存文件与输出文件可能是同一个硬链接，已一同损坏
+            if self.export_cache is not None:
+                self.export_cache.discard(obj_token, export_format)
+            from feishu_native_exporter import FeishuNativeExporter
+            results = FeishuNativeExporter(self.api).export_document_batch(
+                obj_token, entry.get("obj_type") or "docx", [export_format], base_path, filename
+            )
+            success, error = results[export_format]
+            if not success:
+                self.logger.warning(f"⚠️ 重新导出失败 {entry['path']}: {error}")
+            return success
+        except Exception as e:
+            self.logger.error(f"重新导出失败 {entry['path']}: {str(e)}")
+            return False
+
+    def _document_title(self, entry: Dict[str, Any], path: str, filename: str) -> str:
+        """
+        文档的原标题（文件名经过清理，同名时还带有序号）：优先查询文档元数据，其次读取原Markdown的一级标题
+        """
+        if entry.get("obj_type", "docx") == "docx":
+            document = self.api.get_document_metadata(entry["obj_token"])
+            if document and document.get("title"):
+                return document["title"]
+        return markdown_title(path) or filename
+
+
+def markdown_title(path: str) -> Optional[str]:
+    """
+    Markdown文件开头的一级标题
+
+    Args:
+        path: Markdown文件路径
+
+    Returns:
+        标题，文件不存在、无法读取或开头不是一级标题时返回None
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    title = line[2:].strip() if line.startswith("# ") else ""
+                    return title or None
+    except (OSError, UnicodeDecodeError):
+        pass
+    return None
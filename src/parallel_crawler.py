@@ -3,16 +3,26 @@
 使用多线程并行处理多个文档
 """
 import os
+import time
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any
 from wiki_crawler import WikiCrawler
+from node_filter import NodeFilter
+from export_stats import get_default_stats
+from block_converter import MD_SOURCE_BLOCKS
+from output_sink import document_metadata
 
 
 class ParallelWikiCrawler(WikiCrawler):
     """并行Wiki爬取器 - 多文档同时处理"""
     
-    def __init__(self, api, export_formats: List[str] = None, max_workers: int = 3):
+    def __init__(self, api, export_formats: List[str] = None, max_workers: int = 3,
+                 node_filter: NodeFilter = None, md_source: str = MD_SOURCE_BLOCKS,
+                 media: Dict[str, Any] = None, render_modes: Dict[str, str] = None,
+                 render_processes: int = None, output: Dict[str, Any] = None,
+                 export_cache: Dict[str, Any] = None, content_store: Dict[str, Any] = None,
+                 rate_limits: Dict[str, float] = None):
         """
         初始化并行爬取器
         
@@ -20,8 +30,18 @@ class ParallelWikiCrawler(WikiCrawler):
             api: FeishuAPI实例
             export_formats: 导出格式列表
             max_workers: 最大并行数（建议2-5，太多可能被限流）
+            node_filter: 节点过滤器（可选）
+            md_source: Markdown内容来源（'blocks' 或 'raw'）
+            media: 图片/附件下载配置（可选）
+            render_modes: PDF/Word的渲染方式（可选）
+            render_processes: 本地渲染的进程数（None为按CPU核数，0为在线程中渲染）
+            output: 输出目标配置（可选），如 {"format": "zip"}
+            export_cache: 原生导出缓存配置（可选）
+            content_store: 文档内容存储配置（可选）
+            rate_limits: 各接口频控（次/分钟），覆盖默认值
         """
-        super().__init__(api, export_formats)
+        super().__init__(api, export_formats, node_filter, md_source, media, render_modes, render_processes,
+                         output, export_cache, content_store, rate_limits)
         self.max_workers = max_workers
         self.logger = logging.getLogger(__name__)
     
@@ -43,48 +63,53 @@ class ParallelWikiCrawler(WikiCrawler):
         obj_type = node.get("obj_type", "")
         node_type = node.get("node_type")
         
-        safe_title = self._sanitize_filename(title)
+        safe_title = self.path_planner.name(node)
+        if self._is_unchanged(node, base_path, safe_title):
+            self.logger.info(f"{'  ' * level}⏭️ 未修改，跳过: {title}")
+            return 1
+        
+        metadata = document_metadata(node)
         exported_any = False
         
-        # 获取文档内容（仅用于Markdown导出）
-        content = None
-        if 'md' in self.export_formats:
-            content = self.api.get_document_content(node_token)
-        
-        # Markdown导出
-        if 'md' in self.export_formats:
-            if content:
-                from document_converter import DocumentConverter
-                converter = DocumentConverter()
-                metadata = {"title": title}
-                markdown_text = converter.to_markdown(content, metadata)
-                file_path = os.path.join(base_path, f"{safe_title}.md")
-                self._save_markdown(file_path, markdown_text)
+        # 本地渲染：一次获取内容，同时生成Markdown和本地渲染的PDF/Word
+        if self.local_formats:
+            if self._render_local(obj_token or node_token, title, base_path, safe_title, level, metadata):
+                exported_any = True
+        
+        # Markdown导出（流式获取并边解析边写入）
+        elif 'md' in self.export_formats:
+            md_start = time.time()
+            file_path = os.path.join(base_path, f"{safe_title}.md")
+            if self._export_markdown(obj_token or node_token, title, file_path, node.get("obj_edit_time")):
+                get_default_stats().record('md', time.time() - md_start, obj_token or node_token)
+                self._commit_outputs(base_path, safe_title, ['md'], metadata)
                 self.logger.info(f"{'  ' * level}✅ 已保存MD: {safe_title}.md")
                 exported_any = True
             else:
                 self.logger.warning(f"{'  ' * level}⚠️ 无法导出Markdown（获取内容失败）")
         
         # Word和PDF使用飞书原生API导出
-        native_formats = [fmt for fmt in self.export_formats if fmt in ['docx', 'pdf']]
+        native_formats = self.native_formats
         
         if native_formats:
             from feishu_native_exporter import FeishuNativeExporter
-            exporter = FeishuNativeExporter(self.api)
+            exporter = FeishuNativeExporter(self.api, cache=self.export_cache)
             
             export_token = obj_token if obj_token else node_token
             export_type = obj_type if obj_type else (node_type or "docx")
             
             # 批量导出
-            os.makedirs(base_path, exist_ok=True)
             results = exporter.export_document_batch(
                 export_token, 
                 export_type, 
                 native_formats, 
                 base_path, 
-                safe_title
+                safe_title,
+                node.get("obj_edit_time")
             )
             
+            self._commit_outputs(base_path, safe_title, [fmt for fmt, (success, _) in results.items() if success],
+                                 metadata)
             for fmt, (success, error) in results.items():
                 if success:
                     self.logger.info(f"{'  ' * level}✅ 已保存{fmt.upper()} (原生): {safe_title}.{fmt}")
@@ -94,7 +119,8 @@ class ParallelWikiCrawler(WikiCrawler):
         
         return 1 if exported_any else 0
     
-    def _process_node_parallel(self, node: Dict[str, Any], base_path: str, space_id: str, level: int = 0) -> int:
+    def _process_node_parallel(self, node: Dict[str, Any], base_path: str, space_id: str, level: int = 0,
+                               parent_path: str = "") -> int:
         """
         并行处理节点（核心优化）
         
@@ -103,6 +129,7 @@ class ParallelWikiCrawler(WikiCrawler):
             base_path: 保存路径
             space_id: 空间ID
             level: 层级
+            parent_path: 父节点标题路径（用于过滤）
             
         Returns:
             成功导出的文档数量
@@ -117,26 +144,27 @@ class ParallelWikiCrawler(WikiCrawler):
         self.crawled_nodes.add(node_token)
         
         count = 0
+        node_path = NodeFilter.join_path(parent_path, title)
         
         # 处理当前文档（如果是文档类型）
         node_type = node.get("node_type")
         obj_type = node.get("obj_type", "")
         
-        if node_type in ["doc", "docx"] or obj_type in ["doc", "docx"]:
+        is_document = node_type in ["doc", "docx"] or obj_type in ["doc", "docx"]
+        if is_document and self._should_export_node(node, node_path, level):
             # 使用父类的单文档处理方法
             count += self._process_single_node(node, base_path, level)
         
         # 🚀 并行处理子节点（关键优化）
-        if has_child:
+        if has_child and self._should_descend_node(node, node_path, level):
             self.logger.info(f"{'  ' * level}📁 进入目录: {title}")
             
-            # 创建子目录
-            safe_title = self._sanitize_filename(title)
-            sub_dir = os.path.join(base_path, safe_title)
-            os.makedirs(sub_dir, exist_ok=True)
-            
             # 获取子节点
-            child_nodes = self.get_child_nodes(space_id, node_token)
+            child_nodes = self.get_child_nodes(space_id, node_token, node_path, level + 1)
+            
+            # 为子节点分配文件名并创建子目录（在提交并行任务之前完成）
+            sub_dir = os.path.join(base_path, self.path_planner.name(node))
+            self.path_planner.plan(sub_dir, child_nodes, complete=node_token not in self.partial_listings)
             
             if child_nodes:
                 # ⚡ 使用线程池并行处理子节点
@@ -148,7 +176,8 @@ class ParallelWikiCrawler(WikiCrawler):
                             child, 
                             sub_dir, 
                             space_id, 
-                            level + 1
+                            level + 1,
+                            node_path
                         ): child 
                         for child in child_nodes
                     }
@@ -161,6 +190,9 @@ class ParallelWikiCrawler(WikiCrawler):
                         except Exception as e:
                             child = future_to_node[future]
                             self.logger.error(f"处理节点失败 {child.get('title')}: {str(e)}")
+                            self.traversal_errors += 1
+        elif has_child:
+            self.path_planner.skip(os.path.join(base_path, self.path_planner.name(node)))
         
         return count
     
@@ -185,14 +217,17 @@ class ParallelWikiCrawler(WikiCrawler):
             self.logger.info(f"并行数: {self.max_workers} 个文档同时处理")
             
             # 获取根节点
+            self.traversal_errors = 0
+            self.partial_listings.clear()
             root_nodes = self.get_child_nodes(space_id, None)
             if not root_nodes:
                 return (0, "无法获取Wiki根节点")
             
-            # 创建保存目录
-            import time
-            output_dir = os.path.join(save_path, f"Wiki导出_{int(time.time())}")
-            os.makedirs(output_dir, exist_ok=True)
+            # 创建输出目标（目录、归档或对象存储）
+            self._open_output(save_path, space_id)
+            output_dir, location = self.sink.root, self.sink.location
+            self.path_planner.plan(output_dir, root_nodes, complete=None not in self.partial_listings)
+            self._open_resources(output_dir)
             
             total_count = 0
             
@@ -218,9 +253,15 @@ class ParallelWikiCrawler(WikiCrawler):
                     except Exception as e:
                         node = future_to_node[future]
                         self.logger.error(f"处理根节点失败 {node.get('title')}: {str(e)}")
+                        self.traversal_errors += 1
+            
+            finished = self._close_resources()
+            get_default_stats().save()
+            if not finished:
+                return (total_count, f"完成输出失败: {location}")
             
             self.logger.info(f"🎉 爬取完成！共导出 {total_count} 篇文档")
-            self.logger.info(f"📂 保存位置: {output_dir}")
+            self.logger.info(f"📂 保存位置: {location}")
             
             return (total_count, "")
             
@@ -229,4 +270,5 @@ class ParallelWikiCrawler(WikiCrawler):
             self.logger.error(error_msg)
             import traceback
             traceback.print_exc()
+            self._close_resources(complete=False)
             return (0, error_msg)
@@ -0,0 +1,140 @@
+"""
+输出路径规划模块
+同一父节点的子节点列出后，一次性为它们分配不冲突的文件名并创建所在目录；
+导出时各工作线程直接使用分配好的路径，不再各自清理标题、创建目录；
+同步模式下分配路径的同时把改名或移动过的页面的原有文件移动到新位置
+"""
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from sync_index import SyncIndex
+
+# 文件名（不含扩展名）的UTF-8字节上限：常见文件系统单个文件名上限为255字节，
+# 为扩展名和下载、分段渲染时的临时后缀（如 .0.part.pdf）留出余量
+MAX_NAME_BYTES = 200
+TOKEN_SUFFIX_CHARS = 8  # 重名时追加的节点token长度
+
+_INVALID_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+# Windows保留的设备名（不区分大小写，带扩展名同样不可用）
+_RESERVED_NAMES = {"CON", "PRN", "AUX", "NUL"} | {f"{prefix}{i}" for prefix in ("COM", "LPT") for i in range(1, 10)}
+
+
+def truncate_utf8(text: str, max_bytes: int) -> str:
+    """按UTF-8字节数截断（不截断多字节字符）"""
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    return encoded[:max_bytes].decode("utf-8", "ignore")
+
+
+def sanitize_name(title: str, max_bytes: int = MAX_NAME_BYTES) -> str:
+    """
+    将标题转换为可用的文件名
+
+    Args:
+        title: 文档标题
+        max_bytes: UTF-8字节上限
+
+    Returns:
+        文件名（不含扩展名）
+    """
+    name = _INVALID_CHARS.sub("_", title or "").strip()
+    # Windows会去掉结尾的点和空格，导致与其他文件重名
+    name = truncate_utf8(name, max_bytes).rstrip(". ")
+    if not name:
+        return "未命名"
+    if name.split(".")[0].upper() in _RESERVED_NAMES:
+        name = f"_{name}"
+    return name
+
+
+def assign_names(nodes: List[Dict[str, Any]]) -> List[str]:
+    """
+    为兄弟节点分配互不冲突的文件名（不区分大小写）
+
+    按列表顺序，标题首次出现的节点使用标题本身，之后重名的节点追加节点token后缀，
+    结果只取决于节点自身和列表顺序，每次导出相同
+
+    Args:
+        nodes: 同一父节点下的子节点
+
+    Returns:
+        与 nodes 一一对应的文件名
+    """
+    names = []
+    taken = set()
+    for node in nodes:
+        name = sanitize_name(node.get("title", "未命名"))
+        if name.casefold() in taken:
+            token = node.get("node_token") or ""
+            base = truncate_utf8(name, MAX_NAME_BYTES - TOKEN_SUFFIX_CHARS - 1)
+            name = f"{base}_{token[-TOKEN_SUFFIX_CHARS:]}"
+            if name.casefold() in taken:
+                name = f"{truncate_utf8(base, MAX_NAME_BYTES - len(token) - 1)}_{token}"
+        taken.add(name.casefold())
+        names.append(name)
+    return names
+
+
+class PathPlanner:
+    """输出路径规划（线程安全，一次导出共享一个实例）"""
+
+    def __init__(self, sync_index: Optional[SyncIndex] = None):
+        """
+        Args:
+            sync_index: 同步目录的节点路径索引（可选）
+        """
+        self.sync_index = sync_index
+        self._lock = threading.Lock()
+        self._names: Dict[str, str] = {}  # 节点token -> 文件名（不含扩展名）
+
+    def plan(self, directory: str, nodes: List[Dict[str, Any]], complete: bool = False):
+        """
+        为同一目录下的兄弟节点分配文件名，并创建该目录
+
+        Args:
+            directory: 兄弟节点的输出目录
+            nodes: 子节点列表
+            complete: 是否完整列出了全部子节点（列出成功，且没有节点被过滤器剪除）；
+                同步目录只删除完整列出的目录中没有出现的页面
+        """
+        names = assign_names(nodes)
+        with self._lock:
+            for node, name in zip(nodes, names):
+                token = node.get("node_token")
+                if token:
+                    # 同一节点只分配一次
+                    self._names.setdefault(token, name)
+            planned = [(token, self._names[token]) for token in (node.get("node_token") for node in nodes) if token]
+        if nodes:
+            os.makedirs(directory, exist_ok=True)
+        if self.sync_index is not None:
+            for token, name in planned:
+                self.sync_index.place(token, os.path.join(directory, name))
+            self.sync_index.listed(directory, complete)
+
+    def skip(self, directory: str):
+        """
+        记录该目录下的子节点本次没有列出（过滤器不展开）；同步目录保留其中的页面和暂存的旧文件
+
+        Args:
+            directory: 子节点的输出目录
+        """
+        if self.sync_index is not None:
+            self.sync_index.listed(directory, False)
+
+    def name(self, node: Dict[str, Any]) -> str:
+        """
+        节点的文件名（不含扩展名），也是其子节点所在目录的名称
+
+        Args:
+            node: 节点信息
+
+        Returns:
+            分配的文件名；未经规划的节点使用清理后的标题
+        """
+        with self._lock:
+            name = self._names.get(node.get("node_token"))
+        return name or sanitize_name(node.get("title", "未命名"))
@@ -0,0 +1,365 @@
+"""
+PDF渲染模块
+基于 xhtml2pdf 将Markdown（经 document_ir 转为HTML）渲染为PDF：中文字体每个进程只注册一次（嵌入时自动子集化）；
+长文档按标题切分为多段并行渲染，再用 pypdf（可选依赖）合并并保留书签
+"""
+import os
+import re
+import logging
+import platform
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from document_ir import PdfEmitter, emit, parse_markdown
+
+# PDF渲染依赖
+try:
+    from xhtml2pdf import pisa
+    from xhtml2pdf import default as pisa_default
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.lib.fonts import addMapping
+except ImportError:
+    pisa = None
+
+# PDF合并依赖（可选，未安装时长文档整体渲染）
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    PdfWriter = None
+
+
+CJK_FONT_NAME = "DocHarvestCJK"
+CJK_FONT_ENV = "DOCHARVEST_CJK_FONT"  # 指定中文字体文件的环境变量
+
+CHUNK_CHARS = 60_000  # 分段渲染时每段的目标字符数
+
+# 常见的中文字体（需为TrueType轮廓，reportlab不支持CFF轮廓的OTF）
+_CJK_FONT_CANDIDATES = {
+    "Windows": [
+        "C:/Windows/Fonts/msyh.ttc",    # 微软雅黑
+        "C:/Windows/Fonts/simhei.ttf",  # 黑体
+        "C:/Windows/Fonts/simsun.ttc",  # 宋体
+    ],
+    "Darwin": [
+        "/System/Library/Fonts/PingFang.ttc",
+        "/System/Library/Fonts/STHeiti Light.ttc",
+        "/Library/Fonts/Arial Unicode.ttf",
+    ],
+    "Linux": [
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+        "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc",
+        "/usr/share/fonts/truetype/arphic/uming.ttc",
+        "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+    ],
+}
+
+_HEADING_LINE = re.compile(r'#{1,3}\s')
+_ANY_HEADING = re.compile(r'(#{1,6})\s')
+
+_CSS = """
+    body {{
+        font-family: {font}sans-serif;
+        font-size: 12pt;
+        line-height: 1.6;
+    }}
+    h1, h2, h3, h4, h5, h6 {{
+        margin-top: 20px;
+        margin-bottom: 10px;
+        font-weight: bold;
+    }}
+    h1 {{ font-size: 24pt; }}
+    h2 {{ font-size: 20pt; }}
+    h3 {{ font-size: 16pt; }}
+    p {{ margin-bottom: 10px; line-height: 1.5; }}
+    pre {{ background-color: #f5f5f5; padding: 10px; border-radius: 5px; }}
+    code {{ background-color: #f5f5f5; padding: 2px 4px; border-radius: 3px; }}
+    table {{ border: 1px solid #999; }}
+    td, th {{ padding: 4px; }}
+"""
+
+_font_lock = threading.Lock()
+_font_registered: Optional[bool] = None  # None 表示尚未尝试
+
+logger = logging.getLogger(__name__)
+
+
+def find_cjk_font() -> Optional[str]:
+    """
+    查找可用的中文字体文件（优先使用环境变量 DOCHARVEST_CJK_FONT 指定的文件）
+
+    Returns:
+        字体文件路径，未找到时返回None
+    """
+    custom = os.environ.get(CJK_FONT_ENV)
+    if custom and os.path.exists(custom):
+        return custom
+    for path in _CJK_FONT_CANDIDATES.get(platform.system(), []):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def register_cjk_font() -> bool:
+    """
+    注册中文字体（每个进程只执行一次，结果缓存）
+
+    字体注册到reportlab并加入xhtml2pdf的默认字体表，之后每次渲染直接引用，
+    不再为每个文档重新解析字体文件；嵌入PDF时只包含用到的字形
+
+    Returns:
+        是否有可用的中文字体
+    """
+    global _font_registered
+    if _font_registered is not None:
+        return _font_registered
+
+    with _font_lock:
+        if _font_registered is not None:
+            return _font_registered
+
+        path = find_cjk_font() if pisa is not None else None
+        if not path:
+            logger.warning(f"未找到中文字体，PDF中的中文可能显示为方块（可通过环境变量 {CJK_FONT_ENV} 指定字体文件）")
+            _font_registered = False
+            return False
+
+        try:
+            pdfmetrics.registerFont(TTFont(CJK_FONT_NAME, path, subfontIndex=0))
+            # 粗体、斜体使用同一字体，避免回退到不含中文的字体
+            for bold in (0, 1):
+                for italic in (0, 1):
+                    addMapping(CJK_FONT_NAME, bold, italic, CJK_FONT_NAME)
+            pisa_default.DEFAULT_FONT[CJK_FONT_NAME.lower()] = CJK_FONT_NAME
+            logger.info(f"🔤 已注册中文字体: {path}")
+            _font_registered = True
+        except Exception as e:
+            logger.warning(f"注册中文字体失败 {path}: {str(e)}")
+            _font_registered = False
+        return _font_registered
+
+
+def build_html(body_html: str, outline_shift: int = 0) -> str:
+    """
+    为HTML正文加上样式，组成完整的HTML
+
+    Args:
+        body_html: <body> 内的HTML（如 HtmlEmitter.body）
+        outline_shift: 书签层级上移的级数（分段渲染时，不含一级标题的分段从二级标题开始建立书签）
+    """
+    font = f"{CJK_FONT_NAME}, " if register_cjk_font() else ""
+    css = _CSS.format(font=font)
+    if outline_shift:
+        css += "".join(f"h{level} {{ -pdf-outline-level: {level - 1 - outline_shift}; }}\n"
+                       for level in range(outline_shift + 1, 7))
+    return (
+        '<html><head><meta charset="utf-8"><style>'
+        + css
+        + f'</style></head><body>{body_html}</body></html>'
+    )
+
+
+def render_html_pdf(body_html: str, save_path: str, outline_shift: int = 0) -> bool:
+    """
+    将HTML正文渲染为PDF（图片等相对路径以保存目录为基准）
+
+    Args:
+        body_html: <body> 内的HTML
+        save_path: 保存路径
+        outline_shift: 书签层级上移的级数
+
+    Returns:
+        是否成功
+    """
+    if pisa is None:
+        logger.error("未安装xhtml2pdf库，无法导出PDF")
+        return False
+
+    try:
+        full_html = build_html(body_html, outline_shift)
+        with open(save_path, "wb") as f:
+            pisa_status = pisa.CreatePDF(full_html, dest=f, encoding='utf-8',
+                                         path=os.path.abspath(save_path))
+        return not pisa_status.err
+    except Exception as e:
+        logger.error(f"导出PDF失败: {str(e)}")
+        return False
+
+
+def render_pdf(md_content: str, save_path: str, outline_shift: int = 0) -> bool:
+    """
+    将Markdown整体渲染为PDF
+
+    Args:
+        md_content: Markdown文本
+        save_path: 保存路径
+        outline_shift: 书签层级上移的级数
+
+    Returns:
+        是否成功
+    """
+    success, _ = emit(parse_markdown(md_content), [PdfEmitter(save_path, outline_shift)])["pdf"]
+    return success
+
+
+def split_markdown(md_content: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    在标题处将Markdown切分为若干段（不会切开代码块；没有合适标题时单段可能超过上限）
+
+    Args:
+        md_content: Markdown文本
+        max_chars: 每段的目标字符数
+
+    Returns:
+        分段列表
+    """
+    chunks = []
+    current: List[str] = []
+    size = 0
+    in_code = False
+    for line in md_content.split("\n"):
+        if line.startswith("```"):
+            in_code = not in_code
+        elif not in_code and current and size >= max_chars and _HEADING_LINE.match(line):
+            chunks.append("\n".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def heading_shift(md_content: str) -> int:
+    """分段中最高级标题之上的空缺级数（如只含二、三级标题时为1；忽略代码块内的行）"""
+    top = 6
+    in_code = False
+    for line in md_content.split("\n"):
+        if line.startswith("```"):
+            in_code = not in_code
+            continue
+        heading = None if in_code else _ANY_HEADING.match(line)
+        if heading:
+            top = min(top, len(heading.group(1)))
+            if top == 1:
+                break
+    return top - 1
+
+
+def merge_pdfs(part_paths: List[str], save_path: str) -> bool:
+    """
+    合并PDF并重建书签：首段的书签原样保留；首段只有一个顶层书签（文档标题）时，
+    后续分段的书签挂在它下面
+
+    Args:
+        part_paths: 按顺序排列的分段文件
+        save_path: 保存路径
+
+    Returns:
+        是否成功
+    """
+    if PdfWriter is None:
+        logger.error("未安装pypdf库，无法合并PDF")
+        return False
+
+    tmp_path = save_path + ".part"
+    try:
+        writer = PdfWriter()
+        title_item = None
+        for index, part_path in enumerate(part_paths):
+            reader = PdfReader(part_path)
+            page_offset = len(writer.pages)
+            writer.append(reader, import_outline=False)
+            added = _copy_outline(writer, reader, reader.outline, page_offset, title_item)
+            if index == 0 and len(added) == 1:
+                title_item = added[0]
+        with open(tmp_path, "wb") as f:
+            writer.write(f)
+        writer.close()
+        os.replace(tmp_path, save_path)
+        return True
+    except Exception as e:
+        logger.error(f"合并PDF失败: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def _copy_outline(writer, reader, items, page_offset: int, parent) -> list:
+    """
+    复制书签（pypdf的书签列表中，子书签列表紧跟在父书签之后）
+
+    Returns:
+        本层新增的书签
+    """
+    added = []
+    for item in items:
+        if isinstance(item, list):
+            _copy_outline(writer, reader, item, page_offset, added[-1] if added else parent)
+            continue
+        page = reader.get_destination_page_number(item)
+        added.append(writer.add_outline_item(item.title, page + page_offset, parent=parent))
+    return added
+
+
+# 提交函数：submit(fn, *args) -> Future（如 RenderService.submit_call）
+SubmitFunc = Callable[..., Future]
+
+
+class PdfRenderer:
+    """PDF渲染器（长文档分段并行渲染）"""
+
+    def __init__(self, submit: SubmitFunc = None, chunk_chars: int = CHUNK_CHARS):
+        """
+        Args:
+            submit: 提交分段渲染任务的函数（可选）；未提供或未安装pypdf时整体渲染
+            chunk_chars: 每段的目标字符数
+        """
+        self.submit = submit
+        self.chunk_chars = chunk_chars
+        self.logger = logging.getLogger(__name__)
+
+    def render(self, md_content: str, save_path: str) -> bool:
+        """
+        渲染为PDF
+
+        Args:
+            md_content: Markdown文本
+            save_path: 保存路径
+
+        Returns:
+            是否成功
+        """
+        if self.submit is None or PdfWriter is None or len(md_content) <= self.chunk_chars:
+            return render_pdf(md_content, save_path)
+
+        chunks = split_markdown(md_content, self.chunk_chars)
+        if len(chunks) == 1:
+            return render_pdf(md_content, save_path)
+
+        # 分段文件与结果位于同一目录，图片等相对路径保持有效
+        part_paths = [f"{save_path}.{i}.part.pdf" for i in range(len(chunks))]
+        try:
+            # 首段之后的分段不含文档标题，书签层级上移，合并时再挂到标题下
+            futures = [
+                self.submit(render_pdf, chunk, path, heading_shift(chunk) if i else 0)
+                for i, (chunk, path) in enumerate(zip(chunks, part_paths))
+            ]
+            if not all(future.result() for future in futures):
+                self.logger.error(f"分段渲染PDF失败: {os.path.basename(save_path)}")
+                return False
+            self.logger.debug(f"PDF分 {len(chunks)} 段渲染: {os.path.basename(save_path)}")
+            return merge_pdfs(part_paths, save_path)
+        except Exception as e:
+            self.logger.error(f"分段渲染PDF失败: {str(e)}")
+            return False
+        finally:
+            for path in part_paths:
+                if os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
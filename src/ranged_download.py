@@ -0,0 +1,410 @@
+"""
+分段下载模块
+下载中断后使用HTTP Range从断点续传；文件超过阈值且服务端支持Range时，
+将文件切分为多个区间并行下载到预分配的文件中
+"""
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+CHUNK_SIZE = 64 * 1024               # 读取块大小
+PARALLEL_THRESHOLD = 8 * 1024 * 1024  # 超过该大小时并行下载
+MIN_PART_SIZE = 2 * 1024 * 1024       # 每个区间的最小大小
+MAX_PARTS = 4                         # 最大并行区间数
+MAX_RETRIES = 3                       # 每个区间的最大续传次数
+RETRY_DELAY = 1.0                     # 续传前等待时间（秒）
+
+
+class DownloadError(Exception):
+    """下载失败"""
+
+
+class RangeNotSupportedError(DownloadError):
+    """服务端不支持分段请求（不应重试）"""
+
+
+def split_ranges(size: int, max_parts: int = MAX_PARTS, min_part_size: int = MIN_PART_SIZE) -> List[Tuple[int, int]]:
+    """
+    将文件切分为若干闭区间
+
+    Args:
+        size: 文件大小
+        max_parts: 最大区间数
+        min_part_size: 每个区间的最小大小
+
+    Returns:
+        [(start, end), ...]，end为闭区间端点
+    """
+    if size <= 0:
+        return []
+    parts = max(1, min(max_parts, size // max(1, min_part_size)))
+    part_size = -(-size // parts)
+    return [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+
+
+def _content_length(headers) -> Optional[int]:
+    """读取Content-Length"""
+    value = headers.get("Content-Length")
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _accepts_ranges(headers) -> bool:
+    """服务端是否声明支持Range"""
+    return headers.get("Accept-Ranges", "").lower() == "bytes"
+
+
+def _preallocate(path: str, size: int):
+    """创建并预分配文件"""
+    with open(path, 'wb') as f:
+        if size > 0:
+            f.truncate(size)
+
+
+class RangedDownloader:
+    """同步分段下载器（requests风格的会话）"""
+
+    def __init__(self, session, headers: Dict[str, str] = None, timeout: int = 60,
+                 parallel_threshold: int = PARALLEL_THRESHOLD, max_parts: int = MAX_PARTS,
+                 max_retries: int = MAX_RETRIES):
+        """
+        初始化下载器
+
+        Args:
+            session: 提供 get(url, headers=, stream=, timeout=) 的对象（requests模块或Session）
+            headers: 请求头（如Authorization）
+            timeout: 单次请求超时
+            parallel_threshold: 并行下载阈值（字节）
+            max_parts: 最大并行区间数
+            max_retries: 每个区间的最大续传次数
+        """
+        self.session = session
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.parallel_threshold = parallel_threshold
+        self.max_parts = max_parts
+        self.max_retries = max_retries
+        self.logger = logging.getLogger(__name__)
+
+    def download(self, url: str, save_path: str) -> bool:
+        """
+        下载文件到save_path（先写入.part文件，完成后重命名）
+
+        Returns:
+            是否成功
+        """
+        part_path = save_path + ".part"
+        try:
+            response = self.session.get(url, headers=self.headers, stream=True, timeout=self.timeout)
+            response.raise_for_status()
+
+            size = _content_length(response.headers)
+            can_range = _accepts_ranges(response.headers)
+
+            if size is not None and can_range and size >= self.parallel_threshold:
+                self._download_parallel(url, part_path, size, response)
+            else:
+                self._download_single(url, part_path, size, can_range, response)
+
+            os.replace(part_path, save_path)
+            return True
+
+        except Exception as e:
+            self.logger.error(f"下载文件异常: {str(e)}")
+            if os.path.exists(part_path):
+                try:
+                    os.remove(part_path)
+                except OSError:
+                    pass
+            return False
+
+    def _download_single(self, url: str, part_path: str, size: Optional[int], can_range: bool, response):
+        """单连接下载，中断后按已写入的字节数续传（重新连接也计入续传次数）"""
+        written = 0
+        attempt = 0
+        with open(part_path, 'wb') as f:
+            while True:
+                try:
+                    if response is None:
+                        headers = dict(self.headers)
+                        if can_range and written:
+                            headers["Range"] = f"bytes={written}-"
+                        response = self.session.get(url, headers=headers, stream=True, timeout=self.timeout)
+                        response.raise_for_status()
+
+                        if response.status_code != 206:
+                            # 服务端未按Range返回，从头开始
+                            f.seek(0)
+                            f.truncate()
+                            written = 0
+
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        if chunk:
+                            f.write(chunk)
+                            written += len(chunk)
+                    response.close()
+                    response = None
+
+                    if size is not None and written < size:
+                        raise DownloadError(f"连接提前关闭 ({written}/{size})")
+                    return
+
+                except Exception as e:
+                    if response is not None:
+                        response.close()
+                    response = None
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise
+
+                    self.logger.warning(f"下载中断，{RETRY_DELAY}秒后续传 ({attempt}/{self.max_retries}): {str(e)}")
+                    time.sleep(RETRY_DELAY)
+
+    def _download_parallel(self, url: str, part_path: str, size: int, response):
+        """并行下载多个区间到预分配文件，首个区间复用已建立的响应"""
+        ranges = split_ranges(size, self.max_parts)
+        _preallocate(part_path, size)
+        self.logger.info(f"并行下载 {len(ranges)} 个区间 ({size / 1024 / 1024:.1f} MB)")
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [
+                executor.submit(self._download_range, url, part_path, start, end,
+                                response if i == 0 else None)
+                for i, (start, end) in enumerate(ranges)
+            ]
+            for future in futures:
+                future.result()
+
+    def _download_range(self, url: str, part_path: str, start: int, end: int, response=None):
+        """下载一个区间，中断后从区间内的断点续传"""
+        offset = start
+        attempt = 0
+        with open(part_path, 'r+b') as f:
+            f.seek(offset)
+            while offset <= end:
+                try:
+                    if response is None:
+                        headers = dict(self.headers)
+                        headers["Range"] = f"bytes={offset}-{end}"
+                        response = self.session.get(url, headers=headers, stream=True, timeout=self.timeout)
+                        response.raise_for_status()
+                        status_code = response.status_code
+                        if status_code != 206:
+                            response.close()
+                            response = None
+                            raise RangeNotSupportedError(f"服务端未返回分段内容: HTTP {status_code}")
+
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        if not chunk:
+                            continue
+                        # 复用的首个响应包含整个文件，只取本区间
+                        chunk = chunk[:end - offset + 1]
+                        f.write(chunk)
+                        offset += len(chunk)
+                        if offset > end:
+                            break
+                    response.close()
+                    response = None
+
+                    if offset <= end:
+                        raise DownloadError(f"区间未下载完整 ({offset}/{end + 1})")
+
+                except RangeNotSupportedError:
+                    raise
+                except Exception as e:
+                    if response is not None:
+                        response.close()
+                    response = None
+                    attempt = self._retry_or_raise(attempt, e, start, end)
+
+    def _retry_or_raise(self, attempt: int, error: Exception, start: int, end: int) -> int:
+        """续传前的计数与等待，超过次数时抛出异常"""
+        attempt += 1
+        if attempt > self.max_retries:
+            raise error
+        self.logger.warning(f"区间 {start}-{end} 下载中断，续传 ({attempt}/{self.max_retries}): {str(error)}")
+        time.sleep(RETRY_DELAY)
+        return attempt
+
+
+class AsyncRangedDownloader:
+    """异步分段下载器（aiohttp风格的传输）"""
+
+    def __init__(self, session, acquire: Callable[[], Awaitable[None]] = None,
+                 parallel_threshold: int = PARALLEL_THRESHOLD, max_parts: int = MAX_PARTS,
+                 max_retries: int = MAX_RETRIES):
+        """
+        初始化下载器
+
+        Args:
+            session: aiohttp风格的传输（aiohttp.ClientSession 或 transport 中的异步传输）
+            acquire: 每次发起请求前调用的频控回调（首个请求由调用方负责）
+            parallel_threshold: 并行下载阈值（字节）
+            max_parts: 最大并行区间数
+            max_retries: 每个区间的最大续传次数
+        """
+        self.session = session
+        self.acquire = acquire
+        self.parallel_threshold = parallel_threshold
+        self.max_parts = max_parts
+        self.max_retries = max_retries
+        self.logger = logging.getLogger(__name__)
+
+    async def download(self, url: str, part_path: str) -> bool:
+        """
+        下载文件到part_path（调用方负责重命名和清理）
+
+        Returns:
+            是否成功
+        """
+        response = await self.session.get(url)
+        try:
+            if response.status != 200:
+                self.logger.error(f"下载失败: HTTP {response.status}")
+                return False
+
+            size = _content_length(response.headers)
+            can_range = _accepts_ranges(response.headers)
+
+            if size is not None and can_range and size >= self.parallel_threshold:
+                ranges = split_ranges(size, self.max_parts)
+                _preallocate(part_path, size)
+                self.logger.info(f"并行下载 {len(ranges)} 个区间 ({size / 1024 / 1024:.1f} MB)")
+
+                first = response
+                tasks = [
+                    asyncio.ensure_future(
+                        self._download_range(url, part_path, start, end, response if i == 0 else None))
+                    for i, (start, end) in enumerate(ranges)
+                ]
+                response = None  # 所有权交给首个区间
+                await self._wait_ranges(tasks, first)
+            else:
+                owned, response = response, None
+                await self._download_single(url, part_path, size, can_range, owned)
+            return True
+        finally:
+            if response is not None:
+                response.release()
+
+    async def _wait_ranges(self, tasks: List["asyncio.Future"], first):
+        """
+        等待所有区间完成；任一区间失败（或下载被取消）时先取消并等待其余区间结束再抛出异常，
+        避免调用方清理 .part 文件时仍有区间在写入
+
+        Args:
+            tasks: 各区间的任务
+            first: 首个区间复用的响应（任务尚未开始即被取消时由这里释放）
+        """
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            if tasks[0].cancelled():
+                first.release()
+
+    async def _open(self, url: str, headers: Dict[str, str] = None):
+        """发起一次请求（占用频控额度）"""
+        if self.acquire:
+            await self.acquire()
+        return await self.session.get(url, headers=headers)
+
+    async def _download_single(self, url: str, part_path: str, size: Optional[int], can_range: bool, response):
+        """单连接下载，中断后按已写入的字节数续传（重新连接也计入续传次数）"""
+        written = 0
+        attempt = 0
+        with open(part_path, 'wb') as f:
+            while True:
+                try:
+                    if response is None:
+                        headers = {"Range": f"bytes={written}-"} if can_range and written else None
+                        response = await self._open(url, headers)
+                        if response.status not in (200, 206):
+                            raise DownloadError(f"续传失败: HTTP {response.status}")
+
+                        if response.status != 206:
+                            # 服务端未按Range返回，从头开始
+                            f.seek(0)
+                            f.truncate()
+                            written = 0
+
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        f.write(chunk)
+                        written += len(chunk)
+                    response.release()
+                    response = None
+
+                    if size is not None and written < size:
+                        raise DownloadError(f"连接提前关闭 ({written}/{size})")
+                    return
+
+                except asyncio.CancelledError:
+                    if response is not None:
+                        response.release()
+                    raise
+                except Exception as e:
+                    if response is not None:
+                        response.release()
+                    response = None
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise
+
+                    self.logger.warning(f"下载中断，{RETRY_DELAY}秒后续传 ({attempt}/{self.max_retries}): {str(e)}")
+                    await asyncio.sleep(RETRY_DELAY)
+
+    async def _download_range(self, url: str, part_path: str, start: int, end: int, response=None):
+        """下载一个区间，中断后从区间内的断点续传"""
+        offset = start
+        attempt = 0
+        with open(part_path, 'r+b') as f:
+            f.seek(offset)
+            while offset <= end:
+                try:
+                    if response is None:
+                        response = await self._open(url, {"Range": f"bytes={offset}-{end}"})
+                        if response.status != 206:
+                            status = response.status
+                            response.release()
+                            response = None
+                            raise RangeNotSupportedError(f"服务端未返回分段内容: HTTP {status}")
+
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        # 复用的首个响应包含整个文件，只取本区间
+                        chunk = chunk[:end - offset + 1]
+                        f.write(chunk)
+                        offset += len(chunk)
+                        if offset > end:
+                            break
+                    response.release()
+                    response = None
+
+                    if offset <= end:
+                        raise DownloadError(f"区间未下载完整 ({offset}/{end + 1})")
+
+                except (asyncio.CancelledError, RangeNotSupportedError):
+                    if response is not None:
+                        response.release()
+                    raise
+                except Exception as e:
+                    if response is not None:
+                        response.release()
+                        response = None
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise
+                    self.logger.warning(f"区间 {start}-{end} 下载中断，续传 ({attempt}/{self.max_retries}): {str(e)}")
+                    await asyncio.sleep(RETRY_DELAY)
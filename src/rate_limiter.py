@@ -0,0 +1,151 @@
+"""
+接口频控模块
+按接口分别限制请求速率（令牌桶），所有导出请求（含对冲请求）共享同一额度
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+
+# 各接口的频控（次/分钟）。默认值为保守估计，可在 config.json 的 rate_limits 中按实际频控覆盖
+DEFAULT_RATE_LIMITS = {
+    "wiki_nodes": 100,       # 获取知识空间子节点列表
+    "raw_content": 300,      # 获取文档纯文本内容
+    "doc_blocks": 300,       # 获取文档所有块（分页）
+    "export_create": 100,    # 创建导出任务
+    "export_query": 300,     # 查询导出任务结果
+    "export_download": 300,  # 下载导出文件
+    "media_download": 300,   # 下载文档中的图片和附件
+}
+
+
+class _TokenBucket:
+    """异步令牌桶"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """获取一个令牌，额度不足时等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncRateLimiter:
+    """按接口区分的异步频控器"""
+
+    def __init__(self, rate_limits: Dict[str, float] = None):
+        """
+        初始化频控器
+
+        Args:
+            rate_limits: 各接口频控（次/分钟），覆盖 DEFAULT_RATE_LIMITS 中的对应项；值为0或None表示不限制
+        """
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        self.rate_limits.update(rate_limits or {})
+        self.logger = logging.getLogger(__name__)
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self.counts: Dict[str, int] = {}
+
+    async def acquire(self, endpoint: str):
+        """
+        获取指定接口的一次调用额度
+
+        Args:
+            endpoint: 接口名，如 'export_query'
+        """
+        self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+        bucket = self._get_bucket(endpoint)
+        if bucket:
+            await bucket.acquire()
+
+    def _get_bucket(self, endpoint: str) -> Optional[_TokenBucket]:
+        """获取（或创建）接口对应的令牌桶"""
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            limit = self.rate_limits.get(endpoint)
+            if not limit:
+                return None
+            rate = limit / 60.0
+            # 允许1秒内的突发
+            bucket = _TokenBucket(rate, max(1.0, rate))
+            self._buckets[endpoint] = bucket
+        return bucket
+
+
+class _ThreadTokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，额度不足时等待"""
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                time.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """按接口区分的同步频控器（多线程共享）"""
+
+    def __init__(self, rate_limits: Dict[str, float] = None):
+        """
+        初始化频控器
+
+        Args:
+            rate_limits: 各接口频控（次/分钟），覆盖 DEFAULT_RATE_LIMITS 中的对应项；值为0或None表示不限制
+        """
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        self.rate_limits.update(rate_limits or {})
+        self._buckets: Dict[str, _ThreadTokenBucket] = {}
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def acquire(self, endpoint: str):
+        """
+        获取指定接口的一次调用额度（阻塞）
+
+        Args:
+            endpoint: 接口名，如 'media_download'
+        """
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                limit = self.rate_limits.get(endpoint)
+                if limit:
+                    rate = limit / 60.0
+                    bucket = _ThreadTokenBucket(rate, max(1.0, rate))
+                    self._buckets[endpoint] = bucket
+
+        if bucket:
+            bucket.acquire()
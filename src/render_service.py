@@ -0,0 +1,169 @@
+"""
+渲染服务模块
+xhtml2pdf 和 python-docx 的渲染是CPU密集型的，在线程中执行会受GIL限制、在事件循环中执行会阻塞，
+因此放到进程池中：工作进程启动时预先完成字体和样式初始化，提交端在积压过多时阻塞，
+使内容获取阶段不会远远跑在渲染前面
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Tuple
+
+from document_ir import render_markdown
+
+
+_WARMUP_MARKDOWN = "# 预热\n\n正文 text\n\n- 列表\n\n| a | b |\n| --- | --- |\n| 1 | 2 |\n"
+
+
+def _warmup():
+    """工作进程初始化：导入渲染库并各渲染一次小文档，使字体、样式和模板在首个任务前加载完成"""
+    from document_converter import Document, pisa
+    from pdf_renderer import register_cjk_font
+
+    register_cjk_font()
+    logging.getLogger(__name__).debug(f"渲染进程预热: {os.getpid()}")
+    try:
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            targets = {}
+            if Document is not None:
+                targets['docx'] = os.path.join(tmp_dir, "warmup.docx")
+            if pisa is not None:
+                targets['pdf'] = os.path.join(tmp_dir, "warmup.pdf")
+            render_markdown(_WARMUP_MARKDOWN, targets)
+    except Exception:
+        # 预热失败不影响正式渲染（届时会记录真正的错误）
+        pass
+
+
+def _ready() -> int:
+    """空任务，用于确认工作进程已启动"""
+    return os.getpid()
+
+
+class RenderService:
+    """进程池渲染服务（线程安全）"""
+
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        """
+        初始化渲染服务
+
+        Args:
+            max_workers: 渲染进程数，默认为CPU核数（最多4个）
+            max_pending: 最多同时提交（排队+执行）的任务数，默认为进程数的2倍；
+                超过时 submit 阻塞，对内容获取阶段形成背压
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or self.max_workers * 2
+        self.logger = logging.getLogger(__name__)
+
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warmup)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warmup(self, timeout: float = 60):
+        """
+        预先启动所有工作进程并完成初始化（可选，未调用时在首个任务提交时启动）
+
+        Args:
+            timeout: 最长等待秒数
+        """
+        start = time.time()
+        try:
+            futures = [self._executor.submit(_ready) for _ in range(self.max_workers)]
+            pids = {future.result(timeout=timeout) for future in futures}
+            self.logger.info(f"🔥 渲染进程已就绪: {len(pids)} 个，耗时 {time.time() - start:.1f}秒")
+        except Exception as e:
+            self.logger.warning(f"渲染进程预热失败: {str(e)}")
+
+    def submit(self, md_content: str, targets: Dict[str, str]) -> Future:
+        """
+        提交渲染任务（积压任务达到上限时阻塞）
+
+        Args:
+            md_content: Markdown文本
+            targets: {格式: 保存路径}
+
+        Returns:
+            Future，结果为 {格式: (是否成功, 错误信息, 耗时秒数)}
+        """
+        return self.submit_call(render_markdown, md_content, targets)
+
+    def submit_call(self, fn: Callable[..., Any], *args) -> Future:
+        """
+        在渲染进程中执行任意模块级函数（如 pdf_renderer.render_pdf 渲染PDF分段），与 submit 共用背压
+
+        Args:
+            fn: 可被pickle的模块级函数
+            *args: 参数
+
+        Returns:
+            Future
+        """
+        if self._closed:
+            raise RuntimeError("渲染服务已关闭")
+
+        self._slots.acquire()
+        try:
+            executor = self._executor
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # 工作进程崩溃后进程池不再接受任务，换一个新的进程池（已提交的任务随旧进程池失败）
+                future = self._restart(executor).submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def render(self, md_content: str, targets: Dict[str, str]) -> Dict[str, Tuple[bool, str, float]]:
+        """
+        渲染并等待完成；进程池不可用时（如工作进程崩溃）在当前进程渲染
+
+        Args:
+            md_content: Markdown文本
+            targets: {格式: 保存路径}
+
+        Returns:
+            {格式: (是否成功, 错误信息, 耗时秒数)}
+        """
+        try:
+            return self.submit(md_content, targets).result()
+        except RuntimeError as e:
+            # BrokenProcessPool 也是 RuntimeError 的子类
+            self.logger.warning(f"渲染进程不可用，改为在当前进程渲染: {str(e)}")
+            return render_markdown(md_content, targets)
+
+    def _restart(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """
+        替换已损坏的进程池（多个线程同时发现时只替换一次）
+
+        Args:
+            broken: 提交失败的进程池
+
+        Returns:
+            当前可用的进程池
+
+        Raises:
+            RuntimeError: 渲染服务已关闭
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("渲染服务已关闭")
+            if self._executor is broken:
+                self.logger.warning("⚠️ 渲染进程异常退出，重新启动进程池")
+                broken.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warmup)
+            return self._executor
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池"""
+        with self._lock:
+            self._closed = True
+            executor = self._executor
+        executor.shutdown(wait=wait)
@@ -0,0 +1,265 @@
+"""
+全文检索模块
+导出时把每篇Markdown文档（转为纯文本）写入导出目录中的 SQLite FTS5 索引（_search_index.sqlite），
+记录Wiki路径、标题和节点token；同步目录中按节点更新，已删除的页面从索引中删除，移动的页面更新路径。
+非同步模式每次导出到新目录，索引只包含本次导出的文档。检索见 cli.py search
+"""
+import os
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from document_ir import HEADING, TextEmitter, emit, parse_markdown
+
+
+SEARCH_INDEX_NAME = "_search_index.sqlite"
+
+# 每写入这么多篇文档提交一次事务
+_COMMIT_INTERVAL = 200
+
+# trigram 分词器（SQLite 3.34+）支持中文等不以空格分词的文本按子串检索，查询词至少3个字符
+_TRIGRAM_VERSION = (3, 34, 0)
+_TRIGRAM_MIN_LENGTH = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    node_token TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    title TEXT NOT NULL,
+    revision TEXT NOT NULL DEFAULT ''
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, body, tokenize='{tokenizer}');
+"""
+
+
+def fts5_available() -> bool:
+    """当前Python的 sqlite3 是否支持 FTS5"""
+    try:
+        connection = sqlite3.connect(":memory:")
+        try:
+            connection.execute("CREATE VIRTUAL TABLE t USING fts5(body)")
+        finally:
+            connection.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def markdown_text(markdown: str, default_title: str = "") -> Tuple[str, str]:
+    """
+    Markdown转为检索用的标题和纯文本（文档开头的一级标题为文档标题）
+
+    Args:
+        markdown: Markdown文本
+        default_title: 没有一级标题时使用的标题
+
+    Returns:
+        (标题, 正文纯文本)
+    """
+    title = None
+    emitter = TextEmitter()
+
+    def nodes():
+        nonlocal title
+        for node in parse_markdown(markdown):
+            if title is None and node.kind == HEADING and node.level == 1:
+                title = node.text
+                continue
+            yield node
+
+    emit(nodes(), [emitter])
+    return title or default_title, emitter.getvalue()
+
+
+class SearchIndex:
+    """导出目录的全文索引（线程安全）"""
+
+    def __init__(self, root: str):
+        """
+        打开（或创建）导出目录中的索引
+
+        Args:
+            root: 导出目录
+
+        Raises:
+            sqlite3.Error: sqlite3 不支持 FTS5 或索引文件损坏
+        """
+        self.root = root
+        self.path = os.path.join(root, SEARCH_INDEX_NAME)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.indexed = 0
+
+        tokenizer = "trigram" if sqlite3.sqlite_version_info >= _TRIGRAM_VERSION else "unicode61"
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA.format(tokenizer=tokenizer))
+        # 已有索引沿用创建时的分词器
+        row = self._connection.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'documents_fts'"
+        ).fetchone()
+        self.trigram = "trigram" in (row[0] if row else "")
+
+    def add(self, node_token: str, path: str, title: str, body: str, revision: Optional[str] = None):
+        """
+        写入（或替换）一篇文档
+
+        Args:
+            node_token: 节点token
+            path: 文档在导出目录中的相对路径（/ 分隔）
+            title: 标题
+            body: 正文纯文本
+            revision: 文档版本（可选）
+        """
+        with self._lock:
+            cursor = self._connection.cursor()
+            row = cursor.execute("SELECT id FROM documents WHERE node_token = ?", (node_token,)).fetchone()
+            if row:
+                doc_id = row[0]
+                cursor.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+                cursor.execute("UPDATE documents SET path = ?, title = ?, revision = ? WHERE id = ?",
+                               (path, title, revision or "", doc_id))
+            else:
+                cursor.execute("INSERT INTO documents (node_token, path, title, revision) VALUES (?, ?, ?, ?)",
+                               (node_token, path, title, revision or ""))
+                doc_id = cursor.lastrowid
+            cursor.execute("INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)",
+                           (doc_id, title, body))
+            self.indexed += 1
+            self._pending += 1
+            if self._pending >= _COMMIT_INTERVAL:
+                self._connection.commit()
+                self._pending = 0
+
+    def add_markdown(self, node_token: str, path: str, markdown: str, revision: Optional[str] = None):
+        """
+        写入一篇Markdown文档（出错时只记录日志，不影响导出）
+
+        Args:
+            node_token: 节点token
+            path: 文档在导出目录中的相对路径（/ 分隔）
+            markdown: Markdown文本
+            revision: 文档版本（可选）
+        """
+        if not node_token:
+            return
+        try:
+            default_title = os.path.splitext(path.rsplit("/", 1)[-1])[0]
+            title, body = markdown_text(markdown, default_title)
+            self.add(node_token, path, title, body, revision)
+        except Exception as e:
+            self.logger.warning(f"写入全文索引失败 {path}: {str(e)}")
+
+    def add_file(self, node_token: str, file_path: str, revision: Optional[str] = None):
+        """
+        写入导出目录中的Markdown文件（刚写入的文件仍在系统缓存中，读取开销很小）
+
+        Args:
+            node_token: 节点token
+            file_path: Markdown文件路径
+            revision: 文档版本（可选）
+        """
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                markdown = f.read()
+        except Exception as e:
+            self.logger.warning(f"读取Markdown失败，未写入全文索引 {file_path}: {str(e)}")
+            return
+        path = os.path.relpath(file_path, self.root).replace(os.sep, "/")
+        self.add_markdown(node_token, path, markdown, revision)
+
+    def remove(self, node_token: str):
+        """删除一篇文档"""
+        with self._lock:
+            self._remove(node_token)
+
+    def reconcile(self, documents: Dict[str, Tuple[str, str]]):
+        """
+        按同步索引整理：删除已不在Wiki中的页面，更新移动过的页面的路径，补充尚未写入索引的文档
+        （如在已有的同步目录上开启全文索引）
+
+        Args:
+            documents: {节点token: (Markdown文件相对路径, 文档版本)}
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT node_token, path FROM documents").fetchall()
+            indexed = dict(rows)
+            removed = moved = 0
+            for node_token, path in rows:
+                if node_token not in documents:
+                    self._remove(node_token)
+                    removed += 1
+                elif documents[node_token][0] != path:
+                    self._connection.execute("UPDATE documents SET path = ? WHERE node_token = ?",
+                                             (documents[node_token][0], node_token))
+                    moved += 1
+            self._connection.commit()
+            self._pending = 0
+
+        missing = [(token, path, version) for token, (path, version) in documents.items() if token not in indexed]
+        for node_token, path, version in missing:
+            file_path = os.path.join(self.root, *path.split("/"))
+            if os.path.isfile(file_path):
+                self.add_file(node_token, file_path, version)
+        if removed or moved or missing:
+            self.logger.info(f"🔎 全文索引：删除 {removed} 篇，更新路径 {moved} 篇，补充 {len(missing)} 篇")
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        检索
+
+        Args:
+            query: 查询词（空格分隔的多个词需同时出现）
+            limit: 最多返回的结果数
+
+        Returns:
+            [{"path", "title", "node_token", "snippet"}]，按相关度排序
+        """
+        terms = [term for term in query.split() if term]
+        if not terms:
+            return []
+        # 短于3个字符的词 trigram 无法匹配，改用 LIKE（逐行扫描）
+        short = [term for term in terms if self.trigram and len(term) < _TRIGRAM_MIN_LENGTH]
+        phrases = [term for term in terms if term not in short]
+
+        conditions, params = [], []
+        if phrases:
+            conditions.append("documents_fts MATCH ?")
+            params.append(" ".join('"' + term.replace('"', '""') + '"' for term in phrases))
+        for term in short:
+            conditions.append("(documents_fts.title LIKE ? OR documents_fts.body LIKE ?)")
+            params.extend([f"%{term}%"] * 2)
+        order = "bm25(documents_fts)" if phrases else "documents.path"
+        sql = (
+            "SELECT documents.path, documents.title, documents.node_token, "
+            "snippet(documents_fts, 1, '[', ']', '…', 16) "
+            "FROM documents_fts JOIN documents ON documents.id = documents_fts.rowid "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ?"
+        )
+        params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [{"path": path, "title": title, "node_token": node_token, "snippet": " ".join((snippet or "").split())}
+                for path, title, node_token, snippet in rows]
+
+    def close(self):
+        """提交并关闭索引"""
+        with self._lock:
+            try:
+                self._connection.commit()
+                self._connection.close()
+            except sqlite3.Error as e:
+                self.logger.warning(f"保存全文索引失败: {str(e)}")
+        if self.indexed:
+            self.logger.info(f"🔎 全文索引已更新 {self.indexed} 篇文档: {self.path}")
+
+    def _remove(self, node_token: str):
+        """删除一篇文档（调用方持有锁）"""
+        row = self._connection.execute("SELECT id FROM documents WHERE node_token = ?", (node_token,)).fetchone()
+        if row:
+            self._connection.execute("DELETE FROM documents_fts WHERE rowid = ?", (row[0],))
+            self._connection.execute("DELETE FROM documents WHERE id = ?", (row[0],))
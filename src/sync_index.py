@@ -0,0 +1,352 @@
+"""
+同步索引模块
+同步目录中保存节点token到输出路径的索引（_sync_index.json）以及各格式已导出的文档版本。
+Wiki页面改名或移动后节点token不变，列出子节点时按索引把原有的文件和子目录直接移动到新位置，
+只有文档版本变化时才重新导出
+"""
+import os
+import re
+import json
+import shutil
+import threading
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from export_manifest import file_sha256, iter_manifest
+from media_fetcher import MEDIA_DIR_NAME
+
+
+SYNC_INDEX_NAME = "_sync_index.json"
+PARKING_DIR_NAME = ".sync_parking"  # 新位置被其他节点的旧文件占用时，旧文件暂存于此
+
+# Markdown中指向 _media 的相对链接（移动到不同层级后需要改写）
+_MEDIA_LINK = re.compile(r'(?<=[("])(?:\.\./)*' + re.escape(MEDIA_DIR_NAME) + r'/')
+
+
+def _move(src: str, dest: str):
+    """移动文件或目录（目标目录已存在时合并，同名文件替换）"""
+    if os.path.isdir(src) and os.path.isdir(dest) and not os.path.samefile(src, dest):
+        for name in os.listdir(src):
+            _move(os.path.join(src, name), os.path.join(dest, name))
+        os.rmdir(src)
+    else:
+        os.replace(src, dest)
+
+
+class SyncIndex:
+    """同步目录的节点路径索引（线程安全）"""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 同步目录
+        """
+        self.root = root
+        self.path = os.path.join(root, SYNC_INDEX_NAME)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # 节点token -> {"path": 相对路径（不含扩展名，/ 分隔）, "formats": {格式: 文档版本}}
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._owners: Dict[str, str] = {}  # 路径（不区分大小写）-> 节点token
+        self._rewritten = set()  # 本次改写过 Markdown 链接的节点
+        self._seen = set()  # 本次出现的节点
+        self._listed = set()  # 本次完整列出了子节点的目录（其中没有出现的页面才视为已删除）
+        self._filtered = False  # 本次有目录没有完整列出（有节点被过滤器剪除等）
+        self.moved = 0
+        self._load()
+
+    def place(self, node_token: str, path: str):
+        """
+        确定节点本次的输出位置；与索引中的位置不同时，把原有文件和子目录移动过去
+
+        Args:
+            node_token: 节点token
+            path: 输出路径（不含扩展名，子节点所在目录同名）
+        """
+        stem = self._relative(path)
+        with self._lock:
+            self._seen.add(node_token)
+            entry = self._nodes.get(node_token)
+            if entry is None:
+                self._nodes[node_token] = {"path": stem, "formats": {}}
+                self._claim(stem, node_token)
+                return
+            if entry["path"] == stem:
+                return
+            try:
+                self._relocate(node_token, stem)
+                self.moved += 1
+            except OSError as e:
+                # 移动失败时按新文档处理（重新导出）
+                self.logger.warning(f"移动失败 {entry['path']} → {stem}: {str(e)}")
+                self._release(entry["path"], node_token)
+                self._nodes[node_token] = {"path": stem, "formats": {}}
+                self._claim(stem, node_token)
+
+    def listed(self, directory: str, complete: bool):
+        """
+        记录该目录下的子节点已列出
+
+        Args:
+            directory: 兄弟节点的输出目录
+            complete: 是否完整列出（列出成功，且没有节点被过滤器剪除）
+        """
+        stem = self._relative(directory)
+        with self._lock:
+            if complete:
+                self._listed.add("" if stem == "." else stem)
+            else:
+                self._filtered = True
+
+    def record(self, paths: Iterable[str], version: Optional[str]):
+        """
+        记录已写入的文档文件及其版本
+
+        Args:
+            paths: 文件路径（<输出路径>.<格式>）
+            version: 文档版本（无版本时记为空，下次不会跳过）
+        """
+        with self._lock:
+            for path in paths:
+                stem, ext = os.path.splitext(self._relative(path))
+                entry = self._nodes.get(self._owners.get(stem.casefold()))
+                if entry is not None and entry["path"] == stem:
+                    entry["formats"][ext.lstrip(".")] = version or ""
+
+    def is_current(self, paths: Iterable[str], version: str) -> bool:
+        """
+        这些文件是否都已是该版本（文件存在，且索引中记录的版本相同）
+
+        Args:
+            paths: 文件路径（<输出路径>.<格式>）
+            version: 当前文档版本
+        """
+        with self._lock:
+            for path in paths:
+                stem, ext = os.path.splitext(self._relative(path))
+                entry = self._nodes.get(self._owners.get(stem.casefold()))
+                if entry is None or entry["formats"].get(ext.lstrip(".")) != version or not os.path.isfile(path):
+                    return False
+            return True
+
+    def node_path(self, node_token: str) -> Optional[str]:
+        """
+        索引中节点的输出路径
+
+        Args:
+            node_token: 节点token
+
+        Returns:
+            输出路径（不含扩展名）；节点未导出过时返回None
+        """
+        with self._lock:
+            entry = self._nodes.get(node_token)
+            return self._absolute(entry["path"]) if entry is not None else None
+
+    def documents(self, fmt: str) -> Dict[str, Tuple[str, str]]:
+        """
+        已导出该格式的节点
+
+        Args:
+            fmt: 格式，如 'md'
+
+        Returns:
+            {节点token: (文件相对路径, 文档版本)}
+        """
+        with self._lock:
+            return {token: (f"{entry['path']}.{fmt}", entry["formats"][fmt])
+                    for token, entry in self._nodes.items() if fmt in entry["formats"]}
+
+    def close(self, manifest_path: Optional[str] = None, complete: bool = True):
+        """
+        删除本次未出现的节点（被挤到暂存目录的旧文件、已删除页面的文件）及其记录，保存索引，并按当前路径整理导出清单
+
+        Args:
+            manifest_path: 导出清单路径（可选）
+            complete: 本次是否遍历了全部节点；为False时（导出中止、列出子节点失败等）未出现的页面可能仍在Wiki中，
+                暂存的旧文件及其记录保留，之后出现时再移到新位置
+        """
+        with self._lock:
+            # 暂存的页面无法确定现在所在的目录，有目录没有完整列出（过滤器剪除、不展开）时同样保留
+            if complete and not self._filtered:
+                self._drop_parked()
+            elif any(entry["path"].startswith(PARKING_DIR_NAME + "/") for entry in self._nodes.values()):
+                self.logger.info(f"📦 本次未遍历全部节点，暂存的旧文件保留在 {PARKING_DIR_NAME}")
+            if complete:
+                self._drop_unseen()
+            data = {"nodes": self._nodes}
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self.logger.warning(f"保存同步索引失败: {str(e)}")
+        if manifest_path and os.path.exists(manifest_path):
+            self._compact_manifest(manifest_path)
+        if self.moved:
+            self.logger.info(f"🚚 按节点移动了 {self.moved} 个改名或移动的页面")
+
+    def _relocate(self, node_token: str, stem: str):
+        """把节点的文件和子目录移动到新路径，子孙节点的记录随之更新（调用方持有锁）"""
+        occupant = self._owners.get(stem.casefold())
+        if occupant is not None and occupant != node_token:
+            # 暂存占用者可能连带移动本节点（本节点原在其子目录中），之后再读取本节点的路径
+            self._park(occupant)
+        entry = self._nodes[node_token]
+        old = entry["path"]
+
+        for fmt in entry["formats"]:
+            src = self._absolute(f"{old}.{fmt}")
+            if os.path.isfile(src):
+                _move(src, self._absolute(f"{stem}.{fmt}"))
+        old_dir = self._absolute(old)
+        if os.path.isdir(old_dir):
+            _move(old_dir, self._absolute(stem))
+        self.logger.info(f"🚚 已移动: {old} → {stem}")
+
+        self._release(old, node_token)
+        self._claim(stem, node_token)
+        entry["path"] = stem
+        self._rename_descendants(old, stem)
+        if old.count("/") != stem.count("/"):
+            self._rewrite_media_links(stem)
+
+    def _park(self, node_token: str):
+        """把占用目标路径的其他节点的旧文件移到暂存目录（之后出现时再移到它的新位置）"""
+        os.makedirs(self._absolute(PARKING_DIR_NAME), exist_ok=True)
+        self._relocate(node_token, f"{PARKING_DIR_NAME}/{node_token}")
+
+    def _rename_descendants(self, old: str, new: str):
+        """目录移动后更新子孙节点的路径"""
+        prefix = old + "/"
+        for token, entry in self._nodes.items():
+            if entry["path"].startswith(prefix):
+                self._release(entry["path"], token)
+                entry["path"] = new + entry["path"][len(old):]
+                self._claim(entry["path"], token)
+
+    def _rewrite_media_links(self, stem: str):
+        """层级变化后改写 Markdown 中指向 _media 的相对链接（节点自身及子孙节点）"""
+        for token, entry in self._nodes.items():
+            path = entry["path"]
+            if "md" not in entry["formats"] or not (path == stem or path.startswith(stem + "/")):
+                continue
+            md_path = self._absolute(f"{path}.md")
+            if not os.path.isfile(md_path):
+                continue
+            prefix = "../" * path.count("/") + MEDIA_DIR_NAME + "/"
+            with open(md_path, "r", encoding="utf-8") as f:
+                content = f.read()
+            updated = _MEDIA_LINK.sub(prefix, content)
+            if updated != content:
+                tmp_path = md_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(updated)
+                os.replace(tmp_path, md_path)
+                self._rewritten.add(token)
+
+    def _drop_parked(self):
+        """删除本次没有出现的暂存节点（页面已删除或不在导出范围内）（调用方持有锁）"""
+        prefix = PARKING_DIR_NAME + "/"
+        for token in [token for token, entry in self._nodes.items() if entry["path"].startswith(prefix)]:
+            self._release(self._nodes.pop(token)["path"], token)
+        parking_dir = self._absolute(PARKING_DIR_NAME)
+        if os.path.isdir(parking_dir):
+            self.logger.info("🗑️ 删除已不在Wiki中的旧文件")
+            shutil.rmtree(parking_dir, ignore_errors=True)
+
+    def _drop_unseen(self):
+        """
+        删除本次没有出现的节点的文件及记录（页面已从Wiki删除），以及因此变空的目录（调用方持有锁）
+
+        只删除所在目录本次完整列出（或上级页面已删除）的节点；被过滤器剪除、没有展开的子树中的页面保留
+        """
+        unseen = sorted((token for token in self._nodes if token not in self._seen),
+                        key=lambda token: self._nodes[token]["path"].count("/"))
+        dropped = set()
+        directories = set()
+        for token in unseen:
+            parent = self._nodes[token]["path"].rpartition("/")[0]
+            if parent not in self._listed and parent not in dropped:
+                continue
+            entry = self._nodes.pop(token)
+            dropped.add(entry["path"])
+            self._release(entry["path"], token)
+            for fmt in entry["formats"]:
+                try:
+                    os.remove(self._absolute(f"{entry['path']}.{fmt}"))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.logger.warning(f"删除失败 {entry['path']}.{fmt}: {str(e)}")
+            parts = entry["path"].split("/")
+            directories.update("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+        # 先删除较深的目录，上层目录才可能变空
+        for directory in sorted(directories, key=lambda stem: stem.count("/"), reverse=True):
+            path = self._absolute(directory)
+            if os.path.isdir(path) and not os.listdir(path):
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    pass
+        if dropped:
+            self.logger.info(f"🗑️ 删除了 {len(dropped)} 个已不在Wiki中的页面")
+
+    def _compact_manifest(self, manifest_path: str):
+        """导出清单改为每个文件一条记录，路径随节点移动更新，已不存在的文件去掉"""
+        try:
+            # 同一路径先后可能属于不同节点，按（节点，格式）取最后一条
+            latest: Dict[Any, Dict[str, Any]] = {}
+            for entry in iter_manifest(manifest_path):
+                latest[(entry.get("node_token"), entry.get("format"))] = entry
+            entries: Dict[str, Dict[str, Any]] = {}
+            for entry in latest.values():
+                node = self._nodes.get(entry.get("node_token"))
+                if node is None:
+                    # 节点已删除，其原路径可能已属于其他节点
+                    continue
+                path = node["path"] + os.path.splitext(entry["path"])[1]
+                file_path = self._absolute(path)
+                if not os.path.isfile(file_path):
+                    continue
+                if entry.get("format") == "md" and entry.get("node_token") in self._rewritten:
+                    entry["size"] = os.path.getsize(file_path)
+                    entry["sha256"] = file_sha256(file_path)
+                entry["path"] = path
+                entries[path] = entry
+
+            tmp_path = manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, manifest_path)
+        except Exception as e:
+            self.logger.warning(f"整理导出清单失败: {str(e)}")
+
+    def _claim(self, stem: str, node_token: str):
+        self._owners[stem.casefold()] = node_token
+
+    def _release(self, stem: str, node_token: str):
+        if self._owners.get(stem.casefold()) == node_token:
+            del self._owners[stem.casefold()]
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _absolute(self, stem: str) -> str:
+        return os.path.join(self.root, *stem.split("/"))
+
+    def _load(self):
+        """加载索引"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._nodes = json.load(f).get("nodes", {})
+            for token, entry in self._nodes.items():
+                self._claim(entry["path"], token)
+        except Exception as e:
+            self.logger.warning(f"读取同步索引失败，将全部重新导出: {str(e)}")
+            self._nodes = {}
+            self._owners = {}
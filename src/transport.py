@@ -0,0 +1,455 @@
+"""
+HTTP传输层模块
+为同步客户端（FeishuAPI、FeishuNativeExporter）和异步导出器提供可替换的传输后端：
+- requests: 带连接池的持久会话（HTTP/1.1）
+- aiohttp: 异步连接池（HTTP/1.1）
+- http2: 基于httpx的HTTP/2客户端，所有轮询和创建请求复用少量连接
+
+所有同步后端对外表现为requests风格的接口，异常也转换为requests的异常类型；
+所有异步后端对外表现为aiohttp风格的接口，保证上层代码无需区分后端
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# HTTP/2依赖（可选）
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+TRANSPORT_BACKENDS = ("default", "requests", "aiohttp", "http2")
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve_backend(name: Optional[str]) -> str:
+    """校验并解析后端名称，HTTP/2依赖缺失时回退到默认后端"""
+    name = (name or "default").lower()
+    if name not in TRANSPORT_BACKENDS:
+        raise ValueError(f"未知的传输后端: {name}，可选: {', '.join(TRANSPORT_BACKENDS)}")
+    if name == "http2" and httpx is None:
+        logger.warning("未安装httpx[http2]，回退到默认传输后端")
+        return "default"
+    return name
+
+
+# ---------------------------------------------------------------------------
+# 同步传输
+# ---------------------------------------------------------------------------
+
+class RequestsTransport:
+    """基于requests.Session的同步传输（复用连接）"""
+
+    def __init__(self, pool_size: int = 20):
+        """
+        Args:
+            pool_size: 每个主机的连接池大小
+        """
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发起请求（参数与 requests.request 一致）"""
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class _HttpxResponse:
+    """将httpx响应适配为requests风格"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    @property
+    def text(self) -> str:
+        self.content
+        return self._response.text
+
+    @property
+    def content(self) -> bytes:
+        # 流式响应首次访问时读取（已读取时直接返回缓存）
+        with _translate_httpx_errors():
+            return self._response.read()
+
+    def json(self) -> Any:
+        self.content
+        return self._response.json()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            error = requests.HTTPError(f"HTTP {self.status_code}: {self._response.url}")
+            error.response = self
+            raise error
+
+    def iter_content(self, chunk_size: int = 8192):
+        with _translate_httpx_errors():
+            for chunk in self._response.iter_bytes(chunk_size):
+                yield chunk
+
+    def close(self):
+        self._response.close()
+
+
+class _translate_httpx_errors:
+    """将httpx异常转换为requests异常，保持上层重试逻辑不变"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_val is None or httpx is None:
+            return False
+        if isinstance(exc_val, httpx.TimeoutException):
+            raise requests.exceptions.Timeout(str(exc_val)) from exc_val
+        if isinstance(exc_val, httpx.TransportError):
+            raise requests.exceptions.ConnectionError(str(exc_val)) from exc_val
+        if isinstance(exc_val, httpx.HTTPError):
+            raise requests.RequestException(str(exc_val)) from exc_val
+        return False
+
+
+class Http2Transport:
+    """基于httpx的同步HTTP/2传输（多路复用）"""
+
+    def __init__(self, max_connections: int = 4, prior_knowledge: bool = False):
+        """
+        Args:
+            max_connections: 最大连接数（HTTP/2下每个连接可承载大量并发流）
+            prior_knowledge: 明文连接直接使用HTTP/2（h2c，用于本地模拟服务）
+        """
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = httpx.Client(http2=True, http1=not prior_knowledge, limits=limits)
+
+    def request(self, method: str, url: str, headers: Dict[str, str] = None, params: dict = None,
+                json: Any = None, timeout: float = None, stream: bool = False) -> _HttpxResponse:
+        """发起请求（参数与 requests.request 的常用子集一致）"""
+        with _translate_httpx_errors():
+            request = self.client.build_request(
+                method, url, headers=headers, params=params, json=json,
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+            )
+            response = self.client.send(request, stream=stream)
+            return _HttpxResponse(response)
+
+    def get(self, url: str, **kwargs) -> _HttpxResponse:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> _HttpxResponse:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+
+def create_sync_transport(name: str = None, pool_size: int = 20):
+    """
+    创建同步传输
+
+    Args:
+        name: 后端名称（default/requests/aiohttp 均使用requests，http2 使用httpx）
+        pool_size: 连接池大小
+
+    Returns:
+        requests风格的传输对象
+    """
+    name = _resolve_backend(name)
+    if name == "http2":
+        return Http2Transport()
+    return RequestsTransport(pool_size)
+
+
+# ---------------------------------------------------------------------------
+# 异步传输
+# ---------------------------------------------------------------------------
+
+class _RequestContext:
+    """同时支持 `await transport.get(...)` 和 `async with transport.get(...)` 的请求对象"""
+
+    def __init__(self, coro):
+        self._coro = coro
+        self._response = None
+
+    def __await__(self):
+        return self._coro.__await__()
+
+    async def __aenter__(self):
+        self._response = await self._coro
+        return self._response
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._response is None:
+            return
+        if hasattr(self._response, "aclose"):
+            await self._response.aclose()
+        else:
+            self._response.release()
+
+
+class AiohttpTransport:
+    """基于aiohttp的异步传输"""
+
+    def __init__(self, headers: Dict[str, str] = None, limit: int = 50, limit_per_host: int = 20):
+        """
+        Args:
+            headers: 默认请求头
+            limit: 最大连接数
+            limit_per_host: 每个主机最大连接数
+        """
+        # 创建连接池 - 允许更多并发连接
+        self.connector = aiohttp.TCPConnector(
+            limit=limit,  # 最大连接数
+            limit_per_host=limit_per_host,  # 每个主机最大连接数
+            ttl_dns_cache=300,  # DNS缓存时间
+            force_close=False,  # 保持连接
+            enable_cleanup_closed=True
+        )
+
+        # 创建会话 - 配置超时
+        timeout = aiohttp.ClientTimeout(
+            total=120,  # 总超时
+            connect=10,  # 连接超时
+            sock_read=30  # 读取超时
+        )
+
+        self.session = aiohttp.ClientSession(connector=self.connector, timeout=timeout, headers=headers)
+
+    def get(self, url: str, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.session.post(url, **kwargs)
+
+    async def close(self):
+        await self.session.close()
+        await self.connector.close()
+
+
+class _AsyncStream:
+    """aiohttp风格的 response.content"""
+
+    def __init__(self, iter_chunks):
+        self._iter_chunks = iter_chunks
+
+    def iter_chunked(self, size: int):
+        return self._iter_chunks(size)
+
+
+class _translate_async_httpx_errors:
+    """将httpx异常转换为aiohttp风格的异常（超时为 asyncio.TimeoutError），保持对冲和分段下载的重试逻辑不变"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_val is None or httpx is None:
+            return False
+        if isinstance(exc_val, httpx.TimeoutException):
+            raise asyncio.TimeoutError(str(exc_val)) from exc_val
+        if isinstance(exc_val, httpx.TransportError):
+            error = aiohttp.ClientConnectionError if aiohttp is not None else ConnectionError
+            raise error(str(exc_val)) from exc_val
+        if isinstance(exc_val, httpx.HTTPError):
+            error = aiohttp.ClientError if aiohttp is not None else OSError
+            raise error(str(exc_val)) from exc_val
+        return False
+
+
+class _AsyncHttpxResponse:
+    """将httpx异步响应适配为aiohttp风格"""
+
+    def __init__(self, response, closing: set):
+        """
+        Args:
+            response: httpx流式响应
+            closing: 传输中尚未完成的关闭任务（release 调度的关闭在传输关闭时等待完成）
+        """
+        self._response = response
+        self._closing = closing
+        self.status = response.status_code
+        self.headers = response.headers
+        self.content = _AsyncStream(self._iter_chunks)
+
+    async def json(self) -> Any:
+        with _translate_async_httpx_errors():
+            await self._response.aread()
+        return self._response.json()
+
+    async def text(self) -> str:
+        with _translate_async_httpx_errors():
+            await self._response.aread()
+        return self._response.text
+
+    async def read(self) -> bytes:
+        with _translate_async_httpx_errors():
+            return await self._response.aread()
+
+    async def _iter_chunks(self, size: int):
+        with _translate_async_httpx_errors():
+            async for chunk in self._response.aiter_bytes(size):
+                yield chunk
+
+    async def aclose(self):
+        """关闭响应（释放HTTP/2流）"""
+        await self._response.aclose()
+
+    def release(self):
+        # aiohttp的release是同步的，这里调度异步关闭并保留任务，传输关闭时等待完成
+        if self._response.is_closed:
+            return
+        task = asyncio.ensure_future(self._response.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closed)
+
+    def _closed(self, task: asyncio.Task):
+        self._closing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"关闭响应失败: {task.exception()}")
+
+
+class AsyncHttp2Transport:
+    """基于httpx的异步HTTP/2传输，所有请求复用少量多路复用连接"""
+
+    def __init__(self, headers: Dict[str, str] = None, max_connections: int = 4,
+                 prior_knowledge: bool = False):
+        """
+        Args:
+            headers: 默认请求头
+            max_connections: 最大连接数
+            prior_knowledge: 明文连接直接使用HTTP/2（h2c，用于本地模拟服务）
+        """
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        timeout = httpx.Timeout(120, connect=10, read=30)
+        self.client = httpx.AsyncClient(http2=True, http1=not prior_knowledge, limits=limits,
+                                        timeout=timeout, headers=headers)
+        self._closing = set()  # release 调度的响应关闭任务
+
+    async def _send(self, method: str, url: str, params: dict = None, json: Any = None,
+                    headers: Dict[str, str] = None) -> _AsyncHttpxResponse:
+        request = self.client.build_request(method, url, params=params, json=json, headers=headers)
+        with _translate_async_httpx_errors():
+            response = await self.client.send(request, stream=True)
+        return _AsyncHttpxResponse(response, self._closing)
+
+    def get(self, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self._send("GET", url, **kwargs))
+
+    def post(self, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self._send("POST", url, **kwargs))
+
+    async def close(self):
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        await self.client.aclose()
+
+
+class _AsyncThreadedResponse:
+    """将同步响应适配为aiohttp风格（读取在线程池中执行）"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status = response.status_code
+        self.headers = response.headers
+        self.content = _AsyncStream(self._iter_chunks)
+
+    async def json(self) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, self._response.json)
+
+    async def text(self) -> str:
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: self._response.text)
+
+    async def read(self) -> bytes:
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: self._response.content)
+
+    async def _iter_chunks(self, size: int):
+        loop = asyncio.get_running_loop()
+        iterator = self._response.iter_content(chunk_size=size)
+        while True:
+            chunk = await loop.run_in_executor(None, next, iterator, None)
+            if chunk is None:
+                break
+            if chunk:
+                yield chunk
+
+    def release(self):
+        self._response.close()
+
+
+class AsyncThreadedTransport:
+    """在线程池中运行同步传输，供异步导出器使用requests后端"""
+
+    def __init__(self, transport, headers: Dict[str, str] = None, timeout: int = 30):
+        """
+        Args:
+            transport: 同步传输对象
+            headers: 默认请求头
+            timeout: 单次请求超时
+        """
+        self.transport = transport
+        self.headers = headers or {}
+        self.timeout = timeout
+
+    async def _send(self, method: str, url: str, params: dict = None, json: Any = None,
+                    headers: Dict[str, str] = None) -> _AsyncThreadedResponse:
+        merged = dict(self.headers)
+        merged.update(headers or {})
+
+        def send():
+            return self.transport.request(method, url, headers=merged, params=params, json=json,
+                                          timeout=self.timeout, stream=True)
+
+        try:
+            response = await asyncio.get_running_loop().run_in_executor(None, send)
+        except requests.exceptions.Timeout as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        return _AsyncThreadedResponse(response)
+
+    def get(self, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self._send("GET", url, **kwargs))
+
+    def post(self, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self._send("POST", url, **kwargs))
+
+    async def close(self):
+        pass
+
+
+def create_async_transport(name: str = None, headers: Dict[str, str] = None, sync_transport=None):
+    """
+    创建异步传输（需在事件循环中调用）
+
+    Args:
+        name: 后端名称（default/aiohttp 使用aiohttp，http2 使用httpx，requests 使用线程池中的同步会话）
+        headers: 默认请求头
+        sync_transport: requests后端复用的同步传输
+
+    Returns:
+        aiohttp风格的传输对象
+    """
+    name = _resolve_backend(name)
+    if name == "http2":
+        return AsyncHttp2Transport(headers)
+    if name == "requests":
+        return AsyncThreadedTransport(sync_transport or RequestsTransport(), headers)
+    return AiohttpTransport(headers)
@@ -8,23 +8,66 @@ import time
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 from feishu_api import FeishuAPI
+from node_filter import NodeFilter
+from export_stats import get_default_stats
+from block_converter import MD_SOURCE_BLOCKS, MD_SOURCES, export_document_markdown
+from media_fetcher import MediaFetcher
+from content_store import content_store_from_config
+from export_cache import export_cache_from_config
+from path_planner import PathPlanner
+from local_renderer import LocalRenderer, normalize_render_modes, split_formats
+from render_service import RenderService
+from output_sink import (META_SOURCE_VERSION, OutputSink, create_output_sink, document_metadata,
+                         export_name, normalize_output_config, output_export_formats)
 
 
 class WikiCrawler:
     """Wiki批量爬取器"""
     
-    def __init__(self, api: FeishuAPI, export_formats: List[str] = None):
+    def __init__(self, api: FeishuAPI, export_formats: List[str] = None, node_filter: NodeFilter = None,
+                 md_source: str = MD_SOURCE_BLOCKS, media: Dict[str, Any] = None,
+                 render_modes: Dict[str, str] = None, render_processes: Optional[int] = None,
+                 output: Dict[str, Any] = None, export_cache: Dict[str, Any] = None,
+                 content_store: Dict[str, Any] = None, rate_limits: Dict[str, float] = None):
         """
         初始化Wiki爬取器
         
         Args:
             api: FeishuAPI实例
             export_formats: 导出格式列表，如 ['md', 'docx', 'pdf']
+            node_filter: 节点过滤器（可选），在遍历时剪除子树和跳过文档
+            md_source: Markdown内容来源（'blocks' 文档块 / 'raw' 纯文本）
+            media: 图片/附件下载配置（可选），如 {"enabled": true, "max_cache_mb": 2048}
+            render_modes: PDF/Word的渲染方式（可选），如 {"pdf": "local", "docx": "server"}
+            render_processes: 本地渲染的进程数（None为按CPU核数，0为在线程中渲染）
+            output: 输出目标配置（可选），如 {"format": "zip"}
+            export_cache: 原生导出缓存配置（可选），如 {"enabled": true, "max_cache_mb": 4096}
+            content_store: 文档内容存储配置（可选），如 {"enabled": true, "max_cache_mb": 1024}
+            rate_limits: 各接口频控（次/分钟），覆盖默认值（素材下载与导出共用）
         """
+        if md_source not in MD_SOURCES:
+            raise ValueError(f"未知的Markdown内容来源: {md_source}")
+        self.render_modes = normalize_render_modes(render_modes)
+        self.output = normalize_output_config(output)
+        self.export_cache = export_cache_from_config(export_cache)
+        self.content_store = content_store_from_config(content_store)
         self.api = api
         self.logger = logging.getLogger(__name__)
         self.crawled_nodes = set()  # 记录已爬取的节点，避免重复
-        self.export_formats = export_formats or ['md']
+        self.export_formats = output_export_formats(self.output, export_formats or ['md'])
+        self.node_filter = node_filter
+        self.md_source = md_source
+        self.media = media
+        self.rate_limits = rate_limits
+        self.media_fetcher: Optional[MediaFetcher] = None
+        self.local_formats, self.native_formats = split_formats(self.export_formats, self.render_modes)
+        self.render_processes = render_processes
+        self.render_service: Optional[RenderService] = None
+        self.sink: Optional[OutputSink] = None
+        self.path_planner = PathPlanner()
+        self.listing_calls = 0  # 子节点列表请求次数（用于统计）
+        self.traversal_errors = 0  # 因出错没有遍历到的子树数（列出子节点失败等；不为0时同步目录保留未出现的页面）
+        self.partial_listings = set()  # 子节点没有完整列出的父节点token（列出失败或有节点被剪除，根为None）
     
     def extract_space_id_from_link(self, wiki_link: str) -> Optional[str]:
         """
@@ -117,16 +160,56 @@ class WikiCrawler:
             self.logger.error(f"获取space信息异常: {str(e)}")
             return None
     
-    def get_child_nodes(self, space_id: str, parent_node_token: str = None) -> List[Dict[str, Any]]:
+    def resolve_space_id(self, wiki_link: str, log_progress=None) -> Tuple[Optional[str], str]:
+        """
+        解析Wiki链接得到space_id（必要时通过wiki_token查询）
+        
+        Args:
+            wiki_link: Wiki链接
+            log_progress: 进度回调函数 callback(message)
+            
+        Returns:
+            (space_id, 错误信息)
+        """
+        log_progress = log_progress or self.logger.info
+        
+        log_progress("📋 正在解析Wiki链接...")
+        space_id = self.extract_space_id_from_link(wiki_link)
+        
+        if not space_id:
+            return (None, "无法解析Wiki链接，请确认链接格式正确")
+        
+        # 判断是space_id还是wiki_token
+        if space_id.isdigit():
+            # 已经是space_id（纯数字），直接使用
+            log_progress(f"✅ Space ID: {space_id} (从链接直接获取)")
+        else:
+            # 是wiki_token，需要通过API获取space_id
+            log_progress(f"📝 Wiki Token: {space_id}")
+            log_progress("🔍 正在通过Token获取Space ID...")
+            wiki_token = space_id
+            space_id = self.get_wiki_space_info(wiki_token)
+            
+            if not space_id:
+                return (None, "无法获取Wiki空间ID，可能是权限不足或Wiki不存在")
+            
+            log_progress(f"✅ Space ID: {space_id}")
+        
+        return (space_id, "")
+    
+    def get_child_nodes(self, space_id: str, parent_node_token: str = None,
+                        parent_path: str = "", depth: int = 0) -> List[Dict[str, Any]]:
         """
         获取子节点列表
         
         Args:
             space_id: 知识空间ID
             parent_node_token: 父节点token，为None时获取根节点
+            parent_path: 父节点标题路径（用于过滤）
+            depth: 子节点所在层级（根节点为0）
             
         Returns:
-            子节点列表
+            子节点列表（已剔除被过滤器剪除的节点）
         """
         if not self.api.access_token:
             self.logger.error("请先获取access_token")
@@ -156,9 +239,12 @@ class WikiCrawler:
                 
                 self.logger.info(f"正在获取子节点列表: parent={parent_node_token or 'root'}")
                 response = self.api._make_request('GET', url, headers=headers, params=params)
+                self.listing_calls += 1
                 
                 if not response or response.get("code") != 0:
                     self.logger.error(f"获取子节点失败: {response.get('msg') if response else 'No response'}")
+                    self.traversal_errors += 1
+                    self.partial_listings.add(parent_node_token)
                     break
                 
                 data = response.get("data", {})
@@ -173,13 +259,64 @@ class WikiCrawler:
                 time.sleep(0.5)  # 避免请求过快
             
             self.logger.info(f"获取到 {len(all_nodes)} 个子节点")
-            return all_nodes
+            kept = self._prune_nodes(all_nodes, parent_path, depth)
+            if len(kept) < len(all_nodes):
+                self.partial_listings.add(parent_node_token)
+            return kept
             
         except Exception as e:
             self.logger.error(f"获取子节点异常: {str(e)}")
+            self.traversal_errors += 1
+            self.partial_listings.add(parent_node_token)
             return []
     
-    def crawl_node(self, node: Dict[str, Any], base_path: str, space_id: str, level: int = 0) -> int:
+    def _prune_nodes(self, nodes: List[Dict[str, Any]], parent_path: str, depth: int) -> List[Dict[str, Any]]:
+        """
+        剔除被过滤器整体剪除的节点（不导出、不遍历子树）
+        
+        Args:
+            nodes: 子节点列表
+            parent_path: 父节点标题路径
+            depth: 子节点所在层级
+            
+        Returns:
+            保留的节点列表
+        """
+        if not self.node_filter:
+            return nodes
+        
+        kept = []
+        for node in nodes:
+            path = NodeFilter.join_path(parent_path, node.get("title"))
+            reason = self.node_filter.prune_reason(node, path, depth)
+            if reason:
+                self.logger.info(f"{'  ' * depth}⏭️ 跳过子树: {path} ({reason})")
+                continue
+            kept.append(node)
+        return kept
+    
+    def _should_export_node(self, node: Dict[str, Any], path: str, level: int) -> bool:
+        """文档节点是否需要导出"""
+        if not self.node_filter:
+            return True
+        reason = self.node_filter.export_skip_reason(node, path, level)
+        if reason:
+            self.logger.info(f"{'  ' * level}⏭️ 跳过文档: {path} ({reason})")
+            return False
+        return True
+    
+    def _should_descend_node(self, node: Dict[str, Any], path: str, level: int) -> bool:
+        """是否需要获取节点的子节点"""
+        if not self.node_filter:
+            return True
+        reason = self.node_filter.descend_skip_reason(node, path, level)
+        if reason:
+            self.logger.info(f"{'  ' * level}⏭️ 不展开目录: {path} ({reason})")
+            return False
+        return True
+    
+    def crawl_node(self, node: Dict[str, Any], base_path: str, space_id: str, level: int = 0,
+                   parent_path: str = "") -> int:
         """
         递归爬取节点及其子节点
         
@@ -188,6 +325,7 @@ class WikiCrawler:
             base_path: 保存基础路径
             space_id: Wiki空间ID
             level: 当前层级
+            parent_path: 父节点标题路径（用于过滤）
             
         Returns:
             爬取的文档数量
@@ -207,59 +345,66 @@ class WikiCrawler:
         self.crawled_nodes.add(node_token)
         count = 0
         
-        # 清理文件名
-        safe_title = self._sanitize_filename(title)
+        # 规划好的文件名（子节点列出时已分配）
+        safe_title = self.path_planner.name(node)
+        node_path = NodeFilter.join_path(parent_path, title)
         
         # 如果是文档类型，下载内容
         # node_type可能是空的，也可以检查obj_type
-        if node_type in ["doc", "docx"] or obj_type in ["doc", "docx"]:
+        is_document = node_type in ["doc", "docx"] or obj_type in ["doc", "docx"]
+        export_document = is_document and self._should_export_node(node, node_path, level)
+        if export_document and self._is_unchanged(node, base_path, safe_title):
+            self.logger.info(f"{'  ' * level}⏭️ 未修改，跳过: {title}")
+            count += 1
+        elif export_document:
             self.logger.info(f"{'  ' * level}📄 爬取文档: {title}")
+            metadata = document_metadata(node)
             
             # 标记是否成功导出了至少一种格式
             exported_any = False
             
-            # 获取文档内容（仅用于Markdown导出）
-            # 注意：旧版文档（doc）可能无法获取内容，但仍可以导出PDF/Word
-            content = None
-            if 'md' in self.export_formats:
-                content = self.api.get_document_content(node_token)
+            # 本地渲染：一次获取内容，同时生成Markdown和本地渲染的PDF/Word
+            if self.local_formats:
+                if self._render_local(obj_token or node_token, title, base_path, safe_title, level, metadata):
+                    exported_any = True
             
-            # Markdown需要文档内容
-            if 'md' in self.export_formats:
-                if content:
-                    from document_converter import DocumentConverter
-                    converter = DocumentConverter()
-                    metadata = {"title": title}
-                    markdown_text = converter.to_markdown(content, metadata)
-                    file_path = os.path.join(base_path, f"{safe_title}.md")
-                    self._save_markdown(file_path, markdown_text)
+            # Markdown需要文档内容（流式获取并边解析边写入）
+            # 注意：旧版文档（doc）可能无法获取内容，但仍可以导出PDF/Word
+            elif 'md' in self.export_formats:
+                md_start = time.time()
+                file_path = os.path.join(base_path, f"{safe_title}.md")
+                if self._export_markdown(obj_token or node_token, title, file_path, node.get("obj_edit_time")):
+                    get_default_stats().record('md', time.time() - md_start, obj_token or node_token)
+                    self._commit_outputs(base_path, safe_title, ['md'], metadata)
                     self.logger.info(f"{'  ' * level}✅ 已保存MD: {safe_title}.md")
                     exported_any = True
                 else:
                     self.logger.warning(f"{'  ' * level}⚠️ 无法导出Markdown（获取内容失败）")
             
             # Word和PDF使用飞书原生API导出（不需要预先获取内容）
-            native_formats = [fmt for fmt in self.export_formats if fmt in ['docx', 'pdf']]
+            native_formats = self.native_formats
             
             if native_formats:
                 from feishu_native_exporter import FeishuNativeExporter
-                exporter = FeishuNativeExporter(self.api)
+                exporter = FeishuNativeExporter(self.api, cache=self.export_cache)
                 
                 # 使用obj_token进行导出（这是Wiki节点对应的文档token）
                 export_token = obj_token if obj_token else node_token
                 export_type = obj_type if obj_type else (node_type or "docx")
                 
                 # 🚀 批量导出（并行处理）- 同时创建所有任务
-                os.makedirs(base_path, exist_ok=True)
                 results = exporter.export_document_batch(
                     export_token, 
                     export_type, 
                     native_formats, 
                     base_path, 
-                    safe_title
+                    safe_title,
+                    node.get("obj_edit_time")
                 )
                 
                 # 处理结果
+                self._commit_outputs(base_path, safe_title, [fmt for fmt, (success, _) in results.items() if success],
+                                     metadata)
                 for fmt, (success, error) in results.items():
                     if success:
                         self.logger.info(f"{'  ' * level}✅ 已保存{fmt.upper()} (原生): {safe_title}.{fmt}")
@@ -274,20 +419,22 @@ class WikiCrawler:
                 self.logger.warning(f"{'  ' * level}⚠️ 所有格式导出失败: {title}")
         
         # 如果有子节点，递归爬取
-        if has_child:
+        if has_child and self._should_descend_node(node, node_path, level):
             self.logger.info(f"{'  ' * level}📁 进入目录: {title}")
             
-            # 创建子目录
-            sub_dir = os.path.join(base_path, safe_title)
-            os.makedirs(sub_dir, exist_ok=True)
-            
             # 获取子节点
-            child_nodes = self.get_child_nodes(space_id, node_token)
+            child_nodes = self.get_child_nodes(space_id, node_token, node_path, level + 1)
+            
+            # 为子节点分配文件名并创建子目录
+            sub_dir = os.path.join(base_path, safe_title)
+            self.path_planner.plan(sub_dir, child_nodes, complete=node_token not in self.partial_listings)
             
             # 递归爬取每个子节点
             for child in child_nodes:
-                count += self.crawl_node(child, sub_dir, space_id, level + 1)
+                count += self.crawl_node(child, sub_dir, space_id, level + 1, node_path)
                 time.sleep(0.5)  # 避免请求过快
+        elif has_child:
+            self.path_planner.skip(os.path.join(base_path, safe_title))
         
         return count
     
@@ -310,39 +457,26 @@ class WikiCrawler:
         
         try:
             # 提取space_id或wiki_token
-            log_progress("📋 正在解析Wiki链接...")
-            space_id = self.extract_space_id_from_link(wiki_link)
-            
+            space_id, error = self.resolve_space_id(wiki_link, log_progress)
             if not space_id:
-                return (0, "无法解析Wiki链接，请确认链接格式正确")
-            
-            # 判断是space_id还是wiki_token
-            if space_id.isdigit():
-                # 已经是space_id（纯数字），直接使用
-                log_progress(f"✅ Space ID: {space_id} (从链接直接获取)")
-            else:
-                # 是wiki_token，需要通过API获取space_id
-                log_progress(f"📝 Wiki Token: {space_id}")
-                log_progress("🔍 正在通过Token获取Space ID...")
-                wiki_token = space_id
-                space_id = self.get_wiki_space_info(wiki_token)
-                
-                if not space_id:
-                    return (0, "无法获取Wiki空间ID，可能是权限不足或Wiki不存在")
-                
-                log_progress(f"✅ Space ID: {space_id}")
+                return (0, error)
             
-            # 创建输出目录
-            output_dir = os.path.join(save_path, f"Wiki导出_{int(time.time())}")
-            os.makedirs(output_dir, exist_ok=True)
-            log_progress(f"📁 输出目录: {output_dir}")
+            # 创建输出目标（目录、归档或对象存储）
+            self._open_output(save_path, space_id)
+            output_dir, location = self.sink.root, self.sink.location
+            log_progress(f"📁 输出位置: {location}")
+            self._open_resources(output_dir)
             
             # 获取根节点列表（不指定parent_node_token获取所有根节点）
             log_progress("📥 正在获取文档列表...")
+            self.traversal_errors = 0
+            self.partial_listings.clear()
             root_nodes = self.get_child_nodes(space_id, None)
             
             if not root_nodes:
+                self._close_resources(complete=False)
                 return (0, "未找到任何文档。可能原因：\n1. 该Wiki为空\n2. 权限不足\n3. Space ID不正确")
+            self.path_planner.plan(output_dir, root_nodes, complete=None not in self.partial_listings)
             
             log_progress(f"📊 找到 {len(root_nodes)} 个根节点")
             
@@ -358,9 +492,14 @@ class WikiCrawler:
                 total_count += count
                 time.sleep(0.5)
             
+            finished = self._close_resources()
+            get_default_stats().save()
+            if not finished:
+                return (total_count, f"完成输出失败: {location}")
+            
             if total_count > 0:
                 log_progress(f"🎉 爬取完成！共导出 {total_count} 篇文档")
-                log_progress(f"📂 保存位置: {output_dir}")
+                log_progress(f"📂 保存位置: {location}")
                 return (total_count, "")
             else:
                 return (0, "没有成功导出任何文档，请检查权限和文档类型")
@@ -370,22 +509,118 @@ class WikiCrawler:
             error_msg = f"爬取过程出错: {str(e)}"
             self.logger.error(traceback.format_exc())
             log_progress(f"❌ {error_msg}")
+            self._close_resources(complete=False)
             return (0, error_msg)
     
-    def _sanitize_filename(self, filename: str) -> str:
-        """清理文件名中的非法字符"""
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            filename = filename.replace(char, '_')
+    def _export_markdown(self, document_id: str, title: str, file_path: str, revision: str = None) -> bool:
+        """
+        获取文档内容并保存为Markdown（边获取边写入）
         
-        # 移除前后空格
-        filename = filename.strip()
+        Returns:
+            是否成功
+        """
+        return export_document_markdown(self.api, document_id, file_path, title, self.md_source,
+                                        media=self.media_fetcher, content_store=self.content_store,
+                                        revision=revision)
+    
+    def _render_local(self, document_id: str, title: str, base_path: str, safe_title: str, level: int,
+                      metadata: Dict[str, str] = None) -> bool:
+        """
+        获取一次文档内容，生成Markdown（如需要）和本地渲染的PDF/Word
         
-        # 限制长度
-        if len(filename) > 100:
-            filename = filename[:100]
+        Returns:
+            是否至少成功生成了一种格式
+        """
+        formats = (['md'] if 'md' in self.export_formats else []) + self.local_formats
+        renderer = LocalRenderer(self.api, self.md_source, self.media_fetcher,
+                                 render_service=self.render_service, sink=self.sink,
+                                 content_store=self.content_store)
+        results = renderer.render(document_id, title, base_path, safe_title, formats, metadata)
+        
+        exported_any = False
+        for fmt, (success, error) in results.items():
+            if success:
+                self.logger.info(f"{'  ' * level}✅ 已保存{fmt.upper()} (本地): {safe_title}.{fmt}")
+                exported_any = True
+            else:
+                self.logger.warning(f"{'  ' * level}⚠️ 生成{fmt.upper()}失败: {error}")
+        return exported_any
+    
+    def _open_output(self, save_path: str, space_id: str):
+        """创建本次导出的输出目标（目录、归档或对象存储）和路径规划"""
+        self.sink = create_output_sink(save_path, export_name(self.output, space_id), self.output)
+        self.path_planner = PathPlanner(self.sink.sync_index)
+    
+    def _commit_outputs(self, base_path: str, safe_title: str, formats: List[str],
+                        metadata: Dict[str, str] = None):
+        """
+        文档的文件已生成，提交给输出目标（归档、对象存储模式下写入后删除本地文件）
         
-        return filename or "未命名"
+        Args:
+            base_path: 保存目录
+            safe_title: 文件名（不含扩展名）
+            formats: 成功生成的格式
+            metadata: 文档元数据（可选）
+        """
+        if self.sink is not None and formats:
+            self.sink.commit([os.path.join(base_path, f"{safe_title}.{fmt}") for fmt in formats], metadata)
+    
+    def _is_unchanged(self, node: Dict[str, Any], base_path: str, safe_title: str) -> bool:
+        """
+        输出目标中该文档的所有格式是否已是当前版本（增量导出到对象存储时跳过未修改的文档）
+        
+        Args:
+            node: 节点信息
+            base_path: 保存目录
+            safe_title: 文件名（不含扩展名）
+        """
+        version = document_metadata(node).get(META_SOURCE_VERSION)
+        if self.sink is None or not version:
+            return False
+        return self.sink.is_current(
+            [os.path.join(base_path, f"{safe_title}.{fmt}") for fmt in self.export_formats], version
+        )
+    
+    def _open_resources(self, output_dir: str):
+        """创建本次导出共用的素材下载器（语料输出不需要）和渲染进程池"""
+        if (('md' in self.export_formats or self.local_formats) and self.md_source == MD_SOURCE_BLOCKS
+                and not self.sink.text_only):
+            self.media_fetcher = MediaFetcher.from_config(
+                self.api, output_dir, self.media, self.rate_limits
+            )
+        if self.local_formats and self.render_processes != 0:
+            self.render_service = RenderService(self.render_processes)
+            self.render_service.warmup()
+    
+    def _close_resources(self, complete: bool = True) -> bool:
+        """
+        等待素材下载完成、保存素材、导出缓存和内容存储的索引，关闭渲染进程池并完成输出（归档模式下写入索引）
+
+        Args:
+            complete: 导出是否正常结束；为False时放弃输出（保留未完成的归档，不上传导出清单）
+
+        Returns:
+            输出是否已完成
+        """
+        if self.export_cache is not None:
+            self.export_cache.save()
+        if self.content_store is not None:
+            self.content_store.save()
+        if self.media_fetcher is not None:
+            self.media_fetcher.close()
+            self.media_fetcher = None
+        if self.render_service is not None:
+            self.render_service.shutdown()
+            self.render_service = None
+        finished = complete
+        if self.sink is not None:
+            if complete:
+                self.sink.partial = self.traversal_errors > 0
+                finished = self.sink.close()
+            else:
+                self.sink.abort()
+            self.sink = None
+        return finished
     
     def _save_markdown(self, file_path: str, content: str):
         """保存Markdown文件"""
@@ -16,7 +16,11 @@ class WikiWorkerThread(QThread):
     
     def __init__(self, app_id: str, app_secret: str, wiki_link: str, save_path: str, 
                  export_formats: list = None, use_parallel: bool = True, max_workers: int = 3,
-                 turbo_mode: bool = False):
+                 turbo_mode: bool = False, node_filter=None, plan_only: bool = False,
+                 rate_limits: dict = None, hedging: dict = None, transport: str = None,
+                 md_source: str = None, media: dict = None, render_modes: dict = None,
+                 render_processes: int = None, output: dict = None, export_cache: dict = None,
+                 content_store: dict = None):
         super().__init__()
         self.app_id = app_id
         self.app_secret = app_secret
@@ -26,13 +30,25 @@ class WikiWorkerThread(QThread):
         self.use_parallel = use_parallel
         self.max_workers = max_workers
         self.turbo_mode = turbo_mode
+        self.node_filter = node_filter  # 节点过滤器（可选）
+        self.plan_only = plan_only  # 预估模式：只遍历不导出
+        self.rate_limits = rate_limits  # 接口频控
+        self.hedging = hedging  # 请求对冲配置
+        self.transport = transport  # HTTP传输后端
+        self.md_source = md_source or "blocks"  # Markdown内容来源
+        self.media = media  # 图片/附件下载配置
+        self.render_modes = render_modes  # PDF/Word渲染方式（服务端/本地）
+        self.render_processes = render_processes  # 本地渲染进程数
+        self.output = output  # 输出目标（目录/归档/对象存储）
+        self.export_cache = export_cache  # 原生导出缓存配置
+        self.content_store = content_store  # 文档内容存储配置
     
     def run(self):
         """执行Wiki批量爬取任务"""
         try:
             # 初始化API客户端
             self.log_signal.emit("🚀 初始化飞书API客户端...")
-            api = FeishuAPI(self.app_id, self.app_secret)
+            api = FeishuAPI(self.app_id, self.app_secret, transport=self.transport)
             self.progress_signal.emit(10)
             
             # 获取access_token
@@ -43,19 +59,49 @@ class WikiWorkerThread(QThread):
                 return
             self.progress_signal.emit(20)
             
+            if self.plan_only:
+                self._run_plan(api)
+                return
+            
             # 初始化Wiki爬取器
             if self.turbo_mode:
                 # 极速模式 - 使用异步爬取器
                 from async_exporter import AsyncParallelWikiCrawler
-                crawler = AsyncParallelWikiCrawler(api, self.export_formats, self.max_workers)
+                crawler = AsyncParallelWikiCrawler(api, self.export_formats, self.max_workers,
+                                                   node_filter=self.node_filter,
+                                                   rate_limits=self.rate_limits,
+                                                   hedging=self.hedging,
+                                                   md_source=self.md_source,
+                                                   media=self.media,
+                                                   render_modes=self.render_modes,
+                                                   render_processes=self.render_processes,
+                                                   output=self.output,
+                                                   export_cache=self.export_cache,
+                                                   content_store=self.content_store)
                 self.log_signal.emit(f"🚀 极速模式 (并发数: {self.max_workers})")
             elif self.use_parallel:
                 from parallel_crawler import ParallelWikiCrawler
-                crawler = ParallelWikiCrawler(api, self.export_formats, self.max_workers)
+                crawler = ParallelWikiCrawler(api, self.export_formats, self.max_workers,
+                                              node_filter=self.node_filter,
+                                              rate_limits=self.rate_limits,
+                                              md_source=self.md_source,
+                                              media=self.media,
+                                              render_modes=self.render_modes,
+                                              render_processes=self.render_processes,
+                                              output=self.output,
+                                              export_cache=self.export_cache,
+                                              content_store=self.content_store)
                 self.log_signal.emit(f"⚡ 并行模式 (并行数: {self.max_workers})")
             else:
                 from wiki_crawler import WikiCrawler
-                crawler = WikiCrawler(api, self.export_formats)
+                crawler = WikiCrawler(api, self.export_formats, node_filter=self.node_filter,
+                                      rate_limits=self.rate_limits,
+                                      md_source=self.md_source, media=self.media,
+                                      render_modes=self.render_modes,
+                                      render_processes=self.render_processes,
+                                      output=self.output,
+                                      export_cache=self.export_cache,
+                                      content_store=self.content_store)
                 self.log_signal.emit("📊 串行模式")
             
             self.progress_signal.emit(30)
@@ -78,3 +124,30 @@ class WikiWorkerThread(QThread):
         except Exception as e:
             self.log_signal.emit(f"❌ 错误: {str(e)}")
             self.finished_signal.emit(False, f"发生错误: {str(e)}")
+    
+    def _run_plan(self, api: FeishuAPI):
+        """执行预估模式：只遍历Wiki并输出开销预估"""
+        from export_planner import ExportPlanner, format_plan_report
+        
+        planner = ExportPlanner(
+            api, self.export_formats, self.node_filter,
+            max_workers=self.max_workers, rate_limits=self.rate_limits,
+            md_source=self.md_source, render_modes=self.render_modes,
+            output=self.output, save_path=self.save_path
+        )
+        self.progress_signal.emit(30)
+        
+        plan, error = planner.plan_wiki(self.wiki_link, self.log_signal.emit)
+        self.progress_signal.emit(100)
+        
+        if error:
+            self.finished_signal.emit(False, f"预估失败: {error}")
+            return
+        
+        for line in format_plan_report(plan):
+            self.log_signal.emit(line)
+        
+        self.finished_signal.emit(
+            True,
+            f"📊 预估完成：{plan['documents']} 篇文档，约 {plan['total_api_calls']} 次API调用"
+        )
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import types
+
+import pytest
+
+# 源码为 src/ 下的平铺模块（与 run.bat / scripts 相同，按模块名导入）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+WIKI_LINK = "https://example.feishu.cn/wiki/space/123"
+
+# 节点树中表示列出子节点失败（与接口返回错误时相同：记录失败，返回空列表，导出继续）
+LISTING_FAILED = object()
+
+
+class FakeAPI:
+    """只提供 raw_content 和子节点列表的飞书接口替身"""
+
+    access_token = "token"
+    base_url = "http://feishu.invalid"
+
+    def __init__(self, contents=None, titles=None):
+        self.contents = contents or {}  # 文档token -> 正文
+        self.titles = titles or {}      # 文档token -> 标题
+        self.tree = {}                  # 父节点token（根为None）-> 子节点
+        self.fetched = []
+
+    def _make_request(self, method, url, headers=None, params=None, **kwargs):
+        items = self.tree.get((params or {}).get("parent_node_token"), [])
+        return {"code": 0, "data": {"items": items, "has_more": False}}
+
+    def get_document_metadata(self, document_id):
+        title = self.titles.get(document_id)
+        return {"document_id": document_id, "title": title} if title else None
+
+    def iter_document_blocks(self, document_id):
+        return None
+
+    def stream_document_content(self, document_id):
+        self.fetched.append(document_id)
+        return iter([self.contents.get(document_id, f"正文 {document_id}\n")])
+
+
+def wiki_node(token, title, has_child=False, revision="1"):
+    """Wiki节点（文档token为 'o' + 节点token）"""
+    return {"node_token": token, "obj_token": "o" + token, "obj_type": "docx", "title": title,
+            "has_child": has_child, "obj_edit_time": revision}
+
+
+@pytest.fixture(autouse=True)
+def data_home(tmp_path, monkeypatch):
+    """素材、缓存等全局数据目录放到临时目录"""
+    from content_store import ContentStore
+    from export_cache import ExportCache
+    from media_store import MediaStore
+
+    home = tmp_path / "home"
+    monkeypatch.setenv("DOCHARVEST_HOME", str(home))
+    # 进程内共享的存储每个测试重新创建
+    for cls in (ContentStore, ExportCache, MediaStore):
+        monkeypatch.setattr(cls, "_default_instance", None, raising=False)
+    return home
+
+
+@pytest.fixture
+def out(tmp_path):
+    """导出的保存路径"""
+    return tmp_path / "out"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """moto 模拟的对象存储（含存储桶 docs），返回 boto3 客户端"""
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for name, value in (("AWS_ACCESS_KEY_ID", "testing"), ("AWS_SECRET_ACCESS_KEY", "testing"),
+                        ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="docs")
+        yield client
+
+
+@pytest.fixture
+def crawl(monkeypatch):
+    """
+    用 FakeAPI 按节点树导出：crawl(api, tree, save_path, output) -> (crawl_wiki 的结果, 爬取器)
+
+    tree 为 {父节点token（根为None）: [节点]}，值为异常时列出子节点抛出该异常（导出中止），
+    为 LISTING_FAILED 时列出子节点失败；listing=True 时由 FakeAPI 返回子节点列表，
+    经过爬取器自身的列出和过滤逻辑
+    """
+    import wiki_crawler
+    from wiki_crawler import WikiCrawler
+
+    monkeypatch.setattr(wiki_crawler, "time", types.SimpleNamespace(time=time.time, sleep=lambda seconds: None))
+
+    def run(api, tree, save_path, output, formats=("md",), listing=False, **kwargs):
+        crawler = WikiCrawler(api, list(formats), md_source="raw", output=output, **kwargs)
+        if listing:
+            api.tree = tree
+            return crawler.crawl_wiki(WIKI_LINK, str(save_path)), crawler
+
+        def children(space_id, parent=None, *args, **kw):
+            result = tree.get(parent, [])
+            if isinstance(result, Exception):
+                raise result
+            if result is LISTING_FAILED:
+                crawler.traversal_errors += 1
+                crawler.partial_listings.add(parent)
+                return []
+            return result
+
+        crawler.get_child_nodes = children
+        result = crawler.crawl_wiki(WIKI_LINK, str(save_path))
+        return result, crawler
+
+    return run
@@ -0,0 +1,87 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from conftest import FakeAPI, wiki_node
+
+from content_store import (CONTENT_BLOCKS, CONTENT_RAW, ContentStore, content_store_from_config,
+                           get_default_content_store, load_content)
+from lru_store import LruStore
+from offline_renderer import OfflineRenderer
+from render_service import RenderService
+
+STORE = {"enabled": True}
+
+
+def _parts(store):
+    return [name for _, _, names in os.walk(store.objects_dir) for name in names if name.endswith(".part")]
+
+
+def test_store_is_opt_in():
+    assert content_store_from_config(None) is None
+    assert content_store_from_config({"max_cache_mb": 10}) is None
+    store = content_store_from_config(STORE)
+    assert isinstance(store, LruStore) and store is get_default_content_store()
+
+
+def test_capture_round_trip(tmp_path):
+    store = ContentStore(str(tmp_path / "content"))
+    pages = [{"items": [{"block_id": "a"}]}, {"items": [{"block_id": "b", "text": "引号\"与\n换行"}]}]
+    assert list(store.capture("doc1", "7", CONTENT_BLOCKS, "标题", iter(pages))) == pages
+    text = ["第一段\n", "含 \"引号\" 与 \\ 😀\n"]
+    assert list(store.capture("doc2", "7", CONTENT_RAW, None, iter(text))) == text
+
+    assert load_content(store.lookup("doc1", "7")) == {
+        "kind": CONTENT_BLOCKS, "obj_token": "doc1", "revision": "7", "title": "标题", "data": pages}
+    assert load_content(store.lookup("doc2", "7"))["data"] == "".join(text)
+    assert store.lookup("doc1", "8") is None
+
+
+def test_capture_writes_incrementally_and_keeps_nothing_when_abandoned(tmp_path):
+    store = ContentStore(str(tmp_path / "content"))
+    chunks = store.capture("doc1", "1", CONTENT_RAW, None, iter(["a" * 1000, "b"]))
+    next(chunks)
+    assert len(_parts(store)) == 1
+    chunks.close()
+    assert _parts(store) == [] and store.lookup("doc1", "1") is None
+
+
+def test_new_revision_replaces_and_evicts(tmp_path):
+    store = ContentStore(str(tmp_path / "content"), max_bytes=1)
+    store.put("doc1", "1", CONTENT_RAW, None, "旧")
+    store.put("doc1", "2", CONTENT_RAW, None, "新")
+    assert store.lookup("doc1", "1") is None and store.lookup("doc1", "2")
+    store.put("doc2", "1", CONTENT_RAW, None, "其他")
+    assert store.lookup("doc1", "2") is None and store.lookup("doc2", "1")
+    store.save()
+    reopened = ContentStore(str(tmp_path / "content"))
+    assert reopened.lookup("doc2", "1") and reopened.total_bytes == store.total_bytes
+
+
+def test_export_reads_stored_content(out, crawl):
+    tree = {None: [wiki_node("a", "A")]}
+    crawl(FakeAPI(), tree, out, None, content_store=STORE)
+    api = FakeAPI()
+    (count, error), _ = crawl(api, tree, out, None, content_store=STORE)
+    assert (count, error) == (1, "") and api.fetched == []
+
+
+def test_rerender_survives_broken_pool(out, crawl, monkeypatch):
+    (count, _), _ = crawl(FakeAPI(), {None: [wiki_node("a", "A")]}, out, None, content_store=STORE)
+    assert count == 1
+    (root,) = out.iterdir()
+
+    def broken(self, fn, *args):
+        raise BrokenProcessPool("工作进程崩溃")
+
+    monkeypatch.setattr(RenderService, "submit_call", broken)
+    assert OfflineRenderer(str(root), processes=1).rerender() == (0, 0, 1)
+
+
+def test_gzip_round_trip_without_zstandard(tmp_path, monkeypatch):
+    import content_store
+
+    monkeypatch.setattr(content_store, "zstandard", None)
+    store = ContentStore(str(tmp_path / "content"))
+    store.put("doc1", "1", CONTENT_RAW, None, "正文")
+    path = store.lookup("doc1", "1")
+    assert path.endswith(".json.gz") and load_content(path)["data"] == "正文"
@@ -0,0 +1,90 @@
+import gzip
+import json
+
+import pytest
+
+from conftest import FakeAPI, wiki_node
+
+from corpus_writer import chunk_markdown, document_records, estimate_tokens
+from output_sink import INDEX_NAME, normalize_output_config
+
+MARKDOWN = """# 发布流程
+
+简介段落。
+
+## 准备
+
+第一步 检查 分支。
+
+第二步 运行 测试。
+
+### 细节
+
+细节内容。
+
+## 上线
+
+上线说明。
+"""
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("发布 release notes!") == 2 + 2 + 1
+
+
+def test_chunks_follow_headings():
+    chunks = list(chunk_markdown(MARKDOWN, max_tokens=512))
+    assert [chunk["headings"] for chunk in chunks] == [[], ["准备"], ["准备", "细节"], ["上线"]]
+    assert all(chunk["title"] == "发布流程" for chunk in chunks)
+    assert "发布流程" not in chunks[0]["text"]
+
+
+def test_chunks_respect_token_limit():
+    chunks = list(chunk_markdown(MARKDOWN, max_tokens=8))
+    assert [chunk["text"] for chunk in chunks if chunk["headings"] == ["准备"]] == ["第一步 检查 分支。", "第二步 运行 测试。"]
+    long = "字" * 25
+    pieces = [chunk["text"] for chunk in chunk_markdown(long, max_tokens=10)]
+    assert "".join(pieces) == long and all(estimate_tokens(piece) <= 10 for piece in pieces)
+
+
+def test_zero_tokens_keeps_whole_document():
+    (chunk,) = chunk_markdown(MARKDOWN, max_tokens=0)
+    assert chunk["headings"] == [] and "上线说明" in chunk["text"] and "细节内容" in chunk["text"]
+
+
+def test_document_records_ids():
+    records = list(document_records(MARKDOWN, {"node_token": "n1", "path": "目录/发布流程"}))
+    assert [record["id"] for record in records] == [f"n1#{i}" for i in range(len(records))]
+    assert records[0]["path"] == "目录/发布流程"
+
+
+@pytest.mark.parametrize("output", [{"chunk_tokens": -1}, {"chunk_tokens": 1.5}, {"shard_mb": 0},
+                                    {"shard_mb": -5}])
+def test_invalid_corpus_options(output):
+    with pytest.raises(ValueError):
+        normalize_output_config(dict(output, format="jsonl"))
+
+
+def test_corpus_requires_markdown(crawl, out):
+    with pytest.raises(ValueError):
+        crawl(FakeAPI(), {}, out, {"format": "jsonl"}, formats=("pdf",))
+
+
+def test_corpus_drops_other_formats_up_front(crawl, out):
+    tree = {None: [wiki_node("a", "A")]}
+    api = FakeAPI({"oa": "这是第一段正文，内容比较长，用来生成一条语料记录。\n"})
+    (count, error), crawler = crawl(api, tree, out, {"format": "jsonl"}, formats=("md", "pdf", "docx"))
+    assert (count, error) == (1, "")
+    assert crawler.export_formats == ["md"] and not crawler.native_formats and not crawler.local_formats
+
+    (root,) = out.iterdir()
+    index = json.loads((root / INDEX_NAME).read_text(encoding="utf-8"))
+    (shard,) = index["shards"]
+    if shard["path"].endswith(".gz"):
+        lines = gzip.decompress((root / shard["path"]).read_bytes()).splitlines()
+    else:
+        import zstandard
+        with zstandard.ZstdDecompressor().stream_reader((root / shard["path"]).open("rb")) as reader:
+            lines = reader.read().splitlines()
+    (record,) = [json.loads(line) for line in lines]
+    assert record["node_token"] == "a" and record["text"].startswith("这是第一段正文")
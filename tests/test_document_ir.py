@@ -0,0 +1,77 @@
+import docx
+import pytest
+
+import document_converter
+from document_converter import DocumentConverter
+from document_ir import HEADING, MarkdownEmitter, emit, parse_markdown
+from line_formatter import heading_level
+
+
+RAW_CONTENT = "\n".join([
+    "一、概述",
+    "",
+    "",
+    "这是第一段正文，内容比较长，以句号结尾。",
+    "1.1 背景",
+    "背景说明写在这里，也是一段完整的句子。",
+    "",
+    "小节",
+    "最后一段正文，结束。",
+])
+
+
+def _paragraphs(path):
+    return [(p.style.name, p.text) for p in docx.Document(path).paragraphs]
+
+
+def _baseline_paragraphs(content, title):
+    """基线版本 to_docx 的段落：连续空行合并为一个空段落，识别出的标题直接使用其级别"""
+    expected = [("Title", title)]
+    prev_empty = False
+    for line in content.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            if not prev_empty:
+                expected.append(("Normal", ""))
+                prev_empty = True
+            continue
+        prev_empty = False
+        level = heading_level(stripped)
+        expected.append((f"Heading {level}", stripped) if level else ("Normal", stripped))
+    return expected
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_raw_content_docx_matches_baseline(tmp_path, monkeypatch, streaming):
+    if streaming:
+        monkeypatch.setattr(document_converter, "STREAMING_DOCX_THRESHOLD", 1)
+    path = str(tmp_path / "doc.docx")
+    assert DocumentConverter().to_docx({"content": RAW_CONTENT}, {"title": "文档标题"}, path)
+    paragraphs = _paragraphs(path)
+    assert paragraphs == _baseline_paragraphs(RAW_CONTENT, "文档标题")
+    assert ("Heading 2", "一、概述") in paragraphs
+
+
+def test_markdown_docx_levels(tmp_path):
+    path = str(tmp_path / "doc.docx")
+    markdown = "# 标题\n\n## 第一节\n\n正文\n\n### 小节\n\n- 列表项\n"
+    assert DocumentConverter().markdown_to_docx(markdown, path)
+    assert _paragraphs(path) == [
+        ("Title", "标题"), ("Heading 1", "第一节"), ("Normal", "正文"),
+        ("Heading 2", "小节"), ("List Bullet", "列表项"),
+    ]
+
+
+def test_markdown_round_trip():
+    markdown = (
+        "# 标题\n\n## 第一节\n\n正文 **加粗** [链接](https://example.com)\n\n"
+        "- 列表\n  - 嵌套\n1. 编号\n\n> 引用\n\n```python\nprint(1)\n```\n\n"
+        "| a | b |\n| --- | --- |\n| 1 | 2 |\n\n---\n"
+    )
+    emitter = MarkdownEmitter()
+    emit(parse_markdown(markdown), [emitter])
+    # 再次解析得到相同的节点
+    first = [(n.kind, n.text, n.level, n.lines, n.rows) for n in parse_markdown(markdown)]
+    second = [(n.kind, n.text, n.level, n.lines, n.rows) for n in parse_markdown(emitter.getvalue())]
+    assert first == second
+    assert first[0][:3] == (HEADING, "标题", 1)
@@ -0,0 +1,42 @@
+from conftest import WIKI_LINK, FakeAPI, wiki_node
+from export_planner import SKIP_UNCHANGED, ExportPlanner
+
+SYNC = {"format": "directory", "sync": True}
+S3 = {"format": "s3", "bucket": "docs", "prefix": "wiki"}
+
+
+def _plan(tree, save_path, output):
+    planner = ExportPlanner(FakeAPI(), ["md"], md_source="raw", output=output, save_path=str(save_path))
+    planner.get_child_nodes = lambda space_id, parent=None, *args, **kwargs: tree.get(parent, [])
+    plan, error = planner.plan_wiki(WIKI_LINK)
+    assert error == ""
+    return plan
+
+
+def _unchanged(plan):
+    return sorted(item["path"] for item in plan["skipped"] if item["reason"] == SKIP_UNCHANGED)
+
+
+def test_sync_plan_skips_unchanged_documents(out, crawl):
+    crawl(FakeAPI(), {None: [wiki_node("a", "A"), wiki_node("p", "P", has_child=True)],
+                      "p": [wiki_node("b", "B"), wiki_node("c", "C")]}, out, SYNC)
+
+    # A 改名为 A2（导出时直接移动原有文件），C 已修改，D 为新页面
+    tree = {None: [wiki_node("a", "A2"), wiki_node("p", "P", has_child=True)],
+            "p": [wiki_node("b", "B"), wiki_node("c", "C", revision="2"), wiki_node("d", "D")]}
+    plan = _plan(tree, out, SYNC)
+    assert _unchanged(plan) == ["A2", "P", "P/B"]
+    assert plan["documents"] == 2 and plan["api_calls"]["raw_content"] == 2
+
+
+def test_plan_without_previous_export_counts_every_document(out):
+    plan = _plan({None: [wiki_node("a", "A"), wiki_node("b", "B")]}, out, SYNC)
+    assert plan["documents"] == 2 and plan["skipped"] == []
+
+
+def test_s3_plan_skips_unchanged_documents(out, crawl, s3):
+    crawl(FakeAPI(), {None: [wiki_node("a", "A"), wiki_node("b", "B")]}, out, S3)
+
+    plan = _plan({None: [wiki_node("a", "A"), wiki_node("b", "B", revision="2")]}, out, S3)
+    assert _unchanged(plan) == ["A"]
+    assert plan["documents"] == 1
@@ -0,0 +1,66 @@
+import types
+
+from cli import cmd_relink
+from export_manifest import MANIFEST_NAME, ExportManifest
+from link_rewriter import LinkRewriter
+
+A_URL = "https://example.feishu.cn/wiki/nA"
+
+CONTENT = f"""# B
+
+见 [A]({A_URL}#part-1) 与 [A2](https://example.feishu.cn/docx/oA?from=wiki)，[外部](https://example.feishu.cn/wiki/nX)。
+
+行内代码 `[A]({A_URL})` 不改写。
+
+```markdown
+[A]({A_URL})
+```
+
+裸链接 {A_URL} 不改写。
+"""
+
+
+def _export(root, files):
+    """写入文件并记入导出清单：{相对路径: (节点token, 内容)}"""
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = ExportManifest(str(root / MANIFEST_NAME))
+    for name, (node_token, content) in files.items():
+        path = root.joinpath(*name.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = content if isinstance(content, bytes) else content.encode("utf-8")
+        path.write_bytes(data)
+        manifest.add(name, len(data), "", {"node-token": node_token, "obj-token": "o" + node_token[1:],
+                                           "obj-type": "docx"})
+    manifest.close()
+
+
+def test_rewrite_keeps_fragments_and_skips_code(out):
+    _export(out, {"docs/A.md": ("nA", "# A\n"), "B.md": ("nB", CONTENT)})
+    rewriter = LinkRewriter(str(out))
+    assert rewriter.rewrite() == (1, 2) and rewriter.failures == 0
+
+    text = (out / "B.md").read_text(encoding="utf-8")
+    assert f'[A](docs/A.md#part-1 "{A_URL}#part-1")' in text
+    assert '[A2](docs/A.md "https://example.feishu.cn/docx/oA?from=wiki")' in text
+    assert "[外部](https://example.feishu.cn/wiki/nX)" in text
+    assert f"`[A]({A_URL})`" in text
+    assert f"```markdown\n[A]({A_URL})\n```" in text
+    assert f"裸链接 {A_URL} 不改写" in text
+
+    # 再次改写（如页面移动后）按标题中的原链接重新计算
+    assert rewriter.rewrite_text(text, "sub/B.md")[0].count("](../docs/A.md") == 2
+    assert rewriter.rewrite_text(text, "B.md") == (text, 0)
+
+
+def test_unclosed_fence_runs_to_end(out):
+    _export(out, {"A.md": ("nA", "# A\n")})
+    content = f"[A]({A_URL})\n\n~~~\n[A]({A_URL})\n"
+    updated, count = LinkRewriter(str(out)).rewrite_text(content, "B.md")
+    assert count == 1 and updated.endswith(f"~~~\n[A]({A_URL})\n")
+
+
+def test_relink_reports_failures(out):
+    _export(out, {"A.md": ("nA", "# A\n"), "B.md": ("nB", f"[A]({A_URL})\n"),
+                  "C.md": ("nC", b"\xff\xfe feishu")})
+    assert cmd_relink(types.SimpleNamespace(output_dir=str(out))) == 1
+    assert '(A.md "' in (out / "B.md").read_text(encoding="utf-8")
@@ -0,0 +1,62 @@
+import os
+
+from export_cache import ExportCache, get_default_export_cache
+from media_store import MediaStore, get_default_media_store
+
+
+def _file(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_export_cache_evicts_least_recently_used(tmp_path):
+    cache = ExportCache(str(tmp_path / "cache"), max_bytes=250)
+    for token in ("a", "b", "c"):
+        cache.add(token, "1", "pdf", _file(tmp_path, f"{token}.pdf", 100))
+        if token == "b":
+            # a 最近使用过，应淘汰 b
+            assert cache.lookup("a", "1", "pdf")
+    assert cache.lookup("a", "1", "pdf")
+    assert cache.lookup("b", "1", "pdf") is None
+    assert cache.lookup("c", "1", "pdf")
+    assert cache.total_bytes == 200
+    # 版本不同不命中
+    assert cache.lookup("a", "2", "pdf") is None
+
+
+def test_export_cache_index_round_trip(tmp_path):
+    root = str(tmp_path / "cache")
+    cache = ExportCache(root)
+    cache.add("a", "1", "pdf", _file(tmp_path, "a.pdf", 10))
+    cache.save()
+    reopened = ExportCache(root)
+    assert reopened.total_bytes == 10
+    path = reopened.lookup("a", "1", "pdf")
+    os.remove(path)
+    # 文件被外部删除后丢弃记录
+    assert reopened.lookup("a", "1", "pdf") is None
+    assert reopened.total_bytes == 0
+
+
+def test_media_store_forgets_tokens_of_evicted_objects(tmp_path):
+    root = str(tmp_path / "media")
+    store = MediaStore(root, max_bytes=150)
+    store.add("t1", _file(tmp_path, "1.tmp", 100), "aa11", ".png")
+    store.add("t2", _file(tmp_path, "2.tmp", 100), "aa11", ".png")  # 相同内容只保留一份
+    assert store.total_bytes == 100
+    store.add("t3", _file(tmp_path, "3.tmp", 100), "bb22", ".png")
+    assert store.lookup("t1") is None and store.lookup("t2") is None
+    assert store.lookup("t3")
+    store.save()
+    reopened = MediaStore(root)
+    assert reopened.lookup("t3") == store.lookup("t3")
+    assert reopened.lookup("t1") is None
+
+
+def test_default_instances_are_per_class():
+    cache = get_default_export_cache()
+    media = get_default_media_store(123)
+    assert get_default_export_cache() is cache
+    assert get_default_media_store() is media and media.max_bytes == 123
+    assert type(cache) is ExportCache and type(media) is MediaStore
@@ -0,0 +1,141 @@
+import os
+import zipfile
+
+from conftest import FakeAPI, wiki_node
+from output_sink import INDEX_NAME, ZipSink, create_output_sink
+
+
+def _outputs(save_path):
+    return sorted(os.listdir(save_path))
+
+
+def test_zip_abort_keeps_part_archive(out):
+    sink = create_output_sink(str(out), "export", {"format": "zip"})
+    path = os.path.join(sink.root, "a.md")
+    sink.write_bytes(path, "正文".encode("utf-8"), {"node-token": "n1"})
+    sink.abort()
+    assert _outputs(out) == ["export.zip.part"]
+    with zipfile.ZipFile(out / "export.zip.part") as archive:
+        assert archive.namelist() == ["a.md"]
+    assert not os.path.exists(sink.root)
+
+
+def test_failed_crawl_leaves_archive_unfinished(out, crawl):
+    tree = {None: [wiki_node("n1", "A", has_child=True), wiki_node("n2", "B")],
+            "n1": RuntimeError("列出子节点失败")}
+    (count, error), _ = crawl(FakeAPI(), tree, out, {"format": "zip"})
+    assert count == 0 and error
+    names = _outputs(out)
+    assert len(names) == 1 and names[0].endswith(".zip.part")
+    with zipfile.ZipFile(out / names[0]) as archive:
+        assert INDEX_NAME not in archive.namelist()
+
+
+def test_close_failure_is_reported(out, crawl, monkeypatch):
+    def fail(self):
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(ZipSink, "_finish_archive", fail)
+    tree = {None: [wiki_node("n1", "A")]}
+    (count, error), _ = crawl(FakeAPI(), tree, out, {"format": "zip"})
+    assert error.startswith("完成输出失败")
+
+
+def test_successful_crawl_finishes_archive(out, crawl):
+    tree = {None: [wiki_node("n1", "A")]}
+    (count, error), _ = crawl(FakeAPI(), tree, out, {"format": "zip"})
+    assert (count, error) == (1, "")
+    names = _outputs(out)
+    assert len(names) == 1 and names[0].endswith(".zip")
+    with zipfile.ZipFile(out / names[0]) as archive:
+        assert {"A.md", INDEX_NAME} <= set(archive.namelist())
+
+
+def _keys(client):
+    return sorted(item["Key"] for item in client.list_objects_v2(Bucket="docs").get("Contents", []))
+
+
+def _flaky_upload(sink, failures):
+    """前 failures[key] 次上传该对象时失败"""
+    upload = sink.client.upload_fileobj
+
+    def flaky(stream, bucket, key, **kwargs):
+        if failures.get(key):
+            failures[key] -= 1
+            raise OSError("连接被重置")
+        return upload(stream, bucket, key, **kwargs)
+
+    sink.client.upload_fileobj = flaky
+
+
+def _write_staged(sink, name, data):
+    path = os.path.join(sink.root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_s3_retry_keeps_metadata(s3):
+    sink = create_output_sink("", "wiki", {"format": "s3", "bucket": "docs"})
+    _flaky_upload(sink, {"wiki/A.pdf": 1})
+    metadata = {"node-token": "n1", "obj-token": "o1", "obj-type": "docx", "source-version": "42"}
+    sink.commit([_write_staged(sink, "A.pdf", b"%PDF-1.4")], metadata)
+    assert _keys(s3) == []
+
+    assert sink.close()
+    assert _keys(s3) == ["wiki/A.pdf", "wiki/_manifest.jsonl"]
+    head = s3.head_object(Bucket="docs", Key="wiki/A.pdf")
+    assert head["Metadata"]["source-version"] == "42"
+    manifest = s3.get_object(Bucket="docs", Key="wiki/_manifest.jsonl")["Body"].read().decode("utf-8")
+    assert '"path": "A.pdf"' in manifest
+    assert not os.path.exists(sink.root)
+
+
+def test_s3_persistent_failure_keeps_staging(s3):
+    sink = create_output_sink("", "wiki", {"format": "s3", "bucket": "docs"})
+    _flaky_upload(sink, {"wiki/A.pdf": 2})
+    sink.write_bytes(os.path.join(sink.root, "B.md"), b"# B", {"node-token": "n2"})
+    path = _write_staged(sink, "A.pdf", b"%PDF-1.4")
+    sink.commit([path], {"node-token": "n1"})
+
+    assert not sink.close()
+    # 未上传导出清单，失败的文件仍在暂存目录中
+    assert _keys(s3) == ["wiki/B.md"]
+    assert os.path.isfile(path)
+
+
+def _uploads(client):
+    return sorted(upload["Key"] for upload in client.list_multipart_uploads(Bucket="docs").get("Uploads", []))
+
+
+def test_s3_abort_only_cancels_own_uploads(s3):
+    sink = create_output_sink("", "wiki", {"format": "s3", "bucket": "docs"})
+    # 同一前缀下另一次导出正在进行的上传
+    s3.create_multipart_upload(Bucket="docs", Key="wiki/other.pdf")
+    sink.client.create_multipart_upload(Bucket="docs", Key="wiki/A.pdf")
+    assert _uploads(s3) == ["wiki/A.pdf", "wiki/other.pdf"]
+
+    sink.abort()
+    assert _uploads(s3) == ["wiki/other.pdf"]
+    assert not os.path.exists(sink.root)
+
+
+
+def test_corpus_retry_keeps_document(tmp_path, monkeypatch):
+    sink = create_output_sink(str(tmp_path), "corpus", {"format": "jsonl"})
+    writer = sink._writer
+    write = writer.write
+    calls = []
+
+    def flaky(records):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("磁盘已满")
+        return write(records)
+
+    monkeypatch.setattr(writer, "write", flaky)
+    path = _write_staged(sink, "A.md", "# A\n\n正文".encode("utf-8"))
+    sink.commit([path], {"node-token": "n1", "source-version": "7"})
+    assert sink.close()
+    assert writer.documents == 1
@@ -0,0 +1,54 @@
+from conftest import FakeAPI
+
+import feishu_native_exporter
+from export_cache import ExportCache
+from output_verifier import OutputRepairer, markdown_title
+
+
+def md_entry(path):
+    return {"node_token": "A", "obj_token": "oA", "obj_type": "docx", "path": path, "format": "md"}
+
+
+def test_markdown_repair_uses_document_title(out):
+    out.mkdir()
+    (out / "周报 (2).md").write_text("\x00损坏", encoding="utf-8")
+    api = FakeAPI({"oA": "正文\n"}, titles={"oA": "周报"})
+
+    repairer = OutputRepairer(api, str(out), md_source="raw")
+    assert repairer.repair([md_entry("周报 (2).md")]) == 1
+    assert markdown_title(str(out / "周报 (2).md")) == "周报"
+
+
+def test_markdown_repair_falls_back_to_existing_heading(out):
+    out.mkdir()
+    (out / "周报 (2).md").write_text("# 周报\n\n旧正文\n", encoding="utf-8")
+
+    repairer = OutputRepairer(FakeAPI({"oA": "正文\n"}), str(out), md_source="raw")
+    assert repairer.repair([md_entry("周报 (2).md")]) == 1
+    text = (out / "周报 (2).md").read_text(encoding="utf-8")
+    assert text.startswith("# 周报\n") and "正文" in text
+
+
+def test_native_repair_discards_cached_export(out, tmp_path, monkeypatch):
+    out.mkdir()
+    broken = out / "周报.pdf"
+    broken.write_bytes(b"%PDF-broken")
+    cache = ExportCache(str(tmp_path / "cache"))
+    cache.add("oA", "1", "pdf", str(broken))
+    assert cache.lookup("oA", "1", "pdf") is not None
+
+    seen = []
+
+    def export_document_batch(self, doc_token, doc_type, export_formats, base_path, filename, revision=None):
+        seen.append(cache.lookup("oA", "1", "pdf"))
+        broken.write_bytes(b"%PDF-1.4 repaired")
+        return {"pdf": (True, "")}
+
+    monkeypatch.setattr(feishu_native_exporter.FeishuNativeExporter, "export_document_batch", export_document_batch)
+    entry = {"node_token": "A", "obj_token": "oA", "obj_type": "docx", "path": "周报.pdf", "format": "pdf"}
+    repairer = OutputRepairer(FakeAPI(), str(out), md_source="raw", export_cache=cache)
+    assert repairer.repair([entry]) == 1
+
+    # 重新导出前已删除缓存，下次导出不会恢复损坏的文件
+    assert seen == [None]
+    assert ExportCache(str(tmp_path / "cache")).lookup("oA", "1", "pdf") is None
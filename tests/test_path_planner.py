@@ -0,0 +1,56 @@
+import pytest
+
+from path_planner import MAX_NAME_BYTES, assign_names, sanitize_name
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("周报", "周报"),
+    ("a/b:c?", "a_b_c_"),
+    # Windows会去掉结尾的点和空格
+    ("报告. ", "报告"),
+    ("...", "未命名"),
+    ("", "未命名"),
+    (None, "未命名"),
+    # Windows保留的设备名（带扩展名同样不可用）
+    ("CON", "_CON"),
+    ("con.txt", "_con.txt"),
+    ("COM1", "_COM1"),
+    ("Console", "Console"),
+    # 按UTF-8字节截断，不截断多字节字符
+    ("a" * 250, "a" * MAX_NAME_BYTES),
+    ("文" * 100, "文" * (MAX_NAME_BYTES // 3)),
+    ("a" * 199 + "文", "a" * 199),
+    ("a" * 199 + " b", "a" * 199),
+])
+def test_sanitize_name(title, expected):
+    assert sanitize_name(title) == expected
+
+
+def _nodes(*items):
+    return [{"node_token": token, "title": title} for token, title in items]
+
+
+@pytest.mark.parametrize("nodes, expected", [
+    (_nodes(("n1", "A"), ("n2", "B")), ["A", "B"]),
+    # 不区分大小写重名，之后的节点追加节点token后缀
+    (_nodes(("tok00000001", "A"), ("tok00000002", "a")), ["A", "a_00000002"]),
+    # 清理后才重名
+    (_nodes(("n1", "a/b"), ("n2", "a:b")), ["a_b", "a_b_n2"]),
+    # 后缀仍然重名时使用完整的节点token
+    (_nodes(("tok00000001", "A"), ("tok00000002", "A"), ("x00000002", "A")),
+     ["A", "A_00000002", "A_x00000002"]),
+    # 与之前分配的带后缀的名称重名
+    (_nodes(("tok00000001", "A"), ("tok00000002", "A"), ("n3", "A_00000002")),
+     ["A", "A_00000002", "A_00000002_n3"]),
+    # 长标题重名时截断标题，为后缀留出位置
+    (_nodes(("tok00000001", "a" * 250), ("tok00000002", "a" * 250)),
+     ["a" * MAX_NAME_BYTES, "a" * (MAX_NAME_BYTES - 9) + "_00000002"]),
+])
+def test_assign_names(nodes, expected):
+    assert assign_names(nodes) == expected
+
+
+def test_assign_names_depends_only_on_order():
+    nodes = _nodes(("n1", "Doc"), ("n2", "doc"), ("n3", "DOC"))
+    assert assign_names(nodes) == assign_names([dict(node) for node in nodes])
+    assert len({name.casefold() for name in assign_names(nodes)}) == 3
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+import requests
+
+import ranged_download
+from ranged_download import AsyncRangedDownloader, RangedDownloader
+
+
+PAYLOAD = os.urandom(300 * 1024)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """支持 Range/206 的文件服务；可让前几个请求中途断开或返回错误"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.headers.get("Range"))
+            fail = server.fail.pop(0) if server.fail else None
+        if fail == "error":
+            self.send_error(503)
+            return
+
+        start, end = 0, len(PAYLOAD) - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if match and server.ranges:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        body = PAYLOAD[start:end + 1]
+        if fail == "drop":
+            # 只发送一部分就断开
+            self.wfile.write(body[:len(body) // 3])
+            self.wfile.flush()
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    httpd.fail = []
+    httpd.ranges = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/file"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_delay(monkeypatch):
+    monkeypatch.setattr(ranged_download, "RETRY_DELAY", 0)
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    split_ranges = ranged_download.split_ranges
+    monkeypatch.setattr(ranged_download, "split_ranges",
+                        lambda size, max_parts: split_ranges(size, max_parts, min_part_size=1024))
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_single_resumes_with_range(server, tmp_path):
+    server.fail = ["drop"]
+    path = str(tmp_path / "file.bin")
+    assert RangedDownloader(requests.Session()).download(server.url, path)
+    assert _read(path) == PAYLOAD
+    assert server.requests[0] is None
+    assert re.match(r"bytes=\d+-$", server.requests[1])
+
+
+def test_single_failed_reconnect_counts_as_attempt(server, tmp_path):
+    # 续传请求本身失败也应留在重试循环中
+    server.fail = ["drop", "error", "drop"]
+    path = str(tmp_path / "file.bin")
+    assert RangedDownloader(requests.Session()).download(server.url, path)
+    assert _read(path) == PAYLOAD
+    assert len(server.requests) == 4
+
+
+def test_single_gives_up_after_max_retries(server, tmp_path):
+    server.fail = ["drop", "error", "error", "error"]
+    path = str(tmp_path / "file.bin")
+    assert not RangedDownloader(requests.Session(), max_retries=3).download(server.url, path)
+    assert not os.path.exists(path) and not os.path.exists(path + ".part")
+
+
+def test_single_restarts_without_range_support(server, tmp_path):
+    server.ranges = False
+    server.fail = ["drop"]
+    path = str(tmp_path / "file.bin")
+    assert RangedDownloader(requests.Session()).download(server.url, path)
+    assert _read(path) == PAYLOAD
+    assert server.requests == [None, None]
+
+
+def test_parallel_ranges(server, tmp_path, small_parts):
+    server.fail = [None, "drop"]
+    path = str(tmp_path / "file.bin")
+    downloader = RangedDownloader(requests.Session(), parallel_threshold=1024, max_parts=3)
+    assert downloader.download(server.url, path)
+    assert _read(path) == PAYLOAD
+    assert sum(1 for header in server.requests if header) >= 3
+
+
+def test_async_single_resumes(server, tmp_path):
+    server.fail = ["drop", "error"]
+    path = str(tmp_path / "file.bin.part")
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            return await AsyncRangedDownloader(session).download(server.url, path)
+
+    assert asyncio.run(run())
+    assert _read(path) == PAYLOAD
+
+
+def test_async_parallel_ranges(server, tmp_path, small_parts):
+    path = str(tmp_path / "file.bin.part")
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            downloader = AsyncRangedDownloader(session, parallel_threshold=1024, max_parts=3)
+            return await downloader.download(server.url, path)
+
+    assert asyncio.run(run())
+    assert _read(path) == PAYLOAD
+
+
+def test_async_parallel_cancels_siblings_on_failure(server, tmp_path, small_parts):
+    path = str(tmp_path / "file.bin.part")
+    started, cancelled = [], []
+
+    class Downloader(AsyncRangedDownloader):
+        async def _download_range(self, url, part_path, start, end, response=None):
+            started.append(start)
+            if start:
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(start)
+                    raise
+            else:
+                response.release()
+                raise ranged_download.DownloadError("boom")
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            downloader = Downloader(session, parallel_threshold=1024, max_parts=3)
+            with pytest.raises(ranged_download.DownloadError):
+                await downloader.download(server.url, path)
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    # 抛出异常时其余区间都已取消并结束
+    assert len(started) == 3
+    assert sorted(cancelled) == sorted(start for start in started if start)
@@ -0,0 +1,25 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from render_service import RenderService, _ready
+
+
+def test_restarts_pool_after_worker_crash():
+    service = RenderService(max_workers=1)
+    try:
+        first_pid = service.submit_call(_ready).result(timeout=30)
+        with pytest.raises(BrokenProcessPool):
+            service.submit_call(os._exit, 1).result(timeout=30)
+        # 后续任务在新的进程池中执行
+        assert service.submit_call(_ready).result(timeout=30) != first_pid
+    finally:
+        service.shutdown()
+
+
+def test_submit_after_shutdown_raises():
+    service = RenderService(max_workers=1)
+    service.shutdown()
+    with pytest.raises(RuntimeError):
+        service.submit_call(_ready)
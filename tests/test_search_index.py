@@ -0,0 +1,40 @@
+from conftest import LISTING_FAILED, FakeAPI, wiki_node
+
+from search_index import SearchIndex, markdown_text
+
+SYNC_SEARCH = {"format": "directory", "sync": True, "search_index": True}
+
+
+def _search(root, query):
+    index = SearchIndex(str(root))
+    try:
+        return sorted(result["path"] for result in index.search(query))
+    finally:
+        index.close()
+
+
+def test_markdown_text_uses_first_heading_as_title():
+    title, body = markdown_text("# 发布流程\n\n正文内容\n", "默认")
+    assert title == "发布流程" and "正文内容" in body and "发布流程" not in body
+    assert markdown_text("没有标题\n", "默认")[0] == "默认"
+
+
+def test_deleted_pages_are_pruned_from_disk_and_index(out, crawl):
+    tree = {None: [wiki_node("a", "A"), wiki_node("b", "B", has_child=True)], "b": [wiki_node("c", "C")]}
+    crawl(FakeAPI(), tree, out, SYNC_SEARCH)
+    (root,) = out.iterdir()
+    assert _search(root, "正文") == ["A.md", "B.md", "B/C.md"]
+
+    crawl(FakeAPI(), {None: [wiki_node("a", "A")]}, out, SYNC_SEARCH)
+    assert not (root / "B.md").exists() and not (root / "B").exists()
+    assert _search(root, "正文") == ["A.md"]
+
+
+def test_unreached_pages_are_kept_after_incomplete_crawl(out, crawl):
+    tree = {None: [wiki_node("a", "A"), wiki_node("b", "B", has_child=True)], "b": [wiki_node("c", "C")]}
+    crawl(FakeAPI(), tree, out, SYNC_SEARCH)
+    (root,) = out.iterdir()
+
+    crawl(FakeAPI(), {None: tree[None], "b": LISTING_FAILED}, out, SYNC_SEARCH)
+    assert (root / "B" / "C.md").exists()
+    assert _search(root, "正文") == ["A.md", "B.md", "B/C.md"]
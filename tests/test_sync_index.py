@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from conftest import LISTING_FAILED, FakeAPI, wiki_node
+from node_filter import NodeFilter
+from sync_index import PARKING_DIR_NAME, SYNC_INDEX_NAME
+
+SYNC = {"format": "directory", "sync": True}
+
+
+def _root(out):
+    (root,) = out.iterdir()
+    return root
+
+
+def _nodes(root):
+    return json.loads((root / SYNC_INDEX_NAME).read_text(encoding="utf-8"))["nodes"]
+
+
+def test_unchanged_documents_are_skipped(out, crawl):
+    tree = {None: [wiki_node("a", "A")]}
+    crawl(FakeAPI(), tree, out, SYNC)
+    api = FakeAPI()
+    (count, error), _ = crawl(api, tree, out, SYNC)
+    assert (count, error) == (1, "") and api.fetched == []
+
+
+def test_renamed_page_is_moved(out, crawl):
+    crawl(FakeAPI(), {None: [wiki_node("a", "A")]}, out, SYNC)
+    api = FakeAPI()
+    crawl(api, {None: [wiki_node("a", "A2")]}, out, SYNC)
+    root = _root(out)
+    assert api.fetched == []
+    assert not (root / "A.md").exists()
+    assert (root / "A2.md").read_text(encoding="utf-8").count("正文 oa") == 1
+
+
+def _moved_while_listing_fails(out, crawl, p2_children):
+    """A 移到 P2 下，B 改名为 A 的旧名称，本次列出 P2 的子节点失败"""
+    crawl(FakeAPI(), {None: [wiki_node("a", "A"), wiki_node("b", "B"), wiki_node("p2", "P2", has_child=True)]},
+          out, SYNC)
+    tree = {None: [wiki_node("b", "A"), wiki_node("p2", "P2", has_child=True)], "p2": p2_children}
+    return crawl(FakeAPI(), tree, out, SYNC)
+
+
+@pytest.mark.parametrize("p2_children", [LISTING_FAILED, RuntimeError("列出子节点失败")])
+def test_parked_page_is_kept_when_not_all_nodes_were_reached(out, crawl, p2_children):
+    _moved_while_listing_fails(out, crawl, p2_children)
+    root = _root(out)
+    assert "正文 ob" in (root / "A.md").read_text(encoding="utf-8")
+    assert "正文 oa" in (root / PARKING_DIR_NAME / "a.md").read_text(encoding="utf-8")
+    assert _nodes(root)["a"]["path"] == f"{PARKING_DIR_NAME}/a"
+
+    # 之后出现时从暂存目录移到新位置，不重新导出
+    api = FakeAPI()
+    tree = {None: [wiki_node("b", "A"), wiki_node("p2", "P2", has_child=True)], "p2": [wiki_node("a", "A")]}
+    (count, error), _ = crawl(api, tree, out, SYNC)
+    assert (count, error) == (3, "") and api.fetched == []
+    assert "正文 oa" in (root / "P2" / "A.md").read_text(encoding="utf-8")
+    assert not (root / PARKING_DIR_NAME).exists()
+
+
+def test_parked_page_is_dropped_after_complete_crawl(out, crawl):
+    _moved_while_listing_fails(out, crawl, [])
+    root = _root(out)
+    assert not (root / PARKING_DIR_NAME).exists()
+    assert "a" not in _nodes(root)
+
+
+def _tree():
+    return {None: [wiki_node("a", "A", has_child=True), wiki_node("b", "B"), wiki_node("c", "C")],
+            "a": [wiki_node("d", "D", has_child=True)], "d": [wiki_node("e", "E")]}
+
+
+@pytest.mark.parametrize("node_filter, kept", [
+    # 达到最大层级的节点不展开
+    (NodeFilter(max_depth=0), ["A/D.md", "A/D/E.md", "B.md"]),
+    # 超过最大层级的节点被剪除
+    (NodeFilter(max_depth=1), ["A/D.md", "A/D/E.md", "B.md"]),
+    # 命中排除规则的子树被剪除
+    (NodeFilter(exclude_paths=["A/D"]), ["A/D.md", "A/D/E.md", "B.md"]),
+    # 不可能命中包含规则的子树不展开
+    (NodeFilter(include_paths=["B"]), ["A/D.md", "A/D/E.md", "B.md"]),
+])
+def test_filtered_subtrees_are_kept_after_complete_crawl(out, crawl, node_filter, kept):
+    crawl(FakeAPI(), _tree(), out, SYNC, listing=True)
+    root = _root(out)
+
+    # C 已从Wiki删除，本次按过滤器只遍历了部分节点
+    tree = _tree()
+    tree[None] = tree[None][:2]
+    (count, error), crawler = crawl(FakeAPI(), tree, out, SYNC, listing=True, node_filter=node_filter)
+    assert error == "" and crawler.traversal_errors == 0
+    assert all((root / path).exists() for path in kept)
+    assert not (root / "C.md").exists()
+    assert set(_nodes(root)) == {"a", "b", "d", "e"}
+
+
+def test_pages_deleted_under_listed_parent_are_dropped_with_filter(out, crawl):
+    crawl(FakeAPI(), _tree(), out, SYNC, listing=True)
+    root = _root(out)
+
+    # D 连同子页面 E 已删除；A 的子节点完整列出
+    tree = _tree()
+    tree["a"] = []
+    crawl(FakeAPI(), tree, out, SYNC, listing=True, node_filter=NodeFilter(exclude_paths=["B"]))
+    assert not (root / "A" / "D.md").exists() and not (root / "A").exists()
+    assert (root / "B.md").exists()
+    assert set(_nodes(root)) == {"a", "b", "c"}
+
+
+def test_parked_page_is_kept_when_filter_skipped_a_subtree(out, crawl):
+    crawl(FakeAPI(), {None: [wiki_node("a", "A"), wiki_node("b", "B"), wiki_node("p2", "P2", has_child=True)]},
+          out, SYNC, listing=True)
+    # A 移到 P2 下，B 改名为 A 的旧名称，本次不展开 P2
+    tree = {None: [wiki_node("b", "A"), wiki_node("p2", "P2", has_child=True)], "p2": [wiki_node("a", "A")]}
+    (count, error), _ = crawl(FakeAPI(), tree, out, SYNC, listing=True, node_filter=NodeFilter(max_depth=0))
+    root = _root(out)
+    assert error == ""
+    assert "正文 oa" in (root / PARKING_DIR_NAME / "a.md").read_text(encoding="utf-8")
+    assert _nodes(root)["a"]["path"] == f"{PARKING_DIR_NAME}/a"
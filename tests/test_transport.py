@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+aiohttp = pytest.importorskip("aiohttp")
+
+from transport import AsyncHttp2Transport  # noqa: E402
+
+URL = "http://docs.invalid/file"
+
+
+def _transport(handler):
+    transport = AsyncHttp2Transport()
+    transport.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return transport
+
+
+def _ok(request):
+    return httpx.Response(200, content=b"data")
+
+
+def test_connection_errors_are_translated():
+    def refuse(request):
+        raise httpx.ConnectError("连接被拒绝", request=request)
+
+    async def run():
+        transport = _transport(refuse)
+        try:
+            with pytest.raises(aiohttp.ClientConnectionError):
+                await transport.get(URL)
+        finally:
+            await transport.close()
+
+    asyncio.run(run())
+
+
+def test_timeouts_are_translated():
+    def slow(request):
+        raise httpx.ReadTimeout("读取超时", request=request)
+
+    async def run():
+        transport = _transport(slow)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await transport.get(URL)
+        finally:
+            await transport.close()
+
+    asyncio.run(run())
+
+
+def test_context_exit_closes_response():
+    async def run():
+        transport = _transport(_ok)
+        async with transport.get(URL) as response:
+            assert await response.read() == b"data"
+        assert response._response.is_closed
+        await transport.close()
+
+    asyncio.run(run())
+
+
+def test_released_responses_are_closed_before_transport_closes():
+    async def run():
+        transport = _transport(_ok)
+        responses = [await transport.get(URL) for _ in range(3)]
+        for response in responses:
+            response.release()
+        await transport.close()
+        assert all(response._response.is_closed for response in responses)
+        assert not transport._closing
+
+    asyncio.run(run())
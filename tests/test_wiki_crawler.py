@@ -0,0 +1,18 @@
+import pytest
+
+import wiki_crawler
+from conftest import FakeAPI
+from output_sink import create_output_sink
+from parallel_crawler import ParallelWikiCrawler
+from wiki_crawler import WikiCrawler
+
+
+@pytest.mark.parametrize("crawler_class", [WikiCrawler, ParallelWikiCrawler])
+def test_media_downloads_use_configured_rate_limits(crawler_class, out, monkeypatch):
+    calls = []
+    monkeypatch.setattr(wiki_crawler.MediaFetcher, "from_config",
+                        lambda api, output_dir, media, rate_limits: calls.append(rate_limits))
+    crawler = crawler_class(FakeAPI(), ["md"], rate_limits={"media_download": 60})
+    crawler.sink = create_output_sink(str(out), "wiki")
+    crawler._open_resources(crawler.sink.root)
+    assert calls == [{"media_download": 60}]